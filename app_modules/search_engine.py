@@ -3,12 +3,15 @@ MODULE: Search Engine System
 VERSION: 2.2.0 (TITANIUM)
 DESCRIPTION: Μηχανή αναζήτησης στα Manuals της μνήμης (Session State).
 ENHANCEMENT: Integrated Speech-to-Text Button.
+NEW: Κωδικοί σφαλμάτων στην αναζήτηση (π.χ. "daikin e7") -> οι σελίδες των πινάκων σφαλμάτων (core/error_code_index.py).
 """
 
 import streamlit as st
 import logging
+import re
 from typing import List, Dict, Any
 from core.language_pack import get_text # Rule 5
+from core.error_code_index import get_error_code_index, find_codes
 
 # Import Speech-to-Text library with graceful error handling (Rule 1)
 try:
@@ -37,6 +40,35 @@ def _get_badge_color(meta_type: str) -> str:
     if "OTHER" in meta or "GENERAL" in meta or "DOC" in meta: return "gray"
     return "gray"
 
+def _render_error_code_hits(query: str, library_data: List[Dict[str, Any]], lang: str) -> None:
+    """Σελίδες manuals για τους κωδικούς της αναζήτησης (error-code index), με φίλτρο μάρκας αν αναφέρεται."""
+    # Ίδιο ταίριασμα μάρκας με το chat (ChatSessionService._build_request): ολόκληρη λέξη, χωρίς διάκριση πεζών/κεφαλαίων
+    query_upper = query.upper()
+    brands = sorted({str(item.get('brand') or '').upper() for item in library_data} - {'', 'UNKNOWN'}, key=len, reverse=True)
+    brand = next((b for b in brands if re.search(rf"\b{re.escape(b)}\b", query_upper)), None)
+    try: # Rule 4
+        hits = get_error_code_index().lookup_text(query, brand=brand)
+    except Exception as e:
+        logger.error(f"Error-code lookup failed for '{query}': {e}", exc_info=True) # Rule 4
+        return
+    links = {item.get('file_id'): item.get('link') for item in library_data}
+    for code, entries in hits.items():
+        if not entries:
+            st.caption(get_text('search_code_not_indexed', lang).format(code=code)) # Rule 5
+            continue
+        st.markdown(f"#### {get_text('search_code_hits', lang).format(code=code, count=len(entries))}") # Rule 5
+        for entry in entries:
+            with st.container(border=True):
+                c1, c2 = st.columns([4, 1])
+                with c1:
+                    st.markdown(f"**{entry['brand']}** · {entry['model']} · 📄 {entry['file_name']}, {get_text('chat_source_page', lang)} {entry['page']}") # Rule 5
+                    st.caption(entry['snippet'])
+                with c2:
+                    link = links.get(entry['file_id'])
+                    if link:
+                        st.link_button(get_text('search_code_open_page', lang).format(page=entry['page']), url=f"{link}#page={entry['page']}",
+                                       use_container_width=True) # Rule 5
+
 def render_search_page(library_data: List[Dict[str, Any]]) -> None:
     """
     Εμφανίζει τη σελίδα αναζήτησης.
@@ -111,6 +143,10 @@ def render_search_page(library_data: List[Dict[str, Any]]) -> None:
             st.button("🎤", key="stt_button_placeholder_search", disabled=True)
             st.info(get_text('search_voice_info', lang)) # Rule 5
 
+    # 3β. Κωδικοί σφαλμάτων: απευθείας στη σελίδα του πίνακα σφαλμάτων
+    if query and find_codes(query):
+        _render_error_code_hits(query, library_data, lang)
+
     # 4. Λογική Αναζήτησης (AND Logic) - Τώρα χρησιμοποιεί τα εμπλουτισμένα μεταδεδομένα
     results = []
     if query:
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: ADAPTIVE CONCURRENCY (AIMD)
+----------------------------------------
+Ελεγκτής ταυτόχρονων κλήσεων προς το AI (Gemini), τύπου AIMD (additive increase / multiplicative decrease).
+Ανεβάζει σταδιακά το όριο in-flight requests όσο ο χρόνος απόκρισης και τα σφάλματα είναι φυσιολογικά,
+και το μειώνει απότομα σε 429 / quota errors ή σε εκτίναξη του latency, ώστε η παραλληλία να
+προσαρμόζεται στο πραγματικό quota αντί να το "χτυπάει" απρόβλεπτα.
+
+Features:
+- acquire()/release(): μπλοκάρει όταν in_flight >= limit (και κατά τη διάρκεια backoff μετά από 429).
+- Additive increase: +1 στο όριο ανά `limit` επιτυχημένες κλήσεις (όπως το congestion avoidance του TCP).
+- Multiplicative decrease: όριο x0.5 σε throttle ή latency spike (το πολύ μία φορά ανά cooldown).
+- Live state (snapshot) για το Organizer: όριο, in-flight, latency, ιστορικό ορίου.
+
+Το module ΔΕΝ κάνει import το google SDK: τα 429 αναγνωρίζονται από κωδικό / όνομα κλάσης.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("Core.AdaptiveConcurrency")
+
+OUTCOME_OK = "ok"
+OUTCOME_THROTTLED = "throttled"
+OUTCOME_ERROR = "error"
+
+THROTTLE_CODES = (429, 503)
+THROTTLE_EXCEPTIONS = ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable")
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """True για 429 / quota / προσωρινή υπερφόρτωση (google.api_core exceptions ή παρόμοια)."""
+    code = getattr(error, 'code', None)
+    code = getattr(code, 'value', code) # grpc.StatusCode ή int
+    if code in THROTTLE_CODES or type(error).__name__ in THROTTLE_EXCEPTIONS:
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "rate limit" in message
+
+
+class AdaptiveConcurrencyController:
+    """Thread-safe AIMD όριο ταυτόχρονων κλήσεων."""
+
+    def __init__(self, initial_limit: int = 2, min_limit: int = 1, max_limit: int = 8,
+                 decrease_factor: float = 0.5, latency_spike_factor: float = 2.5,
+                 backoff_seconds: float = 1.0, max_backoff_seconds: float = 30.0, error_streak_limit: int = 3):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.latency_spike_factor = latency_spike_factor
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.error_streak_limit = error_streak_limit
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.baseline_latency: Optional[float] = None # EWMA των "καλών" χρόνων απόκρισης
+        self.latency_ewma: Optional[float] = None
+        self.counts = {"ok": 0, "throttled": 0, "errors": 0, "latency_spikes": 0, "increases": 0, "decreases": 0}
+        self.history = deque(maxlen=200) # (δευτερόλεπτα από την αρχή, όριο)
+        self._started = time.monotonic()
+        self._backoff_until = 0.0
+        self._throttle_streak = 0
+        self._error_streak = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._record_limit()
+
+    def _record_limit(self):
+        self.history.append((round(time.monotonic() - self._started, 2), int(self.limit)))
+
+    def acquire(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """Μπλοκάρει μέχρι να υπάρχει ελεύθερη θέση. False αν ζητήθηκε διακοπή."""
+        with self._cond:
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                wait = self._backoff_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                    return True
+                self._cond.wait(min(wait, 0.5) if wait > 0 else 0.5)
+
+    def release(self, latency: float, outcome: str = OUTCOME_OK):
+        """Αποδεσμεύει τη θέση και προσαρμόζει το όριο με βάση το αποτέλεσμα της κλήσης."""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = time.monotonic()
+            if outcome == OUTCOME_THROTTLED:
+                self.counts["throttled"] += 1
+                self._throttle_streak += 1
+                backoff = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** (self._throttle_streak - 1)))
+                self._backoff_until = max(self._backoff_until, now + backoff)
+                self._decrease(now, "throttled")
+            elif outcome == OUTCOME_ERROR:
+                self.counts["errors"] += 1
+                self._error_streak += 1
+                if self._error_streak >= self.error_streak_limit:
+                    self._error_streak = 0
+                    self._decrease(now, "errors")
+            else:
+                self.counts["ok"] += 1
+                self._throttle_streak = 0
+                self._error_streak = 0
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+                if self.baseline_latency is not None and latency > self.baseline_latency * self.latency_spike_factor:
+                    self.counts["latency_spikes"] += 1
+                    self._decrease(now, "latency spike")
+                else:
+                    self.baseline_latency = latency if self.baseline_latency is None else 0.9 * self.baseline_latency + 0.1 * latency
+                    if self.limit < self.max_limit and self.in_flight + 1 >= int(self.limit):
+                        # Αύξηση μόνο όταν το όριο χρησιμοποιείται πλήρως (αλλιώς δεν ξέρουμε αν "χωράει").
+                        previous = int(self.limit)
+                        self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+                        if int(self.limit) > previous:
+                            self.counts["increases"] += 1
+                            self._record_limit()
+            self._cond.notify_all()
+
+    def _decrease(self, now: float, reason: str):
+        # Πολλές αποτυχίες από το ίδιο "κύμα" κλήσεων μετρούν ως μία μείωση.
+        cooldown = self.baseline_latency or self.backoff_seconds
+        if now - self._last_decrease < cooldown:
+            return
+        previous = int(self.limit)
+        self.limit = max(float(self.min_limit), int(self.limit * self.decrease_factor))
+        self._last_decrease = now
+        if int(self.limit) == previous:
+            return # Ήδη στο ελάχιστο
+        self.counts["decreases"] += 1
+        self._record_limit()
+        logger.info(f"AI concurrency reduced {previous} -> {int(self.limit)} ({reason}).")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Live state για το UI / summary."""
+        with self._cond:
+            return {
+                "limit": int(self.limit),
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "latency_ms": round(1000 * self.latency_ewma, 1) if self.latency_ewma is not None else None,
+                "baseline_ms": round(1000 * self.baseline_latency, 1) if self.baseline_latency is not None else None,
+                "backoff_remaining_s": round(max(0.0, self._backoff_until - time.monotonic()), 2),
+                **self.counts,
+                "history": list(self.history),
+            }
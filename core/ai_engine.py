@@ -5,19 +5,29 @@ Handles communication with Google Gemini.
 FEATURES:
 - Native PDF Support (Text & Images/Scans)
 - Smart Model Discovery
+- Streaming chat responses (stream_chat_response) with time-to-first-token tracking
 """
 import google.generativeai as genai
 import logging
+import time
 from core.config_loader import ConfigLoader
-from typing import List, Dict, Any, Optional # NEW
+from typing import List, Dict, Any, Iterator, Optional # NEW
 
 logger = logging.getLogger("Core.AI")
 
+CHAT_SAFETY_SETTINGS = [ # Relax safety settings for technical content
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
 class AIEngine:
     def __init__(self):
         self.api_key = ConfigLoader.get_gemini_key()
         self.model = None
         self.last_error = None
+        self.last_stream_stats: Dict[str, Any] = {} # TTFT / συνολικός χρόνος της τελευταίας streaming κλήσης
         self._setup()
 
     def _setup(self):
@@ -84,20 +94,8 @@ class AIEngine:
             self.last_error = f"CRITICAL AI Engine setup error: {e}"
             logger.critical(self.last_error, exc_info=True) # Rule 4
 
-    def get_chat_response(self, content_parts: list, lang: str = "gr", manual_file_content: Optional[str] = None): # MODIFIED
-        """
-        Απαντάει στο chat λαμβάνοντας υπόψη μια λίστα από content parts (κείμενο, αρχεία).
-        Args:
-            content_parts: Μια λίστα από PAIRED_CONTENT (text parts, file parts for Vision).
-                           Είναι η ευθύνη του καλούντος να φτιάξει αυτή τη λίστα σωστά.
-            lang: Γλώσσα για τις οδηγίες συστήματος.
-            manual_file_content: (ΝΕΟ) Περιεχόμενο ενός μεμονωμένου manual (κείμενο) για πρόσθετο context.
-        """
-        if not self.model: 
-            error_message = f"⚠️ AI Offline ({self.last_error or 'Model not initialized'})"
-            logger.error(f"AI Engine: Cannot get chat response because model is not initialized. Error: {self.last_error}") # Rule 4
-            return error_message
-        
+    def _build_chat_content(self, content_parts: list, lang: str, manual_file_content: Optional[str]) -> list:
+        """System instruction + content parts + (προαιρετικά) κείμενο manuals: κοινό για streaming και μη."""
         target_lang = "GREEK" if lang == 'gr' else "ENGLISH"
         
         system_instruction_part = {
@@ -111,7 +109,7 @@ class AIEngine:
             2. **VERIFY**: Check if the documents actually cover the specific error or issue the user asked about.
             3. **ANSWER**:
                - If the solution is in the manuals, explain it step-by-step.
-               - Cite sources: If specific to a manual, mention the filename. If general knowledge, state "⚠️ **Πηγή:** Γενική Γνώση (Δεν βρέθηκε στα εγχειρίδια)".
+               - Cite sources: If specific to a manual, mention the filename and page exactly as given in the "--- MANUAL: ... | PAGE ... ---" headers (e.g. "📄 file.pdf, σ. 140"). If general knowledge, state "⚠️ **Πηγή:** Γενική Γνώση (Δεν βρέθηκε στα εγχειρίδια)".
                - Be concise and provide actionable advice.
                - If the information is not in the provided documents, state that clearly and offer general advice if appropriate.
             
@@ -131,28 +129,80 @@ class AIEngine:
             full_content_to_send.append({
                 "text": f"ADDITIONAL MANUAL CONTEXT (Relevant to selected device):\n{manual_file_content}"
             })
+        return full_content_to_send
+
+    def get_chat_response(self, content_parts: list, lang: str = "gr", manual_file_content: Optional[str] = None): # MODIFIED
+        """
+        Απαντάει στο chat λαμβάνοντας υπόψη μια λίστα από content parts (κείμενο, αρχεία).
+        Args:
+            content_parts: Μια λίστα από PAIRED_CONTENT (text parts, file parts for Vision).
+                           Είναι η ευθύνη του καλούντος να φτιάξει αυτή τη λίστα σωστά.
+            lang: Γλώσσα για τις οδηγίες συστήματος.
+            manual_file_content: (ΝΕΟ) Περιεχόμενο ενός μεμονωμένου manual (κείμενο) για πρόσθετο context.
+        """
+        if not self.model: 
+            error_message = f"⚠️ AI Offline ({self.last_error or 'Model not initialized'})"
+            logger.error(f"AI Engine: Cannot get chat response because model is not initialized. Error: {self.last_error}") # Rule 4
+            return error_message
+
+        full_content_to_send = self._build_chat_content(content_parts, lang, manual_file_content)
 
         try: # Rule 4: Error Handling
-            # Use `stream=True` for better UX in Streamlit, showing response chunk by chunk.
-            # For this simple implementation, we'll fetch the full response at once.
+            # Ολόκληρη η απάντηση με τη μία (sorter, διαγνωστικά). Για το chat: stream_chat_response.
             response = self.model.generate_content(
                 full_content_to_send,
-                stream=False, # Set to True if Streamlit UI needs chunked response
-                safety_settings=[
-                    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-                ]
+                stream=False,
+                safety_settings=CHAT_SAFETY_SETTINGS
             )
-            # Access the response text. For stream=True, this would be an iteration.
             return response.text
         except Exception as e:
-            error_message = f"❌ AI Generation Error: {e}"
-            logger.error(f"AI Engine: Failed to generate content: {e}", exc_info=True) # Rule 4
-            # Check for specific known errors for better user feedback
-            if "429" in str(e):
-                error_message += " (Quota Exceeded)"
-            elif "API_KEY_INVALID" in str(e):
-                error_message += " (Invalid API Key)"
-            return error_message
\ No newline at end of file
+            return self._generation_error_message(e)
+
+    def stream_chat_response(self, content_parts: list, lang: str = "gr", manual_file_content: Optional[str] = None) -> Iterator[str]:
+        """
+        Ίδιο με το get_chat_response, αλλά generator: επιστρέφει τα κομμάτια της απάντησης
+        καθώς παράγονται (generate_content(stream=True)). Μετά το τέλος, το `last_stream_stats`
+        έχει time-to-first-token, συνολικό χρόνο, κομμάτια και χαρακτήρες της κλήσης.
+        """
+        started = time.perf_counter()
+        stats = {"ttft_ms": None, "total_ms": 0.0, "chunks": 0, "chars": 0, "error": None}
+        self.last_stream_stats = stats
+        if not self.model:
+            stats["error"] = self.last_error or 'Model not initialized'
+            logger.error(f"AI Engine: Cannot stream chat response because model is not initialized. Error: {self.last_error}") # Rule 4
+            yield f"⚠️ AI Offline ({stats['error']})"
+            return
+
+        full_content_to_send = self._build_chat_content(content_parts, lang, manual_file_content)
+        try: # Rule 4: Error Handling
+            response = self.model.generate_content(full_content_to_send, stream=True, safety_settings=CHAT_SAFETY_SETTINGS)
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError: # Κομμάτι χωρίς κείμενο (π.χ. μόνο finish_reason/safety metadata)
+                    continue
+                if not text:
+                    continue
+                if stats["ttft_ms"] is None:
+                    stats["ttft_ms"] = round(1000 * (time.perf_counter() - started), 1)
+                stats["chunks"] += 1
+                stats["chars"] += len(text)
+                yield text
+        except Exception as e:
+            stats["error"] = str(e)
+            yield ("\n\n" if stats["chunks"] else "") + self._generation_error_message(e)
+        finally:
+            stats["total_ms"] = round(1000 * (time.perf_counter() - started), 1)
+            logger.info(f"AI Engine: streamed {stats['chunks']} chunks / {stats['chars']} chars, "
+                        f"TTFT {stats['ttft_ms']} ms, total {stats['total_ms']} ms.") # Rule 4
+
+    @staticmethod
+    def _generation_error_message(e: Exception) -> str:
+        error_message = f"❌ AI Generation Error: {e}"
+        logger.error(f"AI Engine: Failed to generate content: {e}", exc_info=True) # Rule 4
+        # Check for specific known errors for better user feedback
+        if "429" in str(e):
+            error_message += " (Quota Exceeded)"
+        elif "API_KEY_INVALID" in str(e):
+            error_message += " (Invalid API Key)"
+        return error_message
\ No newline at end of file
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: CHAT ANSWER CACHE
+------------------------------
+Μόνιμη (SQLite) cache των απαντήσεων του chat για επαναλαμβανόμενες ερωτήσεις
+("Daikin U4 error", "Vaillant F28") πάνω στο ίδιο σύνολο manuals.
+Κλειδί: κανονικοποιημένη ερώτηση + μάρκα + μοντέλο + γλώσσα + hashes των manuals του scope
+(file_id, md5Checksum, από τον κατάλογο) + hash του ιστορικού της συζήτησης.
+Νέα έκδοση ενός manual ή άλλα manuals στο scope -> νέο κλειδί, οπότε η cache δεν σερβίρει παλιές απαντήσεις.
+Το κλειδί δεν εξαρτάται από το retrieval, άρα το lookup γίνεται πριν κατέβει/ευρετηριαστεί οτιδήποτε.
+
+Features:
+- TTL ανά εγγραφή (DEFAULT_TTL_HOURS) και όριο πλήθους (LRU πάνω από MAX_ENTRIES).
+- Ερωτήσεις με ανεβασμένες φωτογραφίες/αρχεία δεν μπαίνουν στην cache (ο caller κάνει opt-out).
+- Admin purge (όλη η cache) και μετρητές hit/miss.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.page_index import normalize_text
+
+logger = logging.getLogger("Core.AnswerCache")
+
+ANSWER_CACHE_DB_PATH = "mastro_nek_local.db" # Ίδια τοπική βάση με τον DatabaseConnector
+DEFAULT_TTL_HOURS = 7 * 24
+MAX_ENTRIES = 2000
+
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_CODE_TOKEN_RE = re.compile(r"([efhuap])0*(\d{1,3})")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Κανονικοποίηση για το κλειδί: πεζά, χωρίς τόνους/σημεία στίξης/διπλά κενά και κωδικοί χωρίς
+    μηδενικά (E07 == E7), ώστε "Daikin U4 error;" == "daikin u04 error".
+    Η σειρά των λέξεων και οι αρνήσεις ("δεν", "not") μένουν: "δεν ψύχει" != "ψύχει", "E1 then E2" != "E2 then E1".
+    """
+    words = []
+    for word in _WORD_RE.findall(normalize_text(question or "")):
+        match = _CODE_TOKEN_RE.fullmatch(word)
+        words.append(f"{match.group(1)}{int(match.group(2))}" if match else word)
+    return " ".join(words)
+
+
+def build_answer_key(question: str, brand: str, model: str, lang: str, context_hashes: Iterable[str],
+                     history: Optional[List[Dict[str, str]]] = None) -> str:
+    """SHA-256 κλειδί της απάντησης (βλ. docstring του module)."""
+    history_digest = hashlib.sha256(
+        "\n".join(f"{m.get('role')}:{m.get('content')}" for m in history or []).encode("utf-8")
+    ).hexdigest() if history else ""
+    payload = json.dumps({
+        "q": normalize_question(question),
+        "brand": (brand or "").strip().upper(),
+        "model": (model or "").strip().lower(),
+        "lang": lang,
+        "context": sorted(context_hashes),
+        "history": history_digest,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """Thread-safe cache: key -> {answer, sources, created_at}."""
+
+    def __init__(self, db_path: str = ANSWER_CACHE_DB_PATH, ttl_hours: float = DEFAULT_TTL_HOURS, max_entries: int = MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        try: # Rule 4: Error Handling
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            with self._lock:
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS ChatAnswerCache (
+                        cache_key TEXT PRIMARY KEY,
+                        question TEXT,
+                        brand TEXT,
+                        lang TEXT,
+                        answer TEXT NOT NULL,
+                        sources_json TEXT,
+                        created_at REAL NOT NULL,
+                        last_used REAL NOT NULL,
+                        hit_count INTEGER DEFAULT 0
+                    )
+                """)
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open answer cache at {db_path}: {e}", exc_info=True)
+            self._conn = None
+
+    def get(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Η αποθηκευμένη απάντηση {"answer", "sources", "created_at", "hit_count"} ή None (miss / ληγμένη)."""
+        if not cache_key or not self._conn:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT answer, sources_json, created_at, hit_count FROM ChatAnswerCache WHERE cache_key = ?", (cache_key,)
+                ).fetchone()
+                if row and time.time() - row[2] <= self.ttl_seconds:
+                    self._conn.execute("UPDATE ChatAnswerCache SET hit_count = hit_count + 1, last_used = ? WHERE cache_key = ?",
+                                       (time.time(), cache_key))
+                    self._conn.commit()
+                    self.hits += 1
+                    return {"answer": row[0], "sources": json.loads(row[1] or "{}"), "created_at": row[2], "hit_count": row[3] + 1}
+                self.misses += 1
+                return None
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Answer cache read failed: {e}", exc_info=True)
+            return None
+
+    def put(self, cache_key: Optional[str], answer: str, sources: Optional[Dict[str, Any]] = None,
+            question: str = "", brand: str = "", lang: str = "") -> bool:
+        """Αποθηκεύει μια απάντηση, διαγράφει τις ληγμένες και εφαρμόζει το όριο πλήθους (LRU)."""
+        if not cache_key or not answer or not self._conn:
+            return False
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ChatAnswerCache (cache_key, question, brand, lang, answer, sources_json, created_at, last_used, hit_count) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                    (cache_key, question[:500], brand, lang, answer, json.dumps(sources or {}, ensure_ascii=False), now, now)
+                )
+                self._conn.execute("DELETE FROM ChatAnswerCache WHERE created_at < ?", (now - self.ttl_seconds,)) # Ληγμένες
+                self._conn.execute(
+                    "DELETE FROM ChatAnswerCache WHERE cache_key IN (SELECT cache_key FROM ChatAnswerCache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self._conn.commit()
+                self.stores += 1
+            return True
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Answer cache write failed: {e}", exc_info=True)
+            return False
+
+    def purge(self) -> int:
+        """Admin: αδειάζει όλη την cache. Επιστρέφει τον αριθμό των εγγραφών που διαγράφηκαν."""
+        if not self._conn:
+            return 0
+        try:
+            with self._lock:
+                cursor = self._conn.execute("DELETE FROM ChatAnswerCache")
+                self._conn.commit()
+            logger.info(f"Answer cache purged ({cursor.rowcount} entries).")
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Answer cache purge failed: {e}", exc_info=True)
+            return 0
+
+    def purge_expired(self) -> int:
+        """Διαγράφει τις ληγμένες εγγραφές."""
+        if not self._conn:
+            return 0
+        try:
+            with self._lock:
+                cursor = self._conn.execute("DELETE FROM ChatAnswerCache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+                self._conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Answer cache purge failed: {e}", exc_info=True)
+            return 0
+
+    def count(self) -> int:
+        if not self._conn:
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ChatAnswerCache").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Μετρητές της τρέχουσας εκτέλεσης και συνολικά hits που έχουν εξυπηρετηθεί από τη βάση."""
+        lookups = self.hits + self.misses
+        total_hits = 0
+        if self._conn:
+            with self._lock:
+                total_hits = self._conn.execute("SELECT COALESCE(SUM(hit_count), 0) FROM ChatAnswerCache").fetchone()[0]
+        return {
+            "entries": self.count(),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "total_hits": total_hits,
+        }
+
+
+_answer_cache: Optional[AnswerCache] = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Κοινόχρηστη cache απαντήσεων της εφαρμογής (μία ανά process, κοινή για όλους τους χρήστες)."""
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = AnswerCache()
+        return _answer_cache
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: CLASSIFICATION CACHE
+---------------------------------
+Μόνιμη (SQLite) cache των αποτελεσμάτων ταξινόμησης του AI.
+Κλειδί: content hash + έκδοση prompt/μοντέλου, ώστε μια αλλαγή στο prompt
+ή στο μοντέλο να ακυρώνει αυτόματα τις παλιές απαντήσεις.
+
+Features:
+- TTL ανά εγγραφή (DEFAULT_TTL_DAYS).
+- Ρητή ακύρωση (ανά hash, ανά έκδοση, ή πλήρης εκκαθάριση).
+- Μετρητές hit/miss για το summary του Organizer.
+"""
+import json
+import sqlite3
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("Core.ClassificationCache")
+
+CACHE_DB_PATH = "mastro_nek_local.db" # Ίδια τοπική βάση με τον DatabaseConnector
+DEFAULT_TTL_DAYS = 90
+
+
+class ClassificationCache:
+    """Thread-safe cache: (content_hash, version) -> metadata dict."""
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, ttl_days: float = DEFAULT_TTL_DAYS):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        try: # Rule 4: Error Handling
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            with self._lock:
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS ClassificationCache (
+                        content_hash TEXT NOT NULL,
+                        version TEXT NOT NULL,
+                        result_json TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        hit_count INTEGER DEFAULT 0,
+                        PRIMARY KEY (content_hash, version)
+                    )
+                """)
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open classification cache at {db_path}: {e}", exc_info=True)
+            self._conn = None
+
+    def get(self, content_hash: Optional[str], version: str) -> Optional[Dict[str, Any]]:
+        """Επιστρέφει το αποθηκευμένο αποτέλεσμα ή None (miss / ληγμένο)."""
+        if not content_hash or not self._conn:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT result_json, created_at FROM ClassificationCache WHERE content_hash = ? AND version = ?",
+                    (content_hash, version)
+                ).fetchone()
+                if row and time.time() - row[1] <= self.ttl_seconds:
+                    self._conn.execute(
+                        "UPDATE ClassificationCache SET hit_count = hit_count + 1 WHERE content_hash = ? AND version = ?",
+                        (content_hash, version)
+                    )
+                    self._conn.commit()
+                    self.hits += 1
+                    return json.loads(row[0])
+                self.misses += 1
+                return None
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Classification cache read failed: {e}", exc_info=True)
+            return None
+
+    def put(self, content_hash: Optional[str], version: str, result: Dict[str, Any]) -> bool:
+        if not content_hash or not self._conn:
+            return False
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ClassificationCache (content_hash, version, result_json, created_at, hit_count) "
+                    "VALUES (?, ?, ?, ?, 0)",
+                    (content_hash, version, json.dumps(result, ensure_ascii=False), time.time())
+                )
+                self._conn.commit()
+                self.stores += 1
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Classification cache write failed: {e}", exc_info=True)
+            return False
+
+    def invalidate(self, content_hash: Optional[str] = None, version: Optional[str] = None) -> int:
+        """
+        Ρητή ακύρωση. Χωρίς ορίσματα αδειάζει όλη την cache.
+        Επιστρέφει τον αριθμό των εγγραφών που διαγράφηκαν.
+        """
+        if not self._conn:
+            return 0
+        clauses, params = [], []
+        if content_hash:
+            clauses.append("content_hash = ?")
+            params.append(content_hash)
+        if version:
+            clauses.append("version = ?")
+            params.append(version)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        try:
+            with self._lock:
+                cursor = self._conn.execute(f"DELETE FROM ClassificationCache{where}", params)
+                self._conn.commit()
+            logger.info(f"Classification cache invalidated {cursor.rowcount} entries.")
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Classification cache invalidation failed: {e}", exc_info=True)
+            return 0
+
+    def purge_expired(self) -> int:
+        """Διαγράφει τις ληγμένες εγγραφές."""
+        if not self._conn:
+            return 0
+        try:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "DELETE FROM ClassificationCache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                )
+                self._conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Classification cache purge failed: {e}", exc_info=True)
+            return 0
+
+    def count(self) -> int:
+        if not self._conn:
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ClassificationCache").fetchone()[0]
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.stores = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Μετρητές της τρέχουσας εκτέλεσης (από το τελευταίο reset_stats)."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
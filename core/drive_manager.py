@@ -8,6 +8,10 @@ Features:
 - Binary Uploads (PDFs from User)
 - NEW: File Renaming
 - NEW: File Deletion
+- NEW: Thread-safe service access (ένας client ανά worker thread)
+- NEW: Batched move/rename mutations
+- NEW: Batched folder creation
+- NEW: Μετρητές κλήσεων API ανά είδος (calls), για το ιστορικό εκτελέσεων του Sorter
 """
 
 from google.oauth2 import service_account
@@ -16,17 +20,23 @@ from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
 import io
 import json
 import logging
+import threading
 import streamlit as st
 from core.config_loader import ConfigLoader
 
 logger = logging.getLogger("Core.Drive")
 SCOPES = ['https://www.googleapis.com/auth/drive']
+BATCH_LIMIT = 100 # Μέγιστος αριθμός κλήσεων ανά batch request του Drive API
 
 class DriveManager:
     """Χειριστής Google Drive API."""
 
     def __init__(self):
         self.service = self._authenticate()
+        self._owner_thread = threading.current_thread()
+        self._local = threading.local()
+        self.calls = {} # Είδος κλήσης -> πλήθος HTTP requests
+        self._calls_lock = threading.Lock()
         # Ensure root_id is loaded only once and correctly, then cached in session_state
         if 'drive_root_folder_id' not in st.session_state:
             st.session_state['drive_root_folder_id'] = ConfigLoader.get_drive_folder_id()
@@ -51,26 +61,86 @@ class DriveManager:
             logger.critical(f"Drive Auth Failed: {e}", exc_info=True)
             return None
 
+    def _count(self, kind: str, count: int = 1):
+        with self._calls_lock:
+            self.calls[kind] = self.calls.get(kind, 0) + count
+
+    def _get_service(self):
+        """
+        Επιστρέφει client για το τρέχον thread.
+        Το httplib2 δεν είναι thread-safe, οπότε κάθε worker thread (π.χ. του Sorter pipeline)
+        παίρνει δικό του client. Το thread που δημιούργησε τον manager χρησιμοποιεί τον αρχικό.
+        """
+        if not self.service or threading.current_thread() is self._owner_thread:
+            return self.service
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self._authenticate() or self.service
+            self._local.service = service
+        return service
+
     def list_files_in_folder(self, folder_id):
         if not self.service: 
             logger.error("Drive service not initialized for list_files_in_folder.")
             return []
         query = f"'{folder_id}' in parents and trashed = false"
+        self._count("list")
         try:
-            results = self.service.files().list(
-                q=query, fields="files(id, name, mimeType, webViewLink, parents)"
+            results = self._get_service().files().list(
+                q=query, fields="files(id, name, mimeType, webViewLink, parents, md5Checksum, size, createdTime)"
             ).execute()
             return results.get('files', [])
         except Exception as e:
             logger.error(f"List Files Error in folder {folder_id}: {e}", exc_info=True)
             return []
 
+    def _list_all(self, query: str, fields: str):
+        """Όλες οι σελίδες ενός files().list (pageSize=1000). None σε σφάλμα."""
+        items, page_token = [], None
+        try:
+            service = self._get_service()
+            while True:
+                self._count("list")
+                results = service.files().list(
+                    q=query, fields=f"nextPageToken, files({fields})", pageSize=1000, pageToken=page_token
+                ).execute()
+                items.extend(results.get('files', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    return items
+        except Exception as e:
+            logger.error(f"List Error for query [{query}]: {e}", exc_info=True)
+            return None
+
+    def list_all_files_in_folder(self, folder_id):
+        """
+        ΝΕΟ: Όλα τα items ενός φακέλου (με pagination), με τα ίδια πεδία με το list_files_in_folder.
+        Επιστρέφει None σε σφάλμα (ώστε ο φάκελος να μη φαίνεται άδειος).
+        """
+        if not self.service:
+            logger.error("Drive service not initialized for list_all_files_in_folder.")
+            return None
+        return self._list_all(f"'{folder_id}' in parents and trashed = false",
+                              "id, name, mimeType, webViewLink, parents, md5Checksum, size, createdTime")
+
+    def list_child_folders(self, folder_id):
+        """
+        ΝΕΟ: Όλοι οι υποφάκελοι ενός φακέλου (με pagination), με query μόνο για φακέλους.
+        Επιστρέφει None σε σφάλμα (ώστε ο caller να μην τους θεωρήσει ανύπαρκτους).
+        """
+        if not self.service:
+            logger.error("Drive service not initialized for list_child_folders.")
+            return None
+        return self._list_all(f"'{folder_id}' in parents and mimeType = 'application/vnd.google-apps.folder' and trashed = false",
+                              "id, name, mimeType, parents")
+
     def download_file_content(self, file_id):
         if not self.service: 
             logger.error("Drive service not initialized for download_file_content.")
             return None
+        self._count("download")
         try:
-            request = self.service.files().get_media(fileId=file_id)
+            request = self._get_service().files().get_media(fileId=file_id)
             fh = io.BytesIO()
             downloader = MediaIoBaseDownload(fh, request)
             done = False
@@ -87,15 +157,17 @@ class DriveManager:
             logger.error("Drive service not initialized for create_folder.")
             return None
         query = f"name = '{name}' and '{parent_id}' in parents and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
+        self._count("create_folder")
         try:
-            existing = self.service.files().list(q=query, fields="files(id)").execute()
+            service = self._get_service()
+            existing = service.files().list(q=query, fields="files(id)").execute()
             files = existing.get('files', [])
             if files: 
                 logger.info(f"Folder '{name}' already exists in {parent_id}. ID: {files[0]['id']}")
                 return files[0]['id']
             
             metadata = {'name': name, 'mimeType': 'application/vnd.google-apps.folder', 'parents': [parent_id]}
-            folder = self.service.files().create(body=metadata, fields='id').execute()
+            folder = service.files().create(body=metadata, fields='id').execute()
             logger.info(f"Created folder '{name}' in {parent_id}. ID: {folder.get('id')}")
             return folder.get('id')
         except Exception as e:
@@ -107,10 +179,12 @@ class DriveManager:
         if not self.service: 
             logger.error("Drive service not initialized for move_file.")
             return False
+        self._count("move")
         try:
-            file = self.service.files().get(fileId=file_id, fields='parents').execute()
+            service = self._get_service()
+            file = service.files().get(fileId=file_id, fields='parents').execute()
             prev_parents = ",".join(file.get('parents', []))
-            self.service.files().update(
+            service.files().update(
                 fileId=file_id, addParents=target_folder_id, removeParents=prev_parents
             ).execute()
             logger.info(f"Moved file {file_id} to folder {target_folder_id}.")
@@ -126,13 +200,91 @@ class DriveManager:
             return False
         try:
             body = {'name': new_name}
-            self.service.files().update(fileId=file_id, body=body, fields='name').execute()
+            self._count("rename")
+            self._get_service().files().update(fileId=file_id, body=body, fields='name').execute()
             logger.info(f"Renamed file {file_id} to '{new_name}'.")
             return True
         except Exception as e:
             logger.error(f"Rename File Error for {file_id} to '{new_name}': {e}", exc_info=True)
             return False
 
+    def batch_update_files(self, operations: list) -> dict:
+        """
+        ΝΕΟ: Εκτελεί πολλές μετακινήσεις/μετονομασίες σε batch requests (έως BATCH_LIMIT ανά κλήση).
+        Κάθε operation είναι dict με: file_id, add_parent (προαιρετικό),
+        remove_parents (λίστα, προαιρετικό), new_name (προαιρετικό).
+        Επιστρέφει {file_id: True/False}.
+        """
+        results = {}
+        if not self.service:
+            logger.error("Drive service not initialized for batch_update_files.")
+            return {op['file_id']: False for op in operations}
+
+        def _callback(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"Batch update failed for {request_id}: {exception}")
+                results[request_id] = False
+            else:
+                results[request_id] = True
+
+        service = self._get_service()
+        for start in range(0, len(operations), BATCH_LIMIT):
+            chunk = operations[start:start + BATCH_LIMIT]
+            batch = service.new_batch_http_request(callback=_callback)
+            for op in chunk:
+                kwargs = {'fileId': op['file_id'], 'fields': 'id'}
+                if op.get('add_parent'):
+                    kwargs['addParents'] = op['add_parent']
+                    if op.get('remove_parents'):
+                        kwargs['removeParents'] = ",".join(op['remove_parents'])
+                if op.get('new_name'):
+                    kwargs['body'] = {'name': op['new_name']}
+                batch.add(service.files().update(**kwargs), request_id=op['file_id'])
+            self._count("batch_update")
+            try:
+                batch.execute()
+            except Exception as e:
+                logger.error(f"Batch update request failed: {e}", exc_info=True)
+                for op in chunk:
+                    results.setdefault(op['file_id'], False)
+        logger.info(f"Batch updated {sum(1 for ok in results.values() if ok)}/{len(operations)} files.")
+        return results
+
+    def batch_create_folders(self, folders: list) -> dict:
+        """
+        ΝΕΟ: Δημιουργεί πολλούς φακέλους σε batch requests (έως BATCH_LIMIT ανά κλήση).
+        Κάθε στοιχείο είναι dict με: key, name, parent_id. ΔΕΝ ελέγχει αν υπάρχουν ήδη.
+        Επιστρέφει {key: folder_id ή None}.
+        """
+        results = {}
+        if not self.service:
+            logger.error("Drive service not initialized for batch_create_folders.")
+            return {f['key']: None for f in folders}
+
+        def _callback(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"Batch folder creation failed for {request_id}: {exception}")
+                results[request_id] = None
+            else:
+                results[request_id] = response.get('id')
+
+        service = self._get_service()
+        for start in range(0, len(folders), BATCH_LIMIT):
+            chunk = folders[start:start + BATCH_LIMIT]
+            batch = service.new_batch_http_request(callback=_callback)
+            for folder in chunk:
+                metadata = {'name': folder['name'], 'mimeType': 'application/vnd.google-apps.folder', 'parents': [folder['parent_id']]}
+                batch.add(service.files().create(body=metadata, fields='id'), request_id=folder['key'])
+            self._count("batch_create_folders")
+            try:
+                batch.execute()
+            except Exception as e:
+                logger.error(f"Batch folder creation request failed: {e}", exc_info=True)
+                for folder in chunk:
+                    results.setdefault(folder['key'], None)
+        logger.info(f"Batch created {sum(1 for fid in results.values() if fid)}/{len(folders)} folders.")
+        return results
+
     def delete_file(self, file_id) -> bool: # NEW
         """Διαγράφει ένα αρχείο από το Google Drive."""
         if not self.service:
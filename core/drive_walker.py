@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: CONCURRENT DRIVE TREE WALKER
+-----------------------------------------
+Παράλληλη αναδρομική περιήγηση φακέλων του Google Drive.
+Τα listings των υποφακέλων εκτελούνται ταυτόχρονα σε thread pool και τα αρχεία επιστρέφονται
+(streaming) μόλις βρεθούν, ανά φάκελο, ώστε ο καταναλωτής (π.χ. το Sorter pipeline) να ξεκινά
+αμέσως αντί να περιμένει ολόκληρη την περιήγηση.
+
+Ο καλών αποφασίζει ποιοι φάκελοι εξερευνώνται (`should_descend`), π.χ. ο Sorter
+παραλείπει τους οργανωμένους φακέλους (ALLOWED_CATEGORIES) και τους IGNORED_FOLDERS_TOP_LEVEL.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("Core.DriveWalker")
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+DEFAULT_WALK_WORKERS = 4
+DEFAULT_MAX_DEPTH = 8 # Προστασία από κύκλους (shortcuts) και παθολογικά βαθιά δέντρα
+
+
+class DriveTreeWalker:
+    """Thread-safe walker: ένα πλήρες (paginated) `list_all_files_in_folder` ανά φάκελο, έως `workers` ταυτόχρονα."""
+
+    def __init__(self, drive: Any, workers: int = DEFAULT_WALK_WORKERS, max_depth: int = DEFAULT_MAX_DEPTH):
+        self.drive = drive
+        self.workers = max(1, workers)
+        self.max_depth = max_depth
+        self.stats = {"folders_listed": 0, "folders_skipped": 0, "files_found": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def _list(self, folder_id: str) -> List[Dict[str, Any]]:
+        try:
+            listing = self.drive.list_all_files_in_folder(folder_id)
+        except Exception as e:
+            logger.error(f"Listing folder {folder_id} failed: {e}", exc_info=True)
+            listing = None
+        if listing is None: # Αποτυχία (όχι άδειος φάκελος): μετράει στα errors της περιήγησης
+            logger.warning(f"Folder {folder_id} could not be listed, its files are skipped in this run.")
+            with self._lock:
+                self.stats["errors"] += 1
+            return []
+        with self._lock:
+            self.stats["folders_listed"] += 1
+        return listing
+
+    def walk(self, root_id: str, should_descend: Callable[[Dict[str, Any], List[str]], bool],
+             on_listing: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> Iterator[tuple]:
+        """
+        Επιστρέφει (streaming) tuples (files, path) ανά φάκελο: τα μη-φακέλους items του
+        φακέλου και τη διαδρομή του (λίστα ονομάτων από τη ρίζα, [] για τη ρίζα).
+        `should_descend(folder_item, parent_path)`: True αν ο υποφάκελος πρέπει να εξερευνηθεί.
+        `on_listing(listing)`: καλείται με κάθε ακατέργαστο listing (π.χ. για prefill του FolderMetadataResolver).
+        Το κλείσιμο του generator ακυρώνει τα listings που εκκρεμούν.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="drive-walk")
+        visited = {root_id}
+        pending = {executor.submit(self._list, root_id): ([], 0)}
+        try:
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, depth = pending.pop(future)
+                    listing = future.result()
+                    if on_listing:
+                        on_listing(listing)
+                    files = []
+                    for item in listing:
+                        if item.get('mimeType') != FOLDER_MIME:
+                            files.append(item)
+                            continue
+                        if item['id'] in visited or depth >= self.max_depth or not should_descend(item, path):
+                            with self._lock:
+                                self.stats["folders_skipped"] += 1
+                            continue
+                        visited.add(item['id'])
+                        pending[executor.submit(self._list, item['id'])] = (path + [item['name']], depth + 1)
+                    with self._lock:
+                        self.stats["files_found"] += len(files)
+                    if files:
+                        yield files, path
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
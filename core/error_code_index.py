@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: ERROR-CODE INVERTED INDEX
+--------------------------------------
+Ευρετήριο κωδικών σφαλμάτων (E7, F28, U4, A3, P1, H11...) σε όλα τα manuals:
+κωδικός -> (μάρκα, μοντέλο, αρχείο, σελίδα, απόσπασμα).
+Χτίζεται σταδιακά κατά το sync (μόνο νέα/αλλαγμένα αρχεία) και όποτε το chat ευρετηριάζει
+ένα manual, από το κείμενο της κοινής cache (core/text_cache.py).
+Chat, διαγνωστικά και αναζήτηση βρίσκουν τη σωστή σελίδα χωρίς download.
+
+Features:
+- Μοτίβα E/F/H/U/A/P + ψηφία, με παραλλαγές "E-07", "E:07", "E07" -> "E7".
+- Ελληνικά "όμοια" κεφαλαία (Ε, Η, Α, Ρ) από OCR/ελληνικά manuals κανονικοποιούνται σε λατινικά.
+- Μόνο σελίδες που μοιάζουν με πίνακα σφαλμάτων: δίγλωσσες επικεφαλίδες ("Error codes",
+  "Κωδικοί σφαλμάτων", "Βλάβες"...) ή αρκετοί διαφορετικοί κωδικοί στην ίδια σελίδα.
+- SQLite με index στον κωδικό: lookup σε χιλιοστά του δευτερολέπτου.
+
+Το module ΔΕΝ κάνει import το streamlit.
+"""
+import re
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.page_index import normalize_text
+
+logger = logging.getLogger("Core.ErrorCodeIndex")
+
+ERROR_INDEX_DB_PATH = "mastro_nek_local.db" # Ίδια τοπική βάση με τον DatabaseConnector
+
+MIN_CODES_FOR_TABLE = 4   # Σελίδα χωρίς επικεφαλίδα μετράει ως πίνακας από τόσους διαφορετικούς κωδικούς
+SNIPPET_MAX_CHARS = 220
+DEFAULT_LOOKUP_LIMIT = 10
+
+_GREEK_LOOKALIKES = str.maketrans({"Ε": "E", "Η": "H", "Α": "A", "Ρ": "P", "ε": "e", "η": "h", "α": "a", "ρ": "p"})
+# Στα manuals μόνο κεφαλαία (αλλιώς "a10" σε κείμενο θα γινόταν κωδικός)· στις ερωτήσεις και πεζά.
+# Χωρίς κενό ανάμεσα: το "A 10 mm" δεν είναι κωδικός.
+_CODE_RE = re.compile(r"(?<![\w\-/.])([EFHUAP])[\-:]?(\d{1,3})(?![\w\-]|[.,/]\d)")
+_QUERY_CODE_RE = re.compile(r"(?<![\w\-/.])([EFHUAP])-?(\d{1,3})(?![\w\-]|[.,/]\d)", re.IGNORECASE)
+_HEADING_RE = re.compile(r"error|fault|alarm|malfunction|troubleshoot|self[\s\-]?diagnos|σφαλμ|βλαβ|δυσλειτουργ")
+
+
+def normalize_code(letter: str, digits: str) -> str:
+    """'e', '07' -> 'E7' (χωρίς μηδενικά μπροστά, ώστε E07 == E7)."""
+    return f"{letter.upper()}{int(digits)}"
+
+
+def find_codes(text: str) -> List[str]:
+    """Κωδικοί σφαλμάτων που αναφέρει ένα ελεύθερο κείμενο (π.χ. η ερώτηση του τεχνικού), με σειρά εμφάνισης."""
+    codes: List[str] = []
+    for match in _QUERY_CODE_RE.finditer((text or "").translate(_GREEK_LOOKALIKES)):
+        code = normalize_code(match.group(1), match.group(2))
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+def extract_page_codes(text: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Κωδικοί μιας σελίδας manual: {code: {"score", "snippet"}}. Κενό αν η σελίδα δεν μοιάζει με πίνακα σφαλμάτων.
+    Score: εμφανίσεις + μπόνους επικεφαλίδας + μπόνους όταν ο κωδικός ξεκινά γραμμή (γραμμή πίνακα).
+    """
+    text = text or ""
+    found: Dict[str, Dict[str, Any]] = {}
+    for match in _CODE_RE.finditer(text.translate(_GREEK_LOOKALIKES)): # 1:1 αντιστοίχιση χαρακτήρων: οι θέσεις ισχύουν και στο αρχικό κείμενο
+        code = normalize_code(match.group(1), match.group(2))
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        starts_row = not text[line_start:match.start()].strip()
+        entry = found.setdefault(code, {"count": 0, "row": False, "position": match.start()})
+        entry["count"] += 1
+        if starts_row and not entry["row"]:
+            entry["row"], entry["position"] = True, match.start()
+    if not found:
+        return {}
+    heading = bool(_HEADING_RE.search(normalize_text(text)))
+    if not heading and len(found) < MIN_CODES_FOR_TABLE:
+        return {}
+    result = {}
+    for code, entry in found.items():
+        start = text.rfind("\n", 0, entry["position"]) + 1
+        end = text.find("\n", entry["position"])
+        end = len(text) if end < 0 else end
+        following = text[end + 1:text.find("\n", end + 1) if text.find("\n", end + 1) > 0 else len(text)]
+        if following.strip() and not _CODE_RE.match(following.strip().translate(_GREEK_LOOKALIKES)):
+            end += 1 + len(following) # Η περιγραφή συνεχίζει στην επόμενη γραμμή (όχι νέα γραμμή πίνακα)
+        snippet = " ".join(text[start:end].split())
+        result[code] = {"score": entry["count"] + (3 if heading else 0) + (2 if entry["row"] else 0),
+                        "snippet": snippet[:SNIPPET_MAX_CHARS]}
+    return result
+
+
+class ErrorCodeIndex:
+    """Thread-safe inverted index κωδικός -> σελίδες manuals (SQLite)."""
+
+    def __init__(self, db_path: str = ERROR_INDEX_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = None
+        try: # Rule 4: Error Handling
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            with self._lock:
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS ErrorCodeEntries (
+                        code TEXT NOT NULL,
+                        file_id TEXT NOT NULL,
+                        page INTEGER NOT NULL,
+                        brand TEXT,
+                        model TEXT,
+                        file_name TEXT,
+                        snippet TEXT,
+                        score REAL,
+                        PRIMARY KEY (code, file_id, page)
+                    )
+                """)
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_error_code_file ON ErrorCodeEntries (file_id)")
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS ErrorCodeFiles (
+                        file_id TEXT PRIMARY KEY,
+                        checksum TEXT,
+                        codes INTEGER,
+                        indexed_at TEXT
+                    )
+                """)
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open error-code index at {db_path}: {e}", exc_info=True) # Rule 4
+            self._conn = None
+
+    # --- INDEXING ---
+
+    def is_indexed(self, file_id: str, checksum: Optional[str] = None) -> bool:
+        """True αν το αρχείο έχει σαρωθεί (με το ίδιο checksum, όταν δίνεται)."""
+        if self._conn is None:
+            return False
+        with self._lock:
+            row = self._conn.execute("SELECT checksum FROM ErrorCodeFiles WHERE file_id = ?", (file_id,)).fetchone()
+        return row is not None and (not checksum or row[0] == checksum)
+
+    def add_manual(self, file_id: str, file_name: str, pages: Iterable[Dict[str, Any]], brand: str = "", model: str = "",
+                   checksum: Optional[str] = None) -> int:
+        """Σαρώνει τις σελίδες ({"page" 0-based, "text"}) ενός manual· αντικαθιστά προηγούμενες εγγραφές του. Επιστρέφει #κωδικών."""
+        if self._conn is None:
+            return 0
+        rows = []
+        for page in pages:
+            for code, entry in extract_page_codes(page.get("text", "")).items():
+                rows.append((code, file_id, page["page"], (brand or "").upper(), model or "", file_name, entry["snippet"], entry["score"]))
+        with self._lock:
+            try: # Rule 4: Error Handling
+                self._conn.execute("DELETE FROM ErrorCodeEntries WHERE file_id = ?", (file_id,))
+                self._conn.executemany("INSERT OR REPLACE INTO ErrorCodeEntries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute("INSERT OR REPLACE INTO ErrorCodeFiles VALUES (?, ?, ?, ?)",
+                                   (file_id, checksum, len({r[0] for r in rows}), datetime.now().isoformat()))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error-code indexing failed for '{file_name}': {e}", exc_info=True) # Rule 4
+                return 0
+        return len({r[0] for r in rows})
+
+    def remove_manual(self, file_id: str):
+        if self._conn is None:
+            return
+        with self._lock:
+            try: # Rule 4: Error Handling
+                self._conn.execute("DELETE FROM ErrorCodeEntries WHERE file_id = ?", (file_id,))
+                self._conn.execute("DELETE FROM ErrorCodeFiles WHERE file_id = ?", (file_id,))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Removing '{file_id}' from error-code index failed: {e}", exc_info=True) # Rule 4
+
+    def prune(self, keep_file_ids: Iterable[str]) -> int:
+        """Αφαιρεί αρχεία που δεν υπάρχουν πια στη βιβλιοθήκη (μετά από sync). Επιστρέφει πόσα αφαιρέθηκαν."""
+        if self._conn is None:
+            return 0
+        keep = set(keep_file_ids)
+        with self._lock:
+            stale = [fid for (fid,) in self._conn.execute("SELECT file_id FROM ErrorCodeFiles").fetchall() if fid not in keep]
+        for file_id in stale:
+            self.remove_manual(file_id)
+        return len(stale)
+
+    # --- LOOKUP ---
+
+    def lookup(self, code: str, brand: Optional[str] = None, model: Optional[str] = None,
+               file_ids: Optional[Iterable[str]] = None, limit: int = DEFAULT_LOOKUP_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Σελίδες για έναν κωδικό (π.χ. "E07" ή "E7"), καλύτερες πρώτα. Φίλτρα: μάρκα, μοντέλο (substring)
+        και/ή συγκεκριμένα file_ids (scope του chat). Η σελίδα επιστρέφεται 1-based.
+        """
+        codes = find_codes(code)
+        if self._conn is None or not codes:
+            return []
+        sql = "SELECT code, file_id, page, brand, model, file_name, snippet, score FROM ErrorCodeEntries WHERE code = ?"
+        params: List[Any] = [codes[0]]
+        if brand and brand != '-':
+            sql += " AND brand = ?"
+            params.append(brand.upper())
+        if model:
+            sql += " AND (LOWER(model) LIKE ? OR LOWER(file_name) LIKE ?)"
+            params += [f"%{model.lower()}%"] * 2
+        sql += " ORDER BY score DESC"
+        scope = set(file_ids) if file_ids is not None else None
+        with self._lock:
+            try: # Rule 4: Error Handling
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Error-code lookup failed for '{code}': {e}", exc_info=True) # Rule 4
+                return []
+        results = []
+        for code_, file_id, page, brand_, model_, file_name, snippet, score in rows:
+            if scope is not None and file_id not in scope:
+                continue
+            results.append({"code": code_, "file_id": file_id, "page": page + 1, "brand": brand_, "model": model_,
+                            "file_name": file_name, "snippet": snippet, "score": score})
+            if len(results) >= limit:
+                break
+        return results
+
+    def lookup_text(self, text: str, **filters) -> Dict[str, List[Dict[str, Any]]]:
+        """Όλοι οι κωδικοί ενός ελεύθερου κειμένου -> οι σελίδες τους ({code: [entries]})."""
+        return {code: self.lookup(code, **filters) for code in find_codes(text)}
+
+    def count(self) -> Dict[str, int]:
+        if self._conn is None:
+            return {"manuals": 0, "codes": 0, "entries": 0}
+        with self._lock:
+            manuals = self._conn.execute("SELECT COUNT(*) FROM ErrorCodeFiles").fetchone()[0]
+            codes, entries = self._conn.execute("SELECT COUNT(DISTINCT code), COUNT(*) FROM ErrorCodeEntries").fetchone()
+        return {"manuals": manuals, "codes": codes, "entries": entries}
+
+
+_error_code_index: Optional[ErrorCodeIndex] = None
+_error_code_index_lock = threading.Lock()
+
+
+def get_error_code_index() -> ErrorCodeIndex:
+    """Κοινόχρηστο error-code index της εφαρμογής (ένα ανά process)."""
+    global _error_code_index
+    with _error_code_index_lock:
+        if _error_code_index is None:
+            _error_code_index = ErrorCodeIndex()
+        return _error_code_index
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: FOLDER METADATA RESOLVER
+-------------------------------------
+Memoized folder ID -> (name, parent) για το Google Drive.
+Γεμίζει από τα listings που έχουν ήδη γίνει (οι φάκελοι ενός listing δεν χρειάζονται
+ξεχωριστό request), οπότε ένα scan κοστίζει το πολύ ένα `files().get` ανά φάκελο
+αντί για ένα ανά αρχείο.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("Core.FolderResolver")
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+DEFAULT_TTL_SECONDS = 600 # Φάκελοι που μετονομάζονται εκτός εφαρμογής ξαναδιαβάζονται μετά από 10'
+
+
+class FolderMetadataResolver:
+    """Thread-safe cache ονομάτων φακέλων, κοινή για Sorter και Organizer."""
+
+    def __init__(self, drive: Optional[Any] = None, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.drive = drive
+        self.ttl_seconds = ttl_seconds
+        self.requests = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def remember(self, folder_id: str, name: str, parent_id: Optional[str] = None):
+        if not folder_id or name is None:
+            return
+        with self._lock:
+            self._entries[folder_id] = {"name": name, "parent": parent_id, "at": time.monotonic()}
+
+    def prefill(self, items: List[Dict[str, Any]]):
+        """Καταχωρεί τους φακέλους ενός listing (id, name, parents) χωρίς επιπλέον requests."""
+        for item in items:
+            if item.get('mimeType') == FOLDER_MIME:
+                parents = item.get('parents') or [None]
+                self.remember(item['id'], item.get('name'), parents[0])
+
+    def _cached(self, folder_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(folder_id)
+            if entry and time.monotonic() - entry["at"] <= self.ttl_seconds:
+                return entry
+        return None
+
+    def get_name(self, folder_id: str) -> Optional[str]:
+        """Όνομα φακέλου: από την cache, αλλιώς ένα `files().get` (και αποθήκευση)."""
+        if not folder_id:
+            return None
+        entry = self._cached(folder_id)
+        if entry:
+            return entry["name"]
+        if not self.drive or not getattr(self.drive, 'service', None):
+            return None
+        try:
+            get_service = getattr(self.drive, '_get_service', None)
+            service = get_service() if get_service else self.drive.service
+            info = service.files().get(fileId=folder_id, fields='name, parents').execute()
+            with self._lock:
+                self.requests += 1
+        except Exception as e:
+            logger.error(f"Could not resolve folder name for {folder_id}: {e}", exc_info=True)
+            return None
+        parents = info.get('parents') or [None]
+        self.remember(folder_id, info.get('name'), parents[0])
+        return info.get('name')
+
+    def forget(self, folder_id: Optional[str] = None):
+        """Αφαιρεί έναν φάκελο (ή όλη την cache)."""
+        with self._lock:
+            if folder_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(folder_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"cached_folders": len(self._entries), "requests": self.requests}
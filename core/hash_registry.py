@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: CONTENT HASH REGISTRY
+----------------------------------
+Μόνιμο (SQLite) μητρώο: content hash -> canonical αρχείο (file ID, path, classification).
+Ο Sorter το συμβουλεύεται για άμεση δρομολόγηση διπλοτύπων ανάμεσα σε εκτελέσεις,
+και συγχρονίζεται από το library index (drive_index.json): merge σε κάθε sync, πλήρες rebuild μόνο από τον admin.
+
+Κλειδιά:
+- "md5:<size>:<md5>" από τα metadata του Drive (χωρίς download)
+- "sha256:<hex>" όταν το Drive δεν δίνει md5Checksum
+"""
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("Core.HashRegistry")
+
+REGISTRY_DB_PATH = "mastro_nek_local.db" # Ίδια τοπική βάση με τον DatabaseConnector
+CLASSIFICATION_FIELDS = ["category", "brand", "model", "meta_type", "error_codes"]
+
+
+def checksum_key(item: Dict[str, Any]) -> Optional[str]:
+    """Κλειδί από τα metadata του Drive (size + md5Checksum). None αν λείπουν."""
+    md5 = item.get('md5Checksum')
+    size = item.get('size')
+    if not md5 or size is None:
+        return None
+    return f"md5:{size}:{md5}"
+
+
+class HashRegistry:
+    """Thread-safe μητρώο hash -> canonical αρχείο."""
+
+    def __init__(self, db_path: str = REGISTRY_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        try: # Rule 4: Error Handling
+            # check_same_thread=False: χρησιμοποιείται από τα threads του Sorter pipeline (με δικό μας lock).
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._init_schema()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open hash registry at {db_path}: {e}", exc_info=True)
+            self._conn = None
+
+    def _init_schema(self):
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ContentHashRegistry (
+                    content_hash TEXT PRIMARY KEY,
+                    file_id TEXT NOT NULL,
+                    file_name TEXT,
+                    path TEXT,
+                    category TEXT,
+                    brand TEXT,
+                    model TEXT,
+                    meta_type TEXT,
+                    error_codes TEXT,
+                    source TEXT,
+                    updated_at TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chr_file_id ON ContentHashRegistry (file_id)")
+            self._conn.commit()
+
+    @property
+    def available(self) -> bool:
+        return self._conn is not None
+
+    def lookup(self, content_hash: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Επιστρέφει το canonical αρχείο για ένα hash, ή None."""
+        if not content_hash or not self._conn:
+            return None
+        try:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "SELECT content_hash, file_id, file_name, path, category, brand, model, meta_type, error_codes, source, updated_at "
+                    "FROM ContentHashRegistry WHERE content_hash = ?", (content_hash,)
+                )
+                row = cursor.fetchone()
+                columns = [c[0] for c in cursor.description]
+            return dict(zip(columns, row)) if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Hash registry lookup failed: {e}", exc_info=True)
+            return None
+
+    def register(self, content_hash: Optional[str], file_id: str, file_name: str, path: str = "", classification: Optional[Dict[str, Any]] = None, source: str = "sorter") -> bool:
+        """Καταχωρεί (ή ενημερώνει) το canonical αρχείο ενός hash."""
+        if not content_hash or not self._conn:
+            return False
+        classification = classification or {}
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ContentHashRegistry "
+                    "(content_hash, file_id, file_name, path, category, brand, model, meta_type, error_codes, source, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (content_hash, file_id, file_name, path,
+                     *[str(classification.get(f, '') or '') for f in CLASSIFICATION_FIELDS],
+                     source, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                )
+                self._conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Hash registry register failed for {file_id}: {e}", exc_info=True)
+            return False
+
+    def forget_file(self, file_id: str):
+        """Αφαιρεί όλες τις εγγραφές ενός αρχείου (π.χ. μετά από διαγραφή στο Drive)."""
+        if not self._conn:
+            return
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM ContentHashRegistry WHERE file_id = ?", (file_id,))
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Hash registry delete failed for {file_id}: {e}", exc_info=True)
+
+    def count(self) -> int:
+        if not self._conn:
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ContentHashRegistry").fetchone()[0]
+
+    def _index_rows(self, index_entries: List[Dict[str, Any]], stats: Dict[str, int]) -> Dict[str, tuple]:
+        """Γραμμές του μητρώου από το index (ένα hash -> η πρώτη εγγραφή, όπως στον Sorter)."""
+        rows = {}
+        for entry in index_entries:
+            key = checksum_key(entry)
+            if key is None:
+                stats["skipped_no_checksum"] += 1
+                continue
+            if key in rows:
+                stats["duplicates_in_index"] += 1
+                continue
+            rows[key] = (
+                key, entry.get('file_id'), entry.get('original_name') or entry.get('name'), entry.get('name', ''),
+                *[str(entry.get(f, '') or '') for f in CLASSIFICATION_FIELDS],
+                "index", datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            )
+        return rows
+
+    def merge_from_index(self, index_entries: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Ενημερώνει το μητρώο από το library index χωρίς να σβήνει ό,τι κατέγραψε ο Sorter
+        (sha256 κλειδιά, αρχεία σε _MANUAL_REVIEW / _IRRELEVANT που δεν μπαίνουν στο index).
+        Upsert των εγγραφών του index· διαγράφονται μόνο εγγραφές με source='index' των οποίων
+        το file_id δεν υπάρχει πια στο index (το αρχείο διαγράφηκε/μετακινήθηκε εκτός βιβλιοθήκης).
+        """
+        stats = {"registered": 0, "skipped_no_checksum": 0, "duplicates_in_index": 0, "pruned": 0}
+        if not self._conn:
+            return stats
+        rows = self._index_rows(index_entries, stats)
+        live_ids = {entry.get('file_id') for entry in index_entries if entry.get('file_id')}
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO ContentHashRegistry "
+                    "(content_hash, file_id, file_name, path, category, brand, model, meta_type, error_codes, source, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", list(rows.values())
+                )
+                stale = [(key,) for key, file_id in self._conn.execute(
+                    "SELECT content_hash, file_id FROM ContentHashRegistry WHERE source = 'index'") if file_id not in live_ids]
+                self._conn.executemany("DELETE FROM ContentHashRegistry WHERE content_hash = ?", stale)
+                self._conn.commit()
+            stats["registered"] = len(rows)
+            stats["pruned"] = len(stale)
+            logger.info(f"Hash registry merged from index: {stats}")
+        except sqlite3.Error as e:
+            logger.error(f"Hash registry merge failed: {e}", exc_info=True)
+        return stats
+
+    def rebuild_from_index(self, index_entries: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Admin: ξαναχτίζει ΟΛΟ το μητρώο από το library index (drive_index.json)· οι εγγραφές του Sorter χάνονται.
+        Εγγραφές χωρίς md5Checksum/size (παλιά index) παραλείπονται και μετρώνται.
+        Όταν δύο εγγραφές έχουν το ίδιο hash, κρατιέται η πρώτη (όπως στον Sorter).
+        """
+        stats = {"registered": 0, "skipped_no_checksum": 0, "duplicates_in_index": 0}
+        if not self._conn:
+            return stats
+        rows = self._index_rows(index_entries, stats)
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM ContentHashRegistry")
+                self._conn.executemany(
+                    "INSERT INTO ContentHashRegistry "
+                    "(content_hash, file_id, file_name, path, category, brand, model, meta_type, error_codes, source, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", list(rows.values())
+                )
+                self._conn.commit()
+            stats["registered"] = len(rows)
+            logger.info(f"Hash registry rebuilt from index: {stats}")
+        except sqlite3.Error as e:
+            logger.error(f"Hash registry rebuild failed: {e}", exc_info=True)
+        return stats
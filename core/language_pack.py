@@ -86,6 +86,15 @@ LANGUAGE_PACK = {
     "studying_sources": {"gr": "Μελετώ {count} πηγές...", "en": "Studying {count} sources..."},
     "ai_engine_error": {"gr": "Σφάλμα AI:", "en": "AI Error:"},
     "analyzing": {"gr": "Ανάλυση...", "en": "Analyzing..."},
+    "chat_sources": {"gr": "📚 Πηγές ({count} σελίδες manuals)", "en": "📚 Sources ({count} manual pages)"},
+    "chat_source_page": {"gr": "σελ.", "en": "p."},
+    "chat_sources_timing": {"gr": "Αναζήτηση: {search_ms} ms · νέα manuals στο ευρετήριο: {indexed} ({indexing_ms} ms)", "en": "Search: {search_ms} ms · newly indexed manuals: {indexed} ({indexing_ms} ms)"},
+    "chat_sources_pending": {"gr": "⏳ Δεν πρόλαβαν να φορτωθούν (συνεχίζουν στο παρασκήνιο για την επόμενη ερώτηση): {names}", "en": "⏳ Not loaded in time (still loading in the background for the next question): {names}"},
+    "chat_sources_fallback": {"gr": "Καμία σελίδα δεν ταίριαξε στην ερώτηση· στάλθηκαν οι πρώτες σελίδες των κορυφαίων manuals.", "en": "No page matched the question; the first pages of the top manuals were sent."},
+    "chat_timing": {"gr": "⏱️ Πρώτες λέξεις σε {first_token_ms} ms (AI: {ttft_ms} ms) · σύνολο {total_ms} ms", "en": "⏱️ First words in {first_token_ms} ms (AI: {ttft_ms} ms) · total {total_ms} ms"},
+    "chat_context_budget": {"gr": "✂️ Context: {used}/{budget} tokens · παραλείφθηκαν {dropped} · περικόπηκαν {truncated}", "en": "✂️ Context: {used}/{budget} tokens · dropped {dropped} · truncated {truncated}"},
+    "chat_prefetch_status": {"gr": "🔥 Προετοιμασία manuals στο παρασκήνιο: {done}/{total}", "en": "🔥 Preparing manuals in the background: {done}/{total}"},
+    "chat_cached_answer": {"gr": "⚡ Αποθηκευμένη απάντηση (ίδια ερώτηση στα ίδια manuals) · {total_ms} ms", "en": "⚡ Cached answer (same question, same manuals) · {total_ms} ms"},
     "chat_input_placeholder": {"gr": "Περιγράψτε το πρόβλημα ή τον κωδικό βλάβης...", "en": "Describe the issue or error code..."},
 
     # --- UI Diagnostics (Troubleshooting Wizard) ---
@@ -154,6 +163,9 @@ LANGUAGE_PACK = {
     "search_download_manual": {"gr": "⬇️ Λήψη Manual", "en": "⬇️ Download Manual"},
     "search_download_error": {"gr": "Σφάλμα κατά τη λήψη: {error}", "en": "Error during download: {error}"},
     "search_docs_found": {"gr": "Βρέθηκαν {count} έγγραφα.", "en": "{count} documents found."},
+    "search_code_hits": {"gr": "🔢 Κωδικός {code}: {count} σελίδες σε manuals", "en": "🔢 Code {code}: {count} manual pages"},
+    "search_code_not_indexed": {"gr": "Ο κωδικός {code} δεν βρέθηκε στο ευρετήριο κωδικών (ενημερώνεται σε κάθε συγχρονισμό).", "en": "Code {code} was not found in the error-code index (updated on every sync)."},
+    "search_code_open_page": {"gr": "Άνοιγμα σελ. {page}", "en": "Open p. {page}"},
 
 
     # --- UI Admin Panel ---
@@ -263,6 +275,52 @@ LANGUAGE_PACK = {
     "org_no_files_in_category": {"gr": "Δεν βρέθηκαν αρχεία σε αυτή την κατηγορία.", "en": "No files found in this category."},
     "org_full_log_section": {"gr": "Πλήρες Log Εκτέλεσης Organizer", "en": "Full Organizer Run Log"},
     "org_no_log_entries": {"gr": "Δεν υπάρχουν καταχωρήσεις log.", "en": "No log entries."},
+    "org_pipeline_metrics": {"gr": "⏱️ Απόδοση Σταδίων Pipeline", "en": "⏱️ Pipeline Stage Metrics"},
+    "org_summary_checksum_dupes": {"gr": "♻️ {count} διπλότυπα εντοπίστηκαν από το md5 του Drive χωρίς λήψη ({mb} MB εξοικονόμηση).", "en": "♻️ {count} duplicates detected from Drive md5 without downloading ({mb} MB saved)."},
+    "org_summary_near_dupes": {"gr": "🧬 Σχεδόν-διπλότυπα (ομοιότητα κειμένου): {count} στο _DUPLICATES, {review} για χειροκίνητο έλεγχο.", "en": "🧬 Near-duplicates (text similarity): {count} moved to _DUPLICATES, {review} sent to manual review."},
+    "org_summary_registry_dupes": {"gr": "🗂️ {count} διπλότυπα αρχείων προηγούμενων εκτελέσεων (από το μητρώο hashes).", "en": "🗂️ {count} duplicates of files sorted in earlier runs (from the hash registry)."},
+    "org_registry_info": {"gr": "Μητρώο hashes: {count} καταχωρήσεις.", "en": "Hash registry: {count} entries."},
+    "org_registry_rebuild_btn": {"gr": "🔁 Ανακατασκευή Μητρώου", "en": "🔁 Rebuild Registry"},
+    "org_registry_rebuilt": {"gr": "✅ Το μητρώο ξαναχτίστηκε: {registered} αρχεία ({skipped_no_checksum} χωρίς checksum, {duplicates_in_index} διπλότυπα στο index).", "en": "✅ Registry rebuilt: {registered} files ({skipped_no_checksum} without checksum, {duplicates_in_index} duplicates in index)."},
+    "org_summary_cache_hits": {"gr": "🧠 Cache ταξινομήσεων: {hits} hits / {misses} misses ({rate}% hit rate).", "en": "🧠 Classification cache: {hits} hits / {misses} misses ({rate}% hit rate)."},
+    "org_resume_checkbox": {"gr": "Συνέχεια της εκτέλεσης που διακόπηκε ({run_id}, {started})", "en": "Resume the interrupted run ({run_id}, {started})"},
+    "org_summary_resumed": {"gr": "♻️ Συνέχεια εκτέλεσης {run_id}: {count} αρχεία είχαν ήδη μετακινηθεί και παραλείφθηκαν.", "en": "♻️ Resumed run {run_id}: {count} files were already moved and were skipped."},
+    "org_audit_trail": {"gr": "Ιστορικό μετακινήσεων / μετονομασιών", "en": "Move / rename audit trail"},
+    "org_audit_empty": {"gr": "Δεν υπάρχουν καταγεγραμμένες αλλαγές για αυτή την εκτέλεση.", "en": "No recorded changes for this run."},
+    "org_summary_discovery": {"gr": "Discovery: {folders_listed} φάκελοι εξερευνήθηκαν ({folders_skipped} παραλείφθηκαν), {files_found} αρχεία βρέθηκαν.", "en": "Discovery: {folders_listed} folders walked ({folders_skipped} skipped), {files_found} files found."},
+    "org_ai_concurrency": {"gr": "Παραλληλία κλήσεων AI (AIMD)", "en": "AI call concurrency (AIMD)"},
+    "org_ai_concurrency_state": {"gr": "Όριο: {limit} (εύρος {min_limit}-{max_limit}, μέγιστο in-flight {peak_in_flight}) · Latency: {latency_ms} ms (βάση {baseline_ms} ms) · Επιτυχίες: {ok}, 429: {throttled}, σφάλματα: {errors}, spikes: {latency_spikes} · Αυξήσεις: {increases}, μειώσεις: {decreases}", "en": "Limit: {limit} (range {min_limit}-{max_limit}, peak in-flight {peak_in_flight}) · Latency: {latency_ms} ms (baseline {baseline_ms} ms) · OK: {ok}, 429s: {throttled}, errors: {errors}, spikes: {latency_spikes} · Increases: {increases}, decreases: {decreases}"},
+    "org_tab_history": {"gr": "📈 Ιστορικό Εκτελέσεων", "en": "📈 Run History"},
+    "org_history_empty": {"gr": "Δεν υπάρχουν ακόμα αποθηκευμένες εκτελέσεις.", "en": "No recorded runs yet."},
+    "org_history_compare": {"gr": "Σύγκριση Εκτελέσεων", "en": "Compare Runs"},
+    "org_history_base": {"gr": "Βάση σύγκρισης", "en": "Baseline run"},
+    "org_history_other": {"gr": "Σύγκριση με", "en": "Compared run"},
+    "org_history_stage_avg": {"gr": "Μέσος χρόνος ανά αρχείο και στάδιο (ms)", "en": "Average time per file and stage (ms)"},
+    "org_history_config_changes": {"gr": "Αλλαγές ρυθμίσεων ανάμεσα στις εκτελέσεις", "en": "Configuration changes between the runs"},
+    "org_history_files": {"gr": "Αρχεία εκτέλεσης (χρόνοι σταδίων και κόστος)", "en": "Run files (stage timings and cost)"},
+    "org_summary_cost": {"gr": "Κόστος: {requests} requests AI ({tokens_in} tokens in / {tokens_out} out), {drive} κλήσεις Drive, {mb} MB λήψεις.", "en": "Cost: {requests} AI requests ({tokens_in} tokens in / {tokens_out} out), {drive} Drive calls, {mb} MB downloaded."},
+    "org_dry_run_checkbox": {"gr": "Dry run: δημιουργία σχεδίου χωρίς αλλαγές στο Drive", "en": "Dry run: build a plan without changing Drive"},
+    "org_plan_title": {"gr": "Σχέδιο ταξινόμησης {plan_id} ({created})", "en": "Sorting plan {plan_id} ({created})"},
+    "org_plan_folders": {"gr": "Νέοι φάκελοι προς δημιουργία ({count})", "en": "New folders to create ({count})"},
+    "org_plan_no_folders": {"gr": "Όλοι οι φάκελοι προορισμού υπάρχουν ήδη.", "en": "All target folders already exist."},
+    "org_plan_apply_btn": {"gr": "✅ Εφαρμογή Σχεδίου", "en": "✅ Apply Plan"},
+    "org_plan_discard_btn": {"gr": "🗑️ Απόρριψη Σχεδίου", "en": "🗑️ Discard Plan"},
+    "org_sorter_running": {"gr": "⏳ Ο AI Sorter εκτελείται στο παρασκήνιο...", "en": "⏳ The AI Sorter is running in the background..."},
+    "org_sorter_complete": {"gr": "✅ Η ταξινόμηση ολοκληρώθηκε.", "en": "✅ Sorting completed."},
+    "org_sorter_canceled": {"gr": "⏹️ Η ταξινόμηση διακόπηκε από χρήστη.", "en": "⏹️ Sorting was stopped by a user."},
+    "org_sorter_fatal_error": {"gr": "❌ Κρίσιμο σφάλμα στον AI Sorter: {error}", "en": "❌ Fatal AI Sorter error: {error}"},
+    "org_job_running_by": {"gr": "Εργασία '{kind}' από {started_by} (έναρξη {started}).", "en": "Job '{kind}' by {started_by} (started {started})."},
+    "org_job_already_running": {"gr": "Τρέχει ήδη εργασία του {started_by} (από {started}). Παρακολουθήστε την αντί να ξεκινήσετε νέα.", "en": "A job by {started_by} is already running (since {started}). Follow it instead of starting a new one."},
+    "org_job_stopping": {"gr": "Ζητήθηκε διακοπή· η εργασία θα σταματήσει στο επόμενο σημείο ελέγχου.", "en": "Stop requested; the job will stop at the next checkpoint."},
+    "org_job_live_log": {"gr": "📜 Live log εργασίας", "en": "📜 Live job log"},
+    "org_plan_applied": {"gr": "Το σχέδιο εφαρμόστηκε: {applied} αρχεία, {failed} αποτυχίες, {folders_created} νέοι φάκελοι σε {seconds}s.", "en": "Plan applied: {applied} files, {failed} failed, {folders_created} new folders in {seconds}s."},
+    "org_summary_payloads": {"gr": "📄 Αρχεία προς AI: {full} πλήρη, {slim} slim, {text} μόνο κείμενο ({sent} MB από {original} MB).", "en": "📄 AI payloads: {full} full, {slim} slim, {text} text-only ({sent} MB of {original} MB)."},
+    "org_summary_ai_batches": {"gr": "📦 {files} αρχεία ταξινομήθηκαν σε {requests} ομαδικά requests AI.", "en": "📦 {files} files classified in {requests} batched AI requests."},
+    "org_summary_ai_avoided": {"gr": "⚡ Κλήσεις AI: {made} έγιναν, {avoided} αποφεύχθηκαν ({rules} από κανόνες ονόματος αρχείου).", "en": "⚡ AI calls: {made} made, {avoided} avoided ({rules} by filename rules)."},
+    "org_cache_info": {"gr": "Cache ταξινομήσεων AI: {count} καταχωρήσεις.", "en": "AI classification cache: {count} entries."},
+    "org_cache_clear_btn": {"gr": "🧹 Καθαρισμός Cache", "en": "🧹 Clear Cache"},
+    "org_cache_cleared": {"gr": "✅ Διαγράφηκαν {count} καταχωρήσεις από την cache.", "en": "✅ Removed {count} cache entries."},
+    "org_pipeline_total_time": {"gr": "Συνολικός χρόνος: {seconds} δευτ.", "en": "Total time: {seconds} s"},
 
 
     # --- UI Tools ---
@@ -300,6 +358,19 @@ LANGUAGE_PACK = {
     "specs_user_role": {"gr": "Ρόλος Χρήστη", "en": "User Role"},
     "specs_language": {"gr": "Γλώσσα", "en": "Language"},
     "specs_access_denied": {"gr": "Άρνηση Πρόσβασης.", "en": "Access Denied."},
+    "specs_text_cache": {"gr": "Cache Κειμένου Manuals", "en": "Manual Text Cache"},
+    "specs_cache_hit_ratio": {"gr": "Hit Ratio", "en": "Hit Ratio"},
+    "specs_cache_lookups": {"gr": "{hits} hits / {misses} misses", "en": "{hits} hits / {misses} misses"},
+    "specs_cache_saved_time": {"gr": "Χρόνος που Γλιτώσαμε", "en": "Time Saved"},
+    "specs_cache_size": {"gr": "Μέγεθος", "en": "Size"},
+    "specs_cache_contents": {"gr": "{documents} έγγραφα, {pages} σελίδες στην cache (κλειδί: file_id + checksum, LRU).", "en": "{documents} documents, {pages} pages cached (key: file_id + checksum, LRU)."},
+    "specs_cache_clear": {"gr": "🗑️ Άδειασμα Cache", "en": "🗑️ Clear Cache"},
+    "specs_cache_cleared": {"gr": "Η cache κειμένου άδειασε.", "en": "Text cache cleared."},
+    "specs_answer_cache": {"gr": "Cache Απαντήσεων Chat", "en": "Chat Answer Cache"},
+    "specs_answer_cache_entries": {"gr": "Απαντήσεις", "en": "Answers"},
+    "specs_answer_cache_served": {"gr": "Εξυπηρετήσεις από Cache", "en": "Served from Cache"},
+    "specs_answer_cache_purge": {"gr": "🗑️ Εκκαθάριση Απαντήσεων", "en": "🗑️ Purge Answers"},
+    "specs_answer_cache_purged": {"gr": "Διαγράφηκαν {count} αποθηκευμένες απαντήσεις.", "en": "Purged {count} cached answers."},
 
 
     # --- UI Help User ---
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: LIBRARY CATALOG (BRAND / MODEL LOOKUP)
+---------------------------------------------------
+Προϋπολογισμένες δομές πάνω στο ευρετήριο της βιβλιοθήκης (library_cache) για το chat:
+- Ταξινομημένη λίστα μαρκών (get_brands χωρίς σάρωση του ευρετηρίου σε κάθε rerun).
+- Χάρτης μάρκα -> μοντέλο -> εγγραφές.
+- Ανά μάρκα, ταξινομημένη λίστα suffixes των μοντέλων: το "μοντέλο περιέχει το κείμενο" γίνεται
+  bisect + σάρωση μόνο των suffixes που ξεκινούν με το κείμενο, δηλ. O(log n + αποτελέσματα).
+
+Χτίζεται μία φορά ανά "γενιά" του ευρετηρίου: νέα λίστα (load_index / sync) ή αλλαγή μεγέθους
+(append ενός upload) -> ο catalog ξαναχτίζεται αυτόματα (βλ. matches()).
+
+Το module ΔΕΝ κάνει import το streamlit.
+"""
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("Core.LibraryCatalog")
+
+
+class LibraryCatalog:
+    """Read-only όψη μιας γενιάς του ευρετηρίου. Οι εγγραφές είναι τα ίδια dicts (όχι αντίγραφα)."""
+
+    def __init__(self, data: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        self._source = data # Κρατάμε την αναφορά: όσο ζει ο catalog, το id() της λίστας δεν ξαναχρησιμοποιείται
+        self._size = len(data)
+        self._by_brand: Dict[str, List[tuple]] = {}            # brand -> [(θέση, εγγραφή)] με τη σειρά του ευρετηρίου
+        self._by_model: Dict[str, Dict[str, List[tuple]]] = {}  # brand -> model -> [(θέση, εγγραφή)]
+        self._suffixes: Dict[str, List[tuple]] = {}             # brand -> ταξινομημένα (suffix, model)
+        brands = set()
+
+        for position, item in enumerate(data):
+            brand = (item.get('brand') or '').upper()
+            model = (item.get('model') or '').upper()
+            self._by_brand.setdefault(brand, []).append((position, item))
+            self._by_model.setdefault(brand, {}).setdefault(model, []).append((position, item))
+            display_brand = (item.get('brand', 'Unknown') or '').upper() # Ίδιος κανόνας με το παλιό get_brands
+            if display_brand and display_brand != 'UNKNOWN':
+                brands.add(display_brand)
+
+        for brand, models in self._by_model.items():
+            self._suffixes[brand] = sorted((model[i:], model) for model in models for i in range(len(model)))
+
+        self.brands: List[str] = sorted(brands)
+        self.build_ms = round(1000 * (time.perf_counter() - started), 1)
+        logger.info(f"Library catalog built: {self._size} entries, {len(self.brands)} brands in {self.build_ms} ms.") # Rule 4
+
+    def matches(self, data: List[Dict[str, Any]]) -> bool:
+        """True αν ο catalog αντιστοιχεί ακόμη σε αυτή τη λίστα (ίδιο αντικείμενο, ίδιο μέγεθος)."""
+        return data is self._source and len(data) == self._size
+
+    def manuals(self, brand: str, model_keyword: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Εγγραφές της μάρκας (ακριβές ταίριασμα, χωρίς διάκριση πεζών/κεφαλαίων) των οποίων το μοντέλο
+        περιέχει το `model_keyword` (αν δοθεί), με τη σειρά του ευρετηρίου.
+        """
+        target_brand = (brand or '').upper()
+        if not model_keyword:
+            return [item for _, item in self._by_brand.get(target_brand, [])]
+
+        target_model = model_keyword.upper()
+        suffixes = self._suffixes.get(target_brand, [])
+        models = set()
+        position = bisect_left(suffixes, (target_model,))
+        while position < len(suffixes) and suffixes[position][0].startswith(target_model):
+            models.add(suffixes[position][1])
+            position += 1
+        models_index = self._by_model.get(target_brand, {})
+        hits = [entry for model in models for entry in models_index[model]]
+        hits.sort(key=lambda entry: entry[0])
+        return [item for _, item in hits]
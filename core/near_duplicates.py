@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: NEAR-DUPLICATE DETECTION (MINHASH + LSH)
+-----------------------------------------------------
+Εντοπισμός σχεδόν-διπλοτύπων εγχειριδίων από το εξαγόμενο κείμενο: ξανασκαναρισμένα,
+ξαναεξαγμένα ή με διαφορετικό watermark αντίγραφα του ίδιου manual έχουν διαφορετικό
+SHA-256 / md5, αλλά σχεδόν το ίδιο σύνολο φράσεων.
+
+Features:
+- MinHash υπογραφές (NUM_PERM τιμές) από word shingles του κανονικοποιημένου κειμένου.
+- LSH buckets (bands x rows): η αναζήτηση κοιτάει μόνο τους υποψήφιους της ίδιας "λωρίδας",
+  όχι όλη τη βιβλιοθήκη (sub-linear lookup).
+- Similarity = εκτίμηση Jaccard (ποσοστό ίδιων τιμών MinHash) για κάθε υποψήφιο.
+- Μόνιμη (SQLite) αποθήκευση υπογραφών των canonical αρχείων, για εντοπισμό ανάμεσα σε εκτελέσεις.
+
+Το module ΔΕΝ κάνει import το streamlit.
+"""
+import re
+import sqlite3
+import logging
+import threading
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+logger = logging.getLogger("Core.NearDuplicates")
+
+NEAR_DUP_DB_PATH = "mastro_nek_local.db" # Ίδια τοπική βάση με τον DatabaseConnector
+
+NUM_PERM = 128
+LSH_BANDS = 32                 # 32 x 4 rows: υποψήφιος με πιθανότητα >99.9% από similarity 0.75, ~23% στο 0.3
+SHINGLE_SIZE = 3               # Λέξεις ανά shingle (μικρότερο = ανθεκτικότερο σε θόρυβο OCR)
+MIN_SHINGLES = 30              # Λιγότερο κείμενο (π.χ. σκαναρισμένα PDF χωρίς OCR) δεν αρκεί για σύγκριση
+DUPLICATE_THRESHOLD = 0.90     # >= : σχεδόν-διπλότυπο, πηγαίνει στο _DUPLICATES
+REVIEW_THRESHOLD = 0.75        # >= : πιθανό σχεδόν-διπλότυπο, πηγαίνει για χειροκίνητο έλεγχο
+
+_SEED = 20240517               # Σταθερό seed: οι αποθηκευμένες υπογραφές μένουν συγκρίσιμες
+_SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15) # Συνδυασμός των hashes των λέξεων ενός shingle
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+class NearDuplicateIndex:
+    """Thread-safe MinHash/LSH ευρετήριο: file_id -> υπογραφή."""
+
+    def __init__(self, db_path: Optional[str] = NEAR_DUP_DB_PATH, num_perm: int = NUM_PERM, bands: int = LSH_BANDS,
+                 shingle_size: int = SHINGLE_SIZE, min_shingles: int = MIN_SHINGLES,
+                 duplicate_threshold: float = DUPLICATE_THRESHOLD, review_threshold: float = REVIEW_THRESHOLD):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands}).")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        self.duplicate_threshold = duplicate_threshold
+        self.review_threshold = review_threshold
+        self.params = f"{num_perm}:{shingle_size}:{_SEED}" # Αλλαγή παραμέτρων = ασύμβατες υπογραφές
+        # Multiply-shift hashing: h(x) = (a * x + b) mod 2^64 >> 32, με περιττό a (χωρίς ακριβό modulo).
+        rng = np.random.default_rng(_SEED)
+        self._a = (rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._names: Dict[str, str] = {}
+        self._buckets: List[Dict[bytes, Set[str]]] = [defaultdict(set) for _ in range(bands)]
+        self._unpersisted: Set[str] = set()
+        self.stats = {"queries": 0, "candidates": 0, "near_duplicates": 0, "reviews": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            try: # Rule 4: Error Handling
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                with self._lock:
+                    self._conn.execute("""
+                        CREATE TABLE IF NOT EXISTS NearDuplicateSignatures (
+                            file_id TEXT PRIMARY KEY,
+                            file_name TEXT,
+                            params TEXT NOT NULL,
+                            signature BLOB NOT NULL,
+                            updated_at TEXT
+                        )
+                    """)
+                    self._conn.commit()
+                self._load()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open near-duplicate index at {db_path}: {e}", exc_info=True)
+                self._conn = None
+
+    def _load(self):
+        """Φορτώνει στη μνήμη (και στα LSH buckets) τις υπογραφές με τις τρέχουσες παραμέτρους."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT file_id, file_name, signature FROM NearDuplicateSignatures WHERE params = ?", (self.params,)
+            ).fetchall()
+            for file_id, file_name, blob in rows:
+                self._insert(file_id, file_name, np.frombuffer(blob, dtype=np.uint32).copy())
+        logger.info(f"Near-duplicate index loaded: {len(rows)} signatures.")
+
+    # --- SIGNATURES ---
+
+    def _shingles(self, text: str) -> np.ndarray:
+        """Μοναδικά hashes των shingles (k διαδοχικές λέξεις), υπολογισμένα vectorized από τα hashes των λέξεων."""
+        tokens = _TOKEN_RE.findall((text or "").lower())
+        k = self.shingle_size
+        if len(tokens) < k:
+            return np.empty(0, dtype=np.uint64)
+        words = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint64, count=len(tokens))
+        count = len(tokens) - k + 1
+        shingles = words[:count].copy()
+        for offset in range(1, k):
+            shingles = shingles * _SHINGLE_MULTIPLIER + words[offset:offset + count] # mod 2^64 (wrap-around)
+        return np.unique(shingles >> np.uint64(32))
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash υπογραφή του κειμένου, ή None αν το κείμενο είναι πολύ λίγο για αξιόπιστη σύγκριση."""
+        shingles = self._shingles(text)
+        if len(shingles) < self.min_shingles:
+            return None
+        # Hash κάθε permutation (γραμμή) για κάθε shingle (στήλη), ελάχιστο ανά γραμμή.
+        hashed = (np.outer(self._a, shingles) + self._b[:, None]) >> np.uint64(32)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Εκτίμηση Jaccard: ποσοστό θέσεων με ίδια τιμή MinHash."""
+        return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+    # --- INDEX ---
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        raw = signature.tobytes()
+        width = self.rows * signature.itemsize
+        return [raw[i * width:(i + 1) * width] for i in range(self.bands)]
+
+    def _insert(self, file_id: str, file_name: str, signature: np.ndarray):
+        if file_id in self._signatures:
+            self._remove(file_id)
+        self._signatures[file_id] = signature
+        self._names[file_id] = file_name
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].add(file_id)
+
+    def _remove(self, file_id: str):
+        signature = self._signatures.pop(file_id, None)
+        self._names.pop(file_id, None)
+        self._unpersisted.discard(file_id)
+        if signature is None:
+            return
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(file_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def _query(self, signature: np.ndarray, exclude: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+        candidates.discard(exclude)
+        self.stats["queries"] += 1
+        self.stats["candidates"] += len(candidates)
+        matches = []
+        for file_id in candidates:
+            score = self.similarity(signature, self._signatures[file_id])
+            if score >= self.review_threshold:
+                matches.append({"file_id": file_id, "file_name": self._names.get(file_id, ""), "similarity": round(score, 3)})
+        matches.sort(key=lambda m: m["similarity"], reverse=True)
+        return matches[:limit]
+
+    def query(self, signature: np.ndarray, exclude: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """Τα πιο όμοια αρχεία (similarity >= review_threshold), με φθίνουσα ομοιότητα."""
+        with self._lock:
+            return self._query(signature, exclude, limit)
+
+    def add(self, file_id: str, file_name: str, signature: np.ndarray, persist: bool = True):
+        """Προσθέτει (ή αντικαθιστά) την υπογραφή ενός αρχείου."""
+        with self._lock:
+            self._insert(file_id, file_name, signature)
+            self._unpersisted.add(file_id)
+        if persist:
+            self.persist(file_id)
+
+    def check_and_add(self, file_id: str, file_name: str, signature: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        Ατομικό "αναζήτηση ή καταχώρηση" (όπως το πρωτότυπο στο hash dedup): επιστρέφει το πιο όμοιο
+        αρχείο με `verdict` ("duplicate" ή "review"), ή None και το αρχείο γίνεται υποψήφιο πρωτότυπο.
+        Η νέα υπογραφή μένει μόνο στη μνήμη μέχρι το persist() (π.χ. αφού ταξινομηθεί επιτυχώς).
+        """
+        with self._lock:
+            matches = self._query(signature, file_id, 1)
+            if not matches:
+                self._insert(file_id, file_name, signature)
+                self._unpersisted.add(file_id)
+                return None
+            match = matches[0]
+            if match["similarity"] >= self.duplicate_threshold:
+                match["verdict"] = "duplicate"
+                self.stats["near_duplicates"] += 1
+            else:
+                match["verdict"] = "review"
+                self.stats["reviews"] += 1
+            return match
+
+    def persist(self, file_id: str) -> bool:
+        """Αποθηκεύει μόνιμα την υπογραφή ενός αρχείου που ήδη βρίσκεται στη μνήμη."""
+        with self._lock:
+            signature = self._signatures.get(file_id)
+            file_name = self._names.get(file_id, "")
+            self._unpersisted.discard(file_id)
+        if signature is None or not self._conn:
+            return False
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO NearDuplicateSignatures (file_id, file_name, params, signature, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (file_id, file_name, self.params, signature.tobytes(), datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                )
+                self._conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Saving near-duplicate signature failed for {file_id}: {e}", exc_info=True)
+            return False
+
+    def pending_signature(self, file_id: str) -> Optional[bytes]:
+        """Η υπογραφή (bytes) ενός αρχείου που δεν έχει αποθηκευτεί ακόμη, π.χ. για το σχέδιο ενός dry run."""
+        with self._lock:
+            signature = self._signatures.get(file_id) if file_id in self._unpersisted else None
+        return signature.tobytes() if signature is not None else None
+
+    def persist_signature(self, file_id: str, file_name: str, blob: Optional[bytes]) -> bool:
+        """Καταχωρεί και αποθηκεύει μόνιμα μια υπογραφή από bytes (π.χ. από σχέδιο που εφαρμόζεται σε άλλη εκτέλεση)."""
+        if not blob:
+            return False
+        signature = np.frombuffer(blob, dtype=np.uint32).copy()
+        if len(signature) != self.num_perm:
+            logger.warning(f"Ignoring near-duplicate signature of {file_id}: {len(signature)} values, expected {self.num_perm}.")
+            return False
+        with self._lock:
+            self._insert(file_id, file_name, signature)
+            self._unpersisted.add(file_id)
+        return self.persist(file_id)
+
+    def discard_unpersisted(self) -> int:
+        """Αφαιρεί τις υπογραφές που δεν αποθηκεύτηκαν (π.χ. αρχεία μιας εκτέλεσης που δεν ταξινομήθηκαν)."""
+        with self._lock:
+            stale = list(self._unpersisted)
+            for file_id in stale:
+                self._remove(file_id)
+        return len(stale)
+
+    def forget_file(self, file_id: str):
+        """Αφαιρεί την υπογραφή ενός αρχείου (π.χ. μετά από διαγραφή στο Drive)."""
+        with self._lock:
+            self._remove(file_id)
+            if not self._conn:
+                return
+            try:
+                self._conn.execute("DELETE FROM NearDuplicateSignatures WHERE file_id = ?", (file_id,))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Near-duplicate delete failed for {file_id}: {e}", exc_info=True)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._signatures)
@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: PAGE-LEVEL BM25 INDEX
+----------------------------------
+Τοπικό inverted index σε επίπεδο σελίδας για το εξαγόμενο κείμενο των manuals.
+Το chat (smart_solve) στέλνει στο AI τις πιο σχετικές σελίδες για την ερώτηση
+(π.χ. τον πίνακα κωδικών σφαλμάτων στη σελίδα 140), με παραπομπή αρχείο + σελίδα,
+αντί για τις πρώτες σελίδες των manuals.
+
+Features:
+- BM25 ranking (k1/b) με postings ανά όρο σε numpy arrays: αναζήτηση < 50 ms σε 100k σελίδες.
+- Scoping: αναζήτηση μόνο στα manuals της επιλεγμένης μάρκας/μοντέλου (file_ids).
+- Κανονικοποίηση κειμένου (πεζά, χωρίς τόνους) ώστε "Βλάβη" == "βλαβη".
+- Postings σε growable numpy arrays: τα postings ενός νέου manual προστίθενται στο τέλος (amortized O(1))
+  στην επόμενη αναζήτηση, χωρίς μετατροπή ολόκληρων λιστών σε numpy.
+- Το κείμενο των σελίδων ΔΕΝ αντιγράφεται: διαβάζεται από την cache κειμένου (core/text_cache.py, LRU).
+  Στη βάση μένουν μόνο τα metadata (ManualPageIndex)· το index ξαναχτίζεται στη μνήμη στην πρώτη χρήση και
+  manuals που έφυγαν από την cache (eviction) ξαναευρετηριάζονται όταν ζητηθούν.
+- Re-index όταν αλλάξει το md5Checksum ενός manual· compaction των διαγραμμένων σελίδων όταν γίνουν πολλές.
+
+Το module ΔΕΝ κάνει import το streamlit.
+"""
+import math
+import re
+import sqlite3
+import logging
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from core.text_cache import TEXT_CACHE_DB_PATH, ExtractedTextCache, get_text_cache
+
+logger = logging.getLogger("Core.PageIndex")
+
+PAGE_INDEX_DB_PATH = "mastro_nek_local.db" # Ίδια τοπική βάση με τον DatabaseConnector
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_TOP_K = 6
+COMPACT_MIN_DEAD_PAGES = 5000 # Compaction όταν οι διαγραμμένες σελίδες ξεπεράσουν και τα δύο όρια
+COMPACT_DEAD_SHARE = 0.2
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_COMBINING_RE = re.compile("[\u0300-\u036f]")
+STOPWORDS = {
+    # English
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "is", "are", "be", "with", "by", "at",
+    "it", "this", "that", "as", "from", "if", "not", "can", "do", "does", "my", "what", "how", "why",
+    # Ελληνικά (χωρίς τόνους, μετά την κανονικοποίηση)
+    "και", "το", "τα", "η", "ο", "οι", "του", "της", "των", "την", "τον", "σε", "στο", "στη", "στην",
+    "στα", "για", "με", "απο", "να", "που", "τι", "πως", "ειναι", "μου", "ενα", "μια", "δεν",
+}
+
+
+def normalize_text(text: str) -> str:
+    """Πεζά και χωρίς τόνους/διαλυτικά (NFD + αφαίρεση combining marks)."""
+    return _COMBINING_RE.sub("", unicodedata.normalize("NFD", (text or "").lower()))
+
+
+def tokenize(text: str) -> List[str]:
+    """Όροι για το index: κανονικοποιημένες λέξεις/κωδικοί (π.χ. 'e1', 'f28', '140'), χωρίς stopwords."""
+    return [t for t in _TOKEN_RE.findall(normalize_text(text)) if t not in STOPWORDS]
+
+
+class _GrowableArray:
+    """numpy array με περιθώριο χωρητικότητας (+50%): append σε amortized O(1), view() χωρίς αντιγραφή."""
+
+    __slots__ = ("data", "size")
+
+    def __init__(self, dtype, capacity: int = 4):
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    @classmethod
+    def from_array(cls, values: np.ndarray) -> "_GrowableArray":
+        array = cls(values.dtype, 0)
+        array.data = np.ascontiguousarray(values)
+        array.size = len(values)
+        return array
+
+    def extend(self, values):
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.empty(needed + needed // 2 + 4, dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+
+class PageIndex:
+    """Thread-safe BM25 index: μία εγγραφή (doc) ανά σελίδα manual."""
+
+    def __init__(self, db_path: Optional[str] = PAGE_INDEX_DB_PATH, k1: float = BM25_K1, b: float = BM25_B,
+                 text_cache: Optional[ExtractedTextCache] = None):
+        """
+        Args:
+            db_path: Βάση για τα metadata του index· None -> μόνο στη μνήμη (π.χ. benchmark), με το κείμενο στη μνήμη.
+            text_cache: Πηγή του κειμένου των σελίδων (default: η κοινή cache κειμένου της ίδιας βάσης).
+        """
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._conn = None
+        self._text_cache = text_cache
+        if self._text_cache is None and db_path:
+            self._text_cache = get_text_cache() if db_path == TEXT_CACHE_DB_PATH else ExtractedTextCache(db_path)
+        # Docs (σελίδες): doc id = θέση
+        self._doc_file: List[str] = []
+        self._doc_page: List[int] = []
+        self._doc_len = _GrowableArray(np.float32)
+        self._alive = _GrowableArray(bool)
+        self._doc_text: Dict[tuple, str] = {} # (file_id, page) -> κείμενο, μόνο για manuals που δεν είναι στην cache κειμένου
+        self._files: Dict[str, Dict[str, Any]] = {} # file_id -> {file_name, brand, model, checksum, docs}
+        # Postings: term -> (doc ids, tf) σε growable numpy arrays, και τα νέα postings (λίστες) μέχρι την επόμενη αναζήτηση
+        self._postings: Dict[str, tuple] = {}
+        self._pending: Dict[str, tuple] = defaultdict(lambda: ([], []))
+        self._live_docs = 0
+        self._total_len = 0
+        self.stats = {"searches": 0, "last_search_ms": 0.0, "load_seconds": 0.0, "compactions": 0}
+        self._loaded = db_path is None
+        if db_path:
+            try: # Rule 4: Error Handling
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                with self._lock:
+                    self._conn.execute("""
+                        CREATE TABLE IF NOT EXISTS ManualPageIndex (
+                            file_id TEXT PRIMARY KEY,
+                            file_name TEXT,
+                            brand TEXT,
+                            model TEXT,
+                            checksum TEXT,
+                            page_count INTEGER,
+                            indexed_at TEXT
+                        )
+                    """)
+                    self._migrate_page_text()
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open page index at {db_path}: {e}", exc_info=True)
+                self._conn = None
+                self._loaded = True
+
+    def _migrate_page_text(self):
+        """Παλιό σχήμα (ManualPageText): κρατάμε τα metadata, το κείμενο το έχει ήδη η cache κειμένου."""
+        exists = self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ManualPageText'").fetchone()
+        if not exists:
+            return
+        self._conn.execute(
+            "INSERT OR IGNORE INTO ManualPageIndex (file_id, file_name, brand, model, checksum, page_count, indexed_at) "
+            "SELECT file_id, MAX(file_name), MAX(brand), MAX(model), MAX(checksum), MAX(page) + 1, MAX(indexed_at) "
+            "FROM ManualPageText GROUP BY file_id"
+        )
+        self._conn.execute("DROP TABLE ManualPageText")
+        logger.info("Page index: migrated ManualPageText to metadata-only ManualPageIndex.")
+
+    # --- LOAD / INDEXING ---
+
+    def _ensure_loaded(self):
+        """Lazy: το index χτίζεται στη μνήμη στην πρώτη χρήση, με το κείμενο από την cache κειμένου."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            started = time.perf_counter()
+            try:
+                rows = self._conn.execute(
+                    "SELECT file_id, file_name, brand, model, checksum, page_count FROM ManualPageIndex ORDER BY file_id"
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Loading page index failed: {e}", exc_info=True)
+                rows = []
+            evicted = []
+            for file_id, file_name, brand, model, checksum, page_count in rows:
+                texts = self._text_cache.read_pages(file_id, checksum) if self._text_cache else None
+                if texts is None: # Έφυγε από την cache κειμένου: ξαναευρετηριάζεται όταν ζητηθεί
+                    evicted.append(file_id)
+                    continue
+                pages = [{"page": page, "text": texts[page]} for page in sorted(texts) if page_count is None or page < page_count]
+                self._add_in_memory(file_id, file_name, brand, model, checksum, pages)
+            if evicted:
+                self._forget_rows(evicted)
+            self._loaded = True
+            self.stats["load_seconds"] = round(time.perf_counter() - started, 2)
+            logger.info(f"Page index loaded: {len(self._files)} manuals, {self._live_docs} pages in {self.stats['load_seconds']}s"
+                        f" ({len(evicted)} manuals no longer in the text cache).")
+
+    def _add_in_memory(self, file_id: str, file_name: str, brand: str, model: str, checksum: Optional[str],
+                       pages: Iterable[Dict[str, Any]], keep_text: bool = False):
+        if file_id in self._files:
+            self._remove_in_memory(file_id)
+        first_doc = len(self._doc_file)
+        lengths = []
+        for page in pages:
+            terms = Counter(tokenize(page.get("text", "")))
+            doc_id = first_doc + len(lengths)
+            self._doc_file.append(file_id)
+            self._doc_page.append(int(page["page"]))
+            length = sum(terms.values())
+            lengths.append(length)
+            if keep_text:
+                self._doc_text[(file_id, int(page["page"]))] = page.get("text", "")
+            for term, tf in terms.items():
+                doc_ids, tfs = self._pending[term]
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+        self._doc_len.extend(lengths)
+        self._alive.extend([True] * len(lengths))
+        self._live_docs += len(lengths)
+        self._total_len += sum(lengths)
+        self._files[file_id] = {"file_name": file_name, "brand": (brand or "").upper(), "model": (model or "").upper(),
+                                "checksum": checksum, "docs": list(range(first_doc, first_doc + len(lengths)))}
+
+    def _remove_in_memory(self, file_id: str):
+        """Οι σελίδες σημειώνονται ως διαγραμμένες (τα postings τους αγνοούνται στην αναζήτηση μέχρι το compaction)."""
+        entry = self._files.pop(file_id, None)
+        if not entry:
+            return
+        alive = self._alive.view()
+        doc_len = self._doc_len.view()
+        for doc_id in entry["docs"]:
+            self._doc_text.pop((file_id, self._doc_page[doc_id]), None)
+            if alive[doc_id]:
+                alive[doc_id] = False
+                self._live_docs -= 1
+                self._total_len -= int(doc_len[doc_id])
+
+    def _flush_pending(self):
+        """Προσθέτει στα numpy postings μόνο τα νέα postings (όχι ολόκληρες λίστες): ένα extend ανά όρο που άλλαξε."""
+        for term, (doc_ids, tfs) in self._pending.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (_GrowableArray(np.int32, 0), _GrowableArray(np.float32, 0))
+            postings[0].extend(doc_ids)
+            postings[1].extend(tfs)
+        self._pending.clear()
+
+    def _maybe_compact(self):
+        """Compaction όταν οι διαγραμμένες σελίδες (re-index, remove) γίνουν πολλές."""
+        dead = len(self._doc_file) - self._live_docs
+        if dead >= max(COMPACT_MIN_DEAD_PAGES, COMPACT_DEAD_SHARE * len(self._doc_file)):
+            self._compact()
+
+    def _compact(self):
+        """Αφαιρεί τις διαγραμμένες σελίδες από docs και postings και αριθμεί ξανά τα doc ids."""
+        started = time.perf_counter()
+        self._flush_pending()
+        alive = self._alive.view().copy()
+        remap = (np.cumsum(alive, dtype=np.int64) - 1).astype(np.int32)
+        for term in list(self._postings):
+            doc_ids, tfs = self._postings[term]
+            ids = doc_ids.view()
+            keep = alive[ids]
+            if not keep.any():
+                del self._postings[term]
+            elif keep.all():
+                ids[:] = remap[ids]
+            else:
+                self._postings[term] = (_GrowableArray.from_array(remap[ids[keep]]), _GrowableArray.from_array(tfs.view()[keep]))
+        dead = len(self._doc_file) - int(alive.sum())
+        self._doc_file = [file_id for file_id, live in zip(self._doc_file, alive) if live]
+        self._doc_page = [page for page, live in zip(self._doc_page, alive) if live]
+        self._doc_len = _GrowableArray.from_array(self._doc_len.view()[alive])
+        self._alive = _GrowableArray.from_array(np.ones(len(self._doc_file), dtype=bool))
+        for entry in self._files.values():
+            entry["docs"] = [int(remap[d]) for d in entry["docs"]]
+        self.stats["compactions"] += 1
+        logger.info(f"Page index compacted: {dead} deleted pages dropped in {round(1000 * (time.perf_counter() - started), 1)} ms.")
+
+    def _forget_rows(self, file_ids: List[str]):
+        if not self._conn:
+            return
+        try:
+            self._conn.executemany("DELETE FROM ManualPageIndex WHERE file_id = ?", [(f,) for f in file_ids])
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Deleting page index entries failed: {e}", exc_info=True)
+
+    def is_indexed(self, file_id: str, checksum: Optional[str] = None) -> bool:
+        """True αν το manual έχει ήδη σελίδες στο index (και, αν δοθεί, με το ίδιο checksum)."""
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._files.get(file_id)
+            return entry is not None and (checksum is None or entry["checksum"] == checksum)
+
+    def add_manual(self, file_id: str, file_name: str, pages: List[Dict[str, Any]], brand: str = "", model: str = "", checksum: Optional[str] = None) -> int:
+        """
+        Προσθέτει (ή αντικαθιστά) τις σελίδες ενός manual. `pages`: [{"page": 0-based, "text": ...}]
+        (όπως τα επιστρέφει το PdfExtractionPool.extract / η cache κειμένου). Επιστρέφει το πλήθος σελίδων.
+        """
+        self._ensure_loaded()
+        # Το κείμενο κρατιέται στη μνήμη μόνο αν δεν το έχει η cache κειμένου (π.χ. manual χωρίς checksum)
+        in_text_cache = self._text_cache is not None and self._text_cache.has_document(file_id, checksum)
+        with self._lock:
+            self._add_in_memory(file_id, file_name, brand, model, checksum, pages, keep_text=not in_text_cache)
+            self._maybe_compact()
+            if self._conn:
+                try:
+                    if in_text_cache:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO ManualPageIndex (file_id, file_name, brand, model, checksum, page_count, indexed_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (file_id, file_name, brand, model, checksum, max((int(p["page"]) for p in pages), default=-1) + 1,
+                             datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                        )
+                    else: # Χωρίς κείμενο στην cache δεν ξαναχτίζεται μετά από restart
+                        self._conn.execute("DELETE FROM ManualPageIndex WHERE file_id = ?", (file_id,))
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Saving page index entry failed for {file_id}: {e}", exc_info=True)
+        return len(pages)
+
+    def remove_manual(self, file_id: str):
+        self._ensure_loaded()
+        with self._lock:
+            self._remove_in_memory(file_id)
+            self._maybe_compact()
+            self._forget_rows([file_id])
+
+    # --- SEARCH ---
+
+    def search(self, query: str, file_ids: Optional[Iterable[str]] = None, top_k: int = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Οι `top_k` πιο σχετικές σελίδες (BM25) για την ερώτηση, προαιρετικά μόνο στα manuals `file_ids`.
+        Επιστρέφει [{"file_id", "file_name", "page" (1-based), "score", "doc"}] με φθίνον score (κείμενο: page_texts()).
+        """
+        self._ensure_loaded()
+        started = time.perf_counter()
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            total_docs = len(self._doc_file)
+            if not terms or not self._live_docs:
+                return []
+            self._flush_pending()
+            alive = self._alive.view()
+            doc_len = self._doc_len.view()
+            allowed = alive
+            if file_ids is not None:
+                allowed = np.zeros(total_docs, dtype=bool)
+                for file_id in file_ids:
+                    entry = self._files.get(file_id)
+                    if entry and entry["docs"]:
+                        allowed[entry["docs"]] = True
+                allowed &= alive
+            avg_len = self._total_len / max(self._live_docs, 1) or 1.0
+            scores = np.zeros(total_docs, dtype=np.float32)
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                doc_ids, tfs = postings[0].view(), postings[1].view()
+                df = len(doc_ids)
+                idf = math.log(1.0 + (self._live_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * doc_len[doc_ids] / avg_len)
+                scores[doc_ids] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+            scores[~allowed] = 0.0
+            candidates = np.flatnonzero(scores)
+            if candidates.size > top_k:
+                candidates = candidates[np.argpartition(scores[candidates], -top_k)[-top_k:]]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            hits = [(int(d), float(scores[d])) for d in ranked]
+            results = [{"file_id": self._doc_file[d], "file_name": self._files[self._doc_file[d]]["file_name"],
+                        "page": self._doc_page[d] + 1, "score": round(score, 3), "doc": d} for d, score in hits]
+            self.stats["searches"] += 1
+        self.stats["last_search_ms"] = round(1000 * (time.perf_counter() - started), 2)
+        return results
+
+    def page_texts(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Συμπληρώνει το κείμενο των σελίδων ενός αποτελέσματος search() από την cache κειμένου.
+        Manuals που έφυγαν στο μεταξύ από την cache (LRU) βγαίνουν από το index και οι σελίδες τους παραλείπονται.
+        """
+        if not hits:
+            return hits
+        texts: Dict[tuple, str] = {}
+        evicted = []
+        pages_by_file: Dict[str, List[int]] = defaultdict(list)
+        with self._lock:
+            for hit in hits:
+                key = (hit["file_id"], hit["page"] - 1)
+                if key in self._doc_text:
+                    texts[key] = self._doc_text[key]
+                else:
+                    pages_by_file[hit["file_id"]].append(hit["page"] - 1)
+            checksums = {file_id: (self._files.get(file_id) or {}).get("checksum") for file_id in pages_by_file}
+        for file_id, pages in pages_by_file.items():
+            found = self._text_cache.read_pages(file_id, checksums[file_id], pages, touch=True) if self._text_cache else None
+            if found is None:
+                evicted.append(file_id)
+                continue
+            texts.update(((file_id, page), text) for page, text in found.items())
+        if evicted:
+            logger.info(f"Page index: {len(evicted)} manuals left the text cache, dropped until re-indexed.") # Rule 4
+            for file_id in evicted:
+                self.remove_manual(file_id)
+        return [dict(hit, text=texts[(hit["file_id"], hit["page"] - 1)]) for hit in hits if (hit["file_id"], hit["page"] - 1) in texts]
+
+    def first_pages(self, file_id: str, count: int = 5) -> List[Dict[str, Any]]:
+        """Οι πρώτες σελίδες ενός manual (fallback όταν η ερώτηση δεν ταιριάζει σε καμία σελίδα)."""
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._files.get(file_id)
+            if not entry:
+                return []
+            hits = [{"file_id": file_id, "file_name": entry["file_name"], "page": self._doc_page[d] + 1, "score": 0.0, "doc": d}
+                    for d in entry["docs"][:count]]
+        return self.page_texts(hits)
+
+    def count(self) -> Dict[str, int]:
+        self._ensure_loaded()
+        with self._lock:
+            self._flush_pending()
+            return {"manuals": len(self._files), "pages": self._live_docs, "terms": len(self._postings)}
+
+
+_page_index: Optional[PageIndex] = None
+_page_index_lock = threading.Lock()
+
+
+def get_page_index() -> PageIndex:
+    """Κοινόχρηστο page index της εφαρμογής (ένα ανά process)."""
+    global _page_index
+    with _page_index_lock:
+        if _page_index is None:
+            _page_index = PageIndex()
+        return _page_index
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: SANDBOXED PDF TEXT EXTRACTION
+------------------------------------------
+Εξαγωγή κειμένου PDF (pypdf) σε ξεχωριστές worker processes.
+Ένα χαλασμένο ή τεράστιο PDF δεν μπορεί πλέον να "κολλήσει" έναν πυρήνα ή το thread του Streamlit:
+κάθε έγγραφο έχει όριο χρόνου (wall-clock) και μνήμης, και ο worker που το ξεπερνά σκοτώνεται
+και αντικαθίσταται.
+
+Features:
+- Pool από long-lived workers (ένα Pipe ανά worker, ένα έγγραφο τη φορά).
+- Page ranges (π.χ. μόνο οι πρώτες 5 σελίδες).
+- Δομημένα αποτελέσματα ανά σελίδα με χρόνο εξαγωγής.
+- Κοινόχρηστο pool (get_extraction_pool) για Sync, Sorter και Chat.
+- Γενικό `run(func, ...)` για άλλες βαριές εργασίες pypdf (π.χ. slim PDF payloads).
+- Fallback σε εξαγωγή στο ίδιο process όταν δεν επιτρέπονται processes (χωρίς όρια).
+
+Το module ΔΕΝ κάνει import το streamlit, ώστε οι workers να ξεκινούν ελαφριοί.
+"""
+import atexit
+import io
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("Core.PdfExtractor")
+
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_MEMORY_LIMIT_MB = 512       # Επιπλέον μνήμη ανά worker, πάνω από ό,τι κληρονόμησε από τον γονέα
+IDLE_POLL_SECONDS = 1.0             # Κάθε πόσο ένας caller που περιμένει worker ελέγχει αν το pool ζει ακόμη
+
+
+def extract_pages(file_bytes: bytes, page_range: Optional[Tuple[int, int]] = None, max_chars: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Εξάγει κείμενο από τις σελίδες [start, end) ενός PDF (0-based, end=None -> μέχρι το τέλος).
+    Σταματά νωρίτερα όταν συγκεντρωθούν `max_chars` χαρακτήρες.
+    """
+    import pypdf
+    started = time.perf_counter()
+    result = {"ok": False, "page_count": 0, "pages": [], "text": "", "elapsed_ms": 0.0, "error": None, "timed_out": False}
+    try:
+        reader = pypdf.PdfReader(io.BytesIO(file_bytes))
+        page_count = len(reader.pages)
+        start, end = page_range or (0, None)
+        end = page_count if end is None else min(end, page_count)
+        total_chars = 0
+        for index in range(max(0, start), end):
+            page_started = time.perf_counter()
+            try:
+                text = reader.pages[index].extract_text() or ""
+                error = None
+            except Exception as e: # Μία χαλασμένη σελίδα δεν ακυρώνει τις υπόλοιπες
+                text, error = "", str(e)
+            result["pages"].append({"page": index, "text": text, "ms": round(1000 * (time.perf_counter() - page_started), 1), "error": error})
+            total_chars += len(text)
+            if max_chars and total_chars >= max_chars:
+                break
+        result["page_count"] = page_count
+        result["ok"] = True
+    except MemoryError:
+        result["error"] = "Memory limit exceeded."
+    except Exception as e:
+        result["error"] = str(e)
+    text = "\n".join(p["text"] for p in result["pages"] if p["text"])
+    result["text"] = text[:max_chars] if max_chars else text
+    result["elapsed_ms"] = round(1000 * (time.perf_counter() - started), 1)
+    return result
+
+
+def _current_address_space() -> int:
+    """Τρέχον μέγεθος address space (VmSize) του process σε bytes· 0 αν δεν είναι διαθέσιμο (όχι Linux)."""
+    try:
+        import os
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+def _worker_main(conn, memory_limit_mb: int):
+    """Loop ενός worker process: λαμβάνει (func, args), επιστρέφει το αποτέλεσμα του func(*args)."""
+    if memory_limit_mb:
+        try:
+            import resource
+            # Το forked child κρατά όλο το address space του γονέα (Streamlit, pandas, genai ~1 GB VSZ):
+            # το όριο μετριέται ΠΑΝΩ από το τρέχον μέγεθος, όχι ως απόλυτη τιμή.
+            limit = _current_address_space() + memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass # Μη διαθέσιμο (π.χ. Windows): μένει μόνο το όριο χρόνου
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        func, args = task
+        try:
+            conn.send((True, func(*args)))
+        except MemoryError:
+            conn.send((False, "Memory limit exceeded."))
+        except Exception as e:
+            conn.send((False, str(e)))
+
+
+class _Worker:
+    def __init__(self, ctx, memory_limit_mb: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(timeout=1)
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class PdfExtractionPool:
+    """Thread-safe pool εξαγωγής κειμένου με όρια χρόνου και μνήμης ανά έγγραφο."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, timeout: float = DEFAULT_TIMEOUT_SECONDS, memory_limit_mb: int = DEFAULT_MEMORY_LIMIT_MB, use_processes: bool = True):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.use_processes = use_processes
+        self.stats = {"documents": 0, "timeouts": 0, "crashes": 0, "restarts": 0}
+        self._ctx = None
+        self._idle: "queue.Queue" = queue.Queue()
+        self._alive = 0
+        self._started = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _spawn(self) -> Optional[_Worker]:
+        try:
+            return _Worker(self._ctx, self.memory_limit_mb)
+        except Exception as e:
+            logger.error(f"Could not start PDF extraction worker: {e}", exc_info=True)
+            return None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._started or not self.use_processes:
+                return
+            self._started = True
+            try:
+                self._ctx = multiprocessing.get_context()
+                for _ in range(self.workers):
+                    worker = self._spawn()
+                    if worker is None:
+                        raise RuntimeError("worker start failed")
+                    self._alive += 1
+                    self._idle.put(worker)
+            except Exception as e:
+                logger.warning(f"Process pool unavailable, extracting PDF text in-process: {e}")
+                self.use_processes = False
+
+    def _replace(self, worker: _Worker):
+        worker.kill()
+        replacement = None if self._closed else self._spawn()
+        if replacement is None and not self._closed:
+            time.sleep(0.1) # Μία ακόμη προσπάθεια (π.χ. προσωρινό EAGAIN στο fork)
+            replacement = self._spawn()
+        with self._lock:
+            if replacement:
+                self.stats["restarts"] += 1
+            else:
+                self._alive -= 1
+                if self._alive <= 0 and not self._closed:
+                    logger.error("No PDF extraction workers left, extracting PDF text in-process.")
+                    self.use_processes = False
+        if replacement:
+            self._idle.put(replacement)
+
+    def _acquire_worker(self, timeout: float) -> Optional[_Worker]:
+        """Ένας ελεύθερος worker, ή None αν δεν ελευθερωθεί κανείς μέσα στο `timeout` ή αν δεν υπάρχουν πια workers."""
+        deadline = time.monotonic() + timeout
+        while self.use_processes and not self._closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                return self._idle.get(timeout=min(IDLE_POLL_SECONDS, remaining))
+            except queue.Empty:
+                continue
+        return None
+
+    def run(self, func: Callable, *args, timeout: Optional[float] = None) -> Tuple[bool, Any, bool]:
+        """
+        Εκτελεί module-level `func(*args)` σε worker, με τα όρια του pool.
+        Επιστρέφει (ok, αποτέλεσμα ή μήνυμα σφάλματος, timed_out). Ποτέ exception.
+        """
+        with self._lock:
+            self.stats["documents"] += 1
+        self._ensure_started()
+        if not self.use_processes:
+            try:
+                return True, func(*args), False
+            except Exception as e:
+                return False, str(e), False
+
+        timeout = self.timeout if timeout is None else timeout
+        worker = self._acquire_worker(timeout)
+        if worker is None:
+            if not self.use_processes: # Πέθαναν όλοι οι workers όσο περιμέναμε
+                try:
+                    return True, func(*args), False
+                except Exception as e:
+                    return False, str(e), False
+            return False, f"No extraction worker available after {timeout}s.", True
+        try:
+            worker.conn.send((func, args))
+            if worker.conn.poll(timeout):
+                ok, value = worker.conn.recv()
+                self._idle.put(worker)
+                return ok, value, False
+            with self._lock:
+                self.stats["timeouts"] += 1
+            logger.warning(f"PDF worker task '{func.__name__}' exceeded {timeout}s, worker killed.")
+            self._replace(worker)
+            return False, f"Timed out after {timeout}s.", True
+        except (EOFError, OSError, BrokenPipeError) as e:
+            # Ο worker πέθανε (π.χ. ξεπέρασε το όριο μνήμης σε native κώδικα).
+            with self._lock:
+                self.stats["crashes"] += 1
+            logger.warning(f"PDF worker crashed during '{func.__name__}': {e}")
+            self._replace(worker)
+            return False, f"Extraction worker crashed: {e}", False
+
+    def extract(self, file_bytes: bytes, page_range: Optional[Tuple[int, int]] = None, max_chars: Optional[int] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Εξάγει κείμενο από ένα PDF. Επιστρέφει πάντα dict (ποτέ exception):
+        {"ok", "page_count", "pages": [{"page", "text", "ms", "error"}], "text", "elapsed_ms", "error", "timed_out"}
+        """
+        started = time.perf_counter()
+        ok, value, timed_out = self.run(extract_pages, file_bytes, page_range, max_chars, timeout=timeout)
+        if ok:
+            return value
+        return {"ok": False, "page_count": 0, "pages": [], "text": "", "elapsed_ms": round(1000 * (time.perf_counter() - started), 1),
+                "error": value, "timed_out": timed_out}
+
+    def extract_text(self, file_bytes: bytes, max_pages: Optional[int] = None, max_chars: Optional[int] = None, timeout: Optional[float] = None) -> Optional[str]:
+        """Συντόμευση: κείμενο των πρώτων `max_pages` σελίδων, ή None σε αποτυχία."""
+        result = self.extract(file_bytes, (0, max_pages) if max_pages else None, max_chars, timeout)
+        return result["text"] if result["ok"] else None
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            started = self._started
+        if not started:
+            return
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.conn.send(None)
+            except Exception:
+                pass
+            worker.kill()
+
+
+_shared_pool: Optional[PdfExtractionPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_extraction_pool() -> PdfExtractionPool:
+    """Κοινόχρηστο pool της εφαρμογής (ξεκινά lazily στην πρώτη εξαγωγή)."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = PdfExtractionPool()
+            atexit.register(_shared_pool.shutdown)
+        return _shared_pool
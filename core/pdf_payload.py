@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: PDF PAYLOAD BUILDER
+--------------------------------
+Μικρά PDF για το AI αντί για ολόκληρο το αρχείο.
+Για την ταξινόμηση αρκούν οι πρώτες σελίδες (εξώφυλλο, τίτλος) και οι σελίδες με
+πίνακα περιεχομένων ή πίνακα μοντέλων. Ένα manual 100 MB γίνεται έτσι λίγες εκατοντάδες KB.
+
+Modes (ανά αρχείο, με βάση το μέγεθος):
+- "full": μικρά PDF στέλνονται όπως είναι.
+- "slim": παράγωγο PDF (πρώτες N σελίδες + σελίδες TOC/μοντέλων) μέσα σε byte budget.
+- "text": μόνο το απόσπασμα κειμένου (πολύ μεγάλα αρχεία ή αποτυχία slim).
+
+Το build_slim_pdf είναι module-level ώστε να εκτελείται στο sandboxed pool (core/pdf_extractor.py).
+"""
+import io
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger("Core.PdfPayload")
+
+MODE_TEXT = "text"
+MODE_SLIM = "slim"
+MODE_FULL = "full"
+PAYLOAD_MODES = [MODE_TEXT, MODE_SLIM, MODE_FULL]
+
+FULL_PDF_MAX_BYTES = 2 * 1024 * 1024           # Μέχρι εδώ στέλνεται όλο το PDF
+SLIM_SOURCE_MAX_BYTES = 300 * 1024 * 1024      # Πάνω από εδώ δεν αξίζει ούτε το parsing: μόνο κείμενο
+SLIM_BYTE_BUDGET = 1024 * 1024                 # Μέγιστο μέγεθος του slim PDF
+SLIM_FIRST_PAGES = 3
+SLIM_MAX_EXTRA_PAGES = 3                       # Επιπλέον σελίδες TOC / πινάκων μοντέλων
+SLIM_SCAN_PAGES = 30                           # Πόσες σελίδες ελέγχονται για TOC / πίνακες μοντέλων
+
+# Λέξεις-κλειδιά για σελίδες περιεχομένων και πινάκων μοντέλων (lowercase).
+KEY_PAGE_KEYWORDS = [
+    "contents", "table of contents", "index", "περιεχόμενα",
+    "model list", "model name", "models", "model no", "μοντέλα", "μοντέλο",
+    "specifications", "technical data", "τεχνικά χαρακτηριστικά", "line-up", "lineup",
+]
+
+
+def choose_payload_mode(file_size: Optional[int], requested: str = "auto") -> str:
+    """Επιλέγει mode ανά αρχείο. `requested` != "auto" επιβάλλει συγκεκριμένο mode."""
+    if requested in PAYLOAD_MODES:
+        return requested
+    if not file_size:
+        return MODE_TEXT
+    if file_size <= FULL_PDF_MAX_BYTES:
+        return MODE_FULL
+    if file_size <= SLIM_SOURCE_MAX_BYTES:
+        return MODE_SLIM
+    return MODE_TEXT
+
+
+def _key_pages(reader, first_pages: int, scan_pages: int, max_extra: int) -> List[int]:
+    """Σελίδες (μετά τις πρώτες) που μοιάζουν με πίνακα περιεχομένων ή πίνακα μοντέλων."""
+    found = []
+    for index in range(first_pages, min(len(reader.pages), first_pages + scan_pages)):
+        try:
+            text = (reader.pages[index].extract_text() or "").lower()
+        except Exception:
+            continue
+        if any(keyword in text for keyword in KEY_PAGE_KEYWORDS):
+            found.append(index)
+            if len(found) >= max_extra:
+                break
+    return found
+
+
+def build_slim_pdf(file_bytes: bytes, first_pages: int = SLIM_FIRST_PAGES, byte_budget: int = SLIM_BYTE_BUDGET, max_extra_pages: int = SLIM_MAX_EXTRA_PAGES, scan_pages: int = SLIM_SCAN_PAGES) -> Optional[bytes]:
+    """
+    Παράγει PDF με τις πρώτες `first_pages` σελίδες και έως `max_extra_pages` σελίδες TOC/μοντέλων.
+    Αφαιρεί σελίδες από το τέλος μέχρι να χωρέσει στο `byte_budget`. None αν δεν χωράει ούτε μία σελίδα.
+    """
+    import pypdf
+    reader = pypdf.PdfReader(io.BytesIO(file_bytes))
+    pages = list(range(min(first_pages, len(reader.pages))))
+    pages += _key_pages(reader, len(pages), scan_pages, max_extra_pages)
+
+    while pages:
+        writer = pypdf.PdfWriter()
+        for index in pages:
+            writer.add_page(reader.pages[index])
+        if hasattr(writer, "compress_identical_objects"): # pypdf >= 4.3
+            writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        if buffer.tell() <= byte_budget:
+            return buffer.getvalue()
+        pages.pop()
+    return None
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: SORTER RUN HISTORY
+-------------------------------
+Μόνιμο (SQLite) ιστορικό εκτελέσεων του AI Sorter με χρόνους και κόστος,
+ώστε να φαίνεται αν μια αλλαγή ρυθμίσεων έκανε την ταξινόμηση ταχύτερη ή φθηνότερη.
+
+Features:
+- SorterRunHistory: μία εγγραφή ανά εκτέλεση (ρυθμίσεις, αποτελέσματα, bytes, tokens, κλήσεις API, χρόνοι σταδίων).
+- SorterRunFiles: ανά αρχείο διάρκεια κάθε σταδίου, bytes, tokens, requests AI και αποτέλεσμα.
+- compare(): διαφορές ανάμεσα σε δύο εκτελέσεις (απόλυτες και ανά αρχείο).
+"""
+import json
+import sqlite3
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("Core.SorterHistory")
+
+HISTORY_DB_PATH = "mastro_nek_local.db" # Ίδια τοπική βάση με τον DatabaseConnector
+
+FILE_STAGES = ["listing", "download", "hash", "extract", "classify", "apply"]
+
+RUN_COLUMNS = [
+    "history_id", "run_id", "started_at", "finished_at", "status", "dry_run", "force_full_rescan",
+    "files", "sorted", "duplicates", "manual_review", "irrelevant", "failed", "resumed",
+    "bytes_downloaded", "ai_requests", "ai_tokens_in", "ai_tokens_out", "ai_calls_avoided", "drive_calls",
+    "total_seconds", "config_json", "stages_json", "drive_call_kinds_json", "summary_json",
+]
+FILE_COLUMNS = [
+    "history_id", "file_id", "file_name", "action", "source", "outcome", "error",
+    "bytes_downloaded", "ai_requests", "tokens_in", "tokens_out",
+] + [f"{stage}_ms" for stage in FILE_STAGES] + ["total_ms"]
+
+# Μεγέθη που συγκρίνονται ανάμεσα σε εκτελέσεις (μικρότερο = καλύτερο, εκτός από τα αποτελέσματα).
+COMPARE_METRICS = [
+    "files", "sorted", "failed", "total_seconds", "bytes_downloaded",
+    "ai_requests", "ai_tokens_in", "ai_tokens_out", "ai_calls_avoided", "drive_calls",
+]
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class SorterHistoryStore:
+    """Thread-safe αποθήκη ιστορικού εκτελέσεων."""
+
+    def __init__(self, db_path: str = HISTORY_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        try: # Rule 4: Error Handling
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            with self._lock:
+                self._conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS SorterRunHistory (
+                        history_id TEXT PRIMARY KEY,
+                        {', '.join(f'{c} {self._sql_type(c)}' for c in RUN_COLUMNS[1:])}
+                    )
+                """)
+                self._conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS SorterRunFiles (
+                        {', '.join(f'{c} {self._sql_type(c)}' for c in FILE_COLUMNS)}
+                    )
+                """)
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sorter_run_files ON SorterRunFiles (history_id)")
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open sorter history at {db_path}: {e}", exc_info=True)
+            self._conn = None
+
+    @staticmethod
+    def _sql_type(column: str) -> str:
+        if column.endswith("_ms") or column == "total_seconds":
+            return "REAL"
+        if column in ("history_id", "run_id", "started_at", "finished_at", "status", "file_id", "file_name",
+                      "action", "source", "outcome", "error") or column.endswith("_json"):
+            return "TEXT"
+        return "INTEGER"
+
+    @property
+    def available(self) -> bool:
+        return self._conn is not None
+
+    def record_run(self, run: Dict[str, Any], files: List[Dict[str, Any]]) -> Optional[str]:
+        """Αποθηκεύει μια εκτέλεση και τα αρχεία της. Επιστρέφει το history_id."""
+        if not self._conn:
+            return None
+        history_id = f"h-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        run = dict(run, history_id=history_id, finished_at=run.get("finished_at") or _now())
+        run_row = tuple(
+            json.dumps(run.get(c[:-5], {}), ensure_ascii=False, default=str) if c.endswith("_json") else run.get(c)
+            for c in RUN_COLUMNS
+        )
+        file_rows = [tuple(dict(f, history_id=history_id).get(c) for c in FILE_COLUMNS) for f in files]
+        try:
+            with self._lock:
+                self._conn.execute(
+                    f"INSERT INTO SorterRunHistory ({', '.join(RUN_COLUMNS)}) VALUES ({', '.join('?' * len(RUN_COLUMNS))})", run_row
+                )
+                self._conn.executemany(
+                    f"INSERT INTO SorterRunFiles ({', '.join(FILE_COLUMNS)}) VALUES ({', '.join('?' * len(FILE_COLUMNS))})", file_rows
+                )
+                self._conn.commit()
+            return history_id
+        except sqlite3.Error as e:
+            logger.error(f"Saving sorter run history failed: {e}", exc_info=True)
+            return None
+
+    def runs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Οι πιο πρόσφατες εκτελέσεις (χωρίς τα JSON πεδία)."""
+        columns = [c for c in RUN_COLUMNS if not c.endswith("_json")]
+        return self._query(f"SELECT {', '.join(columns)} FROM SorterRunHistory ORDER BY started_at DESC LIMIT ?", (limit,))
+
+    def get_run(self, history_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(f"SELECT {', '.join(RUN_COLUMNS)} FROM SorterRunHistory WHERE history_id = ?", (history_id,))
+        if not rows:
+            return None
+        run = rows[0]
+        for column in [c for c in RUN_COLUMNS if c.endswith("_json")]:
+            try:
+                run[column[:-5]] = json.loads(run.pop(column) or "{}")
+            except ValueError:
+                run[column[:-5]] = {}
+        return run
+
+    def run_files(self, history_id: str) -> List[Dict[str, Any]]:
+        return self._query(f"SELECT {', '.join(FILE_COLUMNS[1:])} FROM SorterRunFiles WHERE history_id = ? ORDER BY total_ms DESC", (history_id,))
+
+    def stage_averages(self, history_id: str) -> Dict[str, float]:
+        """Μέσος χρόνος (ms) ανά στάδιο για τα αρχεία που πέρασαν από αυτό."""
+        expressions = ", ".join(f"AVG(NULLIF({stage}_ms, 0)) AS {stage}" for stage in FILE_STAGES + ["total"])
+        rows = self._query(f"SELECT {expressions} FROM SorterRunFiles WHERE history_id = ?", (history_id,))
+        return {k: round(v or 0.0, 1) for k, v in rows[0].items()} if rows else {}
+
+    def compare(self, base_id: str, other_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Σύγκριση δύο εκτελέσεων: για κάθε μέγεθος η τιμή τους, η διαφορά (other - base) και η
+        μεταβολή %, συν τιμές ανά αρχείο (ώστε να συγκρίνονται εκτελέσεις διαφορετικού μεγέθους).
+        """
+        base, other = self.get_run(base_id), self.get_run(other_id)
+        if not base or not other:
+            return None
+        metrics = []
+        for metric in COMPARE_METRICS:
+            a, b = base.get(metric) or 0, other.get(metric) or 0
+            metrics.append({
+                "metric": metric, "base": a, "other": b, "delta": round(b - a, 3),
+                "change_pct": round(100.0 * (b - a) / a, 1) if a else None,
+                "base_per_file": round(a / base["files"], 3) if base.get("files") else None,
+                "other_per_file": round(b / other["files"], 3) if other.get("files") else None,
+            })
+        base_stages, other_stages = self.stage_averages(base_id), self.stage_averages(other_id)
+        stages = [{"stage": s, "base_avg_ms": base_stages.get(s, 0.0), "other_avg_ms": other_stages.get(s, 0.0),
+                   "delta_ms": round(other_stages.get(s, 0.0) - base_stages.get(s, 0.0), 1)} for s in FILE_STAGES + ["total"]]
+        config_changes = {
+            key: {"base": base["config"].get(key), "other": other["config"].get(key)}
+            for key in sorted(set(base["config"]) | set(other["config"]))
+            if base["config"].get(key) != other["config"].get(key)
+        }
+        return {"base": base_id, "other": other_id, "metrics": metrics, "stages": stages, "config_changes": config_changes}
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        if not self._conn:
+            return []
+        try:
+            with self._lock:
+                cursor = self._conn.execute(sql, params)
+                columns = [c[0] for c in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Sorter history query failed: {e}", exc_info=True)
+            return []
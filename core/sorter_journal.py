@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: SORTER JOURNAL
+---------------------------
+Μόνιμο (SQLite) ημερολόγιο εκτελέσεων του AI Sorter.
+Καταγράφει το στάδιο και το αποτέλεσμα κάθε αρχείου, ώστε μια εκτέλεση που διακόπηκε
+(έκλεισε το session, ο χρήστης άλλαξε σελίδα, Stop) να συνεχίσει από εκεί που σταμάτησε.
+
+Features:
+- SorterRuns: μία εγγραφή ανά εκτέλεση (running / completed / canceled / abandoned).
+- SorterJournal: στάδιο ανά αρχείο (applying -> applied | failed) με την απόφαση σε JSON.
+- SorterAudit: πλήρες ιστορικό μετακινήσεων και μετονομασιών (παλιά -> νέα τιμή).
+- Idempotent resume: αρχεία με στάδιο 'applied' δεν ξαναμετακινούνται.
+"""
+import json
+import sqlite3
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("Core.SorterJournal")
+
+JOURNAL_DB_PATH = "mastro_nek_local.db" # Ίδια τοπική βάση με τον DatabaseConnector
+
+STAGE_APPLYING = "applying"
+STAGE_APPLIED = "applied"
+STAGE_FAILED = "failed"
+
+RUN_RUNNING = "running"
+RUN_COMPLETED = "completed"
+RUN_CANCELED = "canceled"
+RUN_ABANDONED = "abandoned"
+RESUMABLE_STATUSES = (RUN_RUNNING, RUN_CANCELED)
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class SorterJournal:
+    """Thread-safe journal εκτελέσεων του Sorter."""
+
+    def __init__(self, db_path: str = JOURNAL_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        try: # Rule 4: Error Handling
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._init_schema()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open sorter journal at {db_path}: {e}", exc_info=True)
+            self._conn = None
+
+    def _init_schema(self):
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS SorterRuns (
+                    run_id TEXT PRIMARY KEY,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    status TEXT,
+                    force_full_rescan INTEGER DEFAULT 0,
+                    resumed_count INTEGER DEFAULT 0,
+                    summary_json TEXT
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS SorterJournal (
+                    run_id TEXT NOT NULL,
+                    file_id TEXT NOT NULL,
+                    file_name TEXT,
+                    stage TEXT,
+                    action TEXT,
+                    decision_json TEXT,
+                    error TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (run_id, file_id)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS SorterAudit (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    file_id TEXT NOT NULL,
+                    operation TEXT,
+                    old_value TEXT,
+                    new_value TEXT,
+                    ok INTEGER,
+                    created_at TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sorter_audit_run ON SorterAudit (run_id)")
+            self._conn.commit()
+
+    @property
+    def available(self) -> bool:
+        return self._conn is not None
+
+    # --- RUNS ---
+
+    def resumable_run(self) -> Optional[Dict[str, Any]]:
+        """Η πιο πρόσφατη εκτέλεση που δεν ολοκληρώθηκε (ή None)."""
+        if not self._conn:
+            return None
+        try:
+            with self._lock:
+                cursor = self._conn.execute(
+                    f"SELECT run_id, started_at, status, force_full_rescan FROM SorterRuns "
+                    f"WHERE status IN ({','.join('?' * len(RESUMABLE_STATUSES))}) ORDER BY started_at DESC LIMIT 1",
+                    RESUMABLE_STATUSES
+                )
+                row = cursor.fetchone()
+                columns = [c[0] for c in cursor.description]
+            return dict(zip(columns, row)) if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Sorter journal lookup failed: {e}", exc_info=True)
+            return None
+
+    def start_run(self, force_full_rescan: bool = False) -> Optional[str]:
+        """Νέα εκτέλεση. Τυχόν μισοτελειωμένες εκτελέσεις σημειώνονται ως 'abandoned'."""
+        if not self._conn:
+            return None
+        run_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        try:
+            with self._lock:
+                self._conn.execute(
+                    f"UPDATE SorterRuns SET status = ?, finished_at = ? WHERE status IN ({','.join('?' * len(RESUMABLE_STATUSES))})",
+                    (RUN_ABANDONED, _now(), *RESUMABLE_STATUSES)
+                )
+                self._conn.execute(
+                    "INSERT INTO SorterRuns (run_id, started_at, status, force_full_rescan) VALUES (?, ?, ?, ?)",
+                    (run_id, _now(), RUN_RUNNING, int(force_full_rescan))
+                )
+                self._conn.commit()
+            return run_id
+        except sqlite3.Error as e:
+            logger.error(f"Sorter journal start_run failed: {e}", exc_info=True)
+            return None
+
+    def resume_run(self, run_id: str):
+        """Σημειώνει ότι η εκτέλεση συνεχίζεται (status -> running)."""
+        self._execute(
+            "UPDATE SorterRuns SET status = ?, finished_at = NULL, resumed_count = resumed_count + 1 WHERE run_id = ?",
+            (RUN_RUNNING, run_id)
+        )
+
+    def finish_run(self, run_id: Optional[str], status: str, summary: Optional[Dict[str, Any]] = None):
+        if not run_id:
+            return
+        self._execute(
+            "UPDATE SorterRuns SET status = ?, finished_at = ?, summary_json = ? WHERE run_id = ?",
+            (status, _now(), json.dumps(summary or {}, ensure_ascii=False, default=str), run_id)
+        )
+
+    def runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT run_id, started_at, finished_at, status, force_full_rescan, resumed_count FROM SorterRuns "
+            "ORDER BY started_at DESC LIMIT ?", (limit,)
+        )
+
+    # --- FILES ---
+
+    def record(self, run_id: Optional[str], file_id: str, file_name: str, stage: str, decision: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """Καταγράφει το στάδιο ενός αρχείου (η τελευταία εγγραφή υπερισχύει)."""
+        if not run_id:
+            return
+        self.record_many(run_id, [(file_id, file_name, stage, decision, error)])
+
+    def record_many(self, run_id: Optional[str], rows: List[tuple]):
+        """rows: (file_id, file_name, stage, decision, error), σε ένα transaction."""
+        if not run_id or not rows:
+            return
+        now = _now()
+        params = [
+            (run_id, file_id, file_name, stage, (decision or {}).get("action"),
+             json.dumps(decision, ensure_ascii=False) if decision else None, error, now)
+            for file_id, file_name, stage, decision, error in rows
+        ]
+        self._executemany(
+            "INSERT OR REPLACE INTO SorterJournal (run_id, file_id, file_name, stage, action, decision_json, error, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", params
+        )
+
+    def file_states(self, run_id: Optional[str]) -> Dict[str, Dict[str, Any]]:
+        """file_id -> {"stage", "decision"} για μια εκτέλεση (για resume)."""
+        if not run_id:
+            return {}
+        states = {}
+        for row in self._query("SELECT file_id, stage, decision_json FROM SorterJournal WHERE run_id = ?", (run_id,)):
+            try:
+                decision = json.loads(row["decision_json"]) if row["decision_json"] else None
+            except ValueError:
+                decision = None
+            states[row["file_id"]] = {"stage": row["stage"], "decision": decision}
+        return states
+
+    # --- AUDIT ---
+
+    def audit_many(self, run_id: Optional[str], rows: List[tuple]):
+        """rows: (file_id, operation, old_value, new_value, ok)."""
+        if not run_id or not rows:
+            return
+        now = _now()
+        self._executemany(
+            "INSERT INTO SorterAudit (run_id, file_id, operation, old_value, new_value, ok, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(run_id, file_id, op, old, new, int(bool(ok)), now) for file_id, op, old, new, ok in rows]
+        )
+
+    def audit_trail(self, run_id: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """Ιστορικό μετακινήσεων/μετονομασιών (μιας εκτέλεσης ή όλων), νεότερα πρώτα."""
+        if run_id:
+            return self._query(
+                "SELECT run_id, file_id, operation, old_value, new_value, ok, created_at FROM SorterAudit "
+                "WHERE run_id = ? ORDER BY id DESC LIMIT ?", (run_id, limit)
+            )
+        return self._query(
+            "SELECT run_id, file_id, operation, old_value, new_value, ok, created_at FROM SorterAudit "
+            "ORDER BY id DESC LIMIT ?", (limit,)
+        )
+
+    # --- HELPERS ---
+
+    def _execute(self, sql: str, params: tuple = ()):
+        if not self._conn:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(sql, params)
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Sorter journal write failed: {e}", exc_info=True)
+
+    def _executemany(self, sql: str, params: List[tuple]):
+        if not self._conn:
+            return
+        try:
+            with self._lock:
+                self._conn.executemany(sql, params)
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Sorter journal write failed: {e}", exc_info=True)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        if not self._conn:
+            return []
+        try:
+            with self._lock:
+                cursor = self._conn.execute(sql, params)
+                columns = [c[0] for c in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Sorter journal query failed: {e}", exc_info=True)
+            return []
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: SORTER PLAN STORE
+------------------------------
+Μόνιμη (SQLite) αποθήκευση των σχεδίων (dry-run) του AI Sorter.
+Ένα σχέδιο περιέχει την πλήρη τελική διάταξη: φακέλους προς δημιουργία, μετακινήσεις,
+μετονομασίες και διπλότυπα. Ο admin το ελέγχει στο Organizer και το εφαρμόζει (ή το απορρίπτει).
+
+Statuses σχεδίου: draft -> applied | partially_applied | discarded
+Statuses αρχείου: pending -> applied | failed | skipped
+Κάθε αρχείο-υποψήφιο πρωτότυπο κρατά και τη MinHash υπογραφή του dry run (signature), ώστε η
+εφαρμογή να την αποθηκεύσει χωρίς να ξαναεξάγει κείμενο.
+"""
+import json
+import sqlite3
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("Core.SorterPlan")
+
+PLAN_DB_PATH = "mastro_nek_local.db" # Ίδια τοπική βάση με τον DatabaseConnector
+
+PLAN_DRAFT = "draft"
+PLAN_APPLIED = "applied"
+PLAN_PARTIAL = "partially_applied"
+PLAN_DISCARDED = "discarded"
+
+ITEM_PENDING = "pending"
+ITEM_APPLIED = "applied"
+ITEM_FAILED = "failed"
+ITEM_SKIPPED = "skipped"
+
+ITEM_COLUMNS = [
+    "file_id", "file_name", "action", "folder_path", "new_name", "remove_parents",
+    "original_file_name", "reason", "content_hash", "classification", "status", "error", "signature",
+]
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class SorterPlanStore:
+    """Thread-safe αποθήκη σχεδίων ταξινόμησης."""
+
+    def __init__(self, db_path: str = PLAN_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        try: # Rule 4: Error Handling
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            with self._lock:
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS SorterPlans (
+                        plan_id TEXT PRIMARY KEY,
+                        created_at TEXT,
+                        applied_at TEXT,
+                        status TEXT,
+                        folders_json TEXT,
+                        summary_json TEXT
+                    )
+                """)
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS SorterPlanItems (
+                        plan_id TEXT NOT NULL,
+                        file_id TEXT NOT NULL,
+                        file_name TEXT,
+                        action TEXT,
+                        folder_path TEXT,
+                        new_name TEXT,
+                        remove_parents TEXT,
+                        original_file_name TEXT,
+                        reason TEXT,
+                        content_hash TEXT,
+                        classification TEXT,
+                        status TEXT,
+                        error TEXT,
+                        signature BLOB,
+                        PRIMARY KEY (plan_id, file_id)
+                    )
+                """)
+                columns = {row[1] for row in self._conn.execute("PRAGMA table_info(SorterPlanItems)")}
+                if "signature" not in columns: # Βάση από παλαιότερη έκδοση
+                    self._conn.execute("ALTER TABLE SorterPlanItems ADD COLUMN signature BLOB")
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open sorter plan store at {db_path}: {e}", exc_info=True)
+            self._conn = None
+
+    @property
+    def available(self) -> bool:
+        return self._conn is not None
+
+    def create(self, items: List[Dict[str, Any]], folders: List[Dict[str, Any]], summary: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Αποθηκεύει νέο σχέδιο (draft) και επιστρέφει το plan_id."""
+        if not self._conn:
+            return None
+        plan_id = f"plan-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        rows = [
+            (plan_id, item["file_id"], item.get("file_name"), item.get("action"),
+             json.dumps(item.get("folder_path") or [], ensure_ascii=False), item.get("new_name"),
+             json.dumps(item.get("remove_parents") or []), item.get("original_file_name"), item.get("reason"),
+             item.get("content_hash"), json.dumps(item.get("classification") or {}, ensure_ascii=False),
+             ITEM_PENDING, None, item.get("signature"))
+            for item in items
+        ]
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO SorterPlans (plan_id, created_at, status, folders_json, summary_json) VALUES (?, ?, ?, ?, ?)",
+                    (plan_id, _now(), PLAN_DRAFT, json.dumps(folders, ensure_ascii=False),
+                     json.dumps(summary or {}, ensure_ascii=False, default=str))
+                )
+                self._conn.executemany(
+                    f"INSERT INTO SorterPlanItems (plan_id, {', '.join(ITEM_COLUMNS)}) VALUES ({', '.join('?' * (len(ITEM_COLUMNS) + 1))})",
+                    rows
+                )
+                self._conn.commit()
+            logger.info(f"Sorter plan {plan_id} saved with {len(rows)} items.")
+            return plan_id
+        except sqlite3.Error as e:
+            logger.error(f"Saving sorter plan failed: {e}", exc_info=True)
+            return None
+
+    def get(self, plan_id: str) -> Optional[Dict[str, Any]]:
+        """Το σχέδιο με τα αρχεία του (folder_path/remove_parents/classification ως Python τιμές)."""
+        if not self._conn or not plan_id:
+            return None
+        try:
+            with self._lock:
+                head = self._conn.execute(
+                    "SELECT plan_id, created_at, applied_at, status, folders_json, summary_json FROM SorterPlans WHERE plan_id = ?",
+                    (plan_id,)
+                ).fetchone()
+                if not head:
+                    return None
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(ITEM_COLUMNS)} FROM SorterPlanItems WHERE plan_id = ? ORDER BY action, file_name",
+                    (plan_id,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Loading sorter plan {plan_id} failed: {e}", exc_info=True)
+            return None
+        items = []
+        for row in rows:
+            item = dict(zip(ITEM_COLUMNS, row))
+            for key in ("folder_path", "remove_parents", "classification"):
+                item[key] = json.loads(item[key]) if item[key] else ([] if key != "classification" else {})
+            items.append(item)
+        return {
+            "plan_id": head[0], "created_at": head[1], "applied_at": head[2], "status": head[3],
+            "folders": json.loads(head[4] or "[]"), "summary": json.loads(head[5] or "{}"), "items": items,
+        }
+
+    def latest(self, status: str = PLAN_DRAFT) -> Optional[str]:
+        """Το plan_id του πιο πρόσφατου σχεδίου με το δοσμένο status."""
+        if not self._conn:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT plan_id FROM SorterPlans WHERE status = ? ORDER BY created_at DESC LIMIT 1", (status,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def mark_items(self, plan_id: str, results: List[tuple]):
+        """results: (file_id, status, error)."""
+        if not self._conn or not results:
+            return
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "UPDATE SorterPlanItems SET status = ?, error = ? WHERE plan_id = ? AND file_id = ?",
+                    [(status, error, plan_id, file_id) for file_id, status, error in results]
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Updating sorter plan items failed: {e}", exc_info=True)
+
+    def set_status(self, plan_id: str, status: str):
+        if not self._conn:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE SorterPlans SET status = ?, applied_at = ? WHERE plan_id = ?",
+                    (status, _now() if status in (PLAN_APPLIED, PLAN_PARTIAL) else None, plan_id)
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Updating sorter plan status failed: {e}", exc_info=True)
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+CORE MODULE: PERSISTENT EXTRACTED-TEXT CACHE
+--------------------------------------------
+Μόνιμη (SQLite) cache του κειμένου που εξάγεται από τα manuals, ανά σελίδα.
+Κλειδί: file_id + md5Checksum, ώστε μια νέα έκδοση του αρχείου να μη σερβίρει παλιό κείμενο.
+Chat, διαγνωστικά και αναζήτηση περνούν όλα από το SyncService.extract_manual_pages,
+οπότε ένα manual κατεβαίνει και αναλύεται μία φορά, όχι σε κάθε ερώτηση.
+
+Features:
+- Granularity σελίδας: ένα αίτημα (0, 5) σερβίρεται από ένα παλαιότερο (0, 400) και αντίστροφα
+  κατεβαίνει ξανά μόνο αν λείπουν σελίδες.
+- Κείμενο συμπιεσμένο με zlib· LRU eviction ολόκληρων εγγράφων πάνω από το όριο μεγέθους.
+- Μόνιμα στατιστικά (hits, misses, εξοικονομημένος χρόνος download + extraction) για τη σελίδα Tech Specs.
+- read_pages(): πηγή κειμένου του page index (core/page_index.py), που δεν κρατά δικό του αντίγραφο.
+
+Το module ΔΕΝ κάνει import το streamlit.
+"""
+import sqlite3
+import logging
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("Core.TextCache")
+
+TEXT_CACHE_DB_PATH = "mastro_nek_local.db" # Ίδια τοπική βάση με τον DatabaseConnector
+TEXT_CACHE_MAX_MB = 256 # Όριο συμπιεσμένου κειμένου στη βάση (LRU πάνω από αυτό)
+
+
+class ExtractedTextCache:
+    """Thread-safe cache κειμένου σελίδων ανά (file_id, checksum)."""
+
+    def __init__(self, db_path: str = TEXT_CACHE_DB_PATH, max_bytes: int = TEXT_CACHE_MAX_MB * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._conn = None
+        try: # Rule 4: Error Handling
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            with self._lock:
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS ExtractedTextDocs (
+                        file_id TEXT NOT NULL,
+                        checksum TEXT NOT NULL,
+                        page_count INTEGER,
+                        download_ms REAL,
+                        size_bytes INTEGER,
+                        last_access REAL,
+                        PRIMARY KEY (file_id, checksum)
+                    )
+                """)
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS ExtractedTextPages (
+                        file_id TEXT NOT NULL,
+                        checksum TEXT NOT NULL,
+                        page INTEGER NOT NULL,
+                        text_z BLOB,
+                        extract_ms REAL,
+                        error TEXT,
+                        PRIMARY KEY (file_id, checksum, page)
+                    )
+                """)
+                self._conn.execute("CREATE TABLE IF NOT EXISTS ExtractedTextStats (name TEXT PRIMARY KEY, value REAL)")
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open extracted-text cache at {db_path}: {e}", exc_info=True) # Rule 4
+            self._conn = None
+
+    # --- LOOKUP ---
+
+    def get(self, file_id: str, checksum: str, page_range: Optional[Tuple[int, Optional[int]]] = None,
+            max_chars: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Επιστρέφει αποτέλεσμα ίδιας μορφής με το PdfExtractionPool.extract, ή None (miss) αν
+        λείπει έστω και μία σελίδα του διαστήματος. Κάθε κλήση μετράει ως hit ή miss.
+        """
+        if self._conn is None or not file_id or not checksum:
+            return None
+        started = time.perf_counter()
+        with self._lock:
+            try: # Rule 4: Error Handling
+                row = self._conn.execute(
+                    "SELECT page_count, download_ms FROM ExtractedTextDocs WHERE file_id = ? AND checksum = ?", (file_id, checksum)
+                ).fetchone()
+                if row is None:
+                    self._bump(misses=1)
+                    return None
+                page_count, download_ms = row
+                start, end = page_range or (0, None)
+                start = max(0, start)
+                end = page_count if end is None else min(end, page_count)
+                rows = self._conn.execute(
+                    "SELECT page, text_z, extract_ms, error FROM ExtractedTextPages "
+                    "WHERE file_id = ? AND checksum = ? AND page >= ? AND page < ? ORDER BY page",
+                    (file_id, checksum, start, end),
+                ).fetchall()
+                pages: List[Dict[str, Any]] = []
+                total_chars = 0
+                expected = start
+                for page, text_z, extract_ms, error in rows:
+                    if page != expected:
+                        break
+                    text = zlib.decompress(text_z).decode("utf-8") if text_z else ""
+                    pages.append({"page": page, "text": text, "ms": extract_ms or 0.0, "error": error})
+                    expected += 1
+                    total_chars += len(text)
+                    if max_chars and total_chars >= max_chars:
+                        break
+                complete = expected >= end or (max_chars and total_chars >= max_chars)
+                if not complete:
+                    self._bump(misses=1)
+                    return None
+                saved_ms = (download_ms or 0.0) + sum(p["ms"] for p in pages)
+                self._conn.execute("UPDATE ExtractedTextDocs SET last_access = ? WHERE file_id = ? AND checksum = ?",
+                                   (time.time(), file_id, checksum))
+                self._bump(hits=1, saved_ms=saved_ms)
+            except (sqlite3.Error, zlib.error) as e:
+                logger.warning(f"Extracted-text cache read failed for '{file_id}': {e}") # Rule 4
+                return None
+        text = "\n".join(p["text"] for p in pages if p["text"])
+        return {"ok": True, "page_count": page_count, "pages": pages, "text": text[:max_chars] if max_chars else text,
+                "elapsed_ms": round(1000 * (time.perf_counter() - started), 1), "error": None, "timed_out": False, "cached": True}
+
+    def read_pages(self, file_id: str, checksum: Optional[str] = None, pages: Optional[Iterable[int]] = None,
+                   touch: bool = False) -> Optional[Dict[int, str]]:
+        """
+        Κείμενο σελίδων {page: text} για άλλα ευρετήρια (π.χ. page index), χωρίς hit/miss στατιστικά.
+        checksum=None -> όποια έκδοση υπάρχει. pages=None -> όλες. None αν το έγγραφο δεν είναι (πια) στην cache.
+        touch=True ανανεώνει το last_access (το έγγραφο χρησιμοποιήθηκε, π.χ. σε απάντηση του chat).
+        """
+        if self._conn is None or not file_id:
+            return None
+        with self._lock:
+            try: # Rule 4: Error Handling
+                if checksum is None:
+                    row = self._conn.execute("SELECT checksum FROM ExtractedTextDocs WHERE file_id = ? ORDER BY last_access DESC LIMIT 1",
+                                             (file_id,)).fetchone()
+                else:
+                    row = self._conn.execute("SELECT checksum FROM ExtractedTextDocs WHERE file_id = ? AND checksum = ?",
+                                             (file_id, checksum)).fetchone()
+                if row is None:
+                    return None
+                checksum = row[0]
+                if pages is None:
+                    rows = self._conn.execute("SELECT page, text_z FROM ExtractedTextPages WHERE file_id = ? AND checksum = ?",
+                                              (file_id, checksum)).fetchall()
+                else:
+                    wanted = sorted({int(p) for p in pages})
+                    rows = []
+                    for offset in range(0, len(wanted), 500): # Όριο παραμέτρων του SQLite
+                        chunk = wanted[offset:offset + 500]
+                        rows += self._conn.execute(
+                            f"SELECT page, text_z FROM ExtractedTextPages WHERE file_id = ? AND checksum = ? AND page IN ({','.join('?' * len(chunk))})",
+                            (file_id, checksum, *chunk),
+                        ).fetchall()
+                texts = {page: zlib.decompress(text_z).decode("utf-8") if text_z else "" for page, text_z in rows}
+                if touch:
+                    self._conn.execute("UPDATE ExtractedTextDocs SET last_access = ? WHERE file_id = ? AND checksum = ?",
+                                       (time.time(), file_id, checksum))
+                    self._conn.commit()
+                return texts
+            except (sqlite3.Error, zlib.error) as e:
+                logger.warning(f"Extracted-text cache read failed for '{file_id}': {e}") # Rule 4
+                return None
+
+    def has_document(self, file_id: str, checksum: Optional[str] = None) -> bool:
+        """True αν υπάρχει στην cache κείμενο του αρχείου (με αυτό το checksum, ή οποιοδήποτε αν None)."""
+        if self._conn is None or not file_id:
+            return False
+        with self._lock:
+            try: # Rule 4: Error Handling
+                if checksum is None:
+                    row = self._conn.execute("SELECT 1 FROM ExtractedTextDocs WHERE file_id = ? LIMIT 1", (file_id,)).fetchone()
+                else:
+                    row = self._conn.execute("SELECT 1 FROM ExtractedTextDocs WHERE file_id = ? AND checksum = ?", (file_id, checksum)).fetchone()
+                return row is not None
+            except sqlite3.Error as e:
+                logger.warning(f"Extracted-text cache lookup failed for '{file_id}': {e}") # Rule 4
+                return False
+
+    # --- STORE ---
+
+    def put(self, file_id: str, checksum: str, result: Dict[str, Any], download_ms: float = 0.0):
+        """Αποθηκεύει τις σελίδες ενός επιτυχημένου extraction και εφαρμόζει το όριο μεγέθους (LRU)."""
+        if self._conn is None or not file_id or not checksum or not result.get("ok"):
+            return
+        rows = []
+        for page in result.get("pages", []):
+            text_z = zlib.compress((page.get("text") or "").encode("utf-8"), 6)
+            rows.append((file_id, checksum, page["page"], text_z, page.get("ms", 0.0), page.get("error")))
+        with self._lock:
+            try: # Rule 4: Error Handling
+                # Παλιές εκδόσεις του ίδιου αρχείου δεν θα ξαναζητηθούν
+                stale = self._conn.execute("SELECT checksum FROM ExtractedTextDocs WHERE file_id = ? AND checksum != ?",
+                                           (file_id, checksum)).fetchall()
+                for (old_checksum,) in stale:
+                    self._delete_doc(file_id, old_checksum)
+                self._conn.executemany("INSERT OR REPLACE INTO ExtractedTextPages VALUES (?, ?, ?, ?, ?, ?)", rows)
+                size = self._conn.execute(
+                    "SELECT COALESCE(SUM(LENGTH(text_z)), 0) FROM ExtractedTextPages WHERE file_id = ? AND checksum = ?", (file_id, checksum)
+                ).fetchone()[0]
+                previous = self._conn.execute("SELECT download_ms FROM ExtractedTextDocs WHERE file_id = ? AND checksum = ?",
+                                              (file_id, checksum)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ExtractedTextDocs VALUES (?, ?, ?, ?, ?, ?)",
+                    (file_id, checksum, result.get("page_count", 0), max(download_ms, previous[0] if previous else 0.0), size, time.time()),
+                )
+                self._evict(keep=(file_id, checksum))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Extracted-text cache write failed for '{file_id}': {e}") # Rule 4
+
+    def forget(self, file_id: str):
+        """Αφαιρεί όλες τις εκδόσεις ενός αρχείου (π.χ. μετά από διαγραφή)."""
+        if self._conn is None:
+            return
+        with self._lock:
+            try: # Rule 4: Error Handling
+                self._conn.execute("DELETE FROM ExtractedTextPages WHERE file_id = ?", (file_id,))
+                self._conn.execute("DELETE FROM ExtractedTextDocs WHERE file_id = ?", (file_id,))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Extracted-text cache delete failed for '{file_id}': {e}") # Rule 4
+
+    def clear(self):
+        """Αδειάζει την cache και μηδενίζει τα στατιστικά."""
+        if self._conn is None:
+            return
+        with self._lock:
+            try: # Rule 4: Error Handling
+                for table in ("ExtractedTextPages", "ExtractedTextDocs", "ExtractedTextStats"):
+                    self._conn.execute(f"DELETE FROM {table}")
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to clear extracted-text cache: {e}", exc_info=True) # Rule 4
+
+    # --- STATS ---
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit ratio, εξοικονομημένος χρόνος και μέγεθος της cache."""
+        result = {"hits": 0, "misses": 0, "hit_ratio": 0.0, "saved_ms": 0.0, "documents": 0, "pages": 0,
+                  "size_bytes": 0, "max_bytes": self.max_bytes}
+        if self._conn is None:
+            return result
+        with self._lock:
+            try: # Rule 4: Error Handling
+                for name, value in self._conn.execute("SELECT name, value FROM ExtractedTextStats").fetchall():
+                    result[name] = value
+                result["documents"], result["size_bytes"] = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM ExtractedTextDocs"
+                ).fetchone()
+                result["pages"] = self._conn.execute("SELECT COUNT(*) FROM ExtractedTextPages").fetchone()[0]
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to read extracted-text cache stats: {e}") # Rule 4
+        lookups = result["hits"] + result["misses"]
+        result["hit_ratio"] = round(result["hits"] / lookups, 3) if lookups else 0.0
+        return result
+
+    # --- INTERNALS (καλούνται με το lock) ---
+
+    def _bump(self, hits: int = 0, misses: int = 0, saved_ms: float = 0.0):
+        for name, value in (("hits", hits), ("misses", misses), ("saved_ms", saved_ms)):
+            if value:
+                self._conn.execute(
+                    "INSERT INTO ExtractedTextStats (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, value)
+                )
+        self._conn.commit()
+
+    def _delete_doc(self, file_id: str, checksum: str):
+        self._conn.execute("DELETE FROM ExtractedTextPages WHERE file_id = ? AND checksum = ?", (file_id, checksum))
+        self._conn.execute("DELETE FROM ExtractedTextDocs WHERE file_id = ? AND checksum = ?", (file_id, checksum))
+
+    def _evict(self, keep: Tuple[str, str]):
+        """LRU: διαγράφει τα λιγότερο πρόσφατα χρησιμοποιημένα έγγραφα μέχρι να χωρέσει η cache."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM ExtractedTextDocs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        candidates = self._conn.execute(
+            "SELECT file_id, checksum, size_bytes FROM ExtractedTextDocs ORDER BY last_access ASC"
+        ).fetchall()
+        evicted = 0
+        for file_id, checksum, size in candidates:
+            if total <= self.max_bytes:
+                break
+            if (file_id, checksum) == keep:
+                continue
+            self._delete_doc(file_id, checksum)
+            total -= size or 0
+            evicted += 1
+        if evicted:
+            logger.info(f"Extracted-text cache: evicted {evicted} documents (LRU), now {total} bytes.") # Rule 4
+
+
+_text_cache: Optional[ExtractedTextCache] = None
+_text_cache_lock = threading.Lock()
+
+
+def get_text_cache() -> ExtractedTextCache:
+    """Κοινόχρηστη cache κειμένου της εφαρμογής (μία ανά process)."""
+    global _text_cache
+    with _text_cache_lock:
+        if _text_cache is None:
+            _text_cache = ExtractedTextCache()
+        return _text_cache
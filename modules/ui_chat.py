@@ -10,13 +10,16 @@ Architectural Notes:
 - Implements Microphone (Rule 1) and PDF Upload (Rule 2) via UI tabs.
 - Uses Streamlit State (Rule 6) for chat history and context.
 - Uses get_text (Rule 5) for multilingual support.
+- Streams answers as they are generated (st.write_stream) and shows time-to-first-token per answer.
+- Marks answers served from the answer cache.
 """
 
 import streamlit as st
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 
-from core.language_pack import get_text # Rule 5
+from core.language_pack import get_text, LANGUAGE_PACK # Rule 5
+from core.auth_manager import AuthManager # Rule 3: interaction logging
 from services.chat_session import ChatSessionService # Rule 3: Use service layer for business logic.
 
 # Import Speech-to-Text library with graceful error handling (Rule 1)
@@ -32,6 +35,28 @@ except ImportError:
 # Ρύθμιση Logger για το Module (Rule 4)
 logger = logging.getLogger("Module_Chat_UI")
 
+
+def _render_sources(retrieval: Dict[str, Any], lang: str):
+    """Οι σελίδες manuals που στάλθηκαν στο AI για μια απάντηση (αρχείο + σελίδα)."""
+    sources = retrieval.get("sources") or []
+    if not sources:
+        return
+    with st.expander(get_text('chat_sources', lang).format(count=len(sources))): # Rule 5
+        for source in sources:
+            code = f" · 🔢 **{source['code']}**" if source.get('code') else "" # Σελίδα από το error-code index
+            st.markdown(f"- 📄 {source['file_name']}, {get_text('chat_source_page', lang)} {source['page']}{code}")
+        st.caption(get_text('chat_sources_timing', lang).format(search_ms=retrieval.get('search_ms', 0), indexed=retrieval.get('newly_indexed', 0), indexing_ms=retrieval.get('indexing_ms', 0))) # Rule 5
+        if retrieval.get("pending_manuals"):
+            st.caption(get_text('chat_sources_pending', lang).format(names=", ".join(retrieval["pending_manuals"]))) # Rule 5
+        if retrieval.get("fallback"):
+            st.caption(get_text('chat_sources_fallback', lang)) # Rule 5
+
+def _prepend(first: str, rest: Iterator[str]) -> Iterator[str]:
+    """Το πρώτο κομμάτι (που διαβάστηκε κάτω από το spinner) και μετά τα υπόλοιπα."""
+    if first:
+        yield first
+    yield from rest
+
 def render(user):
     lang = st.session_state.get('lang', 'gr') # Rule 6, 5
 
@@ -71,10 +96,16 @@ def render(user):
                 else:
                     msg = get_text('no_manuals', lang)
                     col3.warning(msg)
+                # Background prefetch: τα κορυφαία manuals ζεσταίνονται όσο γράφεται η ερώτηση
+                prefetch = session_srv.prefetch_manuals(selected_brand, selected_model, initial_manuals)
+                if prefetch["active"]:
+                    col3.caption(get_text('chat_prefetch_status', lang).format(
+                        done=prefetch["done"] + prefetch["failed"] + prefetch["canceled"], total=prefetch["total"]))
             except Exception as e:
                 logger.error(f"Error retrieving manuals in UI: {e}", exc_info=True) # Rule 4: Logging error
                 col3.error(get_text('general_ui_error', lang).format(error=str(e)))
         else:
+            session_srv.prefetch_manuals(selected_brand, selected_model, []) # Ακύρωση prefetch προηγούμενης επιλογής
             msg = get_text('select_brand_for_search', lang)
             col3.info(msg)
 
@@ -85,6 +116,17 @@ def render(user):
     for msg in st.session_state.messages:
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
+            if msg.get("sources"):
+                _render_sources(msg["sources"], lang)
+            context = msg.get("context") or {}
+            if context.get("dropped") or context.get("truncated"):
+                st.caption(get_text('chat_context_budget', lang).format(used=context['used_tokens'], budget=context['budget_tokens'],
+                                                                        dropped=len(context['dropped']), truncated=context['truncated']),
+                           help="\n".join(context['dropped'])) # Rule 5
+            if msg.get("cached"):
+                st.caption(get_text('chat_cached_answer', lang).format(total_ms=msg.get("timing", {}).get("total_ms", 0))) # Rule 5
+            elif msg.get("timing", {}).get("ttft_ms") is not None:
+                st.caption(get_text('chat_timing', lang).format(**msg["timing"])) # Rule 5
 
     # Clear chat button
     if st.button(get_text('chat_new_session_btn', lang), key="clear_chat_button", use_container_width=True):
@@ -163,10 +205,11 @@ def render(user):
 
         with st.chat_message("assistant"):
             lbl_analyzing = get_text('analyzing', lang) # Rule 5
-            with st.spinner(lbl_analyzing):
-                try: # Rule 4: Error Handling
-                    # Fix 1 & 2: Delegate all logic to ChatSessionService (Rule 3)
-                    ai_response = session_srv.smart_solve(
+            try: # Rule 4: Error Handling
+                # Fix 1 & 2: Delegate all logic to ChatSessionService (Rule 3)
+                # Streaming: το spinner μένει μέχρι το πρώτο κομμάτι, μετά η απάντηση γράφεται σταδιακά
+                with st.spinner(lbl_analyzing):
+                    chunks = session_srv.smart_solve_stream(
                         user_query=user_prompt or "", # Pass empty string if no text prompt
                         uploaded_pdfs=[f for f in uploaded_files_for_ai if f.type == "application/pdf"],
                         uploaded_imgs=[f for f in uploaded_files_for_ai if f.type.startswith("image/")],
@@ -175,14 +218,18 @@ def render(user):
                         selected_model=selected_model,
                         lang=lang
                     )
-                    st.markdown(ai_response)
-                    st.session_state.messages.append({"role": "assistant", "content": ai_response}) # Rule 6
-                    AuthManager.log_interaction(user['email'], "AI Chat Query", user_prompt or "File Upload") # Rule 3
-                except Exception as e:
-                    error_msg = f"❌ {get_text('ai_engine_error', lang)} {str(e)}" # Rule 5
-                    st.error(error_msg)
-                    logger.error(f"Chat UI error during AI interaction: {e}", exc_info=True) # Rule 4
-                    st.session_state.messages.append({"role": "assistant", "content": error_msg}) # Rule 6
+                    first_chunk = next(chunks, "")
+                ai_response = st.write_stream(_prepend(first_chunk, chunks))
+                ai_response = ai_response if isinstance(ai_response, str) else "".join(map(str, ai_response))
+                st.session_state.messages.append({"role": "assistant", "content": ai_response, "sources": session_srv.last_retrieval,
+                                                  "timing": session_srv.last_timing, "context": session_srv.last_context,
+                                                  "cached": session_srv.last_answer_cached}) # Rule 6
+                AuthManager.log_interaction(user['email'], "AI Chat Query", user_prompt or "File Upload") # Rule 3
+            except Exception as e:
+                error_msg = f"❌ {get_text('ai_engine_error', lang)} {str(e)}" # Rule 5
+                st.error(error_msg)
+                logger.error(f"Chat UI error during AI interaction: {e}", exc_info=True) # Rule 4
+                st.session_state.messages.append({"role": "assistant", "content": error_msg}) # Rule 6
         
         # Clear files after processing to avoid sending them again on rerun (Rule 6)
         # This clears the temporary list, not the uploader widget.
@@ -1,6 +1,7 @@
 import streamlit as st
 import logging
 import time
+from typing import Any
 
 # NEW Imports for AI System Status checks
 import google.generativeai as genai # Still needed for list_models and GenerativeModel
@@ -31,6 +32,24 @@ def status_write(msg_container: Any, msg: str, state: str = "loading"):
     return msg_container
 
 
+def _manual_context(problem_description: str) -> str:
+    """
+    Σχετικές σελίδες manuals για τη μάρκα/μοντέλο του chat context. Το κείμενο έρχεται από
+    το page index και την κοινή cache κειμένου (core/text_cache.py), χωρίς νέο download όταν υπάρχει.
+    """
+    brand = st.session_state.get('ctx_brand') # Rule 6
+    chat_srv = st.session_state.get('chat_session_service') # Rule 6
+    if not brand or brand == '-' or chat_srv is None:
+        return st.session_state.get('diag_manual_context', "")
+    try: # Rule 4: Error Handling
+        manuals = chat_srv.get_prioritized_manuals(brand, st.session_state.get('ctx_model', ''), problem_description)
+        pages = chat_srv.retrieve_pages(problem_description, manuals)
+        return "\n\n".join(f"--- MANUAL: {p['file_name']} | PAGE {p['page']} ---\n{p['text']}" for p in pages)
+    except Exception as e:
+        logger.error(f"Error loading manual context for diagnostics: {e}", exc_info=True) # Rule 4
+        return ""
+
+
 def render(user):
     lang = st.session_state.get('lang', 'gr') # Rule 6, 5
 
@@ -147,10 +166,10 @@ def render(user):
                 st.session_state.diag_problem_description = problem_description
                 with st.spinner(get_text('diag_spinner', lang)): # Rule 5
                     try: # Rule 4: Error Handling
-                        # Assuming the ChatSessionService has access to current selected manuals for context
-                        # For simplicity here, we'll just pass the problem description.
-                        # For advanced, would fetch manual content dynamically here based on chat context.
-                        checklist = diag_service.generate_checklist(problem_description, lang=lang) # Rule 3
+                        # Context από τα manuals της μάρκας/μοντέλου που έχει επιλεγεί στο chat
+                        manual_text = _manual_context(problem_description)
+                        checklist = diag_service.generate_checklist(problem_description, manual_text=manual_text, lang=lang,
+                                                                brand=st.session_state.get('ctx_brand')) # Rule 3
                         if checklist and checklist['checklist']:
                             st.session_state.diag_checklist = checklist['checklist']
                             st.session_state.diag_current_step = 0
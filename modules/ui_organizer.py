@@ -1,14 +1,89 @@
 import streamlit as st
+from core.folder_resolver import FolderMetadataResolver
+from core.sorter_plan import PLAN_DRAFT
 from services.sorter_logic import SorterService, ALLOWED_CATEGORIES, ALLOWED_TYPES, IRRELEVANT_OR_UNKNOWN_FOLDER, DUPLICATES_FOLDER, IGNORED_FOLDERS_TOP_LEVEL, MANUAL_REVIEW_FOLDER # ΝΕΟ: Εισαγωγή MANUAL_REVIEW_FOLDER
-from core.language_pack import get_text # Rule 5
+from core.language_pack import get_text, LANGUAGE_PACK # Rule 5
 from core.db_connector import DatabaseConnector # For potential future admin updates
 import logging # Rule 4
 import pandas as pd
 from datetime import datetime
 from services.sync_service import SyncService # Rule 3
+from services.sorter_jobs import get_sorter_jobs, JOB_KIND_SORT, JOB_KIND_APPLY_PLAN, JOB_COMPLETED, JOB_CANCELED
 
 logger = logging.getLogger("Module_Organizer_UI") # Rule 4
 
+SORTER_POLL_SECONDS = 2 # Κάθε πόσο ανανεώνεται το block κατάστασης όσο τρέχει background εργασία
+
+
+@st.cache_resource(show_spinner=False)
+def _get_sorter_service() -> SorterService:
+    """
+    Ένας SorterService ανά server (όπως και το registry των εργασιών): Drive auth, μοντέλο AI, preclassifier
+    και SQLite stores στήνονται μία φορά, όχι σε κάθε rerun. Οι background εργασίες τρέχουν πάνω σε αυτό το instance.
+    """
+    return SorterService(folder_resolver=FolderMetadataResolver()) # Rule 3
+
+
+def _render_job_status(lang, job_id):
+    """
+    Progress και live log της background εργασίας. Τρέχει ως fragment με run_every όσο υπάρχει ενεργή εργασία,
+    οπότε ανανεώνεται μόνο αυτό το block· όταν η εργασία τελειώσει, ζητά ένα πλήρες rerun για να φορτωθούν τα αποτελέσματα.
+    """
+    active_job = get_sorter_jobs().active()
+    if job_id is not None and (active_job is None or active_job.job_id != job_id):
+        st.rerun() # Η εργασία ολοκληρώθηκε: πλήρες rerun (sync αποτελεσμάτων, ενεργοποίηση κουμπιών)
+    if active_job is None:
+        progress = st.session_state.sorter_progress_data # Rule 6
+        st.progress(progress["current"], text=progress["text"])
+        return
+    snapshot = active_job.snapshot()
+    st.progress(snapshot["percent"], text=snapshot["progress"]["text"])
+    st.info(f"{get_text('org_sorter_running', lang)} {get_text('org_job_running_by', lang).format(kind=snapshot['kind'], started_by=snapshot['started_by'], started=snapshot['started_at'] or snapshot['created_at'])}") # Rule 5
+    if snapshot['cancel_requested']:
+        st.warning(get_text('org_job_stopping', lang)) # Rule 5
+    st.caption(" · ".join(f"{name}: {count}" for name, count in snapshot['counts'].items()))
+    with st.expander(get_text('org_job_live_log', lang), expanded=True): # Rule 5
+        st.code("\n".join(snapshot['log'][-15:]) or "...", language=None)
+
+
+def _sync_finished_job(job):
+    """
+    Φορτώνει στο session το αποτέλεσμα μιας background εργασίας που ολοκληρώθηκε (μία φορά ανά εργασία).
+    Rule 6: Το worker thread δεν αγγίζει ποτέ το session_state· το κάνει η σελίδα στο επόμενο rerun.
+    """
+    if job is None or job.is_active or st.session_state.sorter_synced_job_id == job.job_id:
+        return
+    st.session_state.sorter_synced_job_id = job.job_id
+    snapshot = job.snapshot(log_lines=0)
+    st.session_state.sorter_run_log.extend(snapshot["log"])
+    if job.kind == JOB_KIND_SORT and snapshot["result"]:
+        st.session_state.sorter_summary = snapshot["result"]
+        st.session_state.sorter_failed_files = list(job.lists["failed"])
+        st.session_state.sorter_manual_review_files = list(job.lists["manual_review"])
+        st.session_state.sorter_irrelevant_files = list(job.lists["irrelevant"])
+        st.session_state.sorter_duplicate_files = list(job.lists["duplicates"])
+        if snapshot["result"].get("plan_id"):
+            st.session_state.sorter_plan_id = snapshot["result"]["plan_id"]
+    elif job.kind == JOB_KIND_APPLY_PLAN:
+        st.session_state.sorter_plan_id = None
+    st.session_state.sorter_progress_data = {"current": 0, "total": 0, "text": ""}
+    st.session_state.sorter_job_notice = snapshot
+
+
+def _show_job_notice(snapshot, lang):
+    """Μήνυμα ολοκλήρωσης της τελευταίας background εργασίας."""
+    result = snapshot["result"] or {}
+    if snapshot["error"]:
+        st.error(get_text('org_sorter_fatal_error', lang).format(error=snapshot["error"])) # Rule 5
+    elif snapshot["kind"] == JOB_KIND_APPLY_PLAN and result.get("status") in ("completed", "canceled"):
+        st.success(get_text('org_plan_applied', lang).format(**result)) # Rule 5
+    elif snapshot["kind"] == JOB_KIND_APPLY_PLAN:
+        st.error(result.get('message', '')) # Rule 5
+    elif snapshot["state"] == JOB_CANCELED:
+        st.warning(get_text('org_sorter_canceled', lang)) # Rule 5
+    elif snapshot["state"] == JOB_COMPLETED:
+        st.success(get_text('org_sorter_complete', lang)) # Rule 5
+
 def render(user):
     lang = st.session_state.get('lang', 'gr') # Rule 6, 5
     st.header(get_text('menu_organizer', lang)) # Rule 5
@@ -26,7 +101,7 @@ def render(user):
         return
 
     # Initialize session state for sorter flags and results (Rule 6)
-    if 'sorter_stop_flag' not in st.session_state: st.session_state['sorter_stop_flag'] = False
+    if 'sorter_synced_job_id' not in st.session_state: st.session_state['sorter_synced_job_id'] = None # Τελευταία background εργασία που φορτώθηκε στο session
     if 'sorter_running' not in st.session_state: st.session_state['sorter_running'] = False
     if 'sorter_failed_files' not in st.session_state: st.session_state['sorter_failed_files'] = []
     if 'sorter_manual_review_files' not in st.session_state: st.session_state['sorter_manual_review_files'] = []
@@ -36,10 +111,12 @@ def render(user):
     if 'sorter_run_log' not in st.session_state: st.session_state.sorter_run_log = []
     if 'sorter_summary' not in st.session_state: st.session_state.sorter_summary = None
     if 'force_full_resort' not in st.session_state: st.session_state.force_full_resort = False # ΝΕΟ: Flag για πλήρη επανεπεξεργασία
+    if 'sorter_dry_run' not in st.session_state: st.session_state.sorter_dry_run = False # ΝΕΟ: Σχέδιο χωρίς αλλαγές στο Drive
+    if 'sorter_plan_id' not in st.session_state: st.session_state.sorter_plan_id = None
 
     # --- Session state για περιήγηση αρχείων ---
     # Rule 6: Initialize navigation states
-    sorter_service_instance = SorterService() # Instantiate SorterService to get root_id, etc. (Rule 3)
+    sorter_service_instance = _get_sorter_service() # Κοινό instance του server (Rule 3)
     if 'org_browse_level' not in st.session_state: st.session_state.org_browse_level = "categories"
     if 'org_current_folder_id' not in st.session_state: st.session_state.org_current_folder_id = sorter_service_instance.drive.root_id
     if 'org_folder_history' not in st.session_state: st.session_state.org_folder_history = []
@@ -51,20 +128,27 @@ def render(user):
 
     sorter_service = sorter_service_instance # Use the already instantiated service.
 
-    # --- Progress bar for live updates ---
-    progress_bar = st.progress(st.session_state.sorter_progress_data["current"], text=st.session_state.sorter_progress_data["text"])
+    # --- Background εργασία Sorter (κοινή για όλους τους admins του server) ---
+    sorter_jobs = get_sorter_jobs()
+    active_job = sorter_jobs.active()
+    st.session_state.sorter_running = active_job is not None
+    _sync_finished_job(sorter_jobs.latest())
 
-    def update_progress(current, text):
-        st.session_state.sorter_progress_data["current"] = current
-        st.session_state.sorter_progress_data["text"] = text
-        progress_bar.progress(current, text)
+    # --- Progress / live log: fragment που ανανεώνεται μόνο του όσο τρέχει εργασία (όχι rerun όλης της σελίδας) ---
+    job_status = st.fragment(_render_job_status, run_every=SORTER_POLL_SECONDS if active_job is not None else None)
+    job_status(lang, active_job.job_id if active_job is not None else None)
+
+    job_notice = st.session_state.pop('sorter_job_notice', None)
+    if job_notice:
+        _show_job_notice(job_notice, lang)
 
     # --- Tabs for Organizer functionalities ---
-    tab1, tab2, tab3, tab4 = st.tabs([ # Αναδιάταξη tabs
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([ # Αναδιάταξη tabs
         get_text('org_tab_summary', lang), # Rule 5
         get_text('org_tab_browse', lang), # Rule 5
         get_text('org_tab_review', lang), # Rule 5
-        get_text('org_tab_log', lang) # Rule 5
+        get_text('org_tab_log', lang), # Rule 5
+        get_text('org_tab_history', lang) # Rule 5
     ])
 
     with tab1: # Summary & Execution
@@ -81,6 +165,28 @@ def render(user):
             col3.metric(get_text('org_summary_manual_review', lang), summary.get('total_moved_to_manual_review', 0)) # Rule 5
             col4.metric(get_text('org_summary_irrelevant', lang), summary.get('total_moved_to_irrelevant', 0)) # Rule 5
             col5.metric(get_text('org_summary_duplicates', lang), summary.get('total_moved_to_duplicates', 0)) # Rule 5
+            cache_stats = summary.get('classification_cache')
+            if cache_stats and (cache_stats.get('hits') or cache_stats.get('misses')):
+                st.caption(get_text('org_summary_cache_hits', lang).format(hits=cache_stats['hits'], misses=cache_stats['misses'], rate=round(100 * cache_stats['hit_rate'], 1))) # Rule 5
+            if summary.get('ai_calls_made') or summary.get('ai_calls_avoided'):
+                st.caption(get_text('org_summary_ai_avoided', lang).format(made=summary.get('ai_calls_made', 0), avoided=summary.get('ai_calls_avoided', 0), rules=summary.get('rule_classified', 0))) # Rule 5
+            if summary.get('discovery', {}).get('folders_listed', 0) > 1:
+                st.caption(get_text('org_summary_discovery', lang).format(**summary['discovery'])) # Rule 5
+            if summary.get('resumed_run'):
+                st.caption(get_text('org_summary_resumed', lang).format(run_id=summary.get('run_id'), count=summary.get('resumed_skipped', 0))) # Rule 5
+            if summary.get('payload_modes'):
+                modes = summary['payload_modes']
+                st.caption(get_text('org_summary_payloads', lang).format(full=modes.get('full', 0), slim=modes.get('slim', 0), text=modes.get('text', 0), sent=round(summary.get('payload_bytes_sent', 0) / (1024 * 1024), 1), original=round(summary.get('payload_bytes_original', 0) / (1024 * 1024), 1))) # Rule 5
+            if summary.get('ai_requests') or summary.get('drive_calls'):
+                st.caption(get_text('org_summary_cost', lang).format(requests=summary.get('ai_requests', 0), tokens_in=summary.get('ai_tokens_in', 0), tokens_out=summary.get('ai_tokens_out', 0), drive=summary.get('drive_calls', 0), mb=round(summary.get('bytes_downloaded', 0) / (1024 * 1024), 1))) # Rule 5
+            if summary.get('ai_batched_files'):
+                st.caption(get_text('org_summary_ai_batches', lang).format(files=summary['ai_batched_files'], requests=summary.get('ai_batch_requests', 0))) # Rule 5
+            if summary.get('duplicates_from_registry'):
+                st.caption(get_text('org_summary_registry_dupes', lang).format(count=summary['duplicates_from_registry'])) # Rule 5
+            if summary.get('duplicates_detected_without_download'):
+                st.caption(get_text('org_summary_checksum_dupes', lang).format(count=summary['duplicates_detected_without_download'], mb=round(summary.get('download_bytes_avoided', 0) / (1024 * 1024), 1))) # Rule 5
+            if summary.get('near_duplicates') or summary.get('near_duplicate_reviews'):
+                st.caption(get_text('org_summary_near_dupes', lang).format(count=summary.get('near_duplicates', 0), review=summary.get('near_duplicate_reviews', 0))) # Rule 5
 
             if summary.get('total_successfully_sorted', 0) > 0:
                 st.markdown("---")
@@ -112,6 +218,31 @@ def render(user):
                     else:
                         st.info(get_text('org_no_data_for_type', lang)) # Rule 5
 
+            # --- Pipeline metrics ανά στάδιο ---
+            pipeline_metrics = summary.get('pipeline_metrics')
+            if pipeline_metrics:
+                with st.expander(get_text('org_pipeline_metrics', lang)): # Rule 5
+                    st.caption(get_text('org_pipeline_total_time', lang).format(seconds=pipeline_metrics.get('total_seconds', 0))) # Rule 5
+                    st.dataframe(pd.DataFrame(pipeline_metrics.get('stages', [])), use_container_width=True, hide_index=True)
+
+            # --- AIMD έλεγχος ταυτόχρονων κλήσεων AI ---
+            ai_concurrency = summary.get('ai_concurrency')
+            if ai_concurrency and (ai_concurrency.get('ok') or ai_concurrency.get('throttled')):
+                with st.expander(get_text('org_ai_concurrency', lang)): # Rule 5
+                    st.caption(get_text('org_ai_concurrency_state', lang).format(**ai_concurrency)) # Rule 5
+                    if len(ai_concurrency.get('history', [])) > 1:
+                        df_limit = pd.DataFrame(ai_concurrency['history'], columns=["seconds", "limit"])
+                        st.line_chart(df_limit.set_index("seconds"))
+
+            # --- Audit trail της εκτέλεσης (από το journal) ---
+            if summary.get('run_id'):
+                with st.expander(get_text('org_audit_trail', lang)): # Rule 5
+                    audit_rows = sorter_service.journal.audit_trail(summary['run_id'])
+                    if audit_rows:
+                        st.dataframe(pd.DataFrame(audit_rows), use_container_width=True, hide_index=True)
+                    else:
+                        st.info(get_text('org_audit_empty', lang)) # Rule 5
+
         st.markdown("---")
         st.subheader(get_text('org_tab_summary', lang)) # Rule 5
         
@@ -120,57 +251,107 @@ def render(user):
             value=st.session_state.force_full_resort, key="force_full_resort_checkbox" # Rule 6
         )
         st.caption(get_text('org_force_rescan_info', lang)) # Rule 5
+        st.session_state.sorter_dry_run = st.checkbox(
+            get_text('org_dry_run_checkbox', lang), # Rule 5
+            value=st.session_state.sorter_dry_run, key="sorter_dry_run_checkbox" # Rule 6
+        )
+
+        # --- Συνέχεια εκτέλεσης που διακόπηκε (journal) ---
+        interrupted_run = sorter_service.journal.resumable_run() if not st.session_state.sorter_running else None
+        if interrupted_run:
+            st.session_state.sorter_resume = st.checkbox(
+                get_text('org_resume_checkbox', lang).format(run_id=interrupted_run['run_id'], started=interrupted_run['started_at']), # Rule 5
+                value=st.session_state.get('sorter_resume', True), key="sorter_resume_checkbox" # Rule 6
+            )
+
+        # --- Μόνιμο μητρώο hashes (διπλότυπα ανάμεσα σε εκτελέσεις) ---
+        col_reg_info, col_reg_btn = st.columns([3, 1])
+        col_reg_info.caption(get_text('org_registry_info', lang).format(count=sorter_service.registry.count())) # Rule 5
+        if col_reg_btn.button(get_text('org_registry_rebuild_btn', lang), use_container_width=True, disabled=st.session_state.sorter_running): # Rule 5
+            try: # Rule 4
+                stats = sorter_service.registry.rebuild_from_index(SyncService().load_index()) # Rule 3
+                st.success(get_text('org_registry_rebuilt', lang).format(**stats)) # Rule 5
+            except Exception as e:
+                st.error(get_text('general_ui_error', lang).format(error=e)) # Rule 5
+                logger.error(f"Hash registry rebuild failed: {e}", exc_info=True) # Rule 4
+
+        # --- Cache ταξινομήσεων AI (ρητή ακύρωση) ---
+        col_cache_info, col_cache_btn = st.columns([3, 1])
+        col_cache_info.caption(get_text('org_cache_info', lang).format(count=sorter_service.classification_cache.count())) # Rule 5
+        if col_cache_btn.button(get_text('org_cache_clear_btn', lang), use_container_width=True, disabled=st.session_state.sorter_running): # Rule 5
+            removed = sorter_service.classification_cache.invalidate()
+            st.success(get_text('org_cache_cleared', lang).format(count=removed)) # Rule 5
 
         col_run, col_stop = st.columns(2)
         with col_run:
             if st.button(get_text('org_btn_start_sorter', lang), type="primary", use_container_width=True, disabled=st.session_state.sorter_running): # Rule 5
-                st.session_state.sorter_running = True
-                st.session_state.sorter_stop_flag = False # Reset stop flag
-                st.session_state.sorter_run_log.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Sorter started. Full Rescan: {st.session_state.force_full_resort}") # Rule 4
+                run_options = {
+                    "force_full_rescan": st.session_state.force_full_resort,
+                    "resume": st.session_state.get('sorter_resume', True),
+                    "dry_run": st.session_state.sorter_dry_run,
+                }
+                job, created = sorter_jobs.submit(
+                    JOB_KIND_SORT,
+                    lambda job: sorter_service.run_sorter(
+                        stop_flag=job.should_stop, # Cancellation token της εργασίας
+                        progress_callback=job.set_progress,
+                        log_callback=job.log,
+                        failed_files_list=job.lists["failed"],
+                        manual_review_files_list=job.lists["manual_review"],
+                        irrelevant_files_list=job.lists["irrelevant"],
+                        duplicate_files_list=job.lists["duplicates"],
+                        **run_options
+                    ),
+                    started_by=user.get('email', 'admin'), params=run_options
+                )
+                if created:
+                    logger.info(f"AI Sorter job {job.job_id} started by {job.started_by}.") # Rule 4
+                else:
+                    st.warning(get_text('org_job_already_running', lang).format(started_by=job.started_by, started=job.created_at)) # Rule 5
                 st.rerun()
         with col_stop:
             if st.button(get_text('org_btn_stop_sorter', lang), type="secondary", use_container_width=True, disabled=not st.session_state.sorter_running): # Rule 5
-                st.session_state.sorter_stop_flag = True # Set stop flag
-                logger.info("AI Sorter stop flag set.") # Rule 4
-                st.session_state.sorter_run_log.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Sorter stop requested.") # Rule 4
-                # No rerun here, let the loop check the flag and stop naturally.
+                if active_job is not None:
+                    active_job.cancel(user.get('email', 'admin')) # Το pipeline σταματά στο επόμενο σημείο ελέγχου
+                    logger.info(f"AI Sorter job {active_job.job_id} stop requested.") # Rule 4
+                st.rerun()
 
-        if st.session_state.sorter_running:
-            st.info(get_text('org_sorter_running', lang)) # Rule 5
-            
-            try: # Rule 4
-                # Run the sorter logic
-                summary_result = sorter_service.run_sorter(
-                    stop_flag=st.session_state, # Pass session_state to allow internal modification of stop_flag (Rule 6)
-                    progress_callback=update_progress,
-                    full_rescan=st.session_state.force_full_resort
-                )
-                st.session_state.sorter_summary = summary_result # Store summary
-                st.session_state.sorter_running = False
-                st.session_state.sorter_stop_flag = False
-                if summary_result.get("status") == "canceled":
-                    st.warning(get_text('org_sorter_canceled', lang)) # Rule 5
-                    st.session_state.sorter_run_log.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Sorter cancelled by user.") # Rule 4
+        # --- Σχέδιο dry run: έλεγχος diff και μαζική εφαρμογή ---
+        plan_id = st.session_state.sorter_plan_id or sorter_service.plan_store.latest()
+        plan_diff = sorter_service.get_plan_diff(plan_id) if plan_id and not st.session_state.sorter_running else None
+        if plan_diff and plan_diff['status'] == PLAN_DRAFT:
+            st.markdown("---")
+            st.subheader(get_text('org_plan_title', lang).format(plan_id=plan_diff['plan_id'], created=plan_diff['created_at'])) # Rule 5
+            st.caption(" · ".join(f"{action}: {count}" for action, count in sorted(plan_diff['counts'].items())))
+            with st.expander(get_text('org_plan_folders', lang).format(count=len(plan_diff['folders_to_create']))): # Rule 5
+                if plan_diff['folders_to_create']:
+                    st.code("\n".join(plan_diff['folders_to_create']), language=None)
                 else:
-                    st.success(get_text('org_sorter_complete', lang)) # Rule 5
-                    st.session_state.sorter_run_log.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Sorter completed. Summary: {summary_result}") # Rule 4
-                st.rerun() # Rerun to update UI after completion
-            except Exception as e:
-                st.error(f"{get_text('org_sorter_fatal_error', lang).format(error=e)}") # Rule 5
-                logger.critical(f"FATAL ERROR during AI Sorter run: {e}", exc_info=True) # Rule 4
-                st.session_state.sorter_running = False
-                st.session_state.sorter_stop_flag = False
-                st.session_state.sorter_run_log.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Sorter stopped with FATAL ERROR: {e}") # Rule 4
-                st.rerun() # Rerun to update UI after error
-        else:
-            if st.session_state.sorter_summary:
-                st.info(get_text('org_sorter_stopped', lang)) # Rule 5
-            else:
-                st.info(get_text('org_sorter_ready', lang) if 'org_sorter_ready' in LANGUAGE_PACK else "Ο AI Sorter είναι έτοιμος να ξεκινήσει.") # Rule 5
+                    st.info(get_text('org_plan_no_folders', lang)) # Rule 5
+            if plan_diff['rows']:
+                st.dataframe(pd.DataFrame(plan_diff['rows']), use_container_width=True, hide_index=True)
+
+            col_apply, col_discard = st.columns(2)
+            if col_apply.button(get_text('org_plan_apply_btn', lang), type="primary", use_container_width=True, disabled=st.session_state.sorter_running): # Rule 5
+                apply_plan_id = plan_diff['plan_id']
+                job, created = sorter_jobs.submit(
+                    JOB_KIND_APPLY_PLAN,
+                    lambda job: sorter_service.apply_plan(apply_plan_id, progress_callback=job.set_progress, log_callback=job.log, stop_flag=job.should_stop),
+                    started_by=user.get('email', 'admin'), params={"plan_id": apply_plan_id}
+                )
+                if not created:
+                    st.warning(get_text('org_job_already_running', lang).format(started_by=job.started_by, started=job.created_at)) # Rule 5
+                st.rerun()
+            if col_discard.button(get_text('org_plan_discard_btn', lang), use_container_width=True): # Rule 5
+                sorter_service.discard_plan(plan_diff['plan_id'])
+                st.session_state.sorter_plan_id = None
+                st.rerun()
 
     with tab2: # File Browser
         st.subheader(get_text('org_tab_browse', lang)) # Rule 5
-        st.markdown(f"**{get_text('org_browse_current_path', lang)}** `{st.session_state.org_current_folder_id}`") # Rule 5
+        folder_resolver = sorter_service.folder_resolver
+        current_folder_name = folder_resolver.get_name(st.session_state.org_current_folder_id) or st.session_state.org_current_folder_id
+        st.markdown(f"**{get_text('org_browse_current_path', lang)}** `{current_folder_name}`") # Rule 5
 
         # Back button
         if st.session_state.org_folder_history and st.button(get_text('org_browse_back_btn', lang)): # Rule 5
@@ -179,6 +360,7 @@ def render(user):
 
         try: # Rule 4
             current_folder_contents = sorter_service.drive.list_files_in_folder(st.session_state.org_current_folder_id) # Rule 7
+            folder_resolver.prefill(current_folder_contents)
             
             if not current_folder_contents:
                 st.info(get_text('org_browse_empty', lang)) # Rule 5
@@ -275,4 +457,39 @@ def render(user):
             for entry in st.session_state.sorter_run_log:
                 st.code(entry)
         else:
-            st.info(get_text('org_log_empty', lang)) # Rule 5
\ No newline at end of file
+            st.info(get_text('org_log_empty', lang)) # Rule 5
+
+    with tab5: # Run History & Comparison
+        st.subheader(get_text('org_tab_history', lang)) # Rule 5
+        history_runs = sorter_service.history.runs()
+        if not history_runs:
+            st.info(get_text('org_history_empty', lang)) # Rule 5
+        else:
+            st.dataframe(pd.DataFrame(history_runs), use_container_width=True, hide_index=True)
+            run_labels = {r['history_id']: f"{r['started_at']} · {r['files']} files · {r['total_seconds']}s" + (" · dry run" if r['dry_run'] else "") for r in history_runs}
+            run_ids = list(run_labels)
+
+            # --- Σύγκριση δύο εκτελέσεων (π.χ. πριν/μετά από αλλαγή ρυθμίσεων) ---
+            if len(run_ids) > 1:
+                st.markdown("---")
+                st.subheader(get_text('org_history_compare', lang)) # Rule 5
+                col_base, col_other = st.columns(2)
+                base_id = col_base.selectbox(get_text('org_history_base', lang), run_ids, index=1, format_func=run_labels.get, key="org_history_base") # Rule 5, 6
+                other_id = col_other.selectbox(get_text('org_history_other', lang), run_ids, index=0, format_func=run_labels.get, key="org_history_other") # Rule 5, 6
+                comparison = sorter_service.history.compare(base_id, other_id)
+                if comparison:
+                    st.dataframe(pd.DataFrame(comparison['metrics']), use_container_width=True, hide_index=True)
+                    df_stages = pd.DataFrame(comparison['stages'])
+                    st.caption(get_text('org_history_stage_avg', lang)) # Rule 5
+                    st.bar_chart(df_stages[df_stages['stage'] != 'total'].set_index('stage')[['base_avg_ms', 'other_avg_ms']])
+                    if comparison['config_changes']:
+                        st.caption(get_text('org_history_config_changes', lang)) # Rule 5
+                        st.json(comparison['config_changes'])
+
+            # --- Ανά αρχείο: χρόνοι σταδίων και κόστος ---
+            st.markdown("---")
+            detail_id = st.selectbox(get_text('org_history_files', lang), run_ids, format_func=run_labels.get, key="org_history_detail") # Rule 5, 6
+            run_files = sorter_service.history.run_files(detail_id)
+            if run_files:
+                st.dataframe(pd.DataFrame(run_files), use_container_width=True, hide_index=True)
+
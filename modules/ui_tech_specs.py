@@ -2,6 +2,8 @@ import streamlit as st
 import sys
 from core.language_pack import get_text
 from version import VERSION # NEW: Import version for display
+from core.text_cache import get_text_cache # NEW: Extracted-text cache stats
+from core.answer_cache import get_answer_cache # NEW: Chat answer cache (admin purge)
 
 def render(user):
     # Security Check: Μόνο Admin
@@ -30,4 +32,30 @@ def render(user):
     
     with c2:
         st.metric(get_text('specs_user_role', lang), user['role'].upper()) # Rule 5
-        st.metric(get_text('specs_language', lang), st.session_state.lang.upper()) # Rule 5
\ No newline at end of file
+        st.metric(get_text('specs_language', lang), st.session_state.lang.upper()) # Rule 5
+
+    # NEW: Κοινή cache εξαγόμενου κειμένου (chat, διαγνωστικά, αναζήτηση)
+    st.markdown(f"### 🗄️ {get_text('specs_text_cache', lang)}") # Rule 5
+    cache = get_text_cache()
+    stats = cache.stats()
+    c1, c2, c3 = st.columns(3)
+    c1.metric(get_text('specs_cache_hit_ratio', lang), f"{100 * stats['hit_ratio']:.1f}%",
+              help=get_text('specs_cache_lookups', lang).format(hits=int(stats['hits']), misses=int(stats['misses']))) # Rule 5
+    c2.metric(get_text('specs_cache_saved_time', lang), f"{stats['saved_ms'] / 1000:.1f} s") # Rule 5
+    c3.metric(get_text('specs_cache_size', lang), f"{stats['size_bytes'] / 1048576:.1f} / {stats['max_bytes'] / 1048576:.0f} MB") # Rule 5
+    st.caption(get_text('specs_cache_contents', lang).format(documents=stats['documents'], pages=stats['pages'])) # Rule 5
+    if st.button(get_text('specs_cache_clear', lang), key="specs_clear_text_cache"): # Rule 5
+        cache.clear()
+        st.success(get_text('specs_cache_cleared', lang)) # Rule 5
+
+    # NEW: Cache απαντήσεων του chat
+    st.markdown(f"### ⚡ {get_text('specs_answer_cache', lang)}") # Rule 5
+    answer_cache = get_answer_cache()
+    answer_stats = answer_cache.stats()
+    c1, c2, c3 = st.columns(3)
+    c1.metric(get_text('specs_answer_cache_entries', lang), f"{answer_stats['entries']} / {answer_stats['max_entries']}") # Rule 5
+    c2.metric(get_text('specs_cache_hit_ratio', lang), f"{100 * answer_stats['hit_rate']:.1f}%") # Rule 5
+    c3.metric(get_text('specs_answer_cache_served', lang), answer_stats['total_hits']) # Rule 5
+    if st.button(get_text('specs_answer_cache_purge', lang), key="specs_purge_answer_cache"): # Rule 5
+        removed = answer_cache.purge()
+        st.success(get_text('specs_answer_cache_purged', lang).format(count=removed)) # Rule 5
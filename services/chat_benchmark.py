@@ -0,0 +1,113 @@
+"""
+SERVICE: CHAT RETRIEVAL BENCHMARK
+---------------------------------
+Μετράει το page-level BM25 index (core/page_index.py) σε συνθετική βιβλιοθήκη manuals,
+χωρίς Drive/AI: χρόνος κατασκευής και latency αναζήτησης (p50/p95/max), με και χωρίς
+scope μάρκας/μοντέλου, και αν η σελίδα με τον ζητούμενο κωδικό σφάλματος βγαίνει πρώτη.
+
+Χρήση:
+    python -m services.chat_benchmark --pages 100000
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+FAKE_BRANDS = ["DAIKIN", "VAILLANT", "MITSUBISHI", "BAXI", "LG", "TOSHIBA", "ARISTON", "BOSCH"]
+TECH_WORDS = ("compressor valve pressure sensor fan coil refrigerant outdoor indoor unit pump flow water "
+              "temperature thermistor board pcb wiring terminal fuse relay defrost heating cooling mode "
+              "installation pipe flare drain filter remote controller display reset setting parameter "
+              "βλάβη σφάλμα αισθητήρας πίεση θερμοκρασία βαλβίδα αντλία ανεμιστήρας εγκατάσταση καλωδίωση").split()
+
+
+def build_synthetic_library(num_pages: int, pages_per_manual: int = 120, words_per_page: int = 250, seed: int = 11) -> List[Dict[str, Any]]:
+    """
+    Συνθετικά manuals: τεχνικό λεξιλόγιο + σπάνιοι όροι ανά manual, και σε κάθε manual
+    μία σελίδα "πίνακα κωδικών σφαλμάτων" (κωδικοί E/F/H με περιγραφές) σε τυχαία θέση.
+    """
+    rng = random.Random(seed)
+    rare = [f"x{n:05d}" for n in range(20000)]
+    manuals = []
+    for index in range(max(1, num_pages // pages_per_manual)):
+        brand = FAKE_BRANDS[index % len(FAKE_BRANDS)]
+        error_page = rng.randrange(pages_per_manual)
+        codes = [f"{rng.choice('EFH')}{rng.randint(1, 99)}" for _ in range(12)]
+        pages = []
+        for page in range(pages_per_manual):
+            words = [rng.choice(TECH_WORDS) if rng.random() < 0.8 else rng.choice(rare) for _ in range(words_per_page)]
+            if page == error_page:
+                words += [token for code in codes for token in (code, "error", "code", "check", rng.choice(TECH_WORDS))]
+            pages.append({"page": page, "text": " ".join(words)})
+        manuals.append({"file_id": f"m{index:05d}", "file_name": f"{brand}_MODEL{index}_Service_Manual.pdf",
+                        "brand": brand, "model": f"MODEL{index}", "pages": pages, "error_page": error_page, "codes": codes})
+    return manuals
+
+
+def run_page_index_benchmark(num_pages: int = 100000, queries: int = 300, top_k: int = 6) -> Dict[str, Any]:
+    """Benchmark κατασκευής και αναζήτησης του PageIndex (in-memory, χωρίς SQLite)."""
+    from core.page_index import PageIndex
+
+    started = time.perf_counter()
+    manuals = build_synthetic_library(num_pages)
+    generated = time.perf_counter() - started
+
+    index = PageIndex(None)
+    started = time.perf_counter()
+    for manual in manuals:
+        index.add_manual(manual["file_id"], manual["file_name"], manual["pages"], brand=manual["brand"], model=manual["model"])
+    index.search("warmup")
+    built = time.perf_counter() - started
+
+    rng = random.Random(3)
+    by_brand: Dict[str, List[str]] = {}
+    for manual in manuals:
+        by_brand.setdefault(manual["brand"], []).append(manual["file_id"])
+    timings = {"library": [], "brand_scope": [], "model_scope": []}
+    correct = 0
+    for _ in range(queries):
+        manual = rng.choice(manuals)
+        code = rng.choice(manual["codes"])
+        query = f"Η μονάδα βγάζει σφάλμα {code}, τι σημαίνει ο κωδικός; pressure sensor"
+        for scope, file_ids in (("library", None), ("brand_scope", by_brand[manual["brand"]]), ("model_scope", [manual["file_id"]])):
+            t0 = time.perf_counter()
+            hits = index.search(query, file_ids=file_ids, top_k=top_k)
+            timings[scope].append(1000 * (time.perf_counter() - t0))
+            if scope == "model_scope" and hits and hits[0]["page"] == manual["error_page"] + 1:
+                correct += 1
+
+    def percentiles(values: List[float]) -> Dict[str, float]:
+        ordered = sorted(values)
+        return {"p50": round(ordered[len(ordered) // 2], 2), "p95": round(ordered[int(len(ordered) * 0.95) - 1], 2), "max": round(ordered[-1], 2)}
+
+    # Ερώτηση αμέσως μετά την ευρετηρίαση ενός νέου manual (cold path του chat)
+    template = manuals[0]
+    started = time.perf_counter()
+    index.add_manual("bench-new", template["file_name"], template["pages"], brand=template["brand"], model=template["model"])
+    index.search("Η μονάδα βγάζει σφάλμα, pressure sensor")
+    add_search_ms = round(1000 * (time.perf_counter() - started), 1)
+
+    counts = index.count()
+    result = {
+        "pages": counts["pages"], "manuals": counts["manuals"], "terms": counts["terms"],
+        "generate_s": round(generated, 2), "build_s": round(built, 2),
+        "latency_ms": {scope: percentiles(values) for scope, values in timings.items()},
+        "error_page_top1": round(correct / queries, 3), "add_search_ms": add_search_ms,
+    }
+    print(f"\n=== Page index: {result['pages']} pages, {result['manuals']} manuals, {result['terms']} terms, built in {result['build_s']}s")
+    for scope, stats in result["latency_ms"].items():
+        print(f"    search ({scope:<11}) p50={stats['p50']} ms, p95={stats['p95']} ms, max={stats['max']} ms")
+    print(f"    error-code page ranked first (model scope): {100 * result['error_page_top1']:.1f}%")
+    print(f"    add 1 manual ({len(template['pages'])} pages) + search: {add_search_ms} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark του page-level BM25 index του chat.")
+    parser.add_argument("--pages", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+    run_page_index_benchmark(args.pages, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+SERVICE: CHAT CONTEXT ASSEMBLER (TOKEN BUDGET)
+----------------------------------------------
+Συναρμολογεί το context κάθε ερώτησης του chat μέσα σε σταθερό budget tokens, ώστε
+latency και κόστος ανά ερώτηση να μένουν σταθερά όσο μεγαλώνει η συζήτηση.
+
+Προτεραιότητες (η υψηλότερη παίρνει πρώτη από το budget):
+1. Ερώτηση (πάντα)
+2. Ανεβασμένες εικόνες
+3. Ανεβασμένα PDF: ολόκληρο -> slim PDF (core/pdf_payload.py) -> απόσπασμα κειμένου
+4. Σελίδες manuals από το retrieval (με τη σειρά κατάταξης)
+5. Πρόσφατο ιστορικό (αυτούσιο, από το νεότερο)
+6. Παλαιότερο ιστορικό: ντετερμινιστική περίληψη (πρώτη πρόταση κάθε μηνύματος)
+
+Οι σελίδες manuals αφήνουν ένα μικρό απόθεμα (HISTORY_RESERVE_SHARE) ώστε να μη χάνεται όλο το ιστορικό.
+Ό,τι δεν χωράει περικόπτεται ή παραλείπεται και καταγράφεται στο report.
+Οι εκτιμήσεις tokens είναι ευρετικές (χωρίς κλήση στο API): ίδια είσοδος -> ίδιο αποτέλεσμα.
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from core.pdf_extractor import get_extraction_pool
+from core.pdf_payload import build_slim_pdf, SLIM_FIRST_PAGES, SLIM_MAX_EXTRA_PAGES
+
+logger = logging.getLogger("Service.ChatContext")
+
+CHAT_CONTEXT_BUDGET_TOKENS = 24000   # Budget ανά ερώτηση (χωρίς τις οδηγίες συστήματος)
+IMAGE_TOKENS = 258                   # Gemini: σταθερό κόστος ανά εικόνα
+PDF_TOKENS_PER_PAGE = 560            # Gemini: εικόνα σελίδας (258) + το κείμενό της (κατά προσέγγιση)
+RECENT_HISTORY_MESSAGES = 4          # Τόσα τελευταία μηνύματα στέλνονται αυτούσια
+HISTORY_RESERVE_SHARE = 0.15         # Μέρος του budget που οι σελίδες manuals αφήνουν για το ιστορικό
+MIN_PART_TOKENS = 120                # Κάτω από αυτό δεν αξίζει να σταλεί κομμάτι περικομμένου κειμένου
+SUMMARY_CHARS_PER_MESSAGE = 160      # Μήκος περίληψης ανά παλαιότερο μήνυμα
+PDF_TEXT_MAX_PAGES = 30              # Σελίδες που εξάγονται όταν ένα PDF στέλνεται ως κείμενο
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!;?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Ευρετική εκτίμηση tokens: ~4 χαρακτήρες/token για λατινικά, ~2 για ελληνικά
+    (οι tokenizers σπάνε τα ελληνικά σε περισσότερα κομμάτια).
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return 1 + (len(text) - non_ascii) // 4 + non_ascii // 2
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Κόβει το κείμενο ώστε να χωράει σε `max_tokens` (σε όριο λέξης), με σημάδι περικοπής."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high: # Binary search στο μήκος (η εκτίμηση είναι μονότονη)
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) + 3 <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    cut = text[:low]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > low // 2 else cut) + " […]"
+
+
+def summarize_message(content: str, max_chars: int = SUMMARY_CHARS_PER_MESSAGE) -> str:
+    """Ντετερμινιστική περίληψη: η πρώτη πρόταση (ή οι πρώτοι `max_chars` χαρακτήρες) χωρίς markdown."""
+    flat = " ".join(re.sub(r"[*#>`_]", "", content or "").split())
+    first = _SENTENCE_END_RE.split(flat, maxsplit=1)[0]
+    return first if len(first) <= max_chars else first[:max_chars].rsplit(" ", 1)[0] + "…"
+
+
+class ContextAssembler:
+    """Επιλέγει τι μπαίνει στο context του AI με βάση προτεραιότητες και budget tokens."""
+
+    def __init__(self, budget_tokens: int = CHAT_CONTEXT_BUDGET_TOKENS):
+        self.budget_tokens = budget_tokens
+
+    def assemble(self, question: str, images: Optional[List[Dict[str, Any]]] = None, pdfs: Optional[List[Dict[str, Any]]] = None,
+                 pages: Optional[List[Dict[str, Any]]] = None, history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        Args:
+            question: Η ερώτηση του χρήστη.
+            images: [{"name", "mime_type", "data"}] ανεβασμένες εικόνες.
+            pdfs: [{"name", "data"}] ανεβασμένα PDF.
+            pages: Σελίδες retrieval ({"file_name", "page", "text", ...}) με σειρά κατάταξης.
+            history: Μηνύματα της συζήτησης ({"role", "content"}), παλαιότερο πρώτο.
+        Returns:
+            {"content_parts", "manual_text", "pages" (όσες στάλθηκαν), "report"}
+        """
+        self._remaining = self.budget_tokens
+        self._items: List[Dict[str, Any]] = []
+
+        # 1. Ερώτηση: πάντα (περικοπή μόνο αν μόνη της ξεπερνά το budget)
+        question_text = truncate_to_tokens(question or "", self.budget_tokens)
+        self._take("question", "question", estimate_tokens(question or ""), estimate_tokens(question_text),
+                   "kept" if question_text == (question or "") else "truncated")
+
+        # 2. Εικόνες
+        image_parts = []
+        for image in images or []:
+            if self._fits(IMAGE_TOKENS):
+                image_parts.append({"mime_type": image["mime_type"], "data": image["data"]})
+                self._take("image", image["name"], IMAGE_TOKENS, IMAGE_TOKENS, "kept")
+            else:
+                self._take("image", image["name"], IMAGE_TOKENS, 0, "dropped")
+
+        # 3. Ανεβασμένα PDF
+        pdf_parts = [part for part in (self._pdf_part(pdf) for pdf in pdfs or []) if part]
+
+        # 4. Σελίδες manuals
+        kept_pages = []
+        manual_text = ""
+        reserve = int(self.budget_tokens * HISTORY_RESERVE_SHARE) if history else 0
+        for page in pages or []:
+            header = f"\n\n--- MANUAL: {page['file_name']} | PAGE {page['page']} ---\n"
+            text, status = self._fit_text(header + (page.get("text") or ""), reserve)
+            self._take("page", f"{page['file_name']} p.{page['page']}", estimate_tokens(header + (page.get("text") or "")), estimate_tokens(text), status)
+            if text:
+                manual_text += text
+                kept_pages.append(page)
+
+        # 5-6. Ιστορικό: πρόσφατα αυτούσια, παλαιότερα ως περίληψη (από το νεότερο προς το παλαιότερο)
+        history = history or []
+        recent = history[-RECENT_HISTORY_MESSAGES:] if RECENT_HISTORY_MESSAGES else []
+        older = history[:len(history) - len(recent)]
+        recent_parts: List[Dict[str, str]] = []
+        for index in range(len(recent) - 1, -1, -1):
+            message = recent[index]
+            line = f"{message['role']}: {message['content']}"
+            text, status = self._fit_text(line)
+            self._take("history", f"{message['role']} #{len(older) + index + 1}", estimate_tokens(line), estimate_tokens(text), status)
+            if text:
+                recent_parts.insert(0, {"text": text})
+        summary_lines: List[str] = []
+        for index in range(len(older) - 1, -1, -1):
+            message = older[index]
+            line = f"- {message['role']}: {summarize_message(message['content'])}"
+            tokens = estimate_tokens(line)
+            label = f"{message['role']} #{index + 1}"
+            if self._fits(tokens):
+                summary_lines.insert(0, line)
+                self._take("history_summary", label, estimate_tokens(message['content']), tokens, "summarized")
+            else:
+                self._take("history_summary", label, estimate_tokens(message['content']), 0, "dropped")
+        summary_parts = [{"text": "EARLIER CONVERSATION (summary):\n" + "\n".join(summary_lines)}] if summary_lines else []
+
+        content_parts = [{"text": question_text}] + pdf_parts + image_parts + summary_parts + recent_parts
+        report = self._report()
+        if report["dropped"] or report["truncated"]:
+            logger.info(f"Chat context: {report['used_tokens']}/{report['budget_tokens']} tokens, "
+                        f"dropped {len(report['dropped'])}, truncated {report['truncated']}.") # Rule 4
+        return {"content_parts": content_parts, "manual_text": manual_text, "pages": kept_pages, "report": report}
+
+    # --- INTERNALS ---
+
+    def _fits(self, tokens: int, reserve: int = 0) -> bool:
+        return tokens <= self._remaining - reserve
+
+    def _take(self, kind: str, label: str, requested: int, used: int, status: str):
+        self._remaining -= used
+        self._items.append({"kind": kind, "label": label, "requested_tokens": requested, "tokens": used, "status": status})
+
+    def _fit_text(self, text: str, reserve: int = 0) -> tuple:
+        """(κείμενο, status): αυτούσιο αν χωράει, περικομμένο αν μένει αρκετό budget (πέρα από το `reserve`), αλλιώς κενό."""
+        if self._fits(estimate_tokens(text), reserve):
+            return text, "kept"
+        if self._remaining - reserve >= MIN_PART_TOKENS:
+            return truncate_to_tokens(text, self._remaining - reserve), "truncated"
+        return "", "dropped"
+
+    def _pdf_part(self, pdf: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Ολόκληρο PDF αν χωράει· αλλιώς slim PDF· αλλιώς το κείμενό του περικομμένο· αλλιώς τίποτα."""
+        name, data = pdf["name"], pdf["data"]
+        extracted = get_extraction_pool().extract(data, (0, PDF_TEXT_MAX_PAGES))
+        page_count = extracted.get("page_count") or 1
+        full_tokens = page_count * PDF_TOKENS_PER_PAGE
+        if self._fits(full_tokens):
+            self._take("pdf", name, full_tokens, full_tokens, "kept")
+            return {"mime_type": "application/pdf", "data": data}
+        slim_tokens = min(page_count, SLIM_FIRST_PAGES + SLIM_MAX_EXTRA_PAGES) * PDF_TOKENS_PER_PAGE # Άνω όριο σελίδων του slim PDF
+        if self._fits(slim_tokens):
+            ok, slim, _ = get_extraction_pool().run(build_slim_pdf, data)
+            if ok and slim:
+                self._take("pdf", name, full_tokens, slim_tokens, "truncated")
+                return {"mime_type": "application/pdf", "data": slim}
+        if extracted.get("ok") and extracted.get("text"):
+            text, status = self._fit_text(f"UPLOADED PDF '{name}' (text excerpt):\n{extracted['text']}")
+            if text:
+                self._take("pdf", name, full_tokens, estimate_tokens(text), "truncated")
+                return {"text": text}
+        self._take("pdf", name, full_tokens, 0, "dropped")
+        return None
+
+    def _report(self) -> Dict[str, Any]:
+        used = self.budget_tokens - self._remaining
+        return {
+            "budget_tokens": self.budget_tokens,
+            "used_tokens": used,
+            "requested_tokens": sum(item["requested_tokens"] for item in self._items),
+            "dropped": [f"{item['kind']}: {item['label']}" for item in self._items if item["status"] == "dropped"],
+            "truncated": sum(1 for item in self._items if item["status"] == "truncated"),
+            "summarized": sum(1 for item in self._items if item["status"] == "summarized"),
+            "items": self._items,
+        }
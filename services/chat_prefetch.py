@@ -0,0 +1,229 @@
+"""
+SERVICE: CHAT MANUAL PREFETCH (BACKGROUND)
+------------------------------------------
+Μόλις ο τεχνικός επιλέξει μάρκα/μοντέλο στο chat, τα κορυφαία manuals της επιλογής
+κατεβαίνουν, εξάγονται (cache κειμένου) και μπαίνουν στο page / error-code index στο
+background, ώστε μέχρι να γραφτεί η ερώτηση το context να είναι ήδη "ζεστό".
+
+Features:
+- Bounded concurrency: ένας κοινός (ανά process) thread pool με PREFETCH_WORKERS workers για όλα τα sessions.
+- Ακύρωση όταν αλλάζει η επιλογή: όσα manuals δεν έχουν ξεκινήσει ακυρώνονται, όσα τρέχουν ολοκληρώνονται
+  (ένα μισό download δεν αφήνει τίποτα χρήσιμο πίσω του).
+- Χωρίς διπλή δουλειά: ένα manual που ήδη προθερμαίνεται (από οποιοδήποτε session) δεν ξαναμπαίνει στην ουρά,
+  και το retrieval της ερώτησης περιμένει το prefetch του αντί να το κατεβάσει δεύτερη φορά.
+- NEW: load_manuals(): φόρτωση του context της ερώτησης παράλληλα (ξεχωριστό pool), με προθεσμία ανά manual
+  που μετράει από την ώρα που το manual ξεκινά (όχι όσο περιμένει στην ουρά).
+  Όσα δεν προλαβαίνουν συνεχίζουν στο background και είναι έτοιμα για την επόμενη ερώτηση.
+
+Το module ΔΕΝ κάνει import το streamlit: οι workers δεν αγγίζουν ποτέ το session_state.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait as wait_futures
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("Service.ChatPrefetch")
+
+PREFETCH_WORKERS = 3        # Ταυτόχρονα downloads/extractions prefetch σε όλη την εφαρμογή
+PREFETCH_MANUALS = 4        # Κορυφαία manuals ανά επιλογή (όσα θα ευρετηρίαζε και η πρώτη ερώτηση)
+CONTEXT_LOAD_WORKERS = 4    # Παράλληλα downloads/extractions κατά την ερώτηση (όσα RETRIEVAL_MAX_NEW_MANUALS)
+CONTEXT_LOAD_DEADLINE_SECONDS = 20 # Προθεσμία ανά manual· μετά η ερώτηση προχωρά με όσα έχουν ολοκληρωθεί
+CONTEXT_LOAD_POLL_SECONDS = 0.1   # Κάθε πόσο ελέγχεται ποια manuals ξεκίνησαν (για το ρολόι της προθεσμίας τους)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_load_executor: Optional[ThreadPoolExecutor] = None
+_inflight: Dict[str, Future] = {} # file_id -> future (κοινό για όλα τα sessions)
+_shared_lock = threading.RLock() # RLock: ένα done-callback μπορεί να τρέξει αμέσως, μέσα στο lock
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _shared_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="chat-prefetch")
+        return _executor
+
+
+def _get_load_executor() -> ThreadPoolExecutor:
+    global _load_executor
+    with _shared_lock:
+        if _load_executor is None:
+            _load_executor = ThreadPoolExecutor(max_workers=CONTEXT_LOAD_WORKERS, thread_name_prefix="chat-context")
+        return _load_executor
+
+
+def _submit_load(manual: Dict[str, Any], warm: Callable[[Dict[str, Any]], Any]) -> Future:
+    """Future φόρτωσης ενός manual: το υπάρχον (prefetch ή άλλη ερώτηση) αν είναι ζωντανό, αλλιώς νέο."""
+    with _shared_lock:
+        future = _inflight.get(manual['file_id'])
+        if future is None or future.cancelled():
+            future = _get_load_executor().submit(_warm_safely, warm, manual)
+            _inflight[manual['file_id']] = future
+            future.add_done_callback(lambda f, file_id=manual['file_id']: _release(file_id, f))
+        return future
+
+
+def load_manuals(manuals: List[Dict[str, Any]], warm: Callable[[Dict[str, Any]], Any],
+                 is_ready: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 deadline: float = CONTEXT_LOAD_DEADLINE_SECONDS, max_wait: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Φορτώνει (κατεβάζει/ευρετηριάζει) τα `manuals` παράλληλα. Manuals που ήδη προθερμαίνονται δεν ξαναξεκινούν·
+    περιμένουμε το υπάρχον future τους (ή ξαναϋποβάλλονται αν το prefetch ακυρώθηκε πριν ολοκληρωθεί).
+    Η προθεσμία `deadline` μετράει για κάθε manual από τη στιγμή που ξεκινά πραγματικά (όχι όσο περιμένει
+    στην ουρά του pool)· συνολικά δεν περιμένουμε πάνω από `max_wait` (default: 2 x deadline).
+    Args:
+        is_ready: True αν το manual είναι πλέον στο index· ελέγχεται μετά την αναμονή (ένα future που
+            ολοκληρώθηκε δεν σημαίνει ότι το manual φορτώθηκε, π.χ. ακυρωμένο ή αποτυχημένο prefetch).
+    Returns:
+        {"done": [ονόματα έτοιμα], "pending": [ονόματα που συνεχίζουν στο background], "failed": [ονόματα που
+         ολοκληρώθηκαν χωρίς να φορτωθούν], "elapsed_ms"}
+    """
+    started = time.perf_counter()
+    max_wait = 2 * deadline if max_wait is None else max_wait
+    futures: Dict[str, Future] = {manual['file_id']: _submit_load(manual, warm) for manual in manuals}
+    by_id = {manual['file_id']: manual for manual in manuals}
+    retried = set()
+    running_since: Dict[str, float] = {}
+    begin = time.monotonic()
+    while True:
+        now = time.monotonic()
+        for file_id, future in list(futures.items()):
+            if future.done() and file_id not in retried and _was_canceled(future):
+                retried.add(file_id) # Το prefetch που περιμέναμε ακυρώθηκε: μία νέα προσπάθεια
+                futures[file_id] = future = _submit_load(by_id[file_id], warm)
+            if file_id not in running_since and (future.running() or future.done()):
+                running_since[file_id] = now
+        # Περιμένουμε όσα δεν έχουν ξεκινήσει ακόμη ή είναι μέσα στη δική τους προθεσμία
+        waiting = [f for file_id, f in futures.items() if not f.done() and now - running_since.get(file_id, now) < deadline]
+        if not waiting or now - begin >= max_wait:
+            break
+        wait_futures(waiting, timeout=min(CONTEXT_LOAD_POLL_SECONDS, max_wait - (now - begin)), return_when=FIRST_COMPLETED)
+
+    result = {"done": [], "pending": [], "failed": []}
+    for file_id, future in futures.items():
+        manual = by_id[file_id]
+        if is_ready is not None:
+            ready = is_ready(manual)
+        else:
+            ready = future.done() and not _was_canceled(future) and future.exception() is None and future.result() == "done"
+        group = "done" if ready else "failed" if future.done() else "pending"
+        result[group].append(manual.get('name', file_id))
+    if result["pending"]:
+        logger.warning(f"Context load deadline ({deadline}s per manual) reached: continuing without {result['pending']}.") # Rule 4
+    result["elapsed_ms"] = round(1000 * (time.perf_counter() - started), 1)
+    return result
+
+
+def _was_canceled(future: Future) -> bool:
+    """Ακυρωμένο future, ή prefetch που σταμάτησε λόγω αλλαγής επιλογής πριν ξεκινήσει (αποτέλεσμα "canceled")."""
+    return future.cancelled() or (future.exception() is None and future.result() == "canceled")
+
+
+def _warm_safely(warm: Callable[[Dict[str, Any]], Any], manual: Dict[str, Any]) -> str:
+    try: # Rule 4: Error Handling
+        warm(manual)
+        return "done"
+    except Exception as e:
+        logger.error(f"Error indexing manual '{manual.get('name')}': {e}", exc_info=True) # Rule 4
+        return "failed"
+
+
+class ManualPrefetcher:
+    """Prefetch ανά chat session: μία ενεργή επιλογή (μάρκα/μοντέλο) κάθε φορά."""
+
+    def __init__(self, warm: Callable[[Dict[str, Any]], Any], is_warm: Callable[[Dict[str, Any]], bool]):
+        """
+        Args:
+            warm: Κατεβάζει/ευρετηριάζει ένα manual (τρέχει σε worker thread).
+            is_warm: True αν το manual είναι ήδη έτοιμο (δεν χρειάζεται prefetch). Καλείται μόνο σε worker threads.
+        """
+        self._warm = warm
+        self._is_warm = is_warm
+        self._lock = threading.RLock()
+        self.selection: Optional[str] = None
+        self._cancel = threading.Event()
+        self._futures: List[Future] = []
+        self._status = {"total": 0, "done": 0, "failed": 0, "canceled": 0}
+
+    def prefetch(self, selection: str, manuals: List[Dict[str, Any]], limit: int = PREFETCH_MANUALS) -> bool:
+        """
+        Ξεκινά prefetch για τα πρώτα `limit` manuals της επιλογής. Ίδια επιλογή με την ενεργή -> τίποτα.
+        Νέα επιλογή -> ακύρωση της προηγούμενης. Επιστρέφει True αν ξεκίνησε νέο prefetch.
+        """
+        with self._lock:
+            if selection == self.selection:
+                return False
+            self._cancel_locked()
+            self.selection = selection
+            self._cancel = threading.Event()
+            cancel = self._cancel
+            # Ο έλεγχος "ήδη στο index" γίνεται στον worker (_run): το πρώτο is_indexed φορτώνει όλο το page index
+            # από τη βάση και δεν πρέπει να τρέξει στο render thread του Streamlit.
+            candidates = [m for m in manuals[:limit] if m.get('mime', 'application/pdf') == 'application/pdf']
+            self._status = {"total": len(candidates), "done": 0, "failed": 0, "canceled": 0}
+            self._futures = []
+            executor = _get_executor()
+            for manual in candidates:
+                with _shared_lock:
+                    future = _inflight.get(manual['file_id'])
+                    owned = future is None
+                    if owned:
+                        future = executor.submit(self._run, manual, cancel)
+                        _inflight[manual['file_id']] = future
+                        future.add_done_callback(lambda f, file_id=manual['file_id']: _release(file_id, f))
+                future.add_done_callback(lambda f, cancel=cancel: self._record(f, cancel))
+                if owned: # Prefetch άλλου session δεν ακυρώνεται από εδώ
+                    self._futures.append(future)
+        if candidates:
+            logger.info(f"Prefetch '{selection}': {len(candidates)} manuals queued.") # Rule 4
+        return True
+
+    def cancel(self):
+        """Ακυρώνει το τρέχον prefetch (π.χ. η μάρκα έγινε '-')."""
+        with self._lock:
+            self._cancel_locked()
+            self.selection = None
+
+    def status(self) -> Dict[str, Any]:
+        """Snapshot για το UI: {"selection", "total", "done", "failed", "canceled", "active"}."""
+        with self._lock:
+            status = dict(self._status, selection=self.selection)
+        status["active"] = status["done"] + status["failed"] + status["canceled"] < status["total"]
+        return status
+
+    # --- INTERNALS ---
+
+    def _cancel_locked(self):
+        self._cancel.set()
+        for future in self._futures:
+            future.cancel() # Μόνο όσα δεν έχουν ξεκινήσει· τα υπόλοιπα ολοκληρώνονται
+        self._futures = []
+
+    def _run(self, manual: Dict[str, Any], cancel: threading.Event) -> str:
+        if cancel.is_set():
+            return "canceled"
+        if self._is_warm(manual): # Το ζέστανε στο μεταξύ το retrieval ή άλλο session
+            return "done"
+        try: # Rule 4: Error Handling
+            self._warm(manual)
+            return "done"
+        except Exception as e:
+            logger.warning(f"Prefetch failed for '{manual.get('name')}': {e}") # Rule 4
+            return "failed"
+
+    def _record(self, future: Future, cancel: threading.Event):
+        with self._lock:
+            if cancel is not self._cancel: # Αποτέλεσμα παλιάς επιλογής
+                return
+            if future.cancelled():
+                self._status["canceled"] += 1
+            else:
+                outcome = future.result() if future.exception() is None else "failed"
+                self._status["done" if outcome == "done" else "canceled" if outcome == "canceled" else "failed"] += 1
+
+
+def _release(file_id: str, future: Future):
+    with _shared_lock:
+        if _inflight.get(file_id) is future:
+            del _inflight[file_id]
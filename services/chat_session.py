@@ -3,24 +3,56 @@ SERVICE: CHAT SESSION (INTENT AWARE)
 ------------------------------------
 Sorts manuals based on user query keywords.
 Handles file uploads and AI interaction.
+NEW: Page-level BM25 retrieval (core/page_index.py): στο AI πηγαίνουν οι πιο σχετικές σελίδες
+     των manuals της μάρκας/μοντέλου, με παραπομπή αρχείο + σελίδα.
+NEW: Το κείμενο των manuals έρχεται από την κοινή μόνιμη cache (core/text_cache.py) αντί για download σε κάθε ερώτηση.
+NEW: Κωδικοί σφαλμάτων της ερώτησης (π.χ. "E7") λύνονται απευθείας στη σελίδα του πίνακα σφαλμάτων (core/error_code_index.py).
+NEW: Streaming απαντήσεις (smart_solve_stream) με μέτρηση time-to-first-token ανά ερώτηση.
+NEW: Budget tokens ανά ερώτηση με προτεραιότητες (services/chat_context.py): σταθερό κόστος σε μεγάλες συζητήσεις.
+NEW: Cache απαντήσεων (core/answer_cache.py) για επαναλαμβανόμενες ερωτήσεις στα ίδια manuals.
 """
 import streamlit as st
 from services.sync_service import SyncService
 from core.drive_manager import DriveManager
 from core.ai_engine import AIEngine
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 import logging
-import io
-from pypdf import PdfReader # Used for text extraction
+from core.page_index import get_page_index
+from core.error_code_index import get_error_code_index, find_codes
+from services.chat_context import ContextAssembler, CHAT_CONTEXT_BUDGET_TOKENS
+from core.answer_cache import get_answer_cache, build_answer_key
+from core.library_catalog import LibraryCatalog
+from services.chat_prefetch import ManualPrefetcher, load_manuals
+import re
+import time
 from PIL import Image # For image processing (if needed for AI)
 
 logger = logging.getLogger("Service.ChatSession")
 
+RETRIEVAL_TOP_K = 6              # Σελίδες που στέλνονται στο AI ανά ερώτηση
+RETRIEVAL_MAX_NEW_MANUALS = 4    # Manuals που κατεβαίνουν/ευρετηριάζονται το πολύ ανά ερώτηση (τα υπόλοιπα σε επόμενες)
+PAGE_INDEX_MAX_PAGES = 400       # Μέγιστες σελίδες ανά manual στο index
+FALLBACK_MANUALS = 3             # Χωρίς σχετικές σελίδες: οι πρώτες σελίδες των κορυφαίων manuals (παλιά συμπεριφορά)
+FALLBACK_PAGES = 5
+ERROR_CODE_MAX_CODES = 3         # Κωδικοί σφαλμάτων ανά ερώτηση που λύνονται από το error-code index
+ERROR_CODE_PAGES_PER_CODE = 2    # Σελίδες πίνακα σφαλμάτων ανά κωδικό
+
 class ChatSessionService:
     def __init__(self):
         self.sync = SyncService() # Rule 3
         self.drive = DriveManager() # Rule 7
         self.ai_engine = AIEngine() # Rule 3
+        self.page_index = get_page_index() # Κοινό για όλα τα sessions
+        self.error_index = get_error_code_index() # Κωδικός σφάλματος -> σελίδες (κοινό)
+        self.last_retrieval: Dict[str, Any] = {} # Πηγές και χρόνοι της τελευταίας ερώτησης (για το UI)
+        self.last_timing: Dict[str, Any] = {} # TTFT / συνολικός χρόνος της τελευταίας streaming απάντησης
+        self.context_budget_tokens = CHAT_CONTEXT_BUDGET_TOKENS # Ρυθμιζόμενο budget ανά ερώτηση
+        self.last_context: Dict[str, Any] = {} # Report του ContextAssembler (tokens, τι περικόπηκε/παραλείφθηκε)
+        self.last_context_pages: List[Dict[str, Any]] = [] # Σελίδες manuals που στάλθηκαν στο AI
+        self.answer_cache = get_answer_cache() # Κοινή για όλους τους χρήστες
+        self.last_answer_cached = False
+        self._catalog: Optional[LibraryCatalog] = None # Μάρκα/μοντέλο lookup, ξαναχτίζεται σε κάθε νέα γενιά του ευρετηρίου
+        self.prefetcher = ManualPrefetcher(self.index_manual, self._is_manual_indexed) # Background prefetch της επιλογής μάρκας/μοντέλου
         # Rule 6: Ensure library_cache is initialized once
         if 'library_cache' not in st.session_state:
             try: # Rule 4: Error Handling
@@ -31,14 +63,16 @@ class ChatSessionService:
                 st.session_state.library_cache = [] # Ensure it's a list even on error
         logger.info("ChatSessionService initialized.") # Rule 4
 
+    def _get_catalog(self) -> LibraryCatalog:
+        """Ο catalog του τρέχοντος ευρετηρίου· ξαναχτίζεται αν το library_cache αντικαταστάθηκε ή άλλαξε μέγεθος."""
+        data = st.session_state.get('library_cache', []) # Rule 6
+        if self._catalog is None or not self._catalog.matches(data):
+            self._catalog = LibraryCatalog(data)
+        return self._catalog
+
     def get_brands(self) -> List[str]:
         """Επιστρέφει τις μάρκες από τα metadata του ευρετηρίου."""
-        data = st.session_state.get('library_cache', []) # Rule 6
-        brands = set()
-        for item in data:
-            brand = item.get('brand', 'Unknown').upper() # Use extracted metadata field directly
-            if brand and brand != 'UNKNOWN': brands.add(brand)
-        return sorted(list(brands))
+        return list(self._get_catalog().brands)
 
     def get_prioritized_manuals(self, brand: str, model_keyword: str, user_query: str) -> List[Dict[str, Any]]:
         """
@@ -47,19 +81,8 @@ class ChatSessionService:
         2. Καταλαβαίνει τι ρωτάει ο χρήστης (Intent).
         3. Αλλάζει τη σειρά των αρχείων δυναμικά.
         """
-        data = st.session_state.get('library_cache', []) # Rule 6
-        results = []
-        target_brand = brand.upper()
-        target_model = model_keyword.upper() if model_keyword else None
-        
-        # 1. Βασικό Φιλτράρισμα (Use metadata fields)
-        for item in data:
-            item_brand = item.get('brand', '').upper()
-            item_model = item.get('model', '').upper()
-            
-            if item_brand == target_brand:
-                if not target_model or target_model in item_model: # Allow model match or no model filter
-                    results.append(item)
+        # 1. Βασικό Φιλτράρισμα (Use metadata fields) μέσω του catalog: O(αποτελέσματα), όχι σάρωση του ευρετηρίου
+        results = self._get_catalog().manuals(brand, model_keyword)
 
         # 2. Ανίχνευση Πρόθεσης (Intent)
         query = user_query.upper()
@@ -161,35 +184,179 @@ class ChatSessionService:
             logger.error(f"Error handling manual upload for '{uploaded_file.name}': {e}", exc_info=True) # Rule 4
             return False
 
-    def _extract_text_from_stream(self, file_bytes: bytes) -> Optional[str]:
-        """Utility function to extract text from a PDF byte stream."""
-        try: # Rule 4: Error Handling
-            reader = PdfReader(io.BytesIO(file_bytes))
-            text = ""
-            for i in range(min(5, len(reader.pages))): # Limit pages for performance and token economy
-                page_text = reader.pages[i].extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            return text
-        except Exception as e:
-            logger.error(f"Error extracting text from file stream: {e}", exc_info=True) # Rule 4
-            return None
+    def index_manual(self, manual: Dict[str, Any]) -> int:
+        """Εξάγει (ή παίρνει από την cache κειμένου) όλες τις σελίδες ενός manual και τις προσθέτει στο page index."""
+        result = self.sync.extract_manual_pages(manual['file_id'], page_range=(0, PAGE_INDEX_MAX_PAGES), checksum=manual.get('md5Checksum'))
+        if not result["ok"]:
+            logger.warning(f"Page indexing failed for '{manual.get('name')}': {result['error']}") # Rule 4
+            return 0
+        file_name = manual.get('original_name') or manual.get('name', '')
+        if not self.error_index.is_indexed(manual['file_id'], manual.get('md5Checksum')):
+            self.error_index.add_manual(manual['file_id'], file_name, result["pages"], brand=manual.get('brand', ''),
+                                        model=manual.get('model', ''), checksum=manual.get('md5Checksum'))
+        return self.page_index.add_manual(
+            manual['file_id'], file_name, result["pages"],
+            brand=manual.get('brand', ''), model=manual.get('model', ''), checksum=manual.get('md5Checksum'),
+        )
+
+    def _is_manual_indexed(self, manual: Dict[str, Any]) -> bool:
+        return self.page_index.is_indexed(manual['file_id'], manual.get('md5Checksum'))
 
-    def get_manual_content_from_id(self, file_id: str) -> Optional[str]: 
+    def prefetch_manuals(self, brand: str, model: str, manuals: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Κατεβάζει ένα manual από το Drive και εξάγει το κείμενο του.
+        Ξεκινά (ή συνεχίζει) το background prefetch των κορυφαίων manuals της επιλογής μάρκας/μοντέλου.
+        Αλλαγή επιλογής ακυρώνει το προηγούμενο prefetch. Επιστρέφει το status για το UI.
         """
-        try: # Rule 4: Error Handling
-            stream = self.drive.download_file_content(file_id) # Rule 7
-            if stream:
-                stream.seek(0)
-                file_bytes = stream.read()
-                return self._extract_text_from_stream(file_bytes)
-            logger.warning(f"Failed to download content for file ID: {file_id}") # Rule 4
-            return None
-        except Exception as e:
-            logger.error(f"Error getting manual content for ID '{file_id}': {e}", exc_info=True) # Rule 4
+        if not brand or brand == "-" or not manuals:
+            self.prefetcher.cancel()
+        else:
+            # Αντίγραφα: οι workers δεν κρατούν αναφορές στα dicts του session_state
+            self.prefetcher.prefetch(f"{brand.upper()}|{(model or '').strip().upper()}", [dict(m) for m in manuals])
+        return self.prefetcher.status()
+
+    def error_code_pages(self, user_query: str, manuals: Optional[List[Dict[str, Any]]] = None, brand: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Σελίδες πινάκων σφαλμάτων για τους κωδικούς της ερώτησης, από το error-code index (χωρίς αναζήτηση στα manuals).
+        Scope: τα `manuals` (μάρκα/μοντέλο του chat) ή, αν δεν δοθούν, η `brand`. Το κείμενο της σελίδας
+        έρχεται από την cache κειμένου· αν αποτύχει, στέλνεται το απόσπασμα του index.
+        """
+        codes = find_codes(user_query)[:ERROR_CODE_MAX_CODES]
+        if not codes:
+            return []
+        file_ids = [m['file_id'] for m in manuals] if manuals is not None else None
+        checksums = {item.get('file_id'): item.get('md5Checksum') for item in (manuals or st.session_state.get('library_cache', []))} # Rule 6
+        pages = []
+        for code in codes:
+            for entry in self.error_index.lookup(code, brand=brand, file_ids=file_ids, limit=ERROR_CODE_PAGES_PER_CODE):
+                result = self.sync.extract_manual_pages(entry['file_id'], page_range=(entry['page'] - 1, entry['page']),
+                                                        checksum=checksums.get(entry['file_id']))
+                pages.append({"file_id": entry['file_id'], "file_name": entry['file_name'], "page": entry['page'], "score": entry['score'],
+                              "text": result["text"] if result["ok"] and result["text"] else entry['snippet'], "code": code})
+        return pages
+
+    def retrieve_pages(self, user_query: str, manuals: List[Dict[str, Any]], top_k: int = RETRIEVAL_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Οι πιο σχετικές σελίδες (BM25) για την ερώτηση, μόνο μέσα στα `manuals` (scope μάρκας/μοντέλου).
+        Manuals που δεν έχουν ευρετηριαστεί (ή άλλαξε το checksum τους) κατεβαίνουν πρώτα, παράλληλα,
+        το πολύ RETRIEVAL_MAX_NEW_MANUALS ανά ερώτηση· όσα ξεπεράσουν την προθεσμία μένουν για την επόμενη.
+        """
+        started = time.perf_counter()
+        to_index = [m for m in manuals
+                    if m.get('mime', 'application/pdf') == 'application/pdf' and not self._is_manual_indexed(m)][:RETRIEVAL_MAX_NEW_MANUALS]
+        # Παράλληλα, με προθεσμία ανά manual: ένα αργό manual δεν καθυστερεί την απάντηση (ολοκληρώνεται στο background)
+        loaded = load_manuals(to_index, self.index_manual, is_ready=self._is_manual_indexed)
+        indexed_at = time.perf_counter()
+
+        pages = self.error_code_pages(user_query, manuals)
+        seen = {(p["file_id"], p["page"]) for p in pages}
+        hits = self.page_index.search(user_query, file_ids=[m['file_id'] for m in manuals], top_k=top_k)
+        pages += [p for p in self.page_index.page_texts(hits) if (p["file_id"], p["page"]) not in seen][:max(0, top_k - len(pages))]
+        fallback = not pages
+        if fallback:
+            for manual in manuals[:FALLBACK_MANUALS]:
+                pages.extend(self.page_index.first_pages(manual['file_id'], FALLBACK_PAGES))
+        self.last_retrieval = {
+            "sources": [{"file_name": p["file_name"], "page": p["page"], "score": p["score"], "code": p.get("code")} for p in pages],
+            "fallback": fallback,
+            "newly_indexed": len(loaded["done"]),
+            "pending_manuals": loaded["pending"],
+            "indexing_ms": round(1000 * (indexed_at - started), 1),
+            "search_ms": self.page_index.stats["last_search_ms"],
+        }
+        logger.info(f"Retrieved {len(pages)} pages for chat (fallback={fallback}, search={self.last_retrieval['search_ms']} ms).") # Rule 4
+        return pages
+
+    def _brand_in_query(self, user_query: str) -> Optional[str]:
+        """Η μάρκα που αναφέρει η ερώτηση ("τι είναι το E7 σε Daikin"), ή None."""
+        query_upper = user_query.upper()
+        return next((b for b in self.get_brands() if re.search(rf"\b{re.escape(b)}\b", query_upper)), None)
+
+    def _build_request(self, user_query: str, uploaded_pdfs: List[Any], uploaded_imgs: List[Any], history: List[Dict[str, str]],
+                       selected_brand: str, selected_model: str) -> tuple:
+        """
+        Content parts (ερώτηση, αρχεία, ιστορικό) και κείμενο manuals για το AI· κοινό για smart_solve και smart_solve_stream.
+        Όλα περνούν από τον ContextAssembler (services/chat_context.py): budget tokens με προτεραιότητες,
+        και το report του (τι περικόπηκε/παραλείφθηκε) μένει στο `last_context`.
+        """
+        pdfs, images, pages = [], [], []
+
+        # 1-2. Process uploaded files (Rule 2)
+        for uploaded_file in uploaded_pdfs or []:
+            try: # Rule 4
+                pdfs.append({"name": uploaded_file.name, "data": uploaded_file.getvalue()})
+            except Exception as e:
+                logger.error(f"Error processing uploaded PDF '{uploaded_file.name}': {e}", exc_info=True) # Rule 4
+        for uploaded_file in uploaded_imgs or []:
+            try: # Rule 4
+                images.append({"name": uploaded_file.name, "mime_type": uploaded_file.type, "data": uploaded_file.getvalue()})
+            except Exception as e:
+                logger.error(f"Error processing uploaded image '{uploaded_file.name}': {e}", exc_info=True) # Rule 4
+
+        # 3. Get the most relevant manual pages for the question (scoped to brand/model)
+        self.last_retrieval = {}
+        if selected_brand and selected_brand != '-':
+            prioritized_manuals = self.get_prioritized_manuals(selected_brand, selected_model, user_query)
+            try: # Rule 4
+                pages = self.retrieve_pages(user_query, prioritized_manuals)
+            except Exception as e:
+                logger.error(f"Error retrieving manual pages for chat: {e}", exc_info=True) # Rule 4
+        elif find_codes(user_query):
+            # Χωρίς επιλεγμένη μάρκα: "τι είναι το E7 σε Daikin" -> μάρκα από την ερώτηση, σελίδες από το error-code index
+            brand = self._brand_in_query(user_query)
+            try: # Rule 4
+                pages = self.error_code_pages(user_query, brand=brand)
+                self.last_retrieval = {"sources": [], "fallback": False, "newly_indexed": 0, "indexing_ms": 0.0, "search_ms": 0.0}
+            except Exception as e:
+                logger.error(f"Error resolving error codes for chat: {e}", exc_info=True) # Rule 4
+
+        # 4. Token budget: ερώτηση > εικόνες > PDF > σελίδες manuals > πρόσφατο > παλαιότερο ιστορικό
+        assembled = ContextAssembler(self.context_budget_tokens).assemble(
+            user_query, images=images, pdfs=pdfs, pages=pages,
+            history=[{"role": msg['role'], "content": msg['content']} for msg in history],
+        )
+        self.last_context = assembled["report"]
+        self.last_context_pages = assembled["pages"]
+        if self.last_retrieval:
+            # Πηγές: μόνο οι σελίδες που χώρεσαν στο budget
+            self.last_retrieval["sources"] = [{"file_name": p["file_name"], "page": p["page"], "score": p["score"], "code": p.get("code")}
+                                              for p in assembled["pages"]]
+        return assembled["content_parts"], assembled["manual_text"]
+
+    def _answer_cache_key(self, user_query: str, uploaded_pdfs: List[Any], uploaded_imgs: List[Any], history: List[Dict[str, str]],
+                          selected_brand: str, selected_model: str, lang: str) -> Optional[str]:
+        """
+        Κλειδί της answer cache για το τρέχον αίτημα, ή None για opt-out: ερωτήσεις με ανεβασμένες
+        φωτογραφίες/αρχεία δεν αποθηκεύονται ούτε σερβίρονται από την cache.
+        Υπολογίζεται ΠΡΙΝ το _build_request, μόνο από τον κατάλογο (file_id + md5Checksum των manuals του scope),
+        ώστε ένα hit να μη περιμένει κατέβασμα/ευρετηρίαση manuals.
+        """
+        if uploaded_pdfs or uploaded_imgs or not (user_query or "").strip():
             return None
+        manuals = []
+        if selected_brand and selected_brand != '-':
+            manuals = self.get_prioritized_manuals(selected_brand, selected_model, user_query)
+        elif find_codes(user_query):
+            brand = self._brand_in_query(user_query)
+            manuals = self._get_catalog().manuals(brand) if brand else st.session_state.get('library_cache', []) # Rule 6
+        context_hashes = [f"{item.get('file_id')}:{item.get('md5Checksum') or ''}" for item in manuals]
+        return build_answer_key(user_query, selected_brand if selected_brand != '-' else "", selected_model, lang, context_hashes,
+                                [{"role": msg['role'], "content": msg['content']} for msg in history])
+
+    def _cached_answer(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Lookup στην answer cache· σε hit, οι πηγές της αποθηκευμένης απάντησης γίνονται το `last_retrieval`."""
+        cached = self.answer_cache.get(cache_key)
+        self.last_answer_cached = cached is not None
+        if cached:
+            self.last_retrieval = cached["sources"]
+            self.last_context = {}
+            self.last_context_pages = []
+        return cached
+
+    def _store_answer(self, cache_key: Optional[str], answer: str, user_query: str, selected_brand: str, lang: str) -> None:
+        """Αποθήκευση στην answer cache, εκτός αν κάποια manuals του scope δεν πρόλαβαν να ευρετηριαστούν (ελλιπές context)."""
+        if self.last_retrieval.get("pending_manuals"):
+            return
+        self.answer_cache.put(cache_key, answer, self.last_retrieval, question=user_query, brand=selected_brand, lang=lang)
 
     def smart_solve(
         self, 
@@ -211,49 +378,12 @@ class ChatSessionService:
             logger.error("AI Engine model not initialized for smart_solve.") # Rule 4
             return f"{self.ai_engine.last_error or 'AI Model not initialized.'}"
 
-        content_parts = []
-        manual_text_content = "" # For text extracted from prioritized manuals
-
-        # 1. Add user query to content parts
-        content_parts.append({"text": user_query})
-
-        # 2. Process uploaded files (Rule 2)
-        if uploaded_pdfs:
-            for uploaded_file in uploaded_pdfs:
-                try: # Rule 4
-                    file_bytes = uploaded_file.getvalue()
-                    content_parts.append({"mime_type": "application/pdf", "data": file_bytes})
-                    logger.info(f"Added uploaded PDF '{uploaded_file.name}' to AI context.") # Rule 4
-                except Exception as e:
-                    logger.error(f"Error processing uploaded PDF '{uploaded_file.name}': {e}", exc_info=True) # Rule 4
-
-        if uploaded_imgs:
-            for uploaded_file in uploaded_imgs:
-                try: # Rule 4
-                    file_bytes = uploaded_file.getvalue()
-                    content_parts.append({"mime_type": uploaded_file.type, "data": file_bytes})
-                    logger.info(f"Added uploaded image '{uploaded_file.name}' to AI context.") # Rule 4
-                except Exception as e:
-                    logger.error(f"Error processing uploaded image '{uploaded_file.name}': {e}", exc_info=True) # Rule 4
-
-        # 3. Get relevant manuals based on current context (brand/model) and user query
-        if selected_brand and selected_brand != '-':
-            # Get a few highly prioritized manuals
-            prioritized_manuals = self.get_prioritized_manuals(selected_brand, selected_model, user_query)
-            
-            # Limit to top 2-3 manuals for token efficiency (adjust as needed)
-            for manual in prioritized_manuals[:3]: 
-                try: # Rule 4
-                    manual_content = self.get_manual_content_from_id(manual['file_id'])
-                    if manual_content:
-                        manual_text_content += f"\n\n--- MANUAL: {manual.get('original_name', manual['name'])} ---\n{manual_content}"
-                        logger.info(f"Added text from manual '{manual.get('original_name', manual['name'])}' to AI context.") # Rule 4
-                except Exception as e:
-                    logger.error(f"Error retrieving content for manual ID {manual['file_id']}: {e}", exc_info=True) # Rule 4
-
-        # 4. Add conversation history
-        for msg in history:
-            content_parts.append({"text": f"{msg['role']}: {msg['content']}"})
+        cache_key = self._answer_cache_key(user_query, uploaded_pdfs, uploaded_imgs, history, selected_brand, selected_model, lang)
+        cached = self._cached_answer(cache_key)
+        if cached:
+            return cached["answer"]
+
+        content_parts, manual_text_content = self._build_request(user_query, uploaded_pdfs, uploaded_imgs, history, selected_brand, selected_model)
 
         # 5. Call AI Engine with all collected parts
         try: # Rule 4: Error Handling
@@ -262,7 +392,67 @@ class ChatSessionService:
                 lang=lang,
                 manual_file_content=manual_text_content # Pass extracted text separately
             )
+            if not response.startswith(("❌", "⚠️ AI Offline")):
+                self._store_answer(cache_key, response, user_query, selected_brand, lang)
             return response
         except Exception as e:
             logger.error(f"Error calling AI Engine for smart_solve: {e}", exc_info=True) # Rule 4
-            return f"❌ {self.ai_engine.last_error or 'AI system error'}: {e}"
\ No newline at end of file
+            return f"❌ {self.ai_engine.last_error or 'AI system error'}: {e}"
+
+    def smart_solve_stream(
+        self,
+        user_query: str,
+        uploaded_pdfs: List[Any],
+        uploaded_imgs: List[Any],
+        history: List[Dict[str, str]],
+        selected_brand: str,
+        selected_model: str,
+        lang: str = "gr" # Rule 5
+    ) -> Iterator[str]:
+        """
+        Όπως το smart_solve, αλλά επιστρέφει την απάντηση σε κομμάτια καθώς παράγεται (για st.write_stream).
+        Στο τέλος, το `last_timing` έχει χρόνο προετοιμασίας (retrieval), time-to-first-token
+        (από το AI και από την αρχή του αιτήματος) και συνολικό χρόνο.
+        """
+        started = time.perf_counter()
+        self.last_timing = {}
+        if not self.ai_engine.model:
+            logger.error("AI Engine model not initialized for smart_solve_stream.") # Rule 4
+            yield f"{self.ai_engine.last_error or 'AI Model not initialized.'}"
+            return
+
+        cache_key = self._answer_cache_key(user_query, uploaded_pdfs, uploaded_imgs, history, selected_brand, selected_model, lang)
+        cached = self._cached_answer(cache_key)
+        if cached:
+            prepare_ms = round(1000 * (time.perf_counter() - started), 1)
+            yield cached["answer"]
+            self.last_timing = {"cached": True, "prepare_ms": prepare_ms, "total_ms": round(1000 * (time.perf_counter() - started), 1),
+                                "hit_count": cached["hit_count"]}
+            logger.info(f"Chat answer served from cache in {self.last_timing['total_ms']} ms.") # Rule 4
+            return
+
+        content_parts, manual_text_content = self._build_request(user_query, uploaded_pdfs, uploaded_imgs, history, selected_brand, selected_model)
+        prepare_ms = round(1000 * (time.perf_counter() - started), 1)
+
+        chunks: List[str] = []
+        try: # Rule 4: Error Handling
+            for chunk in self.ai_engine.stream_chat_response(content_parts=content_parts, lang=lang, manual_file_content=manual_text_content):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error calling AI Engine for smart_solve_stream: {e}", exc_info=True) # Rule 4
+            chunks = []
+            yield f"❌ {self.ai_engine.last_error or 'AI system error'}: {e}"
+        stream_stats = self.ai_engine.last_stream_stats
+        if chunks and not stream_stats.get("error"):
+            self._store_answer(cache_key, "".join(chunks), user_query, selected_brand, lang)
+        ttft = stream_stats.get("ttft_ms")
+        self.last_timing = {
+            "prepare_ms": prepare_ms,
+            "ttft_ms": ttft,
+            "first_token_ms": round(prepare_ms + ttft, 1) if ttft is not None else None,
+            "generation_ms": stream_stats.get("total_ms", 0.0),
+            "total_ms": round(1000 * (time.perf_counter() - started), 1),
+            "chars": stream_stats.get("chars", 0),
+        }
+        logger.info(f"Chat turn timing: {self.last_timing}") # Rule 4
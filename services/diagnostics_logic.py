@@ -7,6 +7,7 @@ FEATURES:
 - Smart Model Discovery (No 404 errors)
 - Multi-language Support (Greek/English)
 - Centralized system checks
+- Error codes resolved to exact manual pages (core/error_code_index.py)
 """
 
 import google.generativeai as genai
@@ -20,6 +21,7 @@ from typing import Dict, Any, Optional # For type hinting
 from core.config_loader import ConfigLoader
 from core.ai_engine import AIEngine # Rule 3: Use central AI Engine
 from core.language_pack import get_text # Rule 5
+from core.error_code_index import get_error_code_index
 
 logger = logging.getLogger("Service.Diagnostics")
 
@@ -87,13 +89,24 @@ class DiagnosticsService:
             logger.error(f"PDF engine check failed: {e}", exc_info=True) # Rule 4
             return {"status": "error", "message": str(e)}
 
-    def generate_checklist(self, error_code: str, manual_text: str = "", lang: str = "gr") -> Optional[Dict[str, Any]]:
+    def lookup_error_codes(self, text: str, brand: Optional[str] = None, per_code: int = 3) -> str:
+        """Γραμμές "ΚΩΔΙΚΟΣ | αρχείο σελ. N: απόσπασμα" για τους κωδικούς του κειμένου, από το error-code index."""
+        lines = []
+        try: # Rule 4: Error Handling
+            for code, entries in get_error_code_index().lookup_text(text, brand=brand, limit=per_code).items():
+                lines += [f"{code} | {e['brand']} {e['model']} | {e['file_name']} p.{e['page']}: {e['snippet']}" for e in entries]
+        except Exception as e:
+            logger.warning(f"Error-code lookup failed for diagnostics: {e}") # Rule 4
+        return "\n".join(lines)
+
+    def generate_checklist(self, error_code: str, manual_text: str = "", lang: str = "gr", brand: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Δημιουργεί λίστα ελέγχου (Checklist) σε μορφή JSON.
         Args:
             error_code: Ο κωδικός σφάλματος.
             manual_text: Context από το manual (αν υπάρχει).
             lang: 'gr' για Ελληνικά, 'en' για Αγγλικά.
+            brand: Μάρκα για το error-code index (αλλιώς όλες οι μάρκες).
         Returns:
             Optional[Dict[str, Any]]: Η λίστα ελέγχου σε μορφή JSON ή None σε περίπτωση σφάλματος.
         """
@@ -101,6 +114,9 @@ class DiagnosticsService:
             logger.error("AI Model not initialized for checklist generation.") # Rule 4
             return None
 
+        # NEW: Ο κωδικός λύνεται απευθείας στη σελίδα του πίνακα σφαλμάτων (error-code index)
+        code_references = self.lookup_error_codes(error_code, brand=brand)
+
         # Επιλογή Γλώσσας Στόχου για το AI (Rule 5)
         target_lang_str = "GREEK (Ελληνικά)" if lang == 'gr' else "ENGLISH"
 
@@ -110,6 +126,7 @@ class DiagnosticsService:
         
         ISSUE/ERROR CODE: {error_code}
         MANUAL CONTEXT: {manual_text[:5000]} (Use this if relevant, prioritize it over general knowledge)
+        ERROR CODE TABLE ENTRIES (from the manuals, with file and page): {code_references or "None"}
 
         CRITICAL LANGUAGE INSTRUCTION:
         The user speaks {target_lang_str}. 
@@ -0,0 +1,207 @@
+"""
+SERVICE: RULE-BASED PRE-CLASSIFIER
+----------------------------------
+Ντετερμινιστική ταξινόμηση από το όνομα αρχείου, πριν από το Gemini.
+Ένα αρχείο σαν `DAIKIN_FTXM35_Service_Manual.pdf` έχει ήδη μάρκα, μοντέλο και τύπο
+στο όνομά του, οπότε δεν χρειάζεται κλήση AI.
+
+Features:
+- Λεξικό γνωστών μαρκών (KNOWN_BRANDS + μάρκες από το library index).
+- Patterns για κωδικούς μοντέλων (π.χ. FTXM35, RXM35R, VU-200/5), με stoplist για ψυκτικά, τάσεις, εκδόσεις, σελίδες.
+- Ελληνικές/Αγγλικές λέξεις-κλειδιά ανά τύπο εγγράφου (ALLOWED_TYPES).
+- Κατηγορία από τα στατιστικά του index (μάρκα / πρόθεμα μοντέλου) ή από λέξεις-κλειδιά.
+- Confidence score: μόνο πάνω από το threshold παρακάμπτεται το AI.
+"""
+import json
+import logging
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("Sorter.PreClassifier")
+
+LOCAL_INDEX_FILENAME = "drive_index.json" # Ίδιο αρχείο με το INDEX_FILENAME του SyncService
+DEFAULT_CONFIDENCE_THRESHOLD = 0.85
+
+KNOWN_BRANDS = [
+    "DAIKIN", "MITSUBISHI", "TOSHIBA", "FUJITSU", "PANASONIC", "HITACHI", "SAMSUNG", "LG",
+    "GREE", "MIDEA", "CARRIER", "TOSOT", "INVENTOR", "AUX", "HAIER", "SHARP", "OLYMPIA",
+    "VAILLANT", "BAXI", "BOSCH", "BUDERUS", "VIESSMANN", "ARISTON", "IMMERGAS", "FERROLI",
+    "WOLF", "RIELLO", "BERETTA", "ROCA", "JUNKERS", "PROTHERM", "HERMANN", "CHAFFOTEAUX",
+    "NOBEL", "CALPAK", "SOLE", "MALTEZOS", "HONEYWELL", "SIEMENS", "DANFOSS", "GRUNDFOS", "WILO",
+]
+
+# Λέξεις-κλειδιά ανά τύπο εγγράφου (lowercase, ελέγχονται ως substrings).
+TYPE_KEYWORDS = {
+    "Service_Manual": ["service manual", "service", "servicing", "τεχνικό εγχειρίδιο", "σέρβις", "συντήρηση"],
+    "User_Manual": ["user manual", "user", "owner", "operation manual", "operating", "χρήστη", "λειτουργίας", "χρήσης"],
+    "Installation_Manual": ["installation", "install", "εγκατάσταση", "εγκατάστασης", "εγκαταστάτη"],
+    "Technical_Data": ["technical data", "databook", "data book", "specification", "datasheet", "τεχνικά χαρακτηριστικά", "προδιαγραφές"],
+    "Error_Codes": ["error codes", "error code", "error", "fault", "troubleshooting", "βλάβες", "βλαβών", "σφάλματα", "κωδικοί"],
+    "Spare_Parts_List": ["spare parts", "parts list", "spare", "exploded", "ανταλλακτικά"],
+}
+
+# Λέξεις-κλειδιά κατηγορίας, όταν το index δεν αρκεί.
+CATEGORY_KEYWORDS = {
+    "Heating_Boilers": ["boiler", "λέβητα", "λέβητας", "καυστήρα", "combi"],
+    "Heat_Pumps": ["heat pump", "heatpump", "αντλία θερμότητας", "altherma", "aquarea", "ecodan"],
+    "Air_Conditioning": ["air condition", "split", "κλιματιστικ", "vrv", "vrf", "inverter ac"],
+    "Solar_Systems": ["solar", "ηλιακ"],
+    "Water_Heaters": ["water heater", "θερμοσίφων", "calorifier"],
+    "Thermostats_Controllers": ["thermostat", "θερμοστάτ", "controller", "remote control", "χειριστήριο"],
+    "Spare_Parts_Valves": ["valve", "βαλβίδα", "pump", "κυκλοφορητ"],
+}
+
+# Κωδικός μοντέλου: γράμματα + ψηφία (FTXM35, RXM35R, EHBH08, VU-200/5).
+MODEL_PATTERN = re.compile(r'^(?=.*\d)(?=.*[A-Z])[A-Z0-9][A-Z0-9\-/]{2,19}$')
+# Tokens που ταιριάζουν στο MODEL_PATTERN αλλά δεν είναι μοντέλα: ψυκτικά (R32, R-410A), τάση/συχνότητα/ισχύς
+# (230V, 50HZ, 3KW, 12000BTU), φάσεις (1PH), εκδόσεις/σελίδες/τμήματα (REV2, V1.2, ED3, P12, PAGE4, PART2, VOL1), έτη (2019-05).
+NON_MODEL_PATTERN = re.compile(
+    r'^(?:R-?\d{2,4}[A-Z]?'
+    r'|\d+(?:[.,]\d+)?(?:V|VAC|VDC|HZ|KW|W|KBTU|BTU|BTUH|PH|A|MM|CM|M|L|KG|BAR)'
+    r'|(?:REV|VER|ED|EDITION|V)\.?-?\d{1,2}(?:[.\-]\d{1,2})*'
+    r'|(?:P|PG|PP|PAGE|PAGES|PART|PT|VOL|NO)\.?-?\d{1,3}'
+    r'|(?:19|20)\d{2}(?:-\d{1,2})*[A-Z]?)$'
+)
+
+# Βάρη του confidence score (άθροισμα = 1.0).
+WEIGHT_BRAND = 0.3
+WEIGHT_MODEL = 0.25
+WEIGHT_TYPE = 0.2
+WEIGHT_CATEGORY = 0.25
+
+
+def load_local_index(path: str = LOCAL_INDEX_FILENAME) -> List[Dict[str, Any]]:
+    """Φορτώνει το τοπικό library index (χωρίς streamlit, για χρήση και σε scripts)."""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except Exception as e:
+        logger.warning(f"Could not load local index '{path}' for pre-classifier: {e}")
+        return []
+
+
+class RulePreClassifier:
+    """Ταξινομεί αρχεία από το όνομά τους, με βάση κανόνες και στατιστικά του index."""
+
+    def __init__(self, allowed_categories: List[str], allowed_types: List[str], index_entries: Optional[List[Dict[str, Any]]] = None, threshold: float = DEFAULT_CONFIDENCE_THRESHOLD):
+        self.allowed_categories = list(allowed_categories)
+        self.allowed_types = list(allowed_types)
+        self.threshold = threshold
+        self.type_keywords = {t: kws for t, kws in TYPE_KEYWORDS.items() if t in self.allowed_types}
+        self.category_keywords = {c: kws for c, kws in CATEGORY_KEYWORDS.items() if c in self.allowed_categories}
+        self.brands: Dict[str, str] = {}
+        self.brand_categories: Dict[str, Counter] = defaultdict(Counter)
+        self.model_prefix_categories: Dict[tuple, Counter] = defaultdict(Counter)
+        self.build(index_entries or [])
+
+    @staticmethod
+    def _normalize(token: str) -> str:
+        return re.sub(r'[^A-Z0-9]', '', token.upper())
+
+    @staticmethod
+    def _model_prefix(model: str) -> str:
+        """Το αλφαβητικό πρόθεμα του μοντέλου (FTXM35 -> FTXM) ορίζει τη σειρά προϊόντων."""
+        match = re.match(r'[A-Z]+', model.upper())
+        return match.group(0) if match else model.upper()[:3]
+
+    def build(self, index_entries: List[Dict[str, Any]]):
+        """(Ξανα)χτίζει το λεξικό μαρκών και τα στατιστικά κατηγοριών από το index."""
+        self.brands = {self._normalize(b): b for b in KNOWN_BRANDS}
+        self.brand_categories.clear()
+        self.model_prefix_categories.clear()
+
+        brand_counts = Counter()
+        for entry in index_entries:
+            brand = str(entry.get('brand') or '').upper().replace(' ', '_')
+            if not brand or brand in ('UNKNOWN', 'UNKNOWN_BRAND') or not brand.replace('_', '').isalpha():
+                continue
+            brand_counts[brand] += 1
+            category = entry.get('category')
+            if category in self.allowed_categories:
+                self.brand_categories[brand][category] += 1
+                model = str(entry.get('model') or '')
+                if model and model != 'General_Model':
+                    self.model_prefix_categories[(brand, self._model_prefix(model))][category] += 1
+
+        # Μάρκες του index με τουλάχιστον 2 αρχεία θεωρούνται γνωστές.
+        for brand, count in brand_counts.items():
+            if count >= 2:
+                self.brands.setdefault(self._normalize(brand), brand)
+        logger.info(f"Pre-classifier built: {len(self.brands)} brands, {len(self.model_prefix_categories)} model families.")
+
+    def _find_type(self, haystack: str) -> Optional[str]:
+        # Προτεραιότητα στις πιο μακριές (πιο συγκεκριμένες) λέξεις-κλειδιά.
+        best, best_len = None, 0
+        for meta_type, keywords in self.type_keywords.items():
+            for kw in keywords:
+                if kw in haystack and len(kw) > best_len:
+                    best, best_len = meta_type, len(kw)
+        return best
+
+    def _find_category(self, brand: str, model: Optional[str], haystack: str) -> Tuple[Optional[str], float]:
+        """Επιστρέφει (category, share) όπου share = βεβαιότητα 0..1."""
+        for kw_category, keywords in self.category_keywords.items():
+            if any(kw in haystack for kw in keywords):
+                return kw_category, 1.0
+        if brand and model:
+            counts = self.model_prefix_categories.get((brand, self._model_prefix(model)))
+            if counts:
+                category, n = counts.most_common(1)[0]
+                return category, n / sum(counts.values())
+        counts = self.brand_categories.get(brand)
+        if counts:
+            category, n = counts.most_common(1)[0]
+            return category, n / sum(counts.values())
+        return None, 0.0
+
+    def classify(self, filename: str, text: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Επιστρέφει metadata στη μορφή του _ask_ai_for_metadata, μαζί με
+        `confidence` (0..1) και `source` = "rules".
+        """
+        stem = os.path.splitext(filename)[0]
+        tokens = [t for t in re.split(r'[_\s.|()\[\]]+', stem) if t]
+        haystack = f"{stem.replace('_', ' ')} {(text or '')[:1000]}".lower()
+
+        brand = None
+        brand_idx = -1
+        for idx, token in enumerate(tokens):
+            normalized = self._normalize(token)
+            if normalized in self.brands:
+                brand, brand_idx = self.brands[normalized], idx
+                break
+
+        model = None
+        for token in tokens[brand_idx + 1:] if brand else tokens:
+            candidate = token.upper()
+            if MODEL_PATTERN.match(candidate) and not NON_MODEL_PATTERN.match(candidate):
+                model = candidate
+                break
+
+        meta_type = self._find_type(haystack)
+        category, category_share = self._find_category(brand, model, haystack) if brand else (None, 0.0)
+
+        confidence = 0.0
+        confidence += WEIGHT_BRAND if brand else 0.0
+        confidence += WEIGHT_MODEL if model else 0.0
+        confidence += WEIGHT_TYPE if meta_type else 0.0
+        confidence += WEIGHT_CATEGORY * category_share
+
+        return {
+            "category": category or "Unknown",
+            "brand": brand or "Unknown",
+            "model": model or "General_Model",
+            "meta_type": meta_type or "General_Manual",
+            "error_codes": "",
+            "reason": f"Rule-based pre-classifier (confidence {confidence:.2f})",
+            "confidence": round(confidence, 3),
+            "source": "rules",
+        }
+
+    def is_confident(self, result: Dict[str, Any]) -> bool:
+        return result.get("confidence", 0.0) >= self.threshold
@@ -0,0 +1,490 @@
+"""
+SERVICE: SORTER BENCHMARK (FAKE BACKENDS)
+-----------------------------------------
+Μετράει το staged pipeline του Sorter απέναντι σε in-memory fake Drive/Gemini backends
+με τεχνητή καθυστέρηση δικτύου, ώστε να συγκρίνουμε ρυθμίσεις concurrency χωρίς quota.
+Το QuotaEnforcingFakeModel προσομοιώνει quota (429) για τον AIMD ελεγκτή ταυτόχρονων κλήσεων.
+Το run_near_duplicate_benchmark μετράει το MinHash/LSH ευρετήριο σε συνθετικά έγγραφα (χωρίς Drive/AI).
+
+Χρήση:
+    python -m services.sorter_benchmark --files 200
+    python -m services.sorter_benchmark --files 0 --near-dup-docs 50000
+"""
+import argparse
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+FAKE_BRANDS = ["DAIKIN", "VAILLANT", "MITSUBISHI", "BAXI", "LG", "TOSHIBA"]
+FAKE_TYPES = ["Service_Manual", "User_Manual", "Installation_Manual", "Error_Codes"]
+
+
+def _make_pdf(label: str) -> bytes:
+    """Μικρό έγκυρο PDF (μία κενή σελίδα) με μοναδικό περιεχόμενο ανά label."""
+    import pypdf
+    writer = pypdf.PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    writer.add_metadata({"/Title": label})
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+class FakeDriveBackend:
+    """In-memory Drive με τη διεπαφή του DriveManager που χρησιμοποιεί ο Sorter."""
+
+    def __init__(self, latency: float = 0.05, root_id: str = "root"):
+        self.latency = latency
+        self.root_id = root_id
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.content: Dict[str, bytes] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.service = _FakeService(self)
+        self.files[root_id] = {"id": root_id, "name": "ROOT", "mimeType": FOLDER_MIME, "parents": []}
+
+    def _call(self, name: str, latency: Optional[float] = None):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        time.sleep(self.latency if latency is None else latency)
+
+    def add_file(self, name: str, data: bytes, parent_id: Optional[str] = None, mime_type: str = 'application/pdf') -> str:
+        file_id = uuid.uuid4().hex[:12]
+        self.files[file_id] = {
+            "id": file_id, "name": name, "mimeType": mime_type,
+            "parents": [parent_id or self.root_id], "webViewLink": f"https://drive.fake/{file_id}",
+            "md5Checksum": hashlib.md5(data).hexdigest(), "size": str(len(data)),
+            "createdTime": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(time.time() + len(self.files))),
+        }
+        self.content[file_id] = data
+        return file_id
+
+    def list_files_in_folder(self, folder_id):
+        self._call("list")
+        with self._lock:
+            return [dict(f) for f in self.files.values() if folder_id in f["parents"]]
+
+    def list_all_files_in_folder(self, folder_id):
+        return self.list_files_in_folder(folder_id)
+
+    def list_child_folders(self, folder_id):
+        self._call("list")
+        with self._lock:
+            return [dict(f) for f in self.files.values() if folder_id in f["parents"] and f["mimeType"] == FOLDER_MIME]
+
+    def download_file_content(self, file_id):
+        # Το download κοστίζει περισσότερο από μια απλή κλήση metadata.
+        self._call("download", self.latency * 3)
+        data = self.content.get(file_id)
+        return io.BytesIO(data) if data is not None else None
+
+    def create_folder(self, name, parent_id):
+        self._call("create_folder")
+        with self._lock:
+            for f in self.files.values():
+                if f["name"] == name and parent_id in f["parents"] and f["mimeType"] == FOLDER_MIME:
+                    return f["id"]
+            folder_id = uuid.uuid4().hex[:12]
+            self.files[folder_id] = {"id": folder_id, "name": name, "mimeType": FOLDER_MIME, "parents": [parent_id]}
+            return folder_id
+
+    def batch_create_folders(self, folders: list) -> dict:
+        self._call("batch_create_folders")
+        results = {}
+        with self._lock:
+            for folder in folders:
+                folder_id = uuid.uuid4().hex[:12]
+                self.files[folder_id] = {"id": folder_id, "name": folder["name"], "mimeType": FOLDER_MIME, "parents": [folder["parent_id"]]}
+                results[folder["key"]] = folder_id
+        return results
+
+    def move_file(self, file_id, target_folder_id):
+        self._call("move")
+        with self._lock:
+            self.files[file_id]["parents"] = [target_folder_id]
+        return True
+
+    def rename_file(self, file_id, new_name):
+        self._call("rename")
+        with self._lock:
+            self.files[file_id]["name"] = new_name
+        return True
+
+    def batch_update_files(self, operations: list) -> dict:
+        self._call("batch_update")
+        results = {}
+        with self._lock:
+            for op in operations:
+                f = self.files.get(op["file_id"])
+                if not f:
+                    results[op["file_id"]] = False
+                    continue
+                if op.get("add_parent"):
+                    f["parents"] = [op["add_parent"]]
+                if op.get("new_name"):
+                    f["name"] = op["new_name"]
+                results[op["file_id"]] = True
+        return results
+
+
+class _FakeService:
+    """Ελάχιστο `service.files().get(...).execute()` για κώδικα που καλεί απευθείας το API."""
+
+    def __init__(self, backend: FakeDriveBackend):
+        self.backend = backend
+
+    def files(self):
+        return self
+
+    def get(self, fileId, fields=None):
+        backend = self.backend
+
+        class _Request:
+            def execute(self_inner):
+                backend._call("get")
+                return dict(backend.files.get(fileId, {}))
+        return _Request()
+
+
+class _FakeUsage:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class _FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int = 0):
+        self.text = text
+        self.usage_metadata = _FakeUsage(prompt_tokens, len(text) // 4)
+
+
+def _estimate_prompt_tokens(prompt_parts) -> int:
+    """~4 χαρακτήρες ανά token για κείμενο, ~258 tokens ανά inline έγγραφο (όπως το Gemini ανά σελίδα)."""
+    return sum(len(part) // 4 if isinstance(part, str) else 258 for part in prompt_parts)
+
+
+class FakeGeminiModel:
+    """Fake GenerativeModel: ταξινομεί με βάση το όνομα αρχείου, με σταθερή καθυστέρηση."""
+
+    def __init__(self, latency: float = 0.3, max_batch_results: Optional[int] = None):
+        self.latency = latency
+        self.model_name = "models/fake-gemini"
+        self.input_token_limit = 32768
+        self.output_token_limit = 8192
+        self.max_batch_results = max_batch_results # Προσομοίωση κομμένης απάντησης σε μεγάλα batches
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _classify_name(filename: str) -> Dict[str, Any]:
+        tokens = filename.replace(".pdf", "").split("_")
+        brand = tokens[0] if tokens and tokens[0] in FAKE_BRANDS else "Unknown"
+        model = tokens[1] if len(tokens) > 1 else "General_Model"
+        meta_type = "_".join(tokens[2:4]) if len(tokens) > 3 else "General_Manual"
+        return {
+            "category": "Air_Conditioning" if brand != "Unknown" else "Unknown",
+            "brand": brand, "model": model, "meta_type": meta_type,
+            "error_codes": "", "reason": "fake",
+        }
+
+    def generate_content(self, prompt_parts, generation_config=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        filename = ""
+        for part in prompt_parts:
+            if isinstance(part, str) and part.startswith("Documents:"):
+                documents = json.loads(part.split(":", 1)[1])
+                results = [{"file_id": d["file_id"], **self._classify_name(d["filename"])} for d in documents]
+                if self.max_batch_results is not None and len(results) > self.max_batch_results:
+                    return _FakeResponse(json.dumps(results[:self.max_batch_results])[:-1], _estimate_prompt_tokens(prompt_parts)) # Κομμένο JSON
+                return _FakeResponse(json.dumps(results), _estimate_prompt_tokens(prompt_parts))
+            if isinstance(part, str) and part.startswith("Filename:"):
+                filename = part.split(":", 1)[1].strip()
+        return _FakeResponse(json.dumps(self._classify_name(filename)), _estimate_prompt_tokens(prompt_parts))
+
+
+class FakeQuotaExceeded(Exception):
+    """Όπως το google.api_core.exceptions.ResourceExhausted (HTTP 429)."""
+    code = 429
+
+
+class QuotaEnforcingFakeModel(FakeGeminiModel):
+    """
+    Fake endpoint με quota: έως `max_concurrent` ταυτόχρονα requests και `requests_per_second`.
+    Όσα ξεπερνούν το quota απορρίπτονται με 429. Πάνω από `soft_concurrent` το latency αυξάνεται
+    (όπως ένα υπερφορτωμένο backend πριν αρχίσει να απορρίπτει).
+    """
+
+    def __init__(self, latency: float = 0.3, max_concurrent: int = 4, requests_per_second: float = 10.0, soft_concurrent: int = 3, max_batch_results: Optional[int] = None):
+        super().__init__(latency=latency, max_batch_results=max_batch_results)
+        self.max_concurrent = max_concurrent
+        self.requests_per_second = requests_per_second
+        self.soft_concurrent = soft_concurrent
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.rejected = 0
+        self._window: List[float] = []
+
+    def generate_content(self, prompt_parts, generation_config=None, **kwargs):
+        with self._lock:
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1.0]
+            if self.in_flight >= self.max_concurrent or len(self._window) >= self.requests_per_second:
+                self.rejected += 1
+                raise FakeQuotaExceeded("429 Resource has been exhausted (e.g. check quota).")
+            self._window.append(now)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            overload = max(0, self.in_flight - self.soft_concurrent)
+        try:
+            # Μέσα στο super() μετράει και το self.calls και η βασική καθυστέρηση.
+            time.sleep(self.latency * overload)
+            return super().generate_content(prompt_parts, generation_config, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def build_fake_library(num_files: int, duplicate_ratio: float = 0.1, drive_latency: float = 0.05) -> FakeDriveBackend:
+    """Δημιουργεί fake Drive με `num_files` PDF στο root (μέρος τους διπλότυπα)."""
+    drive = FakeDriveBackend(latency=drive_latency)
+    originals: List[bytes] = []
+    every = int(1 / duplicate_ratio) if duplicate_ratio else 0
+    for i in range(num_files):
+        brand = FAKE_BRANDS[i % len(FAKE_BRANDS)]
+        meta_type = FAKE_TYPES[i % len(FAKE_TYPES)]
+        name = f"{brand}_M{i:05d}_{meta_type}.pdf"
+        if originals and every and i % every == 0:
+            data = originals[i % len(originals)]
+        else:
+            data = _make_pdf(name)
+            originals.append(data)
+        drive.add_file(name, data)
+    return drive
+
+
+def run_benchmark(num_files: int = 100, pipeline_config: Optional[Dict[str, Any]] = None, drive_latency: float = 0.05, ai_latency: float = 0.3, use_rules: bool = False, max_batch_results: Optional[int] = None, dry_run: bool = False, quota: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Εκτελεί τον Sorter σε fake backends και επιστρέφει summary + metrics.
+    Με use_rules=False ο pre-classifier είναι ανενεργός, ώστε να μετριέται καθαρά το pipeline.
+    Με dry_run=True γίνεται πρώτα σχέδιο και μετά apply_plan (summary["apply"]).
+    Με `quota` (kwargs του QuotaEnforcingFakeModel) το fake AI απορρίπτει με 429 ό,τι ξεπερνά το quota.
+    """
+    from services.sorter_logic import SorterService, ALLOWED_CATEGORIES, ALLOWED_TYPES
+    from core.hash_registry import HashRegistry
+    from core.classification_cache import ClassificationCache
+    from services.preclassifier import RulePreClassifier
+    from core.sorter_journal import SorterJournal
+    from core.sorter_plan import SorterPlanStore
+    from core.sorter_history import SorterHistoryStore
+    from core.near_duplicates import NearDuplicateIndex
+
+    drive = build_fake_library(num_files, drive_latency=drive_latency)
+    if quota:
+        model = QuotaEnforcingFakeModel(latency=ai_latency, max_batch_results=max_batch_results, **quota)
+    else:
+        model = FakeGeminiModel(latency=ai_latency, max_batch_results=max_batch_results)
+    service = SorterService(drive=drive, model=model, pipeline_config=pipeline_config, registry=HashRegistry(":memory:"), classification_cache=ClassificationCache(":memory:"),
+                             preclassifier=RulePreClassifier(ALLOWED_CATEGORIES if use_rules else [], ALLOWED_TYPES if use_rules else []),
+                             journal=SorterJournal(":memory:"), plan_store=SorterPlanStore(":memory:"), history=SorterHistoryStore(":memory:"),
+                             near_duplicates=NearDuplicateIndex(None))
+    service.batch_min_text_chars = 0 # Τα fake PDF είναι κενές σελίδες χωρίς κείμενο
+    failed, review, irrelevant, duplicates = [], [], [], []
+    summary = service.run_sorter(
+        stop_flag=False,
+        progress_callback=lambda current, total, text: None,
+        log_callback=lambda msg: None,
+        failed_files_list=failed,
+        manual_review_files_list=review,
+        irrelevant_files_list=irrelevant,
+        duplicate_files_list=duplicates,
+        dry_run=dry_run,
+    )
+    if dry_run and summary.get("plan_id"):
+        summary["plan_drive_calls"] = dict(drive.calls)
+        summary["apply"] = service.apply_plan(summary["plan_id"], lambda current, total, text: None, lambda msg: None)
+    summary["drive_calls"] = dict(drive.calls)
+    summary["ai_calls"] = model.calls
+    summary["ai_rejected"] = getattr(model, "rejected", 0)
+    summary["ai_peak_in_flight"] = getattr(model, "peak_in_flight", None)
+    summary["failed"] = len(failed)
+    return summary
+
+
+SERIAL_CONFIG = {
+    "download_workers": 1, "extract_workers": 1, "extract_use_processes": False,
+    "classify_workers": 1, "classify_rate_per_minute": 0, "classify_batch_size": 1, "apply_batch_size": 1, "queue_size": 1,
+}
+
+
+def _print_report(label: str, summary: Dict[str, Any]):
+    metrics = summary["pipeline_metrics"]
+    print(f"\n=== {label}: {metrics['total_seconds']}s total, AI requests={summary['ai_calls']} "
+          f"(batched files={summary['ai_batched_files']}), "
+          f"sorted={summary['total_successfully_sorted']}, duplicates={summary['total_moved_to_duplicates']}, "
+          f"failed={summary['failed']}")
+    print(f"    Drive calls: {summary['drive_calls']}")
+    print(f"    {'stage':<10}{'workers':>8}{'items':>8}{'errors':>8}{'wall_s':>10}{'items/s':>10}{'avg_ms':>10}")
+    for stage in metrics["stages"]:
+        print(f"    {stage['stage']:<10}{stage['workers']:>8}{stage['items']:>8}{stage['errors']:>8}"
+              f"{stage['wall_seconds']:>10}{stage['items_per_second']:>10}{stage['avg_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark του Sorter pipeline με fake backends.")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--drive-latency", type=float, default=0.05)
+    parser.add_argument("--ai-latency", type=float, default=0.3)
+    parser.add_argument("--near-dup-docs", type=int, default=50000, help="Συνθετικά έγγραφα για το near-duplicate benchmark (0 = παράλειψη)")
+    args = parser.parse_args()
+
+    if args.near_dup_docs:
+        run_near_duplicate_benchmark(args.near_dup_docs)
+    if not args.files:
+        return
+
+    serial = run_benchmark(args.files, SERIAL_CONFIG, args.drive_latency, args.ai_latency)
+    _print_report("Serial (1 worker/stage)", serial)
+    pipelined = run_benchmark(args.files, {"classify_rate_per_minute": 0}, args.drive_latency, args.ai_latency)
+    _print_report("Pipelined (defaults)", pipelined)
+    speedup = serial["pipeline_metrics"]["total_seconds"] / max(pipelined["pipeline_metrics"]["total_seconds"], 1e-6)
+    print(f"\nSpeedup: x{speedup:.1f}")
+    unbatched = run_benchmark(args.files, {"classify_rate_per_minute": 0, "classify_batch_size": 1}, args.drive_latency, args.ai_latency)
+    _print_report("Pipelined, one AI request per file", unbatched)
+    planned = run_benchmark(args.files, {"classify_rate_per_minute": 0}, args.drive_latency, args.ai_latency, dry_run=True)
+    apply = planned["apply"]
+    print(f"\n=== Dry run + apply: plan Drive calls={planned['plan_drive_calls']}, "
+          f"apply={apply['seconds']}s ({apply['applied']} moved, {apply['folders_created']} folders), "
+          f"Drive calls total={planned['drive_calls']}")
+    run_concurrency_simulation(args.files, args.drive_latency, args.ai_latency)
+
+
+QUOTA_SIMULATION = {"max_concurrent": 4, "requests_per_second": 10.0, "soft_concurrent": 3}
+
+
+def run_concurrency_simulation(num_files: int, drive_latency: float, ai_latency: float, quota: Optional[Dict[str, Any]] = None):
+    """
+    Προσομοίωση quota: σταθερή παραλληλία 8 (χωρίς προσαρμογή) απέναντι στον AIMD ελεγκτή.
+    Ένα αρχείο ανά request, ώστε να φαίνεται καθαρά η συμπεριφορά του ελεγκτή.
+    """
+    quota = quota or QUOTA_SIMULATION
+    base = {"classify_rate_per_minute": 0, "classify_batch_size": 1, "classify_workers": 8}
+    fixed = run_benchmark(num_files, {**base, "ai_concurrency_initial": 8, "ai_concurrency_min": 8}, drive_latency, ai_latency, quota=quota)
+    adaptive = run_benchmark(num_files, base, drive_latency, ai_latency, quota=quota)
+    print(f"\n=== Quota simulation (max {quota['max_concurrent']} concurrent, {quota['requests_per_second']} req/s)")
+    for label, summary in (("Fixed x8", fixed), ("AIMD", adaptive)):
+        state = summary["ai_concurrency"]
+        print(f"    {label:<9} {summary['pipeline_metrics']['total_seconds']}s, 429s={summary['ai_rejected']}, "
+              f"failed={summary['failed']}, manual_review={summary['total_moved_to_manual_review']}, "
+              f"final limit={state['limit']}, increases={state['increases']}, decreases={state['decreases']}")
+    print(f"    AIMD limit history: {adaptive['ai_concurrency']['history'][:20]}")
+    return fixed, adaptive
+
+
+NEAR_DUP_BOILERPLATE = ("warning installation and service must be performed by qualified personnel only "
+                        "disconnect the power supply before opening the unit and follow local regulations").split()
+
+
+def _synthetic_manuals(num_docs: int, near_dup_rate: float, words: int, seed: int) -> tuple:
+    """
+    Συνθετικά "εγχειρίδια": κοινό boilerplate ασφαλείας + τυχαίο τεχνικό κείμενο από κοινό λεξιλόγιο.
+    Ποσοστό `near_dup_rate` είναι παραλλαγές προηγούμενου εγγράφου με κομμένη αρχή: μισές με θόρυβο
+    OCR (~2% λέξεων), μισές με διαφορετικό watermark ανά ~150 λέξεις. Επιστρέφει (texts, originals): originals[i]
+    είναι ο δείκτης του πρωτοτύπου για τις παραλλαγές, αλλιώς None.
+    """
+    rng = random.Random(seed)
+    syllables = ["ka", "ther", "mo", "stat", "val", "ve", "pum", "comp", "res", "sor", "fan", "coil", "flo", "w", "gas", "bar", "ex", "pan", "ion"]
+    vocabulary = sorted({"".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(8000)})
+    vocabulary += [f"E{n:02d}" for n in range(100)] + [f"F{n:02d}" for n in range(100)]
+    texts, originals = [], []
+    for index in range(num_docs):
+        if index and rng.random() < near_dup_rate:
+            source = rng.randrange(index)
+            while originals[source] is not None: # Παραλλαγή πάντα ενός πρωτοτύπου
+                source = originals[source]
+            tokens = texts[source].split()[rng.randint(0, 20):]
+            if rng.random() < 0.5: # Ξανασκαναρισμένο: θόρυβος OCR
+                tokens = [rng.choice(vocabulary) if rng.random() < 0.02 else t for t in tokens]
+            else: # Ξαναεξαγμένο με άλλο watermark ανά "σελίδα"
+                watermark = f"copy {rng.randint(1000, 9999)} dealer".split()
+                for position in range(len(tokens) - 1, 0, -150):
+                    tokens[position:position] = watermark
+            texts.append(" ".join(tokens))
+            originals.append(source)
+        else:
+            texts.append(" ".join(NEAR_DUP_BOILERPLATE + [rng.choice(vocabulary) for _ in range(words)]))
+            originals.append(None)
+    return texts, originals
+
+
+def run_near_duplicate_benchmark(num_docs: int = 50000, near_dup_rate: float = 0.1, words: int = 300, brute_force_sample: int = 200, seed: int = 7) -> Dict[str, Any]:
+    """
+    Benchmark του MinHash/LSH ευρετηρίου (core/near_duplicates.py) σε `num_docs` συνθετικά έγγραφα:
+    χρόνος υπογραφών, χρόνος check_and_add (LSH) ανά έγγραφο, σύγκριση με brute force σε δείγμα,
+    και precision/recall των σχεδόν-διπλοτύπων.
+    """
+    from core.near_duplicates import NearDuplicateIndex
+
+    started = time.perf_counter()
+    texts, originals = _synthetic_manuals(num_docs, near_dup_rate, words, seed)
+    generated = time.perf_counter() - started
+
+    index = NearDuplicateIndex(None)
+    started = time.perf_counter()
+    signatures = [index.signature(text) for text in texts]
+    signing = time.perf_counter() - started
+
+    flagged = {}
+    started = time.perf_counter()
+    for doc, signature in enumerate(signatures):
+        match = index.check_and_add(str(doc), f"doc-{doc}", signature)
+        if match is not None:
+            flagged[doc] = match
+    indexing = time.perf_counter() - started
+
+    # Brute force: σύγκριση με ΟΛΕΣ τις υπογραφές (vectorized), για δείγμα ερωτημάτων.
+    import numpy as np
+    matrix = np.stack(signatures)
+    sample = random.Random(seed).sample(range(num_docs), min(brute_force_sample, num_docs))
+    started = time.perf_counter()
+    for doc in sample:
+        (matrix == matrix[doc]).mean(axis=1)
+    brute_ms = 1000 * (time.perf_counter() - started) / len(sample)
+    started = time.perf_counter()
+    for doc in sample:
+        index.query(signatures[doc], exclude=str(doc))
+    lsh_ms = 1000 * (time.perf_counter() - started) / len(sample)
+
+    variants = {doc for doc, original in enumerate(originals) if original is not None}
+    true_positives = len(variants & set(flagged))
+    result = {
+        "docs": num_docs, "variants": len(variants), "flagged": len(flagged),
+        "flagged_duplicate": sum(1 for m in flagged.values() if m["verdict"] == "duplicate"),
+        "flagged_review": sum(1 for m in flagged.values() if m["verdict"] == "review"),
+        "precision": round(true_positives / max(len(flagged), 1), 4),
+        "recall": round(true_positives / max(len(variants), 1), 4),
+        "generate_s": round(generated, 2), "signature_s": round(signing, 2), "index_s": round(indexing, 2),
+        "signature_ms_per_doc": round(1000 * signing / num_docs, 3),
+        "check_and_add_ms_per_doc": round(1000 * indexing / num_docs, 3),
+        "lsh_query_ms": round(lsh_ms, 3), "brute_force_query_ms": round(brute_ms, 3),
+        "avg_candidates": round(index.stats["candidates"] / max(index.stats["queries"], 1), 2),
+    }
+    print(f"\n=== Near-duplicate index: {num_docs} docs, {result['variants']} near-duplicate variants")
+    print(f"    signatures: {result['signature_s']}s ({result['signature_ms_per_doc']} ms/doc), "
+          f"check_and_add: {result['index_s']}s ({result['check_and_add_ms_per_doc']} ms/doc)")
+    print(f"    flagged={result['flagged']} (duplicate={result['flagged_duplicate']}, review={result['flagged_review']}), "
+          f"precision={result['precision']}, recall={result['recall']}")
+    print(f"    query: LSH {result['lsh_query_ms']} ms (avg {result['avg_candidates']} candidates) vs brute force {result['brute_force_query_ms']} ms")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+SERVICE: SORTER JOB REGISTRY (BACKGROUND EXECUTION)
+---------------------------------------------------
+Εκτέλεση του AI Sorter (και της εφαρμογής σχεδίων) σε background thread,
+ώστε η σελίδα του Organizer να μην "παγώνει" για όλη τη διάρκεια της ταξινόμησης.
+
+Features:
+- Κοινόχρηστο (ανά process) registry εργασιών: όλοι οι admins βλέπουν την ίδια εργασία
+  και δεν μπορεί να ξεκινήσει δεύτερη παράλληλη (αντικρουόμενη) εκτέλεση.
+- Cancellation token (threading.Event) που ελέγχεται από το pipeline ανάμεσα στα στάδια.
+- Status snapshot (κατάσταση, πρόοδος, τελευταίες γραμμές log, αποτέλεσμα) για polling από το UI.
+
+Το module ΔΕΝ κάνει import το streamlit: τα callbacks του worker δεν αγγίζουν ποτέ το session_state.
+"""
+import logging
+import threading
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("Sorter.Jobs")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_CANCELED = "canceled"
+JOB_FAILED = "failed"
+ACTIVE_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+JOB_KIND_SORT = "sort"
+JOB_KIND_APPLY_PLAN = "apply_plan"
+
+MAX_LOG_LINES = 500
+MAX_FINISHED_JOBS = 20
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class SorterJob:
+    """Μία εργασία του Sorter. Οι μέθοδοι set_progress/log καλούνται από το worker thread."""
+
+    def __init__(self, kind: str, started_by: str, params: Optional[Dict[str, Any]] = None):
+        self.job_id = f"job-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.kind = kind
+        self.started_by = started_by
+        self.params = params or {}
+        self.state = JOB_QUEUED
+        self.created_at = _now()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.progress = {"current": 0, "total": 100, "text": ""}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cancel_requested_by: Optional[str] = None
+        self.cancel_event = threading.Event() # Cancellation token
+        # Λίστες αποτελεσμάτων για το tab "Review" (γεμίζουν από το run_sorter).
+        self.lists: Dict[str, List[Dict[str, Any]]] = {"failed": [], "manual_review": [], "irrelevant": [], "duplicates": []}
+        self._log = deque(maxlen=MAX_LOG_LINES)
+        self._lock = threading.Lock()
+
+    @property
+    def is_active(self) -> bool:
+        return self.state in ACTIVE_STATES
+
+    def set_progress(self, current: int, total: int, text: str):
+        with self._lock:
+            self.progress = {"current": current, "total": max(total, 1), "text": text}
+
+    def log(self, message: str):
+        with self._lock:
+            self._log.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}")
+
+    def cancel(self, requested_by: Optional[str] = None):
+        """Ζητά διακοπή· η εργασία σταματά στο επόμενο σημείο ελέγχου (ανάμεσα στα στάδια)."""
+        if self.is_active and not self.cancel_event.is_set():
+            self.cancel_requested_by = requested_by
+            self.cancel_event.set()
+            self.log(f"Stop requested{f' by {requested_by}' if requested_by else ''}.")
+
+    def should_stop(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def snapshot(self, log_lines: int = 50) -> Dict[str, Any]:
+        """Αντίγραφο της κατάστασης για το UI (ασφαλές για ανάγνωση από άλλο thread)."""
+        with self._lock:
+            return {
+                "job_id": self.job_id, "kind": self.kind, "state": self.state, "started_by": self.started_by,
+                "created_at": self.created_at, "started_at": self.started_at, "finished_at": self.finished_at,
+                "progress": dict(self.progress), "percent": min(100, int(100 * self.progress["current"] / max(self.progress["total"], 1))),
+                "cancel_requested": self.cancel_event.is_set(), "cancel_requested_by": self.cancel_requested_by,
+                "error": self.error, "result": self.result, "params": dict(self.params),
+                "log": list(self._log)[-log_lines:] if log_lines else list(self._log),
+                "counts": {name: len(items) for name, items in self.lists.items()},
+            }
+
+
+class SorterJobRegistry:
+    """Thread-safe registry: το πολύ μία ενεργή εργασία Sorter ανά process."""
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, SorterJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def active(self) -> Optional[SorterJob]:
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job.is_active:
+                    return job
+        return None
+
+    def get(self, job_id: Optional[str]) -> Optional[SorterJob]:
+        with self._lock:
+            return self._jobs.get(job_id) if job_id else None
+
+    def latest(self) -> Optional[SorterJob]:
+        with self._lock:
+            return next(reversed(self._jobs.values()), None)
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """Σύντομη λίστα των πρόσφατων εργασιών (νεότερες πρώτα)."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [{k: v for k, v in job.snapshot(log_lines=0).items() if k not in ("log", "result")} for job in reversed(jobs)]
+
+    def submit(self, kind: str, target: Callable[[SorterJob], Dict[str, Any]], started_by: str, params: Optional[Dict[str, Any]] = None) -> Tuple[SorterJob, bool]:
+        """
+        Ξεκινά `target(job)` σε background thread. Αν υπάρχει ήδη ενεργή εργασία, ΔΕΝ ξεκινά
+        νέα: επιστρέφει (ενεργή εργασία, False), ώστε όλοι οι admins να βλέπουν την ίδια.
+        """
+        with self._lock:
+            for existing in self._jobs.values():
+                if existing.is_active:
+                    return existing, False
+            job = SorterJob(kind, started_by, params)
+            self._jobs[job.job_id] = job
+            self._prune()
+        job.log(f"{kind} job queued by {started_by}.")
+        threading.Thread(target=self._run, args=(job, target), name=f"sorter-job-{job.job_id}", daemon=True).start()
+        return job, True
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.is_active]
+        for job_id in finished[:max(0, len(self._jobs) - MAX_FINISHED_JOBS)]:
+            self._jobs.pop(job_id, None)
+
+    @staticmethod
+    def _run(job: SorterJob, target: Callable[[SorterJob], Dict[str, Any]]):
+        with job._lock:
+            job.state = JOB_RUNNING
+            job.started_at = _now()
+        try: # Rule 4: Error Handling
+            result = target(job) or {}
+            state = JOB_CANCELED if job.cancel_event.is_set() or result.get("status") == "canceled" else JOB_COMPLETED
+            if result.get("status") == "failed":
+                state = JOB_FAILED
+            with job._lock:
+                job.result = result
+                job.state = state
+        except Exception as e:
+            logger.critical(f"Sorter job {job.job_id} failed: {e}", exc_info=True)
+            with job._lock:
+                job.error = str(e)
+                job.state = JOB_FAILED
+            job.log(f"FATAL ERROR: {e}")
+        finally:
+            with job._lock:
+                job.finished_at = _now()
+
+
+_registry: Optional[SorterJobRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_sorter_jobs() -> SorterJobRegistry:
+    """Κοινόχρηστο registry της εφαρμογής (κοινό για όλα τα sessions του Streamlit server)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SorterJobRegistry()
+        return _registry
@@ -12,6 +12,21 @@ Features:
 - NEW: AI-driven File Renaming
 - NEW: Enhanced Summary Reporting for UI
 - NEW: Force Full Rescan option.
+- NEW: Staged pipeline (download/hash/extract/classify/apply σε παράλληλα στάδια με bounded queues).
+- NEW: Checksum dedup (size+md5 από το listing του Drive, χωρίς download).
+- NEW: Persistent hash registry (διπλότυπα ανάμεσα σε εκτελέσεις, core/hash_registry.py).
+- NEW: Classification cache (content hash + έκδοση prompt/μοντέλου, core/classification_cache.py).
+- NEW: Rule-based pre-classifier (services/preclassifier.py): προφανή ονόματα αρχείων παρακάμπτουν το AI.
+- NEW: Batched AI classification (πολλά αρχεία ανά request, μέγεθος batch προσαρμοσμένο στο token limit).
+- NEW: Memoized parent-folder names (core/folder_resolver.py): ένα request ανά φάκελο, όχι ανά αρχείο.
+- NEW: Resumable runs (core/sorter_journal.py): journal σταδίων ανά αρχείο + audit trail μετακινήσεων/μετονομασιών.
+- NEW: Slim PDF payloads (core/pdf_payload.py): text-only / slim / full PDF ανά αρχείο, με βάση το μέγεθος.
+- NEW: Dry-run planner (core/sorter_plan.py): σχέδιο χωρίς αλλαγές στο Drive, έλεγχος και μαζική εφαρμογή.
+- NEW: Αναδρομικό, παράλληλο discovery (core/drive_walker.py): αρχεία σε υποφακέλους (π.χ. User_Uploads) ταξινομούνται κι αυτά.
+- NEW: AIMD έλεγχος ταυτόχρονων κλήσεων AI (core/adaptive_concurrency.py) με retry στα 429.
+- NEW: Ιστορικό εκτελέσεων (core/sorter_history.py): χρόνοι σταδίων, bytes, tokens και κλήσεις API ανά αρχείο.
+- NEW: Σχεδόν-διπλότυπα (core/near_duplicates.py): MinHash/LSH στο εξαγόμενο κείμενο, με ποσοστό ομοιότητας.
+- NEW: Background εκτέλεση (services/sorter_jobs.py): κοινή εργασία για όλους τους admins, με ακύρωση και polling κατάστασης.
 """
 import streamlit as st
 from core.drive_manager import DriveManager
@@ -19,14 +34,28 @@ from core.config_loader import ConfigLoader
 import google.generativeai as genai
 import logging
 import time
-import io
 import os
-import pypdf
 import re
-import tempfile
+import json
+import threading
 import hashlib # ΝΕΟ: Για υπολογισμό hash
 from collections import defaultdict # ΝΕΟ: Για πιο εύκολη καταμέτρηση στατιστικών
 from datetime import datetime # ΝΕΟ: Για timestamp
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from services.sorter_pipeline import SorterPipeline, PipelineJob, PIPELINE_DEFAULTS
+from core.hash_registry import HashRegistry, checksum_key
+from core.classification_cache import ClassificationCache
+from core.folder_resolver import FolderMetadataResolver
+from core.pdf_extractor import get_extraction_pool
+from core.pdf_payload import build_slim_pdf, choose_payload_mode, MODE_TEXT, MODE_SLIM, MODE_FULL
+from core.sorter_plan import SorterPlanStore, PLAN_DRAFT, PLAN_APPLIED, PLAN_PARTIAL, PLAN_DISCARDED, ITEM_PENDING, ITEM_APPLIED, ITEM_FAILED
+from core.drive_manager import BATCH_LIMIT
+from core.drive_walker import DriveTreeWalker, DEFAULT_WALK_WORKERS, DEFAULT_MAX_DEPTH
+from core.sorter_history import SorterHistoryStore, FILE_STAGES
+from core.near_duplicates import NearDuplicateIndex
+from core.adaptive_concurrency import AdaptiveConcurrencyController, is_throttle_error, OUTCOME_OK, OUTCOME_THROTTLED, OUTCOME_ERROR
+from core.sorter_journal import SorterJournal, STAGE_APPLYING, STAGE_APPLIED, STAGE_FAILED, RUN_COMPLETED, RUN_CANCELED
+from services.preclassifier import RulePreClassifier, load_local_index
 
 logger = logging.getLogger("Sorter")
 
@@ -45,6 +74,10 @@ IRRELEVANT_OR_UNKNOWN_FOLDER = "_IRRELEVANT_OR_UNKNOWN"
 DUPLICATES_FOLDER = "_DUPLICATES"
 MANUAL_REVIEW_FOLDER = "_MANUAL_REVIEW" # Added for consistency
 
+# Κατάληξη που προσθέτει ο _build_new_filename ("<όνομα>_SERVICE_MANUAL[_<codes>]_pdf"): αφαιρείται πριν
+# ξαναχτιστεί το όνομα, ώστε η επανεξέταση ήδη ταξινομημένων αρχείων να μη στοιβάζει καταλήξεις.
+_SORTED_SUFFIX_RE = re.compile(r"_(?:" + "|".join(re.escape(t.upper()) for t in ALLOWED_TYPES) + r")(?:_[^.]*?)?_pdf$")
+
 # IGNORED_FOLDERS_TOP_LEVEL now includes the new special folders
 IGNORED_FOLDERS_TOP_LEVEL = [
     MANUAL_REVIEW_FOLDER, 
@@ -55,12 +88,73 @@ IGNORED_FOLDERS_TOP_LEVEL = [
     DUPLICATES_FOLDER 
 ]
 
+# Αύξηση της έκδοσης σε κάθε ουσιαστική αλλαγή του prompt του _ask_ai_for_metadata:
+# ακυρώνει αυτόματα τις παλιές εγγραφές της ClassificationCache.
+SORTER_PROMPT_VERSION = "1"
+
+AI_THROTTLE_RETRIES = 3 # Επαναλήψεις ενός request μετά από 429 (με το backoff του ελεγκτή ταυτόχρονων κλήσεων)
+
+CLASSIFICATION_OUTPUT_FORMAT = {
+    "category": "Heating_Boilers|Heat_Pumps|Air_Conditioning|Solar_Systems|Water_Heaters|Thermostats_Controllers|Spare_Parts_Valves|Other_HVAC|Unknown",
+    "brand": "EXTRACTED_BRAND",
+    "model": "EXTRACTED_MODEL",
+    "meta_type": "User_Manual|Service_Manual|Installation_Manual|Technical_Data|Error_Codes|Spare_Parts_List|General_Manual",
+    "error_codes": "E1, E2, F0 (comma separated, if found, else empty string)",
+    "reason": "Why AI chose this category/type (optional, for debugging)"
+}
+
+# BATCHED CLASSIFICATION: μόνο αρχεία με αρκετό κείμενο μπαίνουν σε batch (χωρίς inline bytes).
+# Τα υπόλοιπα (σκαναρισμένα PDF, εικόνες) ταξινομούνται ένα-ένα με το αρχείο συνημμένο.
+BATCH_MIN_TEXT_CHARS = 200
+BATCH_SNIPPET_CHARS = 2000
+BATCH_CHARS_PER_TOKEN = 4            # Χονδρική εκτίμηση tokens από χαρακτήρες
+BATCH_TOKENS_PER_RESULT = 120        # Εκτίμηση tokens εξόδου ανά αρχείο στην απάντηση
+BATCH_INPUT_BUDGET_SHARE = 0.5       # Μέρος του input token limit που διατίθεται στα έγγραφα
+DEFAULT_TOKEN_LIMITS = (30720, 2048) # (input, output) όταν το μοντέλο δεν δηλώνει όρια
+
+
+class AIRequestAborted(Exception):
+    """Ζητήθηκε διακοπή της εκτέλεσης όσο ένα AI request περίμενε θέση ή backoff."""
+
+
 class SorterService:
-    def __init__(self):
-        self.drive = DriveManager()
+    def __init__(self, drive: Optional[Any] = None, model: Optional[Any] = None, pipeline_config: Optional[Dict[str, Any]] = None, registry: Optional[HashRegistry] = None, classification_cache: Optional[ClassificationCache] = None, preclassifier: Optional[RulePreClassifier] = None, folder_resolver: Optional[FolderMetadataResolver] = None, journal: Optional[SorterJournal] = None, plan_store: Optional[SorterPlanStore] = None, history: Optional[SorterHistoryStore] = None, near_duplicates: Optional[NearDuplicateIndex] = None):
+        """Τα προαιρετικά ορίσματα επιτρέπουν την αντικατάσταση των backends (π.χ. fake backends στο benchmark)."""
+        self.drive = drive or DriveManager()
+        self.registry = registry or HashRegistry()
+        self.classification_cache = classification_cache or ClassificationCache()
+        self.preclassifier = preclassifier or RulePreClassifier(ALLOWED_CATEGORIES, ALLOWED_TYPES, load_local_index())
+        self.folder_resolver = folder_resolver or FolderMetadataResolver()
+        self.folder_resolver.drive = self.drive
+        self.journal = journal or SorterJournal()
+        self._run_id: Optional[str] = None
+        self._resume_states: Dict[str, Dict[str, Any]] = {}
+        self.plan_store = plan_store or SorterPlanStore()
+        self.walker: Optional[DriveTreeWalker] = None
+        self.history = history or SorterHistoryStore()
+        self.near_duplicates = near_duplicates or NearDuplicateIndex()
+        self._history_files: List[Dict[str, Any]] = []
+        self._usage_local = threading.local() # Σε ποιο job (ή batch) χρεώνονται τα tokens του τρέχοντος thread
+        self._dry_run = False
+        self._plan_items: List[Dict[str, Any]] = []
+        self._plan_lock = threading.Lock()
         self.api_key = ConfigLoader.get_gemini_key()
-        self.model = None
-        self.root_id = ConfigLoader.get_drive_folder_id()
+        self.model = model
+        self.root_id = self.drive.root_id if drive else ConfigLoader.get_drive_folder_id()
+        self.pipeline_config = {**PIPELINE_DEFAULTS, **(pipeline_config or {})}
+        self.ai_concurrency = self._new_concurrency_controller(self.pipeline_config)
+        self._ai_stop_event: Optional[threading.Event] = None # stop_event του pipeline που τρέχει (run_sorter)
+        self._hash_to_file_map = {}
+        self._hash_lock = threading.Lock()
+        self._folder_cache = {} # (parent_id, name) -> folder_id
+        self._listed_folders = set() # Γονικοί φάκελοι των οποίων οι υποφάκελοι είναι ήδη στο _folder_cache
+        self._folder_lock = threading.Lock()
+        self.batch_min_text_chars = BATCH_MIN_TEXT_CHARS
+        self.pdf_payload_mode = "auto" # "auto" (ανά μέγεθος) ή ένα από: text / slim / full
+        self._batch_cap: Optional[int] = None # Προσαρμοστικό όριο αρχείων ανά batch (μειώνεται σε αποτυχίες)
+        self._batch_lock = threading.Lock()
+        self._batch_requests = 0
+        self._token_limits: Optional[tuple] = None
         self._setup_ai()
 
     def _setup_ai(self):
@@ -125,20 +219,29 @@ class SorterService:
             
             file_hash = self._calculate_file_hash(file_bytes)
 
-            reader = pypdf.PdfReader(io.BytesIO(file_bytes))
-            text = ""
-            for i in range(min(8, len(reader.pages))): 
-                text += reader.pages[i].extract_text() or ""
-            return text[:5000], file_bytes, file_hash 
+            text = get_extraction_pool().extract_text(file_bytes, max_pages=8, max_chars=5000)
+            return text, file_bytes, file_hash
         except Exception as e:
             logger.error(f"Error extracting text from PDF {file_id}: {e}", exc_info=True)
             return None, None, None
 
+    @property
+    def classification_version(self) -> str:
+        """Έκδοση για την ClassificationCache: prompt + επιτρεπτές τιμές + μοντέλο."""
+        allowed = hashlib.sha1("|".join(ALLOWED_CATEGORIES + ALLOWED_TYPES).encode('utf-8')).hexdigest()[:8]
+        model_name = getattr(self.model, 'model_name', None) or "no-model"
+        return f"p{SORTER_PROMPT_VERSION}:{allowed}:{model_name}"
+
+    @staticmethod
+    def _fallback_metadata(reason: str) -> dict:
+        """Metadata όταν το AI δεν έδωσε απάντηση (δεν αποθηκεύονται στην cache)."""
+        return {"category": "Unknown", "brand": "Unknown", "model": "General_Model", "meta_type": "General_Manual", "error_codes": "", "reason": reason, "ai_failed": True}
+
     def _ask_ai_for_metadata(self, filename: str, file_text: Optional[str], file_bytes: Optional[bytes]) -> dict:
         """Ζητάει από το AI να κατηγοριοποιήσει το αρχείο."""
         if not self.model: 
             logger.error("AI Model not initialized for metadata extraction.")
-            return {"category": "Unknown", "brand": "Unknown", "model": "General_Model", "meta_type": "General_Manual", "error_codes": "", "reason": "AI Model not ready."}
+            return self._fallback_metadata("AI Model not ready.")
         
         prompt_parts = [
             f"Analyze the following document (filename: '{filename}'). "
@@ -162,22 +265,10 @@ class SorterService:
                 }
             })
 
-        json_output_format = {
-            "category": "Heating_Boilers|Heat_Pumps|Air_Conditioning|Solar_Systems|Water_Heaters|Thermostats_Controllers|Spare_Parts_Valves|Other_HVAC|Unknown",
-            "brand": "EXTRACTED_BRAND",
-            "model": "EXTRACTED_MODEL",
-            "meta_type": "User_Manual|Service_Manual|Installation_Manual|Technical_Data|Error_Codes|Spare_Parts_List|General_Manual",
-            "error_codes": "E1, E2, F0 (comma separated, if found, else empty string)",
-            "reason": "Why AI chose this category/type (optional, for debugging)"
-        }
-
-        prompt_parts.append(f"\nJSON Output Format (choose from options, provide extracted values): {json.dumps(json_output_format, indent=2)}")
+        prompt_parts.append(f"\nJSON Output Format (choose from options, provide extracted values): {json.dumps(CLASSIFICATION_OUTPUT_FORMAT, indent=2)}")
         
         try:
-            response = self.model.generate_content(
-                prompt_parts,
-                generation_config={"response_mime_type": "application/json"}
-            )
+            response = self._generate(prompt_parts)
             # Robust JSON parsing
             text = response.text.strip()
             start_idx = text.find('{')
@@ -187,23 +278,872 @@ class SorterService:
                 return json.loads(clean_json)
             else:
                 logger.warning(f"AI returned invalid JSON for '{filename}': {text[:200]}")
-                return {"category": "Unknown", "brand": "Unknown", "model": "General_Model", "meta_type": "General_Manual", "error_codes": "", "reason": "AI returned malformed JSON."}
+                return self._fallback_metadata("AI returned malformed JSON.")
+        except AIRequestAborted:
+            return self._fallback_metadata("Sorter stopped before the AI request.")
         except Exception as e:
             logger.error(f"AI metadata extraction failed for '{filename}': {e}", exc_info=True)
-            return {"category": "Unknown", "brand": "Unknown", "model": "General_Model", "meta_type": "General_Manual", "error_codes": "", "reason": f"AI error: {str(e)}"}
+            return self._fallback_metadata(f"AI error: {str(e)}")
 
-    def _get_or_create_folder(self, parent_id, folder_name):
-        """Επιστρέφει το ID του φακέλου, δημιουργώντας τον αν δεν υπάρχει."""
-        # Clean folder name for Drive compatibility
-        clean_folder_name = re.sub(r'[\\/:*?"<>|]', '', folder_name).strip()
-        if not clean_folder_name: return None # Avoid creating empty name folders
-        
-        return self.drive.create_folder(clean_folder_name, parent_id)
+    @staticmethod
+    def _new_concurrency_controller(config: Optional[Dict[str, Any]]) -> AdaptiveConcurrencyController:
+        cfg = {**PIPELINE_DEFAULTS, **(config or {})}
+        return AdaptiveConcurrencyController(
+            initial_limit=cfg["ai_concurrency_initial"], min_limit=cfg["ai_concurrency_min"], max_limit=cfg["classify_workers"]
+        )
+
+    def _generate(self, prompt_parts: list):
+        """
+        generate_content μέσα από τον AIMD ελεγκτή: περιμένει ελεύθερη θέση, αναφέρει latency/αποτέλεσμα
+        και ξαναδοκιμάζει τα 429 / quota errors (μετά το backoff) έως AI_THROTTLE_RETRIES φορές.
+        Raises AIRequestAborted αν σταματήσει η εκτέλεση όσο περιμένει θέση ή backoff.
+        """
+        stop_event = self._ai_stop_event
+        for attempt in range(AI_THROTTLE_RETRIES + 1):
+            if not self.ai_concurrency.acquire(stop_event): # Το backoff των 429 περιμένεται μέσα στο acquire
+                raise AIRequestAborted("Sorter stopped while waiting for an AI request slot.")
+            started = time.monotonic()
+            try:
+                response = self.model.generate_content(
+                    prompt_parts,
+                    generation_config={"response_mime_type": "application/json"}
+                )
+            except Exception as e:
+                self._charge_usage(None)
+                throttled = is_throttle_error(e)
+                self.ai_concurrency.release(time.monotonic() - started, OUTCOME_THROTTLED if throttled else OUTCOME_ERROR)
+                if not throttled or attempt == AI_THROTTLE_RETRIES:
+                    raise
+                logger.warning(f"AI request throttled (attempt {attempt + 1}/{AI_THROTTLE_RETRIES + 1}): {e}")
+                continue
+            self.ai_concurrency.release(time.monotonic() - started, OUTCOME_OK)
+            self._charge_usage(response)
+            return response
+
+    def _charge_usage(self, response: Any):
+        """Χρεώνει ένα request (και τα tokens του, από το usage_metadata) στο job του τρέχοντος thread."""
+        usage = getattr(self._usage_local, 'target', None)
+        if usage is None:
+            return
+        usage["ai_requests"] += 1
+        metadata = getattr(response, 'usage_metadata', None)
+        if metadata is not None:
+            usage["tokens_in"] += getattr(metadata, 'prompt_token_count', 0) or 0
+            usage["tokens_out"] += getattr(metadata, 'candidates_token_count', 0) or 0
+
+    def _model_token_limits(self) -> tuple:
+        """(input_token_limit, output_token_limit) του μοντέλου, με cache."""
+        if self._token_limits is None:
+            limits = (getattr(self.model, 'input_token_limit', None), getattr(self.model, 'output_token_limit', None))
+            if not all(limits) and self.api_key and getattr(self.model, 'model_name', None):
+                try:
+                    info = genai.get_model(self.model.model_name)
+                    limits = (info.input_token_limit, info.output_token_limit)
+                except Exception as e:
+                    logger.warning(f"Could not read token limits for '{self.model.model_name}': {e}")
+            self._token_limits = (limits[0] or DEFAULT_TOKEN_LIMITS[0], limits[1] or DEFAULT_TOKEN_LIMITS[1])
+        return self._token_limits
+
+    def _plan_batches(self, jobs: List[PipelineJob]) -> List[List[PipelineJob]]:
+        """Χωρίζει τα jobs σε batches που χωράνε στο input και στο output token limit."""
+        input_limit, output_limit = self._model_token_limits()
+        input_budget = int(input_limit * BATCH_INPUT_BUDGET_SHARE)
+        max_items = max(1, int(output_limit * 0.8) // BATCH_TOKENS_PER_RESULT)
+        with self._batch_lock:
+            if self._batch_cap is not None:
+                max_items = min(max_items, self._batch_cap)
+
+        batches, current, current_tokens = [], [], 0
+        for job in jobs:
+            tokens = (len(job.name) + min(len(job.text or ''), BATCH_SNIPPET_CHARS)) // BATCH_CHARS_PER_TOKEN + 30
+            if current and (len(current) >= max_items or current_tokens + tokens > input_budget):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(job)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _adapt_batch_cap(self, requested: int, succeeded: bool):
+        """Μισό batch μετά από κομμένη/χαλασμένη απάντηση, σταδιακή αύξηση μετά από επιτυχία."""
+        with self._batch_lock:
+            if not succeeded:
+                self._batch_cap = max(1, requested // 2)
+                logger.warning(f"Batch classification response incomplete, batch size reduced to {self._batch_cap}.")
+            elif self._batch_cap is not None and requested >= self._batch_cap:
+                self._batch_cap += 1
+
+    @staticmethod
+    def _parse_batch_response(text: str) -> Dict[str, dict]:
+        """Δέχεται JSON array με `file_id` ανά στοιχείο (ή object file_id -> metadata)."""
+        text = text.strip()
+        start_idx = min([i for i in (text.find('['), text.find('{')) if i != -1], default=-1)
+        if start_idx == -1:
+            return {}
+        end_char = ']' if text[start_idx] == '[' else '}'
+        end_idx = text.rfind(end_char) + 1
+        if end_idx <= start_idx:
+            return {}
+        try:
+            data = json.loads(text[start_idx:end_idx])
+        except ValueError:
+            return {}
+        if isinstance(data, dict):
+            data = data.get("results", [dict(v, file_id=k) for k, v in data.items() if isinstance(v, dict)])
+        results = {}
+        for entry in data if isinstance(data, list) else []:
+            if isinstance(entry, dict) and entry.get("file_id") and "category" in entry:
+                results[str(entry.pop("file_id"))] = entry
+        return results
+
+    def _ask_ai_for_batch_metadata(self, jobs: List[PipelineJob]) -> Dict[str, dict]:
+        """Ένα request για πολλά αρχεία (όνομα + απόσπασμα κειμένου). Επιστρέφει file_id -> metadata."""
+        documents = [
+            {"file_id": job.file_id, "filename": job.name, "snippet": (job.text or '')[:BATCH_SNIPPET_CHARS]}
+            for job in jobs
+        ]
+        prompt_parts = [
+            "Analyze each of the following documents. "
+            "For each one, determine its Category, Brand, Model, and Document Type, and extract any HVAC error codes mentioned. "
+            f"Allowed Categories: {', '.join(ALLOWED_CATEGORIES)}. "
+            f"Allowed Document Types: {', '.join(ALLOWED_TYPES)}. "
+            "If no specific brand/model, use 'Unknown'/'General_Model'. "
+            "If no specific type, use 'General_Manual'. "
+            "Respond with a JSON array only, one object per document, each including its 'file_id'.",
+            f"Documents: {json.dumps(documents, ensure_ascii=False)}",
+            f"\nJSON Output Format (one per document): {json.dumps([{'file_id': 'FILE_ID', **CLASSIFICATION_OUTPUT_FORMAT}], indent=2)}"
+        ]
+        with self._batch_lock:
+            self._batch_requests += 1
+        try:
+            response = self._generate(prompt_parts)
+            results = self._parse_batch_response(response.text)
+        except AIRequestAborted:
+            return {} # Όχι αποτυχία του batch: δεν μικραίνει το batch cap
+        except Exception as e:
+            logger.error(f"AI batch metadata extraction failed for {len(jobs)} files: {e}", exc_info=True)
+            results = {}
+        expected = {job.file_id for job in jobs}
+        self._adapt_batch_cap(len(jobs), expected.issubset(results))
+        return {fid: meta for fid, meta in results.items() if fid in expected}
+
+    @staticmethod
+    def _clean_folder_name(folder_name: str) -> str:
+        return re.sub(r'[\\/:*?"<>|]', '', folder_name).strip()
 
-    def run_sorter(self, stop_flag: bool, progress_callback, log_callback, failed_files_list: list, manual_review_files_list: list, irrelevant_files_list: list, duplicate_files_list: list, force_full_rescan: bool = False) -> dict:
+    def _resolve_folder_paths(self, folder_paths: List[List[str]]) -> Dict[tuple, Optional[str]]:
         """
-        Εκτελεί την ταξινόμηση αρχείων.
+        IDs των φακέλων προορισμού (κάτω από το root) για ένα apply batch: όσοι λείπουν δημιουργούνται με
+        batch_create_folders, ένα batch ανά επίπεδο (όπως στο apply_plan). Οι υπάρχοντες βρίσκονται με ένα
+        listing υποφακέλων ανά γονικό φάκελο, με cache ανά εκτέλεση. Κλειδί: tuple των καθαρών ονομάτων.
+        """
+        paths = set()
+        for folder_path in folder_paths:
+            clean = tuple(self._clean_folder_name(f) for f in folder_path)
+            for depth in range(1, len(clean) + 1):
+                paths.add(clean[:depth])
+        folder_ids: Dict[tuple, Optional[str]] = {(): self.root_id}
+        for depth in sorted({len(p) for p in paths}):
+            missing = []
+            for path in sorted(p for p in paths if len(p) == depth):
+                parent_id = folder_ids.get(path[:-1])
+                folder_ids[path] = self._existing_folder(parent_id, path[-1]) if parent_id and path[-1] else None
+                if parent_id and path[-1] and folder_ids[path] is None:
+                    missing.append(path)
+            if not missing:
+                continue
+            specs = [{"key": str(i), "name": path[-1], "parent_id": folder_ids[path[:-1]]} for i, path in enumerate(missing)]
+            results = self.drive.batch_create_folders(specs)
+            for spec, path in zip(specs, missing):
+                folder_id = results.get(spec["key"])
+                folder_ids[path] = folder_id
+                if folder_id:
+                    with self._folder_lock:
+                        self._folder_cache[(spec["parent_id"], spec["name"])] = folder_id
+                        self._listed_folders.add(folder_id) # Νέος φάκελος: κανένας υποφάκελος, χωρίς listing
+                    self.folder_resolver.remember(folder_id, spec["name"], spec["parent_id"])
+        return folder_ids
+
+    def _existing_folder(self, parent_id: str, name: str) -> Optional[str]:
+        """ID υπάρχοντος υποφακέλου (ή None): ένα listing ανά γονικό φάκελο και εκτέλεση."""
+        with self._folder_lock:
+            if (parent_id, name) in self._folder_cache or parent_id in self._listed_folders:
+                return self._folder_cache.get((parent_id, name))
+        listing = self.drive.list_child_folders(parent_id)
+        if listing is None: # Άγνωστο αν υπάρχει: create_folder ελέγχει το όνομα πριν δημιουργήσει
+            folder_id = self.drive.create_folder(name, parent_id)
+            if folder_id:
+                with self._folder_lock:
+                    self._folder_cache[(parent_id, name)] = folder_id
+                self.folder_resolver.remember(folder_id, name, parent_id)
+            return folder_id
+        self.folder_resolver.prefill(listing)
+        with self._folder_lock:
+            for folder in listing:
+                self._folder_cache.setdefault((parent_id, folder['name']), folder['id'])
+            self._listed_folders.add(parent_id)
+            return self._folder_cache.get((parent_id, name))
+
+    @staticmethod
+    def _stop_requested(stop_flag: Any) -> bool:
+        """Υποστηρίζει bool, callable ή session_state-like αντικείμενο (κλειδί 'sorter_stop_flag')."""
+        if callable(stop_flag):
+            return bool(stop_flag())
+        if hasattr(stop_flag, 'get'):
+            return bool(stop_flag.get('sorter_stop_flag', False))
+        return bool(stop_flag)
+
+    @staticmethod
+    def _build_new_filename(filename: str, meta_type: str, error_codes: str) -> str:
+        """Δημιουργεί το νέο όνομα αρχείου μετά την ταξινόμηση (idempotent για ονόματα που έχει ήδη φτιάξει)."""
+        filename = _SORTED_SUFFIX_RE.sub("", filename)
+        new_filename = f"{filename.replace('.pdf', '')}_{meta_type.upper()}_{error_codes}.pdf" if error_codes else f"{filename.replace('.pdf', '')}_{meta_type.upper()}.pdf"
+        new_filename = new_filename.replace(' ', '_').replace('.', '_') # Ensure safe filename
+        # Limit length to avoid Drive API issues
+        new_filename = new_filename[:200] + ".pdf" if new_filename.endswith(".pdf") and len(new_filename) > 200 else new_filename
+        return new_filename
+
+    @staticmethod
+    def _already_in_place(target_folder_id: Optional[str], current_parents: List[str], new_name: Optional[str], current_name: str) -> bool:
+        """True αν ο φάκελος προορισμού είναι ήδη γονέας του αρχείου και το όνομα δεν αλλάζει (καμία κλήση στο Drive)."""
+        return bool(target_folder_id) and target_folder_id in (current_parents or []) and (not new_name or new_name == current_name)
+
+    @staticmethod
+    def _checksum_key(item: Dict[str, Any]) -> Optional[str]:
+        """Κλειδί διπλοτύπου από τα metadata του Drive (size + md5Checksum), χωρίς download."""
+        return checksum_key(item)
+
+    def _checksum_prepass(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Dedup pre-pass: ομαδοποιεί τα items κατά size+md5 και τα ταξινομεί ώστε
+        το canonical αρχείο κάθε ομάδας (το παλαιότερο) να έρχεται πρώτο.
+        Έτσι το pipeline_admit κρατάει το παλαιότερο ως πρωτότυπο και τα υπόλοιπα
+        πηγαίνουν στο _DUPLICATES χωρίς ποτέ να κατέβουν.
+        """
+        groups = defaultdict(list)
+        for item in items:
+            groups[self._checksum_key(item)].append(item)
+
+        ordered = []
+        for key, group in groups.items():
+            if key is not None and len(group) > 1:
+                group.sort(key=lambda it: (it.get('createdTime') or '', it['name']))
+            ordered.extend(group)
+        return ordered
+
+    def _should_descend(self, folder: Dict[str, Any], parent_path: List[str], force_full_rescan: bool, log: Callable[[str], None]) -> bool:
+        """
+        Ποιοι υποφάκελοι εξερευνώνται στο discovery.
+        - IGNORED_FOLDERS_TOP_LEVEL (Trash, _DUPLICATES, _MANUAL_REVIEW, ...): ποτέ.
+        - ALLOWED_CATEGORIES (ήδη οργανωμένη δομή): μόνο σε πλήρη επανεξέταση.
+        - Όλοι οι υπόλοιποι (π.χ. User_Uploads, φάκελοι που ανέβηκαν ολόκληροι): πάντα.
+        """
+        name = folder['name']
+        location = "/".join(parent_path + [name])
+        if name in IGNORED_FOLDERS_TOP_LEVEL:
+            log(f"Skipping special ignored folder: {location}")
+            return False
+        if name in ALLOWED_CATEGORIES and not force_full_rescan:
+            log(f"Skipping already categorized folder: {location}")
+            return False
+        return True
+
+    def _iter_candidates(self, force_full_rescan: bool, log: Callable[[str], None], workers: int = DEFAULT_WALK_WORKERS, max_depth: int = DEFAULT_MAX_DEPTH) -> Iterator[Dict[str, Any]]:
+        """
+        Discovery / listing stage: περιηγείται αναδρομικά και παράλληλα το δέντρο κάτω από το root
+        (core/drive_walker.py) και επιστρέφει (streaming) τα αρχεία προς ταξινόμηση μόλις βρεθούν,
+        ώστε το pipeline να ξεκινά πριν ολοκληρωθεί η περιήγηση.
+        Εκτελείται στο listing thread του pipeline, οπότε το `log` πρέπει να είναι thread-safe.
+        """
+        self.walker = DriveTreeWalker(self.drive, workers=workers, max_depth=max_depth)
+        walk = self.walker.walk(
+            self.root_id,
+            should_descend=lambda folder, parent_path: self._should_descend(folder, parent_path, force_full_rescan, log),
+            on_listing=self.folder_resolver.prefill,
+        )
+        try:
+            for files, path in walk:
+                # Το checksum pre-pass γίνεται ανά φάκελο (η περιήγηση είναι streaming): μέσα στον φάκελο
+                # πρωτότυπο είναι το παλαιότερο αρχείο, ανάμεσα σε φακέλους αυτό που βρέθηκε πρώτο.
+                for item in self._checksum_prepass(files):
+                    if item['mimeType'].startswith('application/pdf') or item['mimeType'].startswith('image/'):
+                        yield item
+        finally:
+            walk.close()
+
+    # --- PIPELINE STAGES (καλούνται από το SorterPipeline σε worker threads) ---
+
+    def pipeline_admit(self, job: PipelineJob):
+        """Listing-time dedup με size+md5 του Drive: τα διπλότυπα δεν κατεβαίνουν ποτέ."""
+        state = self._resume_states.get(job.file_id)
+        if state and state["stage"] == STAGE_APPLIED:
+            # Idempotent resume: ήδη μετακινήθηκε στην εκτέλεση που διακόπηκε.
+            job.decision = {"action": "resumed", "folder_path": [], "new_name": None, "reason": "Already applied before the interruption."}
+            return
+        key = self._checksum_key(job.item)
+        if key is None:
+            return # Χωρίς metadata: το pipeline_dedup θα υπολογίσει SHA-256 μετά το download
+        job.file_hash = key
+        original_file_info = self._find_original(job)
+        if original_file_info is None:
+            # Αν η ταξινόμηση είναι ήδη γνωστή, δεν χρειάζεται ούτε download ούτε AI.
+            self._try_skip_ai(job)
+            return
+        job.decision = self._duplicate_decision(job, original_file_info)
+        job.decision["checksum_only"] = True
+
+    def _try_skip_ai(self, job: PipelineJob) -> bool:
+        """
+        Ταξινόμηση χωρίς κλήση AI: πρώτα από το journal της εκτέλεσης που συνεχίζεται,
+        μετά από την ClassificationCache και τέλος από τον rule-based pre-classifier
+        (μόνο αν είναι confident και δίνει πλήρη ταξινόμηση).
+        True αν το job πήρε απόφαση.
+        """
+        journaled = (self._resume_states.get(job.file_id) or {}).get("decision")
+        if journaled and journaled.get("action") in ("sorted", "manual_review", "irrelevant"):
+            job.decision = dict(journaled, source="journal")
+            job.file_bytes = None
+            return True
+
+        cached = self.classification_cache.get(job.file_hash, self.classification_version)
+        if cached is not None:
+            job.metadata = cached
+            job.decision = self._decide_target(job.name, cached)
+            job.decision["source"] = "cache"
+            job.file_bytes = None
+            return True
+
+        ruled = self.preclassifier.classify(job.name)
+        if self.preclassifier.is_confident(ruled):
+            decision = self._decide_target(job.name, ruled)
+            if decision["action"] == "sorted":
+                job.metadata = ruled
+                job.decision = decision
+                job.decision["source"] = "rules"
+                job.file_bytes = None
+                return True
+        return False
+
+    def _find_original(self, job: PipelineJob) -> Optional[Dict[str, Any]]:
+        """
+        Επιστρέφει το πρωτότυπο για το job.file_hash (πρώτα από την τρέχουσα εκτέλεση,
+        μετά από το μόνιμο registry), ή None αν το job είναι το ίδιο το πρωτότυπο.
+        """
+        with self._hash_lock:
+            original_file_info = self._hash_to_file_map.get(job.file_hash)
+            if original_file_info is not None:
+                return original_file_info
+            registered = self.registry.lookup(job.file_hash)
+            if registered and registered['file_id'] != job.file_id:
+                original_file_info = {"name": registered['file_name'], "id": registered['file_id'], "registry_hit": True}
+                self._hash_to_file_map[job.file_hash] = original_file_info
+                return original_file_info
+            self._hash_to_file_map[job.file_hash] = {"name": job.name, "id": job.file_id}
+            return None
+
+    def _duplicate_decision(self, job: PipelineJob, original_file_info: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "action": "duplicate",
+            "folder_path": [DUPLICATES_FOLDER],
+            "new_name": f"{job.name}_DUPLICATE_OF_{original_file_info['name']}",
+            "original_file_name": original_file_info['name'],
+            "registry_hit": original_file_info.get("registry_hit", False),
+        }
+
+    def pipeline_near_duplicate(self, job: PipelineJob):
+        """
+        Near-duplicate stage (μετά την εξαγωγή κειμένου): MinHash υπογραφή και LSH αναζήτηση.
+        - similarity >= duplicate_threshold: στο _DUPLICATES (χωρίς κλήση AI).
+        - similarity >= review_threshold: στο _MANUAL_REVIEW, με το πιθανό πρωτότυπο στο reason.
+        Αλλιώς το αρχείο γίνεται υποψήφιο πρωτότυπο και συνεχίζει κανονικά στο AI.
+        """
+        signature = self.near_duplicates.signature(job.text)
+        if signature is None:
+            return
+        match = self.near_duplicates.check_and_add(job.file_id, job.name, signature)
+        if match is None:
+            return
+        similarity = match["similarity"]
+        if match["verdict"] == "duplicate":
+            job.decision = self._duplicate_decision(job, {"name": match["file_name"], "id": match["file_id"]})
+            job.decision["new_name"] = f"{job.name}_NEAR_DUPLICATE_OF_{match['file_name']}"
+            job.decision["near_duplicate"] = True
+        else:
+            job.decision = {"action": "manual_review", "folder_path": [MANUAL_REVIEW_FOLDER], "new_name": None,
+                            "reason": f"Possible near-duplicate of '{match['file_name']}' (similarity {similarity:.2f})."}
+        job.decision["similarity"] = similarity
+        job.decision["near_duplicate_of"] = match["file_id"]
+        job.file_bytes = None
+
+    def pipeline_download(self, job: PipelineJob):
+        """Download stage."""
+        stream = self.drive.download_file_content(job.file_id)
+        if not stream:
+            raise Exception("Could not retrieve file content.")
+        stream.seek(0)
+        job.file_bytes = stream.read()
+        job.bytes_downloaded = len(job.file_bytes or b"")
+        if not job.file_bytes:
+            raise Exception("Could not retrieve file content.")
+
+    def pipeline_dedup(self, job: PipelineJob):
+        """
+        Hash/dedup stage: το πρώτο αρχείο με ένα hash θεωρείται το πρωτότυπο.
+        Το SHA-256 υπολογίζεται μόνο όταν το Drive δεν έδωσε md5Checksum (βλ. pipeline_admit).
+        """
+        if job.file_hash:
+            return
+        job.file_hash = f"sha256:{self._calculate_file_hash(job.file_bytes)}"
+        original_file_info = self._find_original(job)
+        if original_file_info is None:
+            self._try_skip_ai(job)
+            return
+        job.decision = self._duplicate_decision(job, original_file_info)
+        job.file_bytes = None # Δεν χρειάζεται πλέον, απελευθέρωση μνήμης
+
+    def pipeline_classify(self, job: PipelineJob):
+        """AI classification stage: αποφασίζει τον φάκελο προορισμού."""
+        is_pdf = job.mime_type == 'application/pdf'
+        payload, mode = self._build_pdf_payload(job) if is_pdf else (None, None)
+        self._usage_local.target = job.usage
+        try:
+            metadata = self._ask_ai_for_metadata(job.name, job.text, payload)
+        finally:
+            self._usage_local.target = None
+        self._apply_ai_metadata(job, metadata)
+        if mode:
+            job.decision["payload_mode"] = mode
+            job.decision["payload_bytes"] = len(payload or b"")
+
+    def _build_pdf_payload(self, job: PipelineJob) -> tuple:
+        """
+        Επιλέγει τι θα σταλεί στο AI για ένα PDF: (bytes ή None, mode).
+        Το slim PDF χτίζεται στο sandboxed pool· αν αποτύχει, στέλνεται μόνο το κείμενο.
+        """
+        mode = choose_payload_mode(len(job.file_bytes or b""), self.pdf_payload_mode)
+        if mode == MODE_FULL:
+            return job.file_bytes, mode
+        if mode == MODE_SLIM:
+            ok, slim_pdf, _ = get_extraction_pool().run(build_slim_pdf, job.file_bytes)
+            if ok and slim_pdf:
+                return slim_pdf, mode
+            logger.info(f"Slim PDF not available for '{job.name}', sending text only.")
+        return None, MODE_TEXT
+
+    def pipeline_classify_batch(self, jobs: List[PipelineJob], acquire: Callable[[], bool]) -> List[PipelineJob]:
+        """
+        Batched classification stage: τα αρχεία με αρκετό κείμενο ταξινομούνται σε λίγα requests.
+        `acquire()` δεσμεύει μία θέση στο rate limit ανά request.
+        Επιστρέφει τα jobs που πρέπει να ταξινομηθούν ένα-ένα (χωρίς κείμενο ή χωρίς έγκυρη απάντηση).
+        """
+        if not self.model:
+            return jobs
+        eligible = [j for j in jobs if len((j.text or '').strip()) >= self.batch_min_text_chars]
+        leftovers = [j for j in jobs if j not in eligible]
+        if len(eligible) < 2:
+            return jobs
+
+        for batch in self._plan_batches(eligible):
+            if len(batch) == 1 or not acquire():
+                leftovers.extend(batch)
+                continue
+            usage = {"ai_requests": 0, "tokens_in": 0, "tokens_out": 0}
+            self._usage_local.target = usage
+            try:
+                results = self._ask_ai_for_batch_metadata(batch)
+            finally:
+                self._usage_local.target = None
+            for index, job in enumerate(batch):
+                # Το κόστος του batch μοιράζεται στα αρχεία του (το υπόλοιπο στο πρώτο).
+                for key, value in usage.items():
+                    job.usage[key] += value // len(batch) + (value % len(batch) if index == 0 else 0)
+            for job in batch:
+                metadata = results.get(job.file_id)
+                if metadata is None:
+                    leftovers.append(job) # Per-item fallback
+                    continue
+                self._apply_ai_metadata(job, metadata)
+                job.decision["batched"] = True
+        return leftovers
+
+    def _apply_ai_metadata(self, job: PipelineJob, metadata: dict):
+        """Αποθηκεύει την απάντηση του AI στην cache και ορίζει την απόφαση του job."""
+        job.file_bytes = None # Τα bytes δεν χρειάζονται στο apply stage
+        if not metadata.get("ai_failed"):
+            self.classification_cache.put(job.file_hash, self.classification_version, metadata)
+        job.metadata = metadata
+        job.decision = self._decide_target(job.name, metadata)
+        job.decision["source"] = "ai"
+
+    def _decide_target(self, filename: str, metadata: dict) -> Dict[str, Any]:
+        """Μετατρέπει τα metadata του AI σε απόφαση (φάκελος προορισμού + νέο όνομα)."""
+        category = metadata.get("category", "Unknown").replace(" ", "_")
+        brand = metadata.get("brand", "Unknown").replace(" ", "_")
+        model = metadata.get("model", "General_Model").replace(" ", "_")
+        meta_type = metadata.get("meta_type", "General_Manual").replace(" ", "_")
+        error_codes = metadata.get("error_codes", "")
+        reason = metadata.get("reason", "") # For debugging/manual review
+
+        if category not in ALLOWED_CATEGORIES or brand == "Unknown" or model == "General_Model" or meta_type not in ALLOWED_TYPES:
+            if category == "Unknown" and brand == "Unknown" and model == "General_Model" and meta_type == "General_Manual":
+                return {"action": "irrelevant", "folder_path": [IRRELEVANT_OR_UNKNOWN_FOLDER], "new_name": None, "reason": reason}
+            return {"action": "manual_review", "folder_path": [MANUAL_REVIEW_FOLDER], "new_name": None, "reason": reason}
+
+        return {
+            "action": "sorted",
+            "folder_path": [category, brand, model, meta_type],
+            "new_name": self._build_new_filename(filename, meta_type, error_codes),
+            "reason": reason,
+            "category": category, "brand": brand, "model": model, "meta_type": meta_type,
+        }
+
+    def pipeline_apply_batch(self, jobs: List[PipelineJob]):
+        """Drive apply stage: batched δημιουργία φακέλων (ένα batch ανά επίπεδο) και batched move/rename."""
+        if self._dry_run:
+            self._plan_batch(jobs)
+            return
+        for job in jobs:
+            if job.error is not None:
+                job.decision = {"action": "error", "folder_path": ["_AI_ERROR"], "new_name": None}
+        jobs = [job for job in jobs if job.decision["action"] != "resumed"]
+        folder_ids = self._resolve_folder_paths([job.decision["folder_path"] for job in jobs])
+        operations = []
+        jobs_by_id = {}
+        journal_rows = []
+        for job in jobs:
+            target_folder_id = folder_ids.get(tuple(self._clean_folder_name(f) for f in job.decision["folder_path"]))
+            if not target_folder_id:
+                job.error = job.error or f"Failed to create folder: {'/'.join(job.decision['folder_path'])}"
+                journal_rows.append((job.file_id, job.name, STAGE_FAILED, job.decision, job.error))
+                continue
+            if self._already_in_place(target_folder_id, job.item.get('parents', []), job.decision.get("new_name"), job.name):
+                # Πλήρης επανεξέταση: το αρχείο είναι ήδη στον σωστό φάκελο με το σωστό όνομα
+                if job.error is None and job.decision['action'] not in ("duplicate", "error"):
+                    self._register_canonical(job)
+                journal_rows.append((job.file_id, job.name, STAGE_APPLIED, job.decision, job.error))
+                continue
+            journal_rows.append((job.file_id, job.name, STAGE_APPLYING, job.decision, job.error))
+            operations.append({
+                "file_id": job.file_id,
+                "add_parent": target_folder_id,
+                "remove_parents": job.item.get('parents', []),
+                "new_name": job.decision.get("new_name"),
+            })
+            jobs_by_id[job.file_id] = job
+
+        # Το journal γράφεται ΠΡΙΝ από το Drive update: ένα crash στο ενδιάμεσο αφήνει 'applying',
+        # και στο resume το αρχείο ξαναπροσπαθείται μόνο αν είναι ακόμα στο root.
+        self.journal.record_many(self._run_id, journal_rows)
+        if not operations:
+            return
+        results = self.drive.batch_update_files(operations)
+
+        journal_rows, audit_rows = [], []
+        for op in operations:
+            job = jobs_by_id[op["file_id"]]
+            ok = bool(results.get(op["file_id"]))
+            if not ok and job.error is None:
+                job.error = f"Drive update failed for {job.decision['action']}."
+            elif job.error is None and job.decision['action'] not in ("duplicate", "error"):
+                self._register_canonical(job)
+            old_parent = "/".join(self.folder_resolver.get_name(p) or p for p in op["remove_parents"])
+            audit_rows.append((job.file_id, "move", old_parent, "/".join(job.decision["folder_path"]), ok))
+            if op.get("new_name"):
+                audit_rows.append((job.file_id, "rename", job.name, op["new_name"], ok))
+            journal_rows.append((job.file_id, job.name, STAGE_APPLIED if ok else STAGE_FAILED, job.decision, None if ok else job.error))
+        self.journal.record_many(self._run_id, journal_rows)
+        self.journal.audit_many(self._run_id, audit_rows)
+
+    # --- DRY RUN / PLAN ---
+
+    def _plan_batch(self, jobs: List[PipelineJob]):
+        """Dry-run apply stage: καταγράφει τι ΘΑ γινόταν, χωρίς καμία κλήση στο Drive."""
+        items = []
+        for job in jobs:
+            if job.error is not None:
+                job.decision = {"action": "error", "folder_path": ["_AI_ERROR"], "new_name": None, "reason": job.error}
+            decision = job.decision
+            if decision["action"] == "resumed":
+                continue
+            items.append({
+                "file_id": job.file_id,
+                "file_name": job.name,
+                "action": decision["action"],
+                "folder_path": [self._clean_folder_name(f) for f in decision["folder_path"]],
+                "new_name": decision.get("new_name"),
+                "remove_parents": job.item.get('parents', []),
+                "original_file_name": decision.get("original_file_name"),
+                "reason": decision.get("reason", ""),
+                "content_hash": job.file_hash,
+                "classification": decision if decision["action"] == "sorted" else (job.metadata or {}),
+                # Η υπογραφή μένει στο σχέδιο: το discard_unpersisted της επόμενης εκτέλεσης τη σβήνει από τη μνήμη
+                "signature": self.near_duplicates.pending_signature(job.file_id),
+            })
+        with self._plan_lock:
+            self._plan_items.extend(items)
+
+    def _plan_folders(self, items: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Όλοι οι φάκελοι προορισμού (ανά επίπεδο), με ένδειξη αν υπάρχουν ήδη.
+        Μόνο αναγνώσεις: ένα πλήρες (paginated) listing υποφακέλων ανά υπάρχοντα γονικό φάκελο.
+        None αν κάποιο listing αποτύχει: άγνωστο ποιοι φάκελοι υπάρχουν (δεν τους θεωρούμε ανύπαρκτους).
+        """
+        paths = set()
+        for item in items:
+            folder_path = [f for f in item["folder_path"] if f]
+            for depth in range(1, len(folder_path) + 1):
+                paths.add(tuple(folder_path[:depth]))
+
+        children_cache: Dict[str, Dict[str, str]] = {}
+        folder_ids: Dict[tuple, Optional[str]] = {(): self.root_id}
+        folders = []
+        for path in sorted(paths, key=lambda p: (len(p), p)):
+            parent_id = folder_ids.get(path[:-1])
+            folder_id = None
+            if parent_id:
+                if parent_id not in children_cache:
+                    listing = self.drive.list_child_folders(parent_id)
+                    if listing is None:
+                        logger.error(f"Listing folders of {parent_id} failed, existing folders unknown.")
+                        return None
+                    self.folder_resolver.prefill(listing)
+                    children_cache[parent_id] = {f['name']: f['id'] for f in listing}
+                folder_id = children_cache[parent_id].get(path[-1])
+            folder_ids[path] = folder_id
+            folders.append({"path": "/".join(path), "name": path[-1], "parent_path": "/".join(path[:-1]), "exists": folder_id is not None, "folder_id": folder_id})
+        return folders
+
+    def get_plan_diff(self, plan_id: str) -> Optional[Dict[str, Any]]:
+        """Reviewable diff ενός σχεδίου: γραμμές από -> προς, φάκελοι προς δημιουργία, πλήθη ανά ενέργεια."""
+        plan = self.plan_store.get(plan_id)
+        if not plan:
+            return None
+        rows, counts = [], defaultdict(int)
+        for item in plan["items"]:
+            counts[item["action"]] += 1
+            rows.append({
+                "action": item["action"],
+                "file": item["file_name"],
+                "from": "/".join(self.folder_resolver.get_name(p) or p for p in item["remove_parents"]),
+                "to": "/".join(item["folder_path"]),
+                "new_name": item["new_name"] or "",
+                "duplicate_of": item["original_file_name"] or "",
+                "reason": item["reason"] or "",
+                "status": item["status"],
+            })
+        return {
+            "plan_id": plan["plan_id"], "created_at": plan["created_at"], "status": plan["status"],
+            "rows": rows, "counts": dict(counts),
+            "folders_to_create": [f["path"] for f in plan["folders"] if not f["exists"]],
+        }
+
+    def discard_plan(self, plan_id: str):
+        self.plan_store.set_status(plan_id, PLAN_DISCARDED)
+
+    def apply_plan(self, plan_id: str, progress_callback: Callable[[int, int, str], None], log_callback: Callable[[str], None], stop_flag: Any = False) -> Dict[str, Any]:
+        """
+        Εφαρμόζει ένα αποθηκευμένο σχέδιο:
+        1. batched δημιουργία φακέλων, ένα batch ανά επίπεδο (Category > Brand > Model > Type),
+        2. batched μετακινήσεις/μετονομασίες (BATCH_LIMIT ανά request).
+        Οι φάκελοι ξαναελέγχονται πριν τη δημιουργία, ώστε ένα παλιό σχέδιο να μην δημιουργεί διπλούς.
+        `stop_flag` ελέγχεται ανάμεσα στα batches: μετά από διακοπή το σχέδιο μένει draft και
+        μια νέα εφαρμογή συνεχίζει μόνο με τα αρχεία που εκκρεμούν.
+        """
+        started = time.monotonic()
+        plan = self.plan_store.get(plan_id)
+        if not plan or plan["status"] != PLAN_DRAFT:
+            log_callback(f"❌ Plan {plan_id} not found or not a draft.")
+            return {"status": "failed", "message": "Plan not found or not a draft."}
+        items = [item for item in plan["items"] if item["status"] == ITEM_PENDING]
+        progress_callback(5, 100, "Έλεγχος φακέλων...")
+
+        # 1. Φάκελοι: υπάρχοντες από listings, οι υπόλοιποι σε batches ανά επίπεδο.
+        folders = self._plan_folders(items)
+        if folders is None: # Χωρίς πλήρες listing θα δημιουργούσαμε διπλούς φακέλους
+            log_callback(f"❌ Plan {plan_id}: could not list the existing folders on Drive, nothing was applied.")
+            return {"status": "failed", "plan_id": plan_id, "message": "Could not list existing folders."}
+        folder_ids = {f["path"]: f["folder_id"] for f in folders if f["exists"]}
+        folder_ids[""] = self.root_id
+        missing = [f for f in folders if not f["exists"]]
+        created = 0
+        for depth in sorted({f["path"].count("/") for f in missing}):
+            level = [f for f in missing if f["path"].count("/") == depth and folder_ids.get(f["parent_path"])]
+            if not level:
+                continue
+            specs = [{"key": str(i), "name": f["name"], "parent_id": folder_ids[f["parent_path"]]} for i, f in enumerate(level)]
+            results = self.drive.batch_create_folders(specs)
+            for spec, folder in zip(specs, level):
+                folder_id = results.get(spec["key"])
+                if folder_id:
+                    folder_ids[folder["path"]] = folder_id
+                    self.folder_resolver.remember(folder_id, folder["name"], spec["parent_id"])
+                    created += 1
+        log_callback(f"Created {created} folders in batches.")
+        progress_callback(20, 100, "Μετακινήσεις αρχείων...")
+
+        # 2. Μετακινήσεις / μετονομασίες σε batches.
+        applied, failed = 0, 0
+        for start in range(0, len(items), BATCH_LIMIT):
+            if self._stop_requested(stop_flag):
+                log_callback(f"Plan {plan_id} stopped: {applied + failed}/{len(items)} files processed, the rest stay pending.")
+                return {"status": "canceled", "plan_id": plan_id, "applied": applied, "failed": failed, "folders_created": created,
+                        "seconds": round(time.monotonic() - started, 3)}
+            chunk = items[start:start + BATCH_LIMIT]
+            operations, item_results, audit_rows = [], [], []
+            for item in chunk:
+                target_id = folder_ids.get("/".join(item["folder_path"]))
+                if not target_id:
+                    item_results.append((item["file_id"], ITEM_FAILED, "Target folder could not be created."))
+                    continue
+                if self._already_in_place(target_id, item["remove_parents"], item["new_name"], item["file_name"]):
+                    item_results.append((item["file_id"], ITEM_APPLIED, None)) # Τίποτα να αλλάξει στο Drive
+                    self._register_plan_item(item)
+                    continue
+                operations.append({"file_id": item["file_id"], "add_parent": target_id, "remove_parents": item["remove_parents"], "new_name": item["new_name"]})
+            results = self.drive.batch_update_files(operations) if operations else {}
+            by_id = {item["file_id"]: item for item in chunk}
+            for op in operations:
+                item = by_id[op["file_id"]]
+                ok = bool(results.get(op["file_id"]))
+                item_results.append((item["file_id"], ITEM_APPLIED if ok else ITEM_FAILED, None if ok else "Drive update failed."))
+                old_parent = "/".join(self.folder_resolver.get_name(p) or p for p in item["remove_parents"])
+                audit_rows.append((item["file_id"], "move", old_parent, "/".join(item["folder_path"]), ok))
+                if item["new_name"]:
+                    audit_rows.append((item["file_id"], "rename", item["file_name"], item["new_name"], ok))
+                if ok:
+                    self._register_plan_item(item)
+            applied += sum(1 for _, status, _ in item_results if status == ITEM_APPLIED)
+            failed += sum(1 for _, status, _ in item_results if status == ITEM_FAILED)
+            self.plan_store.mark_items(plan_id, item_results)
+            self.journal.audit_many(plan_id, audit_rows)
+            progress_callback(20 + int(80 * min(start + BATCH_LIMIT, len(items)) / max(len(items), 1)), 100, f"Εφαρμογή ({applied + failed}/{len(items)})")
+
+        self.plan_store.set_status(plan_id, PLAN_APPLIED if not failed else PLAN_PARTIAL)
+        seconds = round(time.monotonic() - started, 3)
+        log_callback(f"✅ Plan {plan_id} applied: {applied} moved, {failed} failed, {created} folders created in {seconds}s.")
+        return {"status": "completed", "plan_id": plan_id, "applied": applied, "failed": failed, "folders_created": created, "seconds": seconds}
+
+    def _register_plan_item(self, item: Dict[str, Any]):
+        """Όπως το _register_canonical, για αρχείο σχεδίου: registry + η υπογραφή MinHash που αποθηκεύτηκε στο dry run."""
+        if item["action"] in ("duplicate", "error"):
+            return
+        final_name = item["new_name"] or item["file_name"]
+        self.registry.register(item["content_hash"], item["file_id"], final_name,
+                               path="/".join(item["folder_path"] + [final_name]), classification=item["classification"])
+        self.near_duplicates.persist_signature(item["file_id"], final_name, item["signature"])
+
+    def _register_canonical(self, job: PipelineJob):
+        """Καταχωρεί στο μόνιμο registry το αρχείο ως canonical για το hash του."""
+        decision = job.decision
+        final_name = decision.get("new_name") or job.name
+        classification = decision if decision['action'] == "sorted" else (job.metadata or {})
+        self.registry.register(
+            job.file_hash, job.file_id, final_name,
+            path="/".join(decision["folder_path"] + [final_name]),
+            classification=classification,
+        )
+        self.near_duplicates.persist(job.file_id)
+
+    def _record_outcome(self, job: PipelineJob, summary: dict, failed_files_list: list, manual_review_files_list: list, irrelevant_files_list: list, duplicate_files_list: list, log_callback):
+        """Ενημερώνει summary και λίστες του UI (εκτελείται στο thread του καλούντος)."""
+        filename = job.name
+        link = job.item.get('webViewLink')
+        decision = job.decision or {}
+        action = decision.get("action")
+
+        source = decision.get("source")
+        if source == "ai":
+            summary['ai_calls_made'] += 1
+            if decision.get("batched"):
+                summary['ai_batched_files'] += 1
+            if decision.get("payload_mode"):
+                summary['payload_modes'][decision['payload_mode']] += 1
+                summary['payload_bytes_sent'] += decision.get("payload_bytes", 0)
+                summary['payload_bytes_original'] += int(job.item.get('size') or 0)
+        elif source in ("cache", "rules", "journal"):
+            summary['ai_calls_avoided'] += 1
+            if source == "rules":
+                summary['rule_classified'] += 1
+
+        self._history_files.append(self._history_row(job, action))
+        if action == "resumed":
+            summary['resumed_skipped'] += 1
+            log_callback(f"Skipping {filename}: already moved before the interruption.")
+        elif job.error is not None or action == "error":
+            error = job.error or "Unknown processing error."
+            failed_files_list.append({"name": filename, "id": job.file_id, "error": error, "link": link})
+            log_callback(f"Error processing {filename}: {error}")
+        elif action == "duplicate":
+            reason = f"Duplicate of '{decision['original_file_name']}'."
+            if decision.get("near_duplicate"):
+                reason = f"Near-duplicate of '{decision['original_file_name']}' (similarity {decision['similarity']:.2f})."
+                summary['near_duplicates'] += 1
+            duplicate_files_list.append({"name": filename, "id": job.file_id, "link": link, "original_file_name": decision['original_file_name'],
+                                         "similarity": decision.get("similarity", 1.0), "reason": reason})
+            summary['total_moved_to_duplicates'] += 1
+            if decision.get("registry_hit"):
+                summary['duplicates_from_registry'] += 1
+            if decision.get("checksum_only"):
+                summary['duplicates_detected_without_download'] += 1
+                summary['download_bytes_avoided'] += int(job.item.get('size') or 0)
+            log_callback(f"Identified duplicate and moved: {filename}")
+        elif action == "irrelevant":
+            irrelevant_files_list.append({"name": filename, "id": job.file_id, "link": link, "reason": decision.get('reason', '')})
+            summary['total_moved_to_irrelevant'] += 1
+            log_callback(f"Moved to Irrelevant/Unknown: {filename} (Reason: {decision.get('reason', '')})")
+        elif action == "manual_review":
+            manual_review_files_list.append({"name": filename, "id": job.file_id, "link": link, "reason": decision.get('reason', ''), "ai_suggestion": job.metadata})
+            summary['total_moved_to_manual_review'] += 1
+            if decision.get("near_duplicate_of"):
+                summary['near_duplicate_reviews'] += 1
+            log_callback(f"Moved to Manual Review: {filename} (Reason: {decision.get('reason', '')})")
+        elif action == "sorted":
+            summary['total_successfully_sorted'] += 1
+            summary['category_counts'][decision['category']] += 1
+            summary['brand_counts'][decision['brand']] += 1
+            summary['type_counts'][decision['meta_type']] += 1
+            log_callback(f"Successfully sorted: {filename} to {decision['category']} | {decision['brand']} | {decision['model']} | {decision['meta_type']}")
+
+    @staticmethod
+    def _history_row(job: PipelineJob, action: Optional[str]) -> Dict[str, Any]:
+        """Γραμμή ιστορικού για ένα αρχείο: χρόνοι σταδίων (ms), bytes, κόστος AI, αποτέλεσμα."""
+        decision = job.decision or {}
+        stage_ms = {f"{stage}_ms": round(1000 * job.stage_times.get(stage, 0.0), 1) for stage in FILE_STAGES}
+        return {
+            "file_id": job.file_id, "file_name": job.name, "action": action, "source": decision.get("source"),
+            "outcome": "failed" if job.error is not None or action == "error" else "ok", "error": job.error,
+            "bytes_downloaded": job.bytes_downloaded, **job.usage, **stage_ms,
+            "total_ms": round(sum(stage_ms.values()), 1),
+        }
+
+    def _save_history(self, summary: Dict[str, Any], config: Dict[str, Any], drive_calls: Dict[str, int], started_at: str, force_full_rescan: bool, dry_run: bool) -> Optional[str]:
+        files = self._history_files
+        run = {
+            "run_id": summary.get("run_id") or summary.get("plan_id"), "started_at": started_at,
+            "status": summary.get("status", "completed"), "dry_run": int(dry_run), "force_full_rescan": int(force_full_rescan),
+            "files": len(files), "sorted": summary["total_successfully_sorted"], "duplicates": summary["total_moved_to_duplicates"],
+            "manual_review": summary["total_moved_to_manual_review"], "irrelevant": summary["total_moved_to_irrelevant"],
+            "failed": sum(1 for f in files if f["outcome"] == "failed"), "resumed": summary["resumed_skipped"],
+            "bytes_downloaded": sum(f["bytes_downloaded"] for f in files),
+            "ai_requests": sum(f["ai_requests"] for f in files),
+            "ai_tokens_in": sum(f["tokens_in"] for f in files), "ai_tokens_out": sum(f["tokens_out"] for f in files),
+            "ai_calls_avoided": summary["ai_calls_avoided"], "drive_calls": sum(drive_calls.values()),
+            "total_seconds": summary["pipeline_metrics"]["total_seconds"],
+            "config": config, "stages": summary["pipeline_metrics"]["stages"], "drive_call_kinds": drive_calls,
+            "summary": {k: v for k, v in summary.items() if k not in ("pipeline_metrics", "ai_concurrency")},
+        }
+        summary.update({k: run[k] for k in ("bytes_downloaded", "ai_requests", "ai_tokens_in", "ai_tokens_out", "drive_calls")})
+        return self.history.record_run(run, files)
+
+    def run_sorter(self, stop_flag: Any, progress_callback, log_callback, failed_files_list: list, manual_review_files_list: list, irrelevant_files_list: list, duplicate_files_list: list, force_full_rescan: bool = False, pipeline_config: Optional[Dict[str, Any]] = None, resume: bool = True, dry_run: bool = False) -> dict:
+        """
+        Εκτελεί την ταξινόμηση αρχείων μέσω του staged pipeline (βλ. services/sorter_pipeline.py).
+        `stop_flag`: bool, callable ή st.session_state (ελέγχεται το 'sorter_stop_flag').
         `force_full_rescan`: Αν είναι True, σαρώνει *όλους* τους φακέλους, συμπεριλαμβανομένων των ήδη ταξινομημένων.
+        `pipeline_config`: Προαιρετικές ρυθμίσεις concurrency ανά στάδιο (override του PIPELINE_DEFAULTS).
+        `resume`: Αν υπάρχει εκτέλεση που διακόπηκε, συνεχίζει αυτήν (βλ. core/sorter_journal.py).
+        `dry_run`: Δεν αλλάζει τίποτα στο Drive· αποθηκεύει σχέδιο (summary["plan_id"]) για έλεγχο και apply_plan().
         """
         if not self.root_id:
             log_callback("❌ Error: Drive Root Folder ID is not configured.")
@@ -211,194 +1151,122 @@ class SorterService:
 
         log_callback("🔄 Starting AI Sorter...")
         progress_callback(0, 100, "Αρχικοποίηση...")
-
-        files_to_process = []
-        hash_to_file_map = {} # Για ανίχνευση διπλοτύπων
-        
-        # Πρώτο πέρασμα: Συλλογή αρχείων
-        # Only scan the root for *unsorted* files if not a full rescan.
-        # If force_full_rescan, scan all folders to re-evaluate.
         log_callback(f"Scanning Drive (Force Full Rescan: {force_full_rescan})...")
         progress_callback(5, 100, "Σάρωση αρχείων στο Drive...")
-        
-        # Use _scan_recursive from SyncService to get a full list if force_full_rescan is True
-        # For this context, we need to adapt the scanner from SyncService or implement a similar one.
-        # Let's use a simplified direct scan of the root for unsorted files if not full rescan.
-        # If force_full_rescan, we get all files.
-        all_drive_files = self.drive.list_files_in_folder(self.root_id)
-        
-        current_idx = 0
-        total_files = len(all_drive_files)
-        
-        # If force_full_rescan, we'll re-scan everything. Otherwise, only new/unsorted.
-        for item in all_drive_files:
-            item_name = item['name']
-            if item['mimeType'] == 'application/vnd.google-apps.folder':
-                # If it's a folder, check if it's an IGNORED_FOLDERS_TOP_LEVEL.
-                # If not forcing full rescan, and it's a categorized folder, skip it.
-                if not force_full_rescan and item_name in ALLOWED_CATEGORIES:
-                    log_callback(f"Skipping already categorized folder: {item_name}")
-                    continue
-                # If it's a special folder and we are not forcing full rescan, skip
-                if not force_full_rescan and item_name in IGNORED_FOLDERS_TOP_LEVEL:
-                    log_callback(f"Skipping special ignored folder: {item_name}")
-                    continue
-                
-                # If it's a folder we need to process (either not categorized, or force_full_rescan)
-                # Recursively add its files for processing.
-                # For simplicity in this `run_sorter`, we are primarily interested in files in the *root* or unorganized subfolders.
-                # A full recursive scan is usually done by SyncService before Sorter.
-                # Here, we'll assume `list_files_in_folder` gives us the direct children.
-                # If we want deep processing, this would need to recursively gather files,
-                # which can be complex to integrate here with progress bars effectively.
-                # For this implementation, let's assume `list_files_in_folder` will return what we need,
-                # or that `files_to_process` is initialized with all unclassified files.
-
-                # Simplified: if it's a folder that needs processing (not in ALLOWED_CATEGORIES, not IGNORED, or force_full_rescan)
-                # We will process it as a 'container' for files, but the sorting logic focuses on *files*.
-                # The assumption is, the Sorter's job is to take files from a "holding area" (like the root)
-                # and put them into structured folders. If force_full_rescan is true, even existing folders/files
-                # might be re-evaluated.
-                pass # Folders are not directly "files to process" for sorting themselves
-            
-            elif item['mimeType'].startswith('application/pdf') or item['mimeType'].startswith('image/'):
-                # Check if it's an ignored file from special folders
-                # This needs to check the parent path, which `list_files_in_folder` doesn't provide directly.
-                # We need to refine the `list_files_in_folder` to return parent info or iterate differently.
-                # For now, let's assume if it's directly in root and not in a categorized folder, it's unsorted.
-                
-                # We need to explicitly avoid files that are ALREADY in the organized structure,
-                # unless force_full_rescan is true.
-                is_in_organized_folder = False
-                if 'parents' in item: # Drive API returns 'parents' list
-                    # Get parent folder's name to check if it's already structured
-                    parent_id = item['parents'][0] # Assuming one parent
-                    parent_folder_info = self.drive.service.files().get(fileId=parent_id, fields='name').execute()
-                    parent_folder_name = parent_folder_info.get('name')
-                    
-                    if parent_folder_name in ALLOWED_CATEGORIES or parent_folder_name in IGNORED_FOLDERS_TOP_LEVEL:
-                        is_in_organized_folder = True
-
-                if not is_in_organized_folder or force_full_rescan:
-                    files_to_process.append(item)
-                else:
-                    log_callback(f"Skipping already organized file: {item_name}")
 
-        total_files_to_process = len(files_to_process)
-        log_callback(f"Found {total_files_to_process} files to process.")
+        self._hash_to_file_map = {} # Για ανίχνευση διπλοτύπων
+        self.near_duplicates.discard_unpersisted() # Υπογραφές προηγούμενης εκτέλεσης που δεν ταξινομήθηκαν
+        self._folder_cache = {}
+        self._listed_folders = set()
+        self.classification_cache.reset_stats()
+        self._batch_requests = 0
+
+        # --- Journal: συνέχιση εκτέλεσης που διακόπηκε ή νέα εκτέλεση ---
+        self._resume_states = {}
+        self._dry_run = dry_run
+        self._plan_items = []
+        interrupted = self.journal.resumable_run() if resume and not dry_run else None
+        if dry_run:
+            self._run_id = None # Το dry run δεν γράφει στο journal
+            log_callback("🧪 Dry run: no changes will be made to Drive.")
+            log_callback = (lambda callback: lambda msg: callback(f"[DRY RUN] {msg}"))(log_callback)
+        elif interrupted:
+            self._run_id = interrupted["run_id"]
+            self.journal.resume_run(self._run_id)
+            self._resume_states = self.journal.file_states(self._run_id)
+            applied = sum(1 for state in self._resume_states.values() if state["stage"] == STAGE_APPLIED)
+            log_callback(f"♻️ Resuming interrupted run {self._run_id} ({applied} files already applied).")
+        else:
+            self._run_id = self.journal.start_run(force_full_rescan)
 
         # Summary statistics
         summary = {
+            "status": "completed",
             "last_run_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "total_files_scanned": total_files_to_process,
+            "total_files_scanned": 0,
             "total_successfully_sorted": 0,
             "total_moved_to_manual_review": 0,
             "total_moved_to_irrelevant": 0,
             "total_moved_to_duplicates": 0,
+            "duplicates_detected_without_download": 0,
+            "download_bytes_avoided": 0,
+            "duplicates_from_registry": 0,
+            "near_duplicates": 0, # Σχεδόν-διπλότυπα (MinHash) που πήγαν στο _DUPLICATES
+            "near_duplicate_reviews": 0, # Πιθανά σχεδόν-διπλότυπα που πήγαν για χειροκίνητο έλεγχο
+            "ai_calls_made": 0,
+            "ai_calls_avoided": 0,
+            "rule_classified": 0,
+            "resumed_skipped": 0,
+            "payload_modes": defaultdict(int),
+            "payload_bytes_sent": 0,
+            "payload_bytes_original": 0,
+            "run_id": self._run_id,
+            "resumed_run": bool(interrupted),
+            "ai_batched_files": 0,
+            "ai_batch_requests": 0,
             "category_counts": defaultdict(int),
             "brand_counts": defaultdict(int),
             "type_counts": defaultdict(int)
         }
 
-        for idx, item in enumerate(files_to_process):
-            if stop_flag:
-                log_callback("Sorting stopped by user.")
-                break
+        pipeline = SorterPipeline(self, {**self.pipeline_config, **(pipeline_config or {})})
+        started_at = summary["last_run_timestamp"]
+        self._history_files = []
+        drive_calls_before = dict(getattr(self.drive, 'calls', None) or {})
+        self.ai_concurrency = self._new_concurrency_controller(pipeline.config)
+        self._ai_stop_event = pipeline.stop_event # Τα AI requests (και τα backoff τους) σταματούν μαζί με το pipeline
+        counters = {"queued": 0, "done": 0, "listing_done": False}
 
-            filename = item['name']
-            file_id = item['id']
-            mime_type = item['mimeType']
+        def on_event(kind: str, payload: Any):
+            if kind == "log":
+                log_callback(payload)
+            elif kind == "queued":
+                counters["queued"] = payload
+            elif kind == "listing_done":
+                counters["listing_done"] = True
+                log_callback(f"Found {payload} files to process.")
+            elif kind == "done":
+                counters["done"] += 1
+                self._record_outcome(payload, summary, failed_files_list, manual_review_files_list, irrelevant_files_list, duplicate_files_list, log_callback)
+                total = counters["queued"] or 1
+                label = f"{counters['done']}/{counters['queued']}" + ("" if counters["listing_done"] else "+")
+                progress_callback(10 + int((counters["done"] / total) * 80), 100, f"Επεξεργασία ({label}, AI x{int(self.ai_concurrency.limit)}): {payload.name}")
 
-            log_callback(f"Processing ({idx+1}/{total_files_to_process}): {filename}")
-            progress_callback(10 + int((idx / total_files_to_process) * 80), 100, f"Επεξεργασία: {filename}")
-
-            try:
-                # 1. Extract text and calculate hash
-                file_text, file_bytes, file_hash = self._extract_text_from_pdf(file_id) if mime_type == 'application/pdf' else (None, self.drive.download_file_content(file_id).getvalue(), self._calculate_file_hash(self.drive.download_file_content(file_id).getvalue()))
-
-                if not file_bytes:
-                    raise Exception("Could not retrieve file content.")
-
-                # 2. Duplicate Detection (using hash)
-                if file_hash in hash_to_file_map:
-                    original_file_info = hash_to_file_map[file_hash]
-                    self.drive.move_file(file_id, self._get_or_create_folder(self.root_id, DUPLICATES_FOLDER))
-                    self.drive.rename_file(file_id, f"{filename}_DUPLICATE_OF_{original_file_info['name']}")
-                    duplicate_files_list.append({"name": filename, "link": item['webViewLink'], "original_file_name": original_file_info['name']})
-                    summary['total_moved_to_duplicates'] += 1
-                    log_callback(f"Identified duplicate and moved: {filename}")
-                    continue
-                else:
-                    hash_to_file_map[file_hash] = {"name": filename, "id": file_id}
-
-                # 3. Ask AI for metadata
-                metadata = self._ask_ai_for_metadata(filename, file_text, file_bytes if mime_type == 'application/pdf' else None)
-
-                category = metadata.get("category", "Unknown")
-                brand = metadata.get("brand", "Unknown")
-                model = metadata.get("model", "General_Model")
-                meta_type = metadata.get("meta_type", "General_Manual")
-                error_codes = metadata.get("error_codes", "")
-                reason = metadata.get("reason", "") # For debugging/manual review
-
-                # Normalize names for folder creation
-                category = category.replace(" ", "_")
-                brand = brand.replace(" ", "_")
-                model = model.replace(" ", "_")
-                meta_type = meta_type.replace(" ", "_")
-
-                if category not in ALLOWED_CATEGORIES or brand == "Unknown" or model == "General_Model" or meta_type not in ALLOWED_TYPES:
-                    # Move to _MANUAL_REVIEW or _IRRELEVANT_OR_UNKNOWN
-                    if category == "Unknown" and brand == "Unknown" and model == "General_Model" and meta_type == "General_Manual":
-                        target_folder_id = self._get_or_create_folder(self.root_id, IRRELEVANT_OR_UNKNOWN_FOLDER)
-                        irrelevant_files_list.append({"name": filename, "link": item['webViewLink'], "reason": reason})
-                        summary['total_moved_to_irrelevant'] += 1
-                        log_callback(f"Moved to Irrelevant/Unknown: {filename} (Reason: {reason})")
-                    else:
-                        target_folder_id = self._get_or_create_folder(self.root_id, MANUAL_REVIEW_FOLDER)
-                        manual_review_files_list.append({"name": filename, "link": item['webViewLink'], "reason": reason, "ai_suggestion": metadata})
-                        summary['total_moved_to_manual_review'] += 1
-                        log_callback(f"Moved to Manual Review: {filename} (Reason: {reason})")
-                    self.drive.move_file(file_id, target_folder_id)
-                    continue
-
-                # 4. Create Folder Structure (Category / Brand / Model / Type)
-                category_folder_id = self._get_or_create_folder(self.root_id, category)
-                if not category_folder_id: raise Exception(f"Failed to create category folder: {category}")
-
-                brand_folder_id = self._get_or_create_folder(category_folder_id, brand)
-                if not brand_folder_id: raise Exception(f"Failed to create brand folder: {brand}")
-                
-                model_folder_id = self._get_or_create_folder(brand_folder_id, model)
-                if not model_folder_id: raise Exception(f"Failed to create model folder: {model}")
-
-                type_folder_id = self._get_or_create_folder(model_folder_id, meta_type)
-                if not type_folder_id: raise Exception(f"Failed to create type folder: {meta_type}")
-                
-                # 5. Move File & Rename
-                self.drive.move_file(file_id, type_folder_id)
-                new_filename = f"{filename.replace('.pdf', '')}_{meta_type.upper()}_{error_codes}.pdf" if error_codes else f"{filename.replace('.pdf', '')}_{meta_type.upper()}.pdf"
-                new_filename = new_filename.replace(' ', '_').replace('.', '_') # Ensure safe filename
-                # Limit length to avoid Drive API issues
-                new_filename = new_filename[:200] + ".pdf" if new_filename.endswith(".pdf") and len(new_filename) > 200 else new_filename
-
-                self.drive.rename_file(file_id, new_filename)
+        try:
+            metrics = pipeline.run(
+                self._iter_candidates(force_full_rescan, pipeline.log, pipeline.config["discover_workers"], pipeline.config["discover_max_depth"]),
+                on_event=on_event,
+                should_stop=lambda: self._stop_requested(stop_flag),
+            )
+        finally:
+            self._ai_stop_event = None
 
-                summary['total_successfully_sorted'] += 1
-                summary['category_counts'][category] += 1
-                summary['brand_counts'][brand] += 1
-                summary['type_counts'][meta_type] += 1
-                log_callback(f"Successfully sorted: {filename} to {category} | {brand} | {model} | {meta_type}")
+        summary["total_files_scanned"] = counters["queued"]
+        summary["pipeline_metrics"] = metrics
+        summary["discovery"] = dict(self.walker.stats) if self.walker else {}
+        summary["ai_concurrency"] = self.ai_concurrency.snapshot()
+        summary["classification_cache"] = self.classification_cache.stats()
+        summary["ai_batch_requests"] = self._batch_requests
+        summary["folder_resolver"] = self.folder_resolver.stats()
+        if metrics["stopped"]:
+            summary["status"] = "canceled"
+            log_callback("Sorting stopped by user.")
+        summary["dry_run"] = dry_run
+        if dry_run:
+            self._dry_run = False
+            folders = self._plan_folders(self._plan_items)
+            if folders is None: # Το apply_plan ξαναελέγχει τους φακέλους· εδώ χάνεται μόνο η προεπισκόπηση
+                log_callback("⚠️ Could not list the existing folders on Drive: the plan preview has no folder list.")
+                folders = []
+            summary["planned_folders_to_create"] = sum(1 for f in folders if not f["exists"])
+            summary["plan_id"] = self.plan_store.create(self._plan_items, folders, {k: v for k, v in summary.items() if k != "pipeline_metrics"})
+            log_callback(f"📝 Plan {summary['plan_id']} saved: {len(self._plan_items)} files, {summary['planned_folders_to_create']} new folders.")
 
-            except Exception as e:
-                failed_files_list.append({"name": filename, "id": file_id, "error": str(e), "link": item['webViewLink']})
-                log_callback(f"Error processing {filename}: {e}")
-                logger.error(f"Error during sorting file {filename}: {e}", exc_info=True)
-                # Move to a dedicated error folder for manual inspection by admin
-                error_folder_id = self._get_or_create_folder(self.root_id, "_AI_ERROR")
-                if error_folder_id:
-                    self.drive.move_file(file_id, error_folder_id)
+        drive_calls_after = dict(getattr(self.drive, 'calls', None) or {})
+        drive_calls = {k: v - drive_calls_before.get(k, 0) for k, v in drive_calls_after.items() if v - drive_calls_before.get(k, 0)}
+        summary["history_id"] = self._save_history(summary, pipeline.config, drive_calls, started_at, force_full_rescan, dry_run)
+        self.journal.finish_run(self._run_id, RUN_CANCELED if metrics["stopped"] else RUN_COMPLETED, summary)
 
         progress_callback(100, 100, "Ολοκληρώθηκε!")
         log_callback("✅ AI Sorter Finished.")
-        return summary
\ No newline at end of file
+        return summary
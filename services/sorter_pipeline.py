@@ -0,0 +1,485 @@
+"""
+SERVICE: SORTER PIPELINE (STAGED EDITION)
+-----------------------------------------
+Staged execution engine for the AI Sorter.
+listing -> download -> hash/dedup -> text extraction -> AI classification -> Drive apply
+
+Features:
+- Bounded queues between stages (backpressure: η μνήμη μένει σταθερή όσο μεγάλη κι αν είναι η βιβλιοθήκη).
+- Per-stage concurrency settings (PIPELINE_DEFAULTS).
+- Text extraction σε sandboxed process pool με όρια χρόνου/μνήμης (core/pdf_extractor.py).
+- Rate-limited AI classification pool (η παραλληλία προσαρμόζεται με AIMD, βλ. core/adaptive_concurrency.py).
+- Batched AI classification (πολλά αρχεία ανά request, με fallback ανά αρχείο).
+- Batched Drive apply.
+- Per-stage throughput metrics.
+
+Το module ΔΕΝ κάνει import το streamlit, ώστε οι worker processes να ξεκινούν ελαφριές.
+Όλα τα callbacks προς το UI εκτελούνται στο thread που κάλεσε το run().
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from core.pdf_extractor import PdfExtractionPool, extract_pages
+
+logger = logging.getLogger("Sorter.Pipeline")
+
+STAGE_LISTING = "listing"
+STAGE_DOWNLOAD = "download"
+STAGE_HASH = "hash"
+STAGE_EXTRACT = "extract"
+STAGE_CLASSIFY = "classify"
+STAGE_APPLY = "apply"
+STAGES = [STAGE_LISTING, STAGE_DOWNLOAD, STAGE_HASH, STAGE_EXTRACT, STAGE_CLASSIFY, STAGE_APPLY]
+
+PIPELINE_DEFAULTS = {
+    "queue_size": 16,                 # Μέγιστο πλήθος jobs σε κάθε ουρά μεταξύ σταδίων
+    "discover_workers": 4,            # Ταυτόχρονα listings φακέλων στο αναδρομικό discovery
+    "discover_max_depth": 8,          # Μέγιστο βάθος υποφακέλων κάτω από το root
+    "download_workers": 4,
+    "hash_workers": 1,                # Πρέπει να μείνει 1: η σειρά "πρώτο αρχείο = πρωτότυπο" εξαρτάται από αυτό
+    "extract_workers": 2,
+    "extract_use_processes": True,    # False = εξαγωγή μέσα σε threads (π.χ. περιβάλλοντα χωρίς fork/spawn)
+    "extract_timeout": 30,            # Δευτερόλεπτα ανά PDF πριν σκοτωθεί ο worker
+    "extract_memory_mb": 512,         # Όριο μνήμης ανά worker process
+    "classify_workers": 8,            # Ανώτατο όριο: η πραγματική παραλληλία AI ρυθμίζεται δυναμικά (AIMD)
+    "ai_concurrency_initial": 2,      # Αρχικό όριο ταυτόχρονων κλήσεων AI
+    "ai_concurrency_min": 1,
+    "classify_rate_per_minute": 60,   # Όριο κλήσεων Gemini ανά λεπτό (0 = χωρίς όριο)
+    "classify_batch_size": 8,         # Μέγιστα αρχεία ανά request ταξινόμησης (1 = ένα request ανά αρχείο)
+    "classify_batch_wait": 0.5,       # Δευτερόλεπτα αναμονής για να γεμίσει ένα batch ταξινόμησης
+    "apply_batch_size": 20,
+    "apply_batch_wait": 0.5,          # Δευτερόλεπτα αναμονής για να γεμίσει ένα batch
+    "pdf_max_pages": 8,
+    "pdf_max_chars": 5000,
+}
+
+_SENTINEL = object()
+
+
+class PipelineJob:
+    """Ένα αρχείο που περνάει από τα στάδια του pipeline."""
+
+    def __init__(self, item: Dict[str, Any], seq: int):
+        self.item = item
+        self.seq = seq
+        self.file_bytes: Optional[bytes] = None
+        self.file_hash: Optional[str] = None
+        self.text: Optional[str] = None
+        self.metadata: Optional[Dict[str, Any]] = None
+        self.decision: Optional[Dict[str, Any]] = None # Τελική απόφαση (sorted/manual_review/irrelevant/duplicate/error)
+        self.error: Optional[str] = None
+        self.stage_times: Dict[str, float] = {}
+        self.bytes_downloaded = 0
+        self.usage = {"ai_requests": 0, "tokens_in": 0, "tokens_out": 0} # Κόστος AI (για το ιστορικό εκτελέσεων)
+
+    @property
+    def file_id(self) -> str:
+        return self.item['id']
+
+    @property
+    def name(self) -> str:
+        return self.item['name']
+
+    @property
+    def mime_type(self) -> str:
+        return self.item.get('mimeType', '')
+
+    def is_settled(self) -> bool:
+        """True αν το job δεν χρειάζεται άλλη επεξεργασία πριν το apply."""
+        return self.error is not None or self.decision is not None
+
+
+class StageMetrics:
+    """Thread-safe μετρητές throughput για ένα στάδιο."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, started: float, ended: float, ok: bool = True, count: int = 1):
+        with self._lock:
+            self.items += count
+            if not ok:
+                self.errors += count
+            self.busy_seconds += ended - started
+            if self.first_start is None or started < self.first_start:
+                self.first_start = started
+            if self.last_end is None or ended > self.last_end:
+                self.last_end = ended
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            wall = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+            return {
+                "stage": self.name,
+                "workers": self.workers,
+                "items": self.items,
+                "errors": self.errors,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "wall_seconds": round(wall, 3),
+                "items_per_second": round(self.items / wall, 2) if wall > 0 else 0.0,
+                "avg_ms": round(1000 * self.busy_seconds / self.items, 1) if self.items else 0.0,
+            }
+
+
+class RateLimiter:
+    """Απλός token bucket για τις κλήσεις AI."""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_second = rate_per_minute / 60.0 if rate_per_minute else 0.0
+        self.capacity = max(1.0, self.rate_per_second)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event: threading.Event) -> bool:
+        """Μπλοκάρει μέχρι να υπάρχει διαθέσιμο token. Επιστρέφει False αν ζητήθηκε διακοπή."""
+        if not self.rate_per_second:
+            return True
+        while not stop_event.is_set():
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_second)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate_per_second
+            stop_event.wait(min(wait, 0.5))
+        return False
+
+
+class SorterPipeline:
+    """
+    Εκτελεί τα στάδια του Sorter σε threads με bounded queues.
+    Το `handler` (SorterService) παρέχει τη λογική κάθε σταδίου:
+      - pipeline_admit(job)         (προαιρετικό, στο listing thread, μόνο με metadata)
+      - pipeline_download(job)
+      - pipeline_dedup(job)
+      - pipeline_near_duplicate(job) (προαιρετικό, στο extract stage, μόλις υπάρχει κείμενο)
+      - pipeline_classify(job)
+      - pipeline_classify_batch(jobs, acquire) (προαιρετικό, επιστρέφει τα jobs που έμειναν αταξινόμητα)
+      - pipeline_apply_batch(jobs)
+    """
+
+    def __init__(self, handler: Any, config: Optional[Dict[str, Any]] = None):
+        self.handler = handler
+        self.config = {**PIPELINE_DEFAULTS, **(config or {})}
+        self.stop_event = threading.Event()
+        self.events: "queue.Queue" = queue.Queue()
+        self.metrics = {
+            STAGE_LISTING: StageMetrics(STAGE_LISTING, 1),
+            STAGE_DOWNLOAD: StageMetrics(STAGE_DOWNLOAD, self.config["download_workers"]),
+            STAGE_HASH: StageMetrics(STAGE_HASH, self.config["hash_workers"]),
+            STAGE_EXTRACT: StageMetrics(STAGE_EXTRACT, self.config["extract_workers"]),
+            STAGE_CLASSIFY: StageMetrics(STAGE_CLASSIFY, self.config["classify_workers"]),
+            STAGE_APPLY: StageMetrics(STAGE_APPLY, 1),
+        }
+        self.rate_limiter = RateLimiter(self.config["classify_rate_per_minute"])
+        self._process_pool: Optional[PdfExtractionPool] = None
+        self._threads: List[threading.Thread] = []
+
+    def log(self, message: str):
+        """Thread-safe log: το μήνυμα παραδίδεται στο on_event του καλούντος thread."""
+        self.events.put(("log", message))
+
+    # --- STAGE FUNCTIONS ---
+
+    def _run_download(self, job: PipelineJob):
+        self.handler.pipeline_download(job)
+
+    def _run_hash(self, job: PipelineJob):
+        self.handler.pipeline_dedup(job)
+
+    def _run_extract(self, job: PipelineJob):
+        if job.mime_type != 'application/pdf' or not job.file_bytes:
+            return
+        args = (job.file_bytes, (0, self.config["pdf_max_pages"]), self.config["pdf_max_chars"])
+        result = self._process_pool.extract(*args) if self._process_pool else extract_pages(*args)
+        if result["ok"]:
+            job.text = result["text"]
+            near_duplicate = getattr(self.handler, 'pipeline_near_duplicate', None)
+            if near_duplicate and job.text:
+                near_duplicate(job)
+        else:
+            # Δεν είναι μοιραίο: το AI μπορεί να ταξινομήσει και χωρίς κείμενο.
+            logger.warning(f"Text extraction failed for '{job.name}': {result['error']}")
+            job.text = None
+
+    def _run_classify(self, job: PipelineJob):
+        if not self.rate_limiter.acquire(self.stop_event):
+            return
+        self.handler.pipeline_classify(job)
+
+    # --- WORKERS ---
+
+    @staticmethod
+    def _worker_exited(out_q: "queue.Queue", state: Dict[str, Any]):
+        """Ο τελευταίος worker ενός σταδίου που τερματίζει προωθεί τα sentinels στο επόμενο."""
+        with state["lock"]:
+            state["remaining"] -= 1
+            last = state["remaining"] == 0
+        if last:
+            for _ in range(state["downstream_workers"]):
+                out_q.put(_SENTINEL)
+
+    def _stage_worker(self, stage: str, fn: Callable, in_q: "queue.Queue", out_q: "queue.Queue", state: Dict[str, Any]):
+        metrics = self.metrics[stage]
+        while True:
+            job = in_q.get()
+            if job is _SENTINEL:
+                self._worker_exited(out_q, state)
+                return
+            if self.stop_event.is_set():
+                continue # Απορρίπτουμε το job, συνεχίζουμε μόνο για να περάσουν τα sentinels
+            if not job.is_settled():
+                started = time.monotonic()
+                try:
+                    fn(job)
+                except Exception as e:
+                    logger.error(f"Stage '{stage}' failed for '{job.name}': {e}", exc_info=True)
+                    job.error = f"{stage}: {e}"
+                ended = time.monotonic()
+                job.stage_times[stage] = ended - started
+                metrics.record(started, ended, ok=job.error is None)
+            out_q.put(job)
+
+    def _classify_batch_worker(self, in_q: "queue.Queue", out_q: "queue.Queue", state: Dict[str, Any]):
+        """
+        Classify stage σε batches: μαζεύει έως `classify_batch_size` αταξινόμητα jobs και τα
+        δίνει στο handler.pipeline_classify_batch. Όσα δεν ταξινομηθούν από το batch
+        ταξινομούνται ένα-ένα (pipeline_classify), με το ίδιο rate limit.
+        """
+        metrics = self.metrics[STAGE_CLASSIFY]
+        batch_size = max(1, self.config["classify_batch_size"])
+        batch_wait = self.config["classify_batch_wait"]
+        pending: List[PipelineJob] = []
+
+        def acquire() -> bool:
+            return self.rate_limiter.acquire(self.stop_event)
+
+        def flush():
+            if not pending:
+                return
+            batch = list(pending)
+            pending.clear()
+            started = time.monotonic()
+            try:
+                leftovers = self.handler.pipeline_classify_batch(batch, acquire)
+            except Exception as e:
+                logger.error(f"Batch classification failed, falling back to single-file requests: {e}", exc_info=True)
+                leftovers = batch
+            for job in leftovers:
+                if job.is_settled() or self.stop_event.is_set():
+                    continue
+                try:
+                    self._run_classify(job)
+                except Exception as e:
+                    logger.error(f"Stage '{STAGE_CLASSIFY}' failed for '{job.name}': {e}", exc_info=True)
+                    job.error = f"{STAGE_CLASSIFY}: {e}"
+            ended = time.monotonic()
+            per_job = (ended - started) / len(batch)
+            for job in batch:
+                job.stage_times[STAGE_CLASSIFY] = per_job
+                out_q.put(job)
+            metrics.record(started, ended, ok=all(j.error is None for j in batch), count=len(batch))
+
+        while True:
+            try:
+                job = in_q.get(timeout=batch_wait if pending else None)
+            except queue.Empty:
+                flush()
+                continue
+            if job is _SENTINEL:
+                flush()
+                self._worker_exited(out_q, state)
+                return
+            if self.stop_event.is_set():
+                continue
+            if job.is_settled():
+                out_q.put(job)
+                continue
+            pending.append(job)
+            if len(pending) >= batch_size:
+                flush()
+
+    def _apply_worker(self, in_q: "queue.Queue", workers_upstream: int):
+        metrics = self.metrics[STAGE_APPLY]
+        batch_size = max(1, self.config["apply_batch_size"])
+        batch_wait = self.config["apply_batch_wait"]
+        pending: List[PipelineJob] = []
+        sentinels = 0
+
+        def flush():
+            if not pending:
+                return
+            started = time.monotonic()
+            try:
+                self.handler.pipeline_apply_batch(list(pending))
+            except Exception as e:
+                logger.error(f"Apply batch failed: {e}", exc_info=True)
+                for job in pending:
+                    if job.error is None:
+                        job.error = f"{STAGE_APPLY}: {e}"
+            ended = time.monotonic()
+            per_job = (ended - started) / len(pending)
+            for job in pending:
+                job.stage_times[STAGE_APPLY] = per_job
+                self.events.put(("done", job))
+            metrics.record(started, ended, ok=all(j.error is None for j in pending), count=len(pending))
+            pending.clear()
+
+        while sentinels < workers_upstream:
+            try:
+                job = in_q.get(timeout=batch_wait if pending else None)
+            except queue.Empty:
+                flush()
+                continue
+            if job is _SENTINEL:
+                sentinels += 1
+                continue
+            if self.stop_event.is_set():
+                continue
+            pending.append(job)
+            if len(pending) >= batch_size:
+                flush()
+        if not self.stop_event.is_set():
+            flush()
+        self.events.put(("finished", None))
+
+    def _listing_worker(self, candidates: Any, out_q: "queue.Queue", downstream_workers: int):
+        metrics = self.metrics[STAGE_LISTING]
+        seq = 0
+        try:
+            iterator = iter(candidates)
+            while not self.stop_event.is_set():
+                started = time.monotonic()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                seq += 1
+                job = PipelineJob(item, seq)
+                # Έλεγχοι μόνο με τα metadata του listing (π.χ. md5 dedup), πριν από οποιοδήποτε download.
+                admit = getattr(self.handler, 'pipeline_admit', None)
+                if admit:
+                    try:
+                        admit(job)
+                    except Exception as e:
+                        logger.error(f"Admission check failed for '{job.name}': {e}", exc_info=True)
+                ended = time.monotonic()
+                job.stage_times[STAGE_LISTING] = ended - started
+                metrics.record(started, ended)
+                self.events.put(("queued", seq))
+                out_q.put(job)
+        except Exception as e:
+            logger.error(f"Listing stage failed: {e}", exc_info=True)
+            self.events.put(("log", f"Listing error: {e}"))
+        finally:
+            close = getattr(candidates, 'close', None)
+            if close:
+                close() # Generator discovery: ακυρώνει τα listings που εκκρεμούν (π.χ. μετά από Stop)
+            self.events.put(("listing_done", seq))
+            for _ in range(downstream_workers):
+                out_q.put(_SENTINEL)
+
+    # --- ORCHESTRATION ---
+
+    def _start_process_pool(self):
+        if not self.config["extract_use_processes"] or self.config["extract_workers"] < 1:
+            return
+        self._process_pool = PdfExtractionPool(
+            workers=self.config["extract_workers"],
+            timeout=self.config["extract_timeout"],
+            memory_limit_mb=self.config["extract_memory_mb"],
+        )
+
+    def run(self, candidates: Any, on_event: Callable[[str, Any], None], should_stop: Callable[[], bool] = lambda: False) -> Dict[str, Any]:
+        """
+        Εκτελεί το pipeline μέχρι να εξαντληθούν τα candidates ή να ζητηθεί διακοπή.
+        `candidates`: iterable με Drive items (μπορεί να είναι generator, διαβάζεται στο listing thread).
+        `on_event(kind, payload)`: καλείται ΠΑΝΤΑ στο thread του καλούντος
+            ("queued", seq), ("listing_done", total), ("done", job), ("log", msg).
+        `should_stop()`: ελέγχεται περιοδικά στο thread του καλούντος.
+        Επιστρέφει τα metrics ανά στάδιο.
+        """
+        cfg = self.config
+        started = time.monotonic()
+        self._start_process_pool()
+
+        workers = {
+            STAGE_DOWNLOAD: max(1, cfg["download_workers"]),
+            STAGE_HASH: max(1, cfg["hash_workers"]),
+            STAGE_EXTRACT: max(1, cfg["extract_workers"]),
+            STAGE_CLASSIFY: max(1, cfg["classify_workers"]),
+        }
+        stage_fns = [
+            (STAGE_DOWNLOAD, self._run_download),
+            (STAGE_HASH, self._run_hash),
+            (STAGE_EXTRACT, self._run_extract),
+            (STAGE_CLASSIFY, self._run_classify),
+        ]
+        queues = [queue.Queue(maxsize=cfg["queue_size"]) for _ in range(len(stage_fns) + 1)]
+
+        listing = threading.Thread(
+            target=self._listing_worker, args=(candidates, queues[0], workers[STAGE_DOWNLOAD]),
+            name="sorter-listing", daemon=True
+        )
+        self._threads.append(listing)
+        batch_classify = cfg["classify_batch_size"] > 1 and hasattr(self.handler, 'pipeline_classify_batch')
+        for idx, (stage, fn) in enumerate(stage_fns):
+            downstream = workers[stage_fns[idx + 1][0]] if idx + 1 < len(stage_fns) else 1
+            state = {"lock": threading.Lock(), "remaining": workers[stage], "downstream_workers": downstream}
+            for n in range(workers[stage]):
+                if stage == STAGE_CLASSIFY and batch_classify:
+                    target, args = self._classify_batch_worker, (queues[idx], queues[idx + 1], state)
+                else:
+                    target, args = self._stage_worker, (stage, fn, queues[idx], queues[idx + 1], state)
+                self._threads.append(threading.Thread(
+                    target=target, args=args, name=f"sorter-{stage}-{n}", daemon=True
+                ))
+        self._threads.append(threading.Thread(
+            target=self._apply_worker, args=(queues[-1], 1), name="sorter-apply", daemon=True
+        ))
+
+        for t in self._threads:
+            t.start()
+
+        finished = False
+        try:
+            while True:
+                try:
+                    kind, payload = self.events.get(timeout=0.2)
+                except queue.Empty:
+                    if not self.stop_event.is_set() and should_stop():
+                        self.stop_event.set()
+                    continue
+                if kind == "finished":
+                    finished = True
+                    break
+                on_event(kind, payload)
+                if not self.stop_event.is_set() and should_stop():
+                    self.stop_event.set()
+        finally:
+            # Rule 4: αν το on_event/should_stop σκάσει, σταματάμε τα workers πριν το join
+            if not finished:
+                self.stop_event.set()
+            for t in self._threads:
+                t.join(timeout=5)
+            if self._process_pool:
+                self._process_pool.shutdown()
+                self._process_pool = None
+
+        return {
+            "total_seconds": round(time.monotonic() - started, 3),
+            "stopped": self.stop_event.is_set(),
+            "stages": [self.metrics[s].to_dict() for s in STAGES],
+        }
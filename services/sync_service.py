@@ -6,6 +6,10 @@ SERVICE: SYNC SERVICE (FINAL SELF-CONTAINED FIX)
 3. Update Only: Updates existing 'drive_index.json' to avoid Quota limits.
 4. METADATA EXTRACTION: Extracts Brand, Model, and Meta_Type from file paths.
 5. IMPROVEMENT: Scans ALL folders to build a complete index for browsing.
+6. HASH REGISTRY: Rebuilds the persistent content-hash registry from the index.
+7. PDF TEXT: Sandboxed per-page extraction (core/pdf_extractor.py) for indexed manuals.
+8. TEXT CACHE: Extracted pages are cached persistently per file_id + checksum (core/text_cache.py).
+9. ERROR CODES: Incremental error-code index (core/error_code_index.py) built during sync.
 """
 import streamlit as st
 import json
@@ -16,11 +20,18 @@ import logging
 from googleapiclient.http import MediaIoBaseUpload
 import io
 import re
+import time
 from services.sorter_logic import IGNORED_FOLDERS_TOP_LEVEL # Rule 3: Use shared ignored folders list
+from core.hash_registry import HashRegistry
+from core.pdf_extractor import get_extraction_pool
+from core.text_cache import get_text_cache
+from core.error_code_index import get_error_code_index
 from typing import List, Dict, Any, Optional # For type hinting
 
 logger = logging.getLogger("Sync") # Rule 4: Logging
 INDEX_FILENAME = "drive_index.json"
+ERROR_INDEX_MAX_MANUALS_PER_SYNC = 40 # Manuals που σαρώνονται για κωδικούς σφαλμάτων ανά sync (σταδιακά)
+ERROR_INDEX_MAX_PAGES = 400
 
 class SyncService:
     def __init__(self):
@@ -64,6 +75,18 @@ class SyncService:
         except Exception as e:
             logger.warning(f"Failed to save local index: {e}", exc_info=True) # Rule 4
 
+        # 2β. Merge του μόνιμου hash registry με το νέο index (οι εγγραφές του Sorter μένουν)
+        try: # Rule 4: Error Handling
+            HashRegistry().merge_from_index(all_files)
+        except Exception as e:
+            logger.warning(f"Failed to merge hash registry with index: {e}", exc_info=True) # Rule 4
+
+        # 2γ. Σταδιακή ενημέρωση του error-code index (μόνο νέα/αλλαγμένα manuals)
+        try: # Rule 4: Error Handling
+            self.update_error_code_index(all_files, my_bar=my_bar)
+        except Exception as e:
+            logger.warning(f"Failed to update error-code index: {e}", exc_info=True) # Rule 4
+
         # 3. CLOUD UPDATE (Direct API Call - Χωρίς μεσάζοντες)
         try: # Rule 4: Error Handling
             # Απευθείας αναζήτηση μέσω του service (παρακάμπτουμε το DriveManager για την ενημέρωση του index file)
@@ -106,6 +129,34 @@ class SyncService:
             st.error(f"❌ Σφάλμα κατά την ενημέρωση Cloud: {e}") # Rule 5
             return all_files
 
+    def update_error_code_index(self, all_files: List[Dict[str, Any]], my_bar: Any = None,
+                                max_manuals: int = ERROR_INDEX_MAX_MANUALS_PER_SYNC) -> Dict[str, int]:
+        """
+        Σαρώνει για κωδικούς σφαλμάτων τα manuals που λείπουν από το error-code index ή άλλαξε το checksum τους,
+        το πολύ `max_manuals` ανά sync (τα υπόλοιπα στο επόμενο). Πρώτα τα Error_Codes / Service manuals.
+        Το κείμενο έρχεται από την cache κειμένου όταν υπάρχει. Αφαιρεί αρχεία που δεν υπάρχουν πια.
+        """
+        index = get_error_code_index()
+        removed = index.prune(item['file_id'] for item in all_files)
+        pending = [item for item in all_files
+                   if item.get('mime') == 'application/pdf' and not index.is_indexed(item['file_id'], item.get('md5Checksum'))]
+        pending.sort(key=lambda item: (0 if 'ERROR' in str(item.get('meta_type', '')).upper() else
+                                       1 if 'SERVICE' in str(item.get('meta_type', '')).upper() else 2))
+        batch = pending[:max_manuals]
+        codes = 0
+        for position, item in enumerate(batch, start=1):
+            if my_bar is not None:
+                my_bar.progress(min(80 + int(15 * position / len(batch)), 95), text=f"🔢 Error codes {position}/{len(batch)}: {item.get('original_name', item['name'])}")
+            result = self.extract_manual_pages(item['file_id'], page_range=(0, ERROR_INDEX_MAX_PAGES), checksum=item.get('md5Checksum'))
+            if not result["ok"]:
+                logger.warning(f"Error-code scan skipped '{item['name']}': {result['error']}") # Rule 4
+                continue
+            codes += index.add_manual(item['file_id'], item.get('original_name') or item['name'], result["pages"],
+                                      brand=item.get('brand', ''), model=item.get('model', ''), checksum=item.get('md5Checksum'))
+        summary = {"scanned": len(batch), "remaining": len(pending) - len(batch), "codes": codes, "removed": removed}
+        logger.info(f"🔢 Error-code index updated: {summary}") # Rule 4
+        return summary
+
     def _scan_recursive(self, current_folder_id: str, path_prefix: str, my_bar: Any, progress_text: str, current_progress: int, total_progress_steps: int, force_full_rescan_for_sync: bool = False) -> List[Dict[str, Any]]:
         """
         Αναδρομική σάρωση φακέλων στο Google Drive.
@@ -154,6 +205,8 @@ class SyncService:
                         "name": full_name_path, # The full path in Drive
                         "link": item['webViewLink'],
                         "mime": item['mimeType'],
+                        "md5Checksum": item.get('md5Checksum'), # Για το HashRegistry (rebuild από το index)
+                        "size": item.get('size'),
                         **metadata # Unpack the extracted metadata
                     }
                     all_files_metadata.append(file_entry)
@@ -227,6 +280,41 @@ class SyncService:
         # We store them as they are parsed, let UI handle display formatting if needed.
         return metadata
 
+    def extract_manual_pages(self, file_id: str, page_range: Optional[tuple] = None, max_chars: Optional[int] = None,
+                             checksum: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Κείμενο ανά σελίδα ενός manual: πρώτα από τη μόνιμη cache (core/text_cache.py, κλειδί file_id + checksum),
+        αλλιώς download + extraction στο κοινό pool και αποθήκευση στην cache.
+        Επιστρέφει το δομημένο αποτέλεσμα του PdfExtractionPool.extract (pages, timing, error).
+        """
+        try: # Rule 4: Error Handling
+            cache = get_text_cache()
+            checksum = checksum or self._get_checksum(file_id)
+            cached = cache.get(file_id, checksum, page_range, max_chars)
+            if cached is not None:
+                return cached
+            started = time.perf_counter()
+            stream = self.drive.download_file_content(file_id) # Rule 7
+            if not stream:
+                return {"ok": False, "page_count": 0, "pages": [], "text": "", "elapsed_ms": 0.0, "error": "Download failed.", "timed_out": False}
+            download_ms = 1000 * (time.perf_counter() - started)
+            stream.seek(0)
+            result = get_extraction_pool().extract(stream.read(), page_range, max_chars)
+            cache.put(file_id, checksum, result, download_ms)
+            return result
+        except Exception as e:
+            logger.error(f"Error extracting pages for file ID '{file_id}': {e}", exc_info=True) # Rule 4
+            return {"ok": False, "page_count": 0, "pages": [], "text": "", "elapsed_ms": 0.0, "error": str(e), "timed_out": False}
+
+    def _get_checksum(self, file_id: str) -> Optional[str]:
+        """md5Checksum ενός αρχείου από το Drive (Rule 7: direct call), όταν ο caller δεν το έχει από το index."""
+        try: # Rule 4: Error Handling
+            meta = self.drive.service.files().get(fileId=file_id, fields="md5Checksum").execute() # Rule 7
+            return meta.get('md5Checksum')
+        except Exception as e:
+            logger.warning(f"Could not read checksum for file ID '{file_id}': {e}") # Rule 4
+            return None
+
     def load_index(self) -> List[Dict[str, Any]]:
         """
         Φορτώνει τον index από τοπικό αρχείο `drive_index.json` ή από το Google Drive.